@@ -0,0 +1,172 @@
+"""
+Benchmark of the apply command against the integrate, modify and delete commands it replaces.
+
+It starts local stand-ins of Orion, WebHDFS and docker (see stubs.py), integrates every Data Model of a
+synthetic configuration file and then edits it: the throttling of some Data Models changes, the HDFS file
+of others changes, some are added, some are removed and one moves to another fiware service. The edits are
+applied twice on copies of the same state: with apply, and with the commands needed before it (modify of the
+changed Data Models, integrate of the added ones and delete --deploy of the removed ones). Every run is a
+fresh process, recording its wall time, the Orion requests and the docker calls (so the Cygnus restarts).
+A second apply checks that applying an unchanged configuration file makes no request.
+
+Usage: python benchmarks/apply.py [--datamodels N] [--changes N] [--latency MS] [--remote] [--json]
+"""
+import argparse
+import copy
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_PATH)
+
+from operations import DATAMODEL_SECTION, patch_solution, run_operation, write_config
+from stubs import OrionStub, WebHDFSStub, FakeDocker
+
+
+def edit_config(path, datamodels, changes):
+	"""
+	Edits a synthetic configuration file
+
+	:param str path: path of the configuration file
+	:param int datamodels: number of Data Model sections
+	:param int changes: number of Data Models of every kind of edit
+	:return: the Data Models modified, added and removed
+	:rtype: dict
+	"""
+	with open(path) as file:
+		content = file.read()
+	edited = {"modified": [], "added": [], "removed": []}
+	for index in range(changes):
+		content = re.sub(r'(file_name = weather_%s\nexpires =\nthrottling = )\d+' % index, r'\g<1>10', content)
+		content = content.replace('file_name = weather_%s\n' % (changes + index),
+								  'file_name = weather_%s_v2\n' % (changes + index))
+		content = content.replace(DATAMODEL_SECTION.format(index=datamodels - 1 - index,
+														   service=(datamodels - 1 - index) % 10), '')
+		content += DATAMODEL_SECTION.format(index='New%s' % index, service=0)
+		edited["modified"] += ['datamodel.Weather%s' % index, 'datamodel.Weather%s' % (changes + index)]
+		edited["added"].append('datamodel.WeatherNew%s' % index)
+		edited["removed"].append('datamodel.Weather%s' % (datamodels - 1 - index))
+	service_index = 2 * changes
+	content = content.replace('fiware_service = city{service}\nfiware_servicepath = /district{index}\n'.format(
+		service=service_index % 10, index=service_index), 'fiware_service = moved\nfiware_servicepath = /district'
+																 '{index}\n'.format(index=service_index))
+	edited["modified"].append('datamodel.Weather%s' % service_index)
+	with open(path, 'w') as file:
+		file.write(content)
+	return edited
+
+
+def run_commands(work_path, remote, commands, results):
+	"""
+	Runs some operations in the current process. It is the target of the measured processes
+
+	:param str work_path: folder with the configuration file and where the internal state is kept
+	:param bool remote: deploy Cygnus through the in-process SSH stand-in
+	:param list commands: tuples (operation, Data Models), the operation being apply, plan, modify,
+		integrate or delete
+	:param results: queue where the wall time and the outcome are put
+	:return: None
+	"""
+	main = patch_solution(work_path, remote)
+	config = os.path.join(work_path, 'cb_bdti.ini')
+	start = time.perf_counter()
+	success = True
+	for operation, datamodels in commands:
+		if operation in ['apply', 'plan']:
+			plan = main.BDTI(config, deploy=operation == 'apply').apply(operation == 'plan')
+			success = success and bool(plan) and not any(step.get("error") for step in plan["steps"])
+		elif operation == 'delete':
+			success = main.BDTI(config, delete=True, deploy=True).delete(datamodels, True, False) and success
+		else:
+			success = getattr(main.BDTI(config), operation)(datamodels) and success
+	results.put({"seconds": time.perf_counter() - start, "success": success})
+
+
+def run(datamodels, changes, latency, remote):
+	"""
+	Applies the edits with apply and with the previous commands
+
+	:return: the measures of every mode
+	:rtype: dict
+	"""
+	orion = OrionStub(latency)
+	hdfs = WebHDFSStub()
+	docker = FakeDocker()
+	os.environ['PATH'] = docker.bin_path + os.pathsep + os.environ['PATH']
+	context = multiprocessing.get_context('spawn')
+	results = {}
+
+	def measure(work_path, commands):
+		orion.reset_counts()
+		restarts = docker.count_calls('run')
+		queue = context.Queue()
+		process = context.Process(target=run_commands, args=(work_path, remote, commands, queue))
+		process.start()
+		measures = queue.get()
+		process.join()
+		requests = orion.reset_counts()
+		measures.update({"orion_requests": sum(count for method, count in requests.items() if method != 'GET'),
+						 "orion_requests_by_method": requests,
+						 "cygnus_restarts": docker.count_calls('run') - restarts})
+		return measures
+
+	try:
+		with tempfile.TemporaryDirectory(prefix='cb_bdti_bench_') as base_path:
+			open(os.path.join(base_path, 'internal_conf.ini'), 'w').close()
+			write_config(os.path.join(base_path, 'cb_bdti.ini'), datamodels, orion.url, hdfs.port, remote)
+			queue = context.Queue()
+			process = context.Process(target=run_operation, args=('integrate', base_path, remote, queue))
+			process.start()
+			queue.get()
+			process.join()
+			edited = edit_config(os.path.join(base_path, 'cb_bdti.ini'), datamodels, changes)
+			subscriptions = copy.deepcopy(orion.subscriptions)
+
+			for mode in ['commands', 'plan', 'apply']:
+				work_path = os.path.join(base_path, mode)
+				shutil.copytree(base_path, work_path, ignore=shutil.ignore_patterns('commands', 'plan', 'apply'))
+				# every mode starts from the same subscriptions
+				orion.subscriptions = copy.deepcopy(subscriptions)
+				if mode == 'commands':
+					commands = [('modify', edited["modified"]), ('integrate', edited["added"]),
+								('delete', edited["removed"])]
+				else:
+					commands = [(mode, None)]
+				results[mode] = measure(work_path, commands)
+			results["apply_again"] = measure(os.path.join(base_path, 'apply'), [('apply', None)])
+	finally:
+		orion.close()
+		hdfs.close()
+		docker.close()
+	return results
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+	parser.add_argument('--datamodels', type=int, default=100, help='Data Models of the configuration file')
+	parser.add_argument('--changes', type=int, default=5, help='Data Models of every kind of edit')
+	parser.add_argument('--latency', type=float, default=0, help='Orion latency in milliseconds')
+	parser.add_argument('--remote', action='store_true', help='Deploy Cygnus through the SSH stand-in')
+	parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+	args = parser.parse_args()
+
+	results = run(args.datamodels, args.changes, args.latency / 1000, args.remote)
+	if args.json:
+		print(json.dumps(results, indent=4))
+		return
+	print('{:<36} {:>8} {:>14} {:>16} {:>8}'.format('MODE', 'SECONDS', 'ORION CHANGES', 'CYGNUS RESTARTS',
+													 'SUCCESS'))
+	for mode, title in (("commands", "modify + integrate + delete"), ("plan", "apply --plan-only"),
+						("apply", "apply"), ("apply_again", "apply (unchanged configuration)")):
+		print('{title:<36} {seconds:>8.3f} {orion_requests:>14} {cygnus_restarts:>16} {success!s:>8}'.format(
+			title=title, **results[mode]))
+
+
+if __name__ == '__main__':
+	main()
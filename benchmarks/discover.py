@@ -0,0 +1,112 @@
+"""
+Benchmark of the discovery of the entity types of Orion.
+
+It starts a local stand-in of Orion (see stubs.py) with the entities of several types in several fiware
+services, and runs the discover command with one worker, as a sequential discovery would, and with several
+workers. It measures the wall time, the Orion requests, the types discovered and the sections suggested.
+Every run is a fresh process.
+
+Usage: python benchmarks/discover.py [--services N] [--types N] [--latency MS] [--workers 1 10] [--json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_PATH)
+
+from operations import patch_solution, write_config
+from stubs import OrionStub
+
+
+def add_entities(orion, services, types):
+	"""
+	Adds the entities of every type to every fiware service of the Orion stand-in, ten times more entities
+	for every type than for the previous one
+
+	:param OrionStub orion: the Orion stand-in
+	:param int services: number of fiware services
+	:param int types: number of entity types of every fiware service
+	:return: None
+	"""
+	for service in range(services):
+		entities = orion.entities.setdefault('city{service}'.format(service=service), {})
+		for index in range(types):
+			entity_type = 'BenchType{index}'.format(index=index)
+			for number in range(10 ** (index % 4)):
+				entity_id = 'urn:ngsi-ld:{type}:{number}'.format(type=entity_type, number=number)
+				entities[entity_id] = {"id": entity_id, "type": entity_type}
+
+
+def run_discover(work_path, workers, results):
+	"""
+	Discovers the entity types in the current process. It is the target of the measured processes
+
+	:param str work_path: folder with the configuration file and where the internal state is kept
+	:param int workers: maximum number of concurrent requests to Orion
+	:param results: queue where the measures are put
+	:return: None
+	"""
+	main = patch_solution(work_path, False)
+	bdti = main.BDTI(os.path.join(work_path, 'cb_bdti.ini'), delete=True, deploy=False)
+	start = time.perf_counter()
+	discovered = bdti.discover(workers=workers)
+	seconds = time.perf_counter() - start
+	results.put({"seconds": seconds, "types": len(discovered),
+				 "suggested": len(main.BDTI.get_suggested_sections(discovered)[0])})
+
+
+def run(services, types, latency, workers_list):
+	"""
+	Runs the discovery with every number of workers
+
+	:return: the measures of every number of workers
+	:rtype: list
+	"""
+	orion = OrionStub(latency)
+	add_entities(orion, services, types)
+	context = multiprocessing.get_context('spawn')
+	results = []
+	try:
+		with tempfile.TemporaryDirectory(prefix='cb_bdti_bench_') as work_path:
+			open(os.path.join(work_path, 'internal_conf.ini'), 'w').close()
+			# a Data Model section for every fiware service, so all of them are discovered
+			write_config(os.path.join(work_path, 'cb_bdti.ini'), services, orion.url, 0, False)
+			for workers in workers_list:
+				orion.reset_counts()
+				queue = context.Queue()
+				process = context.Process(target=run_discover, args=(work_path, workers, queue))
+				process.start()
+				measures = queue.get()
+				process.join()
+				measures.update(workers=workers, orion_requests=sum(orion.reset_counts().values()))
+				results.append(measures)
+	finally:
+		orion.close()
+	return results
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+	parser.add_argument('--services', type=int, default=10, help='Fiware services of Orion')
+	parser.add_argument('--types', type=int, default=20, help='Entity types of every fiware service')
+	parser.add_argument('--latency', type=float, default=5, help='Latency of Orion in milliseconds')
+	parser.add_argument('--workers', type=int, nargs='+', default=[1, 10], help='Concurrent requests to Orion')
+	parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+	args = parser.parse_args()
+
+	results = run(args.services, args.types, args.latency / 1000, args.workers)
+	if args.json:
+		print(json.dumps(results, indent=4))
+		return
+	print('{:>8} {:>8} {:>9} {:>6} {:>10}'.format('WORKERS', 'SECONDS', 'REQUESTS', 'TYPES', 'SUGGESTED'))
+	for result in results:
+		print('{workers:>8} {seconds:>8.3f} {orion_requests:>9} {types:>6} {suggested:>10}'.format(**result))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,160 @@
+"""
+Benchmark of the integration of Data Models spread over several Orions.
+
+It starts three local stand-ins of Orion, a WebHDFS and a docker one (see stubs.py) and integrates a synthetic
+configuration file whose Data Models are spread evenly over the Orion of the fiware section and two
+[orion.<name>] sections, in two scenarios:
+
+- slow Orion: one of the Orions answers slower than the others.
+- Orion down: one of the Orions stops answering (every request takes longer than its timeout).
+
+Each scenario is integrated one Orion after another, in the order of the configuration file and stopping at the
+first error, as integrate did before the Data Models were grouped by Orion, and grouped by Orion, each Orion
+in its own thread. It measures the wall time, the requests received by every Orion and the Data Models
+integrated in every Orion. Every run is a fresh process.
+
+Usage: python benchmarks/federation.py [--datamodels N] [--latency MS] [--slow-latency MS] [--timeout SECONDS]
+									   [--json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import time
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_PATH)
+
+from operations import patch_solution, write_config
+from stubs import OrionStub, WebHDFSStub, FakeDocker
+
+ORIONS = ['', 'south', 'east']
+
+
+def write_federated_config(path, datamodels, orions, hdfs_port, timeout):
+	"""
+	Writes a synthetic configuration file whose Data Models are spread over the Orions, the last one with a timeout
+
+	:param str path: path of the configuration file
+	:param int datamodels: number of Data Model sections
+	:param dict orions: Orion stand-in by name, the one of the fiware section with an empty name
+	:param int hdfs_port: port of the WebHDFS stand-in
+	:param float timeout: timeout of the requests to the last Orion
+	:return: None
+	"""
+	write_config(path, datamodels, orions[''].url, hdfs_port, False)
+	with open(path) as file:
+		content = file.read()
+	index = iter(range(datamodels))
+	content = re.sub(r'(throttling = \d+\n)', lambda match: '%sorion = %s\n' % (
+		match.group(1), ORIONS[next(index) % len(ORIONS)]), content)
+	for name in ORIONS[1:]:
+		content += '\n[orion.{name}]\norion.host = {url}\n'.format(name=name, url=orions[name].url)
+	content += 'orion.timeout = {timeout}\n'.format(timeout=timeout)
+	with open(path, 'w') as file:
+		file.write(content)
+
+
+def run_integrate(work_path, grouped, results):
+	"""
+	Integrates every Data Model in the current process. It is the target of the measured processes
+
+	:param str work_path: folder with the configuration file and where the internal state is kept
+	:param bool grouped: group the Data Models by Orion. Otherwise, integrate them one Orion after another
+	:param results: queue where the wall time and the Data Models integrated in every Orion are put
+	:return: None
+	"""
+	main = patch_solution(work_path, False)
+	# the requests that time out are expected
+	main.logging.disable(main.logging.ERROR)
+	if not grouped:
+		def run_in_order(function, datamodels, get_orion_url):
+			try:
+				return [function(datamodels)], []
+			except Exception:
+				return [], ['every Orion']
+		main.BDTI.run_by_orion = staticmethod(run_in_order)
+	start = time.perf_counter()
+	main.BDTI(os.path.join(work_path, 'cb_bdti.ini')).integrate(['all'])
+	seconds = time.perf_counter() - start
+	integrated = {}
+	for datamodel in main.ConfigManager.get_internal_sections():
+		orion_url = main.ConfigManager.get_internal_value(datamodel, main.ORION_SUBSCRIPTION_URL)
+		integrated[orion_url] = integrated.get(orion_url, 0) + 1
+	results.put({"seconds": seconds, "integrated": integrated})
+
+
+def run(datamodels, latency, slow_latency, timeout):
+	"""
+	Runs every scenario
+
+	:return: the measures of every scenario
+	:rtype: list
+	"""
+	orions = {name: OrionStub(latency) for name in ORIONS}
+	hdfs = WebHDFSStub()
+	docker = FakeDocker()
+	os.environ['PATH'] = docker.bin_path + os.pathsep + os.environ['PATH']
+	context = multiprocessing.get_context('spawn')
+	scenarios = [("slow Orion", slow_latency), ("Orion down", timeout * 3)]
+	results = []
+	try:
+		for scenario, last_latency in scenarios:
+			for grouped in (False, True):
+				with tempfile.TemporaryDirectory(prefix='cb_bdti_bench_') as work_path:
+					open(os.path.join(work_path, 'internal_conf.ini'), 'w').close()
+					write_federated_config(os.path.join(work_path, 'cb_bdti.ini'), datamodels, orions, hdfs.port,
+										   timeout)
+					# the requests that timed out in the previous run are not answered yet
+					while any(orion.in_flight for orion in orions.values()):
+						time.sleep(0.1)
+					for name, orion in orions.items():
+						orion.subscriptions = {}
+						orion.latency = last_latency if name == ORIONS[-1] else latency
+						orion.reset_counts()
+					queue = context.Queue()
+					process = context.Process(target=run_integrate, args=(work_path, grouped, queue))
+					process.start()
+					measures = queue.get()
+					process.join()
+					integrated = measures.pop("integrated")
+					measures.update(scenario=scenario, mode='grouped by Orion' if grouped else 'one after another',
+									orions=[{"orion": name or 'fiware',
+											 "requests": sum(orion.reset_counts().values()),
+											 "integrated": sum(count for orion_url, count in integrated.items()
+															   if orion_url.startswith(orion.url))}
+											for name, orion in orions.items()])
+					results.append(measures)
+	finally:
+		for orion in orions.values():
+			orion.close()
+		hdfs.close()
+		docker.close()
+	return results
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+	parser.add_argument('--datamodels', type=int, default=60, help='Data Models of the configuration file')
+	parser.add_argument('--latency', type=float, default=5, help='Latency of the Orions in milliseconds')
+	parser.add_argument('--slow-latency', type=float, default=50, help='Latency of the slow Orion in milliseconds')
+	parser.add_argument('--timeout', type=float, default=0.5, help='Timeout of the requests to the Orion that stops '
+															   'answering, in seconds')
+	parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+	args = parser.parse_args()
+
+	results = run(args.datamodels, args.latency / 1000, args.slow_latency / 1000, args.timeout)
+	if args.json:
+		print(json.dumps(results, indent=4))
+		return
+	print('{:<12} {:<18} {:>8}  {}'.format('SCENARIO', 'MODE', 'SECONDS', 'INTEGRATED/REQUESTS BY ORION'))
+	for result in results:
+		print('{scenario:<12} {mode:<18} {seconds:>8.3f}  {by_orion}'.format(by_orion='  '.join(
+			'{orion}: {integrated}/{requests}'.format(**orion) for orion in result["orions"]), **result))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,119 @@
+"""
+Benchmark of the grouping rules simulator used by the simulate command.
+
+It builds the grouping rules of synthetic configurations with 10, 100 and 1,000 Data Models and evaluates
+a synthetic notification stream against them, reporting the entities matched per second with the memo of
+entity keys (as simulate runs) and without it, where every regex is tried for every entity.
+
+Usage: python benchmarks/grouping_rules.py [--rules 10 100 1000] [--events N] [--keys N] [--json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from cb_bdti.config.constants import *
+from cb_bdti.config.cygnus.manager import CygnusConfManager
+from cb_bdti.config.cygnus.simulator import GroupingRulesSimulator
+
+FORMAT_FILE = "json-row"
+
+
+def build_models(count):
+	"""
+	Builds the sections of synthetic Data Models with two types each, half of them matching their service path
+
+	:param int count: number of Data Models
+	:return: values of the datamodels sections
+	:rtype: list
+	"""
+	return [{DATA_MODEL_TYPES: "WeatherObserved{index} WeatherForecast{index}".format(index=index),
+			 DATA_MODEL_FIWARE_SERVICEPATH: "/district{index}".format(index=index),
+			 DATA_MODEL_FILE_PATH: "weather{index}".format(index=index),
+			 DATA_MODEL_FILE_NAME: "weather_{index}".format(index=index),
+			 DATA_MODEL_GROUPING_RULE_ID: index + 1}
+			for index in range(count)]
+
+
+def build_records(count, models, keys):
+	"""
+	Builds legacy notifications with one entity each, spread over a number of distinct entity keys.
+	One key in ten belongs to no Data Model
+
+	:param int count: number of notifications
+	:param int models: number of Data Models
+	:param int keys: number of distinct (type, service path) keys
+	:return: the notifications
+	:rtype: list
+	"""
+	random.seed(0)
+	entities = []
+	for key in range(keys):
+		index = key % models
+		entity_type = "Unknown%s" % key if key % 10 == 9 else "WeatherObserved%s" % index
+		entities.append(({"id": "urn:ngsi-ld:%s:%s" % (entity_type, key), "type": entity_type,
+						  "temperature": {"type": "Number", "value": 21.5}},
+						 "/district%s" % index))
+	records = []
+	for _ in range(count):
+		entity, service_path = random.choice(entities)
+		records.append({"fiware-service": "city", "fiware-servicepath": service_path, "data": [entity]})
+	return records
+
+
+def run(rules_count, records, cache_size):
+	"""
+	Evaluates the notifications against the grouping rules of a synthetic configuration
+
+	:param int rules_count: number of Data Models
+	:param list records: the notifications
+	:param int cache_size: maximum number of memoized entity keys, 0 to disable the memo
+	:return: the entities per second and the report of the simulator
+	:rtype: tuple
+	"""
+	rules = CygnusConfManager.build_grouping_rules(build_models(rules_count), FORMAT_FILE)
+	simulator = GroupingRulesSimulator(rules, FORMAT_FILE, cache_size)
+	start = time.perf_counter()
+	for record in records:
+		simulator.add(record)
+	elapsed = time.perf_counter() - start
+	return simulator.events / elapsed, simulator.get_report(SECONDS_PER_DAY, "hdfs")
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+	parser.add_argument('--rules', type=int, nargs='+', default=[10, 100, 1000],
+						help='Numbers of Data Models, and so of grouping rules')
+	parser.add_argument('--events', type=int, default=200000, help='Notifications of the stream')
+	parser.add_argument('--keys', type=int, default=5000, help='Distinct entity types and service paths')
+	parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+	args = parser.parse_args()
+
+	results = []
+	for rules_count in args.rules:
+		records = build_records(args.events, rules_count, args.keys)
+		memoized, report = run(rules_count, records, SIMULATOR_CACHE_SIZE)
+		# without the memo the cost grows with the rules, so a tenth of the stream is enough
+		unmemoized, _ = run(rules_count, records[:max(1, len(records) // 10)], 0)
+		results.append({"rules": rules_count, "events": report["events"], "unmatched": report["unmatched"],
+						"memoized_events_per_second": memoized, "unmemoized_events_per_second": unmemoized,
+						"cache": report["cache"]})
+
+	if args.json:
+		print(json.dumps(results, indent=4))
+		return
+	print('{:>6} {:>10} {:>10} {:>16} {:>16} {:>10}'.format('RULES', 'EVENTS', 'UNMATCHED', 'MEMO (ev/s)',
+															  'NO MEMO (ev/s)', 'HIT RATIO'))
+	for result in results:
+		cache = result["cache"]
+		print('{:>6} {:>10} {:>10} {:>16,.0f} {:>16,.0f} {:>10.3f}'.format(
+			result["rules"], result["events"], result["unmatched"], result["memoized_events_per_second"],
+			result["unmemoized_events_per_second"], cache["hits"] / max(1, cache["hits"] + cache["misses"])))
+
+
+if __name__ == '__main__':
+	main()
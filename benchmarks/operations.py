@@ -0,0 +1,227 @@
+"""
+Benchmark of the integrate, modify and delete operations over synthetic configuration files.
+
+It starts local stand-ins of Orion, WebHDFS and docker (see stubs.py), and runs BDTI.integrate,
+BDTI.modify and BDTI.delete with every Data Model of configuration files with 10, 100 and 1,000 Data Models.
+Every operation runs in a fresh process, recording its wall time, the requests received by the stand-ins
+and its peak RSS. Cygnus startup wait and logging are disabled, so only the integration work is measured.
+
+Usage: python benchmarks/operations.py [--sizes 10 100 1000] [--latency MS] [--error-rate RATE] [--remote]
+									   [--output results.json] [--baseline previous.json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+SOURCE_PATH = os.path.join(os.path.dirname(BENCHMARKS_PATH), 'src')
+sys.path.insert(0, BENCHMARKS_PATH)
+
+from stubs import OrionStub, WebHDFSStub, FakeDocker
+
+OPERATIONS = ['integrate', 'modify', 'delete']
+
+CONFIG_HEADER = """[fiware]
+orion.host = {orion_url}
+cygnus.host = 127.0.0.1
+cygnus.ssh_key_path = {key_path}
+cygnus.ssh_username = {username}
+
+[hdfs]
+hdfs.host = 127.0.0.1
+hdfs.port = {hdfs_port}
+hdfs.format_file = json-row
+hdfs.username = hdfs
+hdfs.oauth2_token =
+hdfs.krb5_auth =
+hdfs.krb5_user =
+hdfs.krb5_password =
+"""
+
+DATAMODEL_SECTION = """
+[datamodel.Weather{index}]
+types = WeatherObserved WeatherForecast
+fiware_service = city{service}
+fiware_servicepath = /district{index}
+file_path = weather{index}
+file_name = weather_{index}
+expires =
+throttling = 5
+"""
+
+
+def write_config(path, datamodels, orion_url, hdfs_port, remote):
+	"""
+	Writes a synthetic configuration file
+
+	:param str path: path of the configuration file
+	:param int datamodels: number of Data Model sections
+	:param str orion_url: URL of the Orion stand-in
+	:param int hdfs_port: port of the WebHDFS stand-in
+	:param bool remote: deploy Cygnus through SSH
+	:return: None
+	"""
+	with open(path, 'w') as file:
+		file.write(CONFIG_HEADER.format(orion_url=orion_url, hdfs_port=hdfs_port,
+										key_path='/dev/null' if remote else '', username='bench' if remote else ''))
+		for index in range(datamodels):
+			file.write(DATAMODEL_SECTION.format(index=index, service=index % 10))
+
+
+def patch_solution(work_path, remote, ssh_latency=0.0):
+	"""
+	Points the solution of the current process to the stand-ins and to the files of the work folder,
+	without Cygnus startup wait, logging or prompts
+
+	:param str work_path: folder with the configuration file and where the internal state is kept
+	:param bool remote: deploy Cygnus through the in-process SSH stand-in
+	:param float ssh_latency: seconds taken by the SSH handshake of the stand-in
+	:return: the main module of the solution
+	:rtype: module
+	"""
+	import logging
+	sys.path.insert(0, SOURCE_PATH)
+	if remote:
+		from stubs import fake_paramiko
+		sys.modules['paramiko'] = fake_paramiko(os.path.join(work_path, 'sftp'), ssh_latency)
+
+	import cb_bdti.config.manager as config_manager
+	import cb_bdti.config.outbox as outbox
+	import cb_bdti.config.registry as registry
+	import cb_bdti.core.handler.handler as deployment_handler
+	import cb_bdti.core.main as main
+	from cb_bdti.utils.helpers import Helpers
+
+	config_manager.INTERNAL_CONF = os.path.join(work_path, 'internal_conf.ini')
+	outbox.OUTBOX_CONF = os.path.join(work_path, 'outbox.ini')
+	registry.DATAMODELS_CACHE = os.path.join(work_path, 'datamodels_cache.json')
+	main.AGENT = deployment_handler.AGENT = os.path.join(work_path, 'agent.conf')
+	main.GROUPING_RULES = deployment_handler.GROUPING_RULES = os.path.join(work_path, 'grouping_rules.conf')
+	deployment_handler.CYGNUS_STARTUP_WAIT = 0
+	main.config_logging = lambda: logging.basicConfig(level=logging.ERROR)
+
+	def confirm_action(message):
+		raise RuntimeError('Unexpected prompt: {message}'.format(message=message))
+	Helpers.confirm_action = staticmethod(confirm_action)
+	return main
+
+
+def run_operation(operation, work_path, remote, results):
+	"""
+	Runs an operation in the current process. It is the target of the operation processes
+
+	:param str operation: integrate, modify or delete
+	:param str work_path: folder with the configuration file and where the internal state is kept
+	:param bool remote: deploy Cygnus through the in-process SSH stand-in
+	:param results: queue where the measures are put
+	:return: None
+	"""
+	main = patch_solution(work_path, remote)
+	config = os.path.join(work_path, 'cb_bdti.ini')
+	start = time.perf_counter()
+	if operation == 'integrate':
+		main.BDTI(config).integrate(['all'])
+	elif operation == 'modify':
+		main.BDTI(config).modify(['all'])
+	else:
+		main.BDTI(config, delete=True, deploy=True).delete(['all'], True, False)
+	wall_seconds = time.perf_counter() - start
+	results.put({"wall_seconds": wall_seconds,
+				 "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss})
+
+
+def run(sizes, latency, error_rate, remote):
+	"""
+	Runs every operation for every size
+
+	:return: the results
+	:rtype: dict
+	"""
+	orion = OrionStub(latency, error_rate)
+	hdfs = WebHDFSStub()
+	docker = FakeDocker()
+	os.environ['PATH'] = docker.bin_path + os.pathsep + os.environ['PATH']
+	context = multiprocessing.get_context('spawn')
+	results = []
+	try:
+		for size in sizes:
+			with tempfile.TemporaryDirectory(prefix='cb_bdti_bench_') as work_path:
+				open(os.path.join(work_path, 'internal_conf.ini'), 'w').close()
+				write_config(os.path.join(work_path, 'cb_bdti.ini'), size, orion.url, hdfs.port, remote)
+				for operation in OPERATIONS:
+					orion.reset_counts()
+					hdfs.reset_counts()
+					docker_calls = docker.count_calls()
+					queue = context.Queue()
+					process = context.Process(target=run_operation, args=(operation, work_path, remote, queue))
+					process.start()
+					measures = queue.get()
+					process.join()
+					orion_requests = orion.reset_counts()
+					measures.update({"datamodels": size, "operation": operation,
+									 "orion_requests": sum(orion_requests.values()),
+									 "orion_requests_by_method": orion_requests,
+									 "hdfs_requests": sum(hdfs.reset_counts().values()),
+									 "docker_calls": docker.count_calls() - docker_calls})
+					results.append(measures)
+					print('{datamodels:>6} {operation:<10} {wall_seconds:>9.3f}s {orion_requests:>7} orion reqs '
+						  '{docker_calls:>3} docker calls {peak_rss_kb:>8} KB peak RSS'.format(**measures))
+	finally:
+		orion.close()
+		hdfs.close()
+		docker.close()
+
+	return {"environment": {"python": platform.python_version(), "platform": platform.platform(),
+							"cpus": os.cpu_count()},
+			"parameters": {"sizes": sizes, "latency_ms": latency * 1000, "error_rate": error_rate,
+						   "remote": remote},
+			"results": results}
+
+
+def compare(results, baseline):
+	"""
+	Prints the wall time and requests of the results relative to a baseline
+
+	:param dict results: results of this run
+	:param dict baseline: results of a previous run
+	:return: None
+	"""
+	previous = {(el["datamodels"], el["operation"]): el for el in baseline["results"]}
+	print('\nCompared with baseline:')
+	for result in results["results"]:
+		base = previous.get((result["datamodels"], result["operation"]))
+		if not base:
+			continue
+		print('{datamodels:>6} {operation:<10} wall time x{wall:.2f}  orion requests x{requests:.2f}'.format(
+			datamodels=result["datamodels"], operation=result["operation"],
+			wall=result["wall_seconds"] / base["wall_seconds"],
+			requests=result["orion_requests"] / max(base["orion_requests"], 1)))
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000], help='Data Models per run')
+	parser.add_argument('--latency', type=float, default=0, help='Orion latency in milliseconds')
+	parser.add_argument('--error-rate', type=float, default=0, help='Fraction of Orion requests failing')
+	parser.add_argument('--remote', action='store_true', help='Deploy Cygnus through the SSH stand-in')
+	parser.add_argument('--output', '-o', help='Write the results as JSON to this path')
+	parser.add_argument('--baseline', '-b', help='Compare the results with a previous JSON results file')
+	args = parser.parse_args()
+
+	results = run(args.sizes, args.latency / 1000, args.error_rate, args.remote)
+	if args.output:
+		with open(args.output, 'w') as file:
+			json.dump(results, file, indent=4)
+	if args.baseline:
+		with open(args.baseline) as file:
+			compare(results, json.load(file))
+
+
+if __name__ == '__main__':
+	main()
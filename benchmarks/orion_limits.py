@@ -0,0 +1,179 @@
+"""
+Benchmark of the limits of the Orion requests: the circuit breaker when Orion is down and the rate and
+concurrency limits when it is shared.
+
+It starts local stand-ins of Orion, WebHDFS and docker (see stubs.py), integrates every Data Model of a
+synthetic configuration file and changes the throttling of all of them. Then, on copies of the same state:
+
+- Orion down: Orion stops answering (every request takes longer than the timeout) after the command started,
+  and the changes are applied with apply (concurrent requests) and the subscriptions renewed with renew
+  (one request after another), with and without circuit breaker. It measures the wall time, the requests
+  that reached Orion and the Data Models left pending or failed.
+- Orion shared: Orion answers with some latency, and the changes are applied with apply without limits and
+  with a rate and concurrency limit. It measures the wall time, the peak of concurrent requests and the
+  maximum requests received within a second.
+
+Every run is a fresh process.
+
+Usage: python benchmarks/orion_limits.py [--datamodels N] [--timeout SECONDS] [--rate N] [--concurrency N]
+										 [--latency MS] [--json]
+"""
+import argparse
+import copy
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_PATH)
+
+from operations import patch_solution, run_operation, write_config
+from stubs import OrionStub, WebHDFSStub, FakeDocker
+
+
+def set_limits(path, limits):
+	"""
+	Sets the limits of the Orion requests in the main section of a configuration file
+
+	:param str path: path of the configuration file
+	:param dict limits: value of each limit by key
+	:return: None
+	"""
+	with open(path) as file:
+		content = file.read()
+	lines = ''.join('{key} = {value}\n'.format(key=key, value=value) for key, value in limits.items())
+	with open(path, 'w') as file:
+		file.write(content.replace('[fiware]\n', '[fiware]\n' + lines, 1))
+
+
+def run_command(work_path, command, results):
+	"""
+	Runs apply or renew in the current process. It is the target of the measured processes. Orion is not
+	checked when the command starts, as it may be down on purpose
+
+	:param str work_path: folder with the configuration file and where the internal state is kept
+	:param str command: apply or renew
+	:param results: queue where the wall time and the outcome are put
+	:return: None
+	"""
+	from datetime import datetime, timedelta, timezone
+	main = patch_solution(work_path, False)
+	# the requests that time out are expected
+	main.logging.disable(main.logging.ERROR)
+	main.Validators.check_orion_url = staticmethod(lambda orion_url: None)
+	start = time.perf_counter()
+	if command == 'apply':
+		plan = main.BDTI(os.path.join(work_path, 'cb_bdti.ini')).apply()
+		steps = plan["steps"] if plan else []
+		pending = sum(1 for step in steps if step.get("pending"))
+		failed = sum(1 for step in steps if step.get("error")) - pending
+	else:
+		main.BDTI(os.path.join(work_path, 'cb_bdti.ini'), deploy=False)
+		expires = main.Helpers.format_iso_datetime(datetime.now(timezone.utc) + timedelta(hours=1))
+		for datamodel in main.ConfigManager.get_internal_sections():
+			main.ConfigManager.set_internal_value(datamodel, main.DATA_MODEL_EXPIRES, expires)
+		pending_datamodels = []
+		log_pending = main.BDTI.log_pending
+		main.BDTI.log_pending = staticmethod(lambda datamodels: pending_datamodels.extend(datamodels))
+		main.BDTI.renew_subscriptions(timedelta(days=30), timedelta(days=1))
+		main.BDTI.log_pending = log_pending
+		renewed = [datamodel for datamodel in main.ConfigManager.get_internal_sections()
+				   if main.ConfigManager.get_internal_value(datamodel, main.DATA_MODEL_EXPIRES) != expires]
+		pending = len(pending_datamodels)
+		failed = len(main.ConfigManager.get_internal_sections()) - len(renewed) - pending
+	results.put({"seconds": time.perf_counter() - start, "pending": pending, "failed": failed})
+
+
+def run(datamodels, timeout, rate, concurrency, latency):
+	"""
+	Runs every scenario
+
+	:return: the measures of every scenario
+	:rtype: dict
+	"""
+	orion = OrionStub()
+	hdfs = WebHDFSStub()
+	docker = FakeDocker()
+	os.environ['PATH'] = docker.bin_path + os.pathsep + os.environ['PATH']
+	context = multiprocessing.get_context('spawn')
+	scenarios = [
+		("down", "apply without circuit breaker", 'apply', {"orion.breaker_failures": 0}),
+		("down", "apply with circuit breaker", 'apply', {}),
+		("down", "renew without circuit breaker", 'renew', {"orion.breaker_failures": 0}),
+		("down", "renew with circuit breaker", 'renew', {}),
+		("shared", "apply without limits", 'apply', {}),
+		("shared", "apply with rate and concurrency limits", 'apply',
+		 {"orion.rate_limit": rate, "orion.max_concurrency": concurrency}),
+	]
+	results = []
+	try:
+		with tempfile.TemporaryDirectory(prefix='cb_bdti_bench_') as base_path:
+			config = os.path.join(base_path, 'cb_bdti.ini')
+			open(os.path.join(base_path, 'internal_conf.ini'), 'w').close()
+			write_config(config, datamodels, orion.url, hdfs.port, False)
+			queue = context.Queue()
+			process = context.Process(target=run_operation, args=('integrate', base_path, False, queue))
+			process.start()
+			queue.get()
+			process.join()
+			with open(config) as file:
+				content = file.read()
+			with open(config, 'w') as file:
+				file.write(re.sub(r'throttling = \d+', 'throttling = 10', content))
+			subscriptions = copy.deepcopy(orion.subscriptions)
+
+			for index, (scenario, title, command, limits) in enumerate(scenarios):
+				work_path = os.path.join(base_path, 'run%s' % index)
+				shutil.copytree(base_path, work_path, ignore=shutil.ignore_patterns('run*'))
+				set_limits(os.path.join(work_path, 'cb_bdti.ini'), dict({"orion.timeout": timeout}, **limits))
+				# the requests that timed out in the previous run are not answered yet
+				while orion.in_flight:
+					time.sleep(0.1)
+				orion.subscriptions = copy.deepcopy(subscriptions)
+				# Orion down takes longer than the timeout to answer
+				orion.latency = timeout * 3 if scenario == 'down' else latency
+				orion.reset_counts()
+				orion.reset_load()
+				queue = context.Queue()
+				process = context.Process(target=run_command, args=(work_path, command, queue))
+				process.start()
+				measures = queue.get()
+				process.join()
+				measures.update(orion.reset_load(), scenario=scenario, title=title,
+								orion_requests=sum(orion.reset_counts().values()))
+				results.append(measures)
+	finally:
+		orion.close()
+		hdfs.close()
+		docker.close()
+	return results
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+	parser.add_argument('--datamodels', type=int, default=100, help='Data Models of the configuration file')
+	parser.add_argument('--timeout', type=float, default=0.5, help='Timeout of the Orion requests in seconds')
+	parser.add_argument('--rate', type=float, default=20, help='Orion requests per second with limits')
+	parser.add_argument('--concurrency', type=int, default=2, help='Concurrent Orion requests with limits')
+	parser.add_argument('--latency', type=float, default=20, help='Latency of the shared Orion in milliseconds')
+	parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+	args = parser.parse_args()
+
+	results = run(args.datamodels, args.timeout, args.rate, args.concurrency, args.latency / 1000)
+	if args.json:
+		print(json.dumps(results, indent=4))
+		return
+	print('{:<8} {:<40} {:>8} {:>12} {:>8} {:>7} {:>10} {:>10}'.format(
+		'ORION', 'RUN', 'SECONDS', 'ORION REQS', 'PENDING', 'FAILED', 'PEAK CONC', 'MAX REQ/S'))
+	for result in results:
+		print('{scenario:<8} {title:<40} {seconds:>8.3f} {orion_requests:>12} {pending:>8} {failed:>7} '
+			  '{peak_concurrency:>10} {max_requests_per_second:>10}'.format(**result))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,138 @@
+"""
+Benchmark of the recovery of an interrupted run: the resume command against running the command again.
+
+It starts local stand-ins of Orion, WebHDFS and docker (see stubs.py), integrates every Data Model of a
+synthetic configuration file and kills modify -d all once Orion has received some of its new subscriptions,
+as a crash would. Then, on copies of the interrupted state, it recovers with resume and with modify -d all
+--force (without --force, modify stops at the first subscription that the interrupted run already removed),
+and measures the wall time, the Orion requests by method, the Data Models integrated at the end and the
+orphan subscriptions left in Orion. Every run is a fresh process.
+
+Usage: python benchmarks/resume.py [--datamodels N] [--crash-after N] [--latency MS] [--json]
+"""
+import argparse
+import copy
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_PATH)
+
+from operations import patch_solution, run_operation, write_config
+from stubs import OrionStub, WebHDFSStub, FakeDocker
+
+
+def run_recovery(work_path, command, results):
+	"""
+	Recovers the interrupted run in the current process. It is the target of the measured processes
+
+	:param str work_path: folder with the configuration file and where the internal state is kept
+	:param str command: resume or modify
+	:param results: queue where the wall time, the outcome and the integrated subscriptions are put
+	:return: None
+	"""
+	main = patch_solution(work_path, False)
+	config = os.path.join(work_path, 'cb_bdti.ini')
+	start = time.perf_counter()
+	if command == 'resume':
+		succeeded = main.BDTI(config).resume(backoff=0)
+	else:
+		succeeded = main.BDTI(config).modify(['all'], force=True)
+	seconds = time.perf_counter() - start
+	subscriptions = [main.ConfigManager.get_subscription_id(datamodel)
+					 for datamodel in main.ConfigManager.get_internal_sections()]
+	results.put({"seconds": seconds, "succeeded": bool(succeeded), "subscriptions": subscriptions,
+				 "pending": len(main.Outbox.get_pending())})
+
+
+def run(datamodels, crash_after, latency):
+	"""
+	Interrupts a run and recovers it in every way
+
+	:return: the Orion requests of the interrupted run and the measures of every recovery
+	:rtype: dict
+	"""
+	orion = OrionStub()
+	hdfs = WebHDFSStub()
+	docker = FakeDocker()
+	os.environ['PATH'] = docker.bin_path + os.pathsep + os.environ['PATH']
+	context = multiprocessing.get_context('spawn')
+	results = []
+	try:
+		with tempfile.TemporaryDirectory(prefix='cb_bdti_bench_') as base_path:
+			open(os.path.join(base_path, 'internal_conf.ini'), 'w').close()
+			write_config(os.path.join(base_path, 'cb_bdti.ini'), datamodels, orion.url, hdfs.port, False)
+			queue = context.Queue()
+			process = context.Process(target=run_operation, args=('integrate', base_path, False, queue))
+			process.start()
+			queue.get()
+			process.join()
+
+			orion.latency = latency
+			orion.reset_counts()
+			queue = context.Queue()
+			process = context.Process(target=run_operation, args=('modify', base_path, False, queue))
+			process.start()
+			while orion.requests['POST'] < crash_after and process.is_alive():
+				time.sleep(0.001)
+			process.kill()
+			process.join()
+			while orion.in_flight:
+				time.sleep(0.01)
+			interrupted = orion.reset_counts()
+			subscriptions = copy.deepcopy(orion.subscriptions)
+
+			for command in ('resume', 'modify'):
+				work_path = os.path.join(base_path, command)
+				shutil.copytree(base_path, work_path, ignore=shutil.ignore_patterns('resume', 'modify'))
+				orion.subscriptions = copy.deepcopy(subscriptions)
+				orion.reset_counts()
+				queue = context.Queue()
+				process = context.Process(target=run_recovery, args=(work_path, command, queue))
+				process.start()
+				measures = queue.get()
+				process.join()
+				requests = orion.reset_counts()
+				referenced = set(measures.pop("subscriptions"))
+				existing = {subscription_id for service in orion.subscriptions.values() for subscription_id in service}
+				measures.update(command=command, orion_requests=sum(requests.values()),
+								orion_requests_by_method=requests, integrated=len(referenced & existing),
+								orphans=len(existing - referenced))
+				results.append(measures)
+	finally:
+		orion.close()
+		hdfs.close()
+		docker.close()
+	return {"interrupted_requests": interrupted, "recoveries": results}
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+	parser.add_argument('--datamodels', type=int, default=100, help='Data Models of the configuration file')
+	parser.add_argument('--crash-after', type=int, default=40,
+						help='New subscriptions received by Orion when the interrupted run is killed')
+	parser.add_argument('--latency', type=float, default=5, help='Latency of Orion in milliseconds')
+	parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+	args = parser.parse_args()
+
+	results = run(args.datamodels, args.crash_after, args.latency / 1000)
+	if args.json:
+		print(json.dumps(results, indent=4))
+		return
+	print('Interrupted modify -d all: %s' % ', '.join('%s %s' % (method, count) for method, count
+													   in sorted(results["interrupted_requests"].items())))
+	print('{:<10} {:>8} {:>10} {:>8} {:>8} {:>11} {:>8} {:>8}'.format(
+		'RECOVERY', 'SECONDS', 'SUCCEEDED', 'POST', 'DELETE', 'INTEGRATED', 'ORPHANS', 'PENDING'))
+	for result in results["recoveries"]:
+		print('{command:<10} {seconds:>8.3f} {succeeded!s:>10} {post:>8} {delete:>8} {integrated:>11} {orphans:>8} '
+			  '{pending:>8}'.format(post=result["orion_requests_by_method"].get('POST', 0),
+									delete=result["orion_requests_by_method"].get('DELETE', 0), **result))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,180 @@
+"""
+Benchmark of single Data Model operations through the serve command against fresh command line processes.
+
+It starts local stand-ins of Orion, WebHDFS and docker (see stubs.py), integrates every Data Model of a
+synthetic configuration file and then modifies one Data Model at a time, first running a fresh process
+per operation, as the command line does, and then requesting the local API of a running server.
+The latency of every operation is measured from the caller, so process startup, imports, configuration
+loading, SSH connection and Orion and HDFS checks are included for the fresh processes.
+
+Usage: python benchmarks/serve.py [--datamodels N] [--operations N] [--latency MS] [--ssh-latency MS]
+								  [--remote] [--json]
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_PATH)
+
+from operations import patch_solution, run_operation, write_config
+from stubs import OrionStub, WebHDFSStub, FakeDocker
+
+
+def modify(work_path, remote, ssh_latency, datamodel):
+	"""
+	Modifies a Data Model in the current process. It is the target of the command line processes
+
+	:param str work_path: folder with the configuration file and where the internal state is kept
+	:param bool remote: deploy Cygnus through the in-process SSH stand-in
+	:param float ssh_latency: seconds taken by the SSH handshake of the stand-in
+	:param str datamodel: the Data Model
+	:return: None
+	"""
+	main = patch_solution(work_path, remote, ssh_latency)
+	main.BDTI(os.path.join(work_path, 'cb_bdti.ini')).modify([datamodel])
+
+
+def serve(work_path, remote, ssh_latency, socket_path, ready):
+	"""
+	Serves the local API in the current process. It is the target of the server process
+
+	:param str work_path: folder with the configuration file and where the internal state is kept
+	:param bool remote: deploy Cygnus through the in-process SSH stand-in
+	:param float ssh_latency: seconds taken by the SSH handshake of the stand-in
+	:param str socket_path: unix socket of the API
+	:param ready: queue where the server notifies it is listening
+	:return: None
+	"""
+	main = patch_solution(work_path, remote, ssh_latency)
+	from cb_bdti.core.server import BDTIServer
+	server = BDTIServer(main.BDTI(os.path.join(work_path, 'cb_bdti.ini')), socket_path)
+	ready.put(True)
+	server.serve()
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+	"""
+	HTTP connection to the unix socket of the API
+	"""
+
+	def __init__(self, socket_path):
+		super(UnixHTTPConnection, self).__init__('localhost')
+		self.socket_path = socket_path
+
+	def connect(self):
+		self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		self.sock.connect(self.socket_path)
+
+
+def post(socket_path, path, content):
+	"""
+	:return: the JSON content of the response to a POST request to the API
+	:rtype: dict
+	"""
+	connection = UnixHTTPConnection(socket_path)
+	try:
+		connection.request('POST', path, json.dumps(content), {'Content-Type': 'application/json'})
+		return json.loads(connection.getresponse().read())
+	finally:
+		connection.close()
+
+
+def summarize(latencies):
+	"""
+	:param list latencies: latencies in seconds
+	:return: median, p95 and mean latency in milliseconds
+	:rtype: dict
+	"""
+	ordered = sorted(latencies)
+	return {"median_ms": statistics.median(ordered) * 1000,
+			"p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+			"mean_ms": statistics.mean(ordered) * 1000}
+
+
+def run(datamodels, operations, latency, ssh_latency, remote):
+	"""
+	Modifies the Data Models through fresh processes and through the server
+
+	:return: the latencies of both modes
+	:rtype: dict
+	"""
+	orion = OrionStub(latency)
+	hdfs = WebHDFSStub()
+	docker = FakeDocker()
+	os.environ['PATH'] = docker.bin_path + os.pathsep + os.environ['PATH']
+	context = multiprocessing.get_context('spawn')
+	names = ['datamodel.Weather%s' % (index % datamodels) for index in range(operations)]
+	results = {}
+	try:
+		with tempfile.TemporaryDirectory(prefix='cb_bdti_bench_') as work_path:
+			open(os.path.join(work_path, 'internal_conf.ini'), 'w').close()
+			write_config(os.path.join(work_path, 'cb_bdti.ini'), datamodels, orion.url, hdfs.port, remote)
+			integrated = context.Queue()
+			process = context.Process(target=run_operation, args=('integrate', work_path, remote, integrated))
+			process.start()
+			integrated.get()
+			process.join()
+
+			latencies = []
+			for name in names:
+				start = time.perf_counter()
+				process = context.Process(target=modify, args=(work_path, remote, ssh_latency, name))
+				process.start()
+				process.join()
+				latencies.append(time.perf_counter() - start)
+			results["cli"] = summarize(latencies)
+
+			socket_path = os.path.join(work_path, 'api.sock')
+			ready = context.Queue()
+			server = context.Process(target=serve, args=(work_path, remote, ssh_latency, socket_path, ready))
+			server.start()
+			ready.get()
+			latencies = []
+			try:
+				for name in names:
+					start = time.perf_counter()
+					result = post(socket_path, '/modify', {"datamodels": [name]})
+					latencies.append(time.perf_counter() - start)
+					if not result["success"]:
+						raise RuntimeError('modify %s failed: %s' % (name, result["logs"]))
+			finally:
+				server.terminate()
+				server.join()
+			results["serve"] = summarize(latencies)
+	finally:
+		orion.close()
+		hdfs.close()
+		docker.close()
+	return results
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument('--datamodels', type=int, default=10, help='Data Models of the configuration file')
+	parser.add_argument('--operations', type=int, default=20, help='Operations of every mode')
+	parser.add_argument('--latency', type=float, default=0, help='Orion latency in milliseconds')
+	parser.add_argument('--ssh-latency', type=float, default=0, help='SSH handshake latency in milliseconds')
+	parser.add_argument('--remote', action='store_true', help='Deploy Cygnus through the SSH stand-in')
+	parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+	args = parser.parse_args()
+
+	results = run(args.datamodels, args.operations, args.latency / 1000, args.ssh_latency / 1000, args.remote)
+	if args.json:
+		print(json.dumps(results, indent=4))
+		return
+	for mode, title in (("cli", "fresh process"), ("serve", "serve API")):
+		print('{title:<14} median {median_ms:>8.1f} ms  p95 {p95_ms:>8.1f} ms  mean {mean_ms:>8.1f} ms'.format(
+			title=title, **results[mode]))
+	print('speedup x%.1f' % (results["cli"]["median_ms"] / results["serve"]["median_ms"]))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,156 @@
+"""
+Benchmark of the sharding of the Data Model subscriptions by entity id.
+
+It starts local stand-ins of Orion, WebHDFS and docker (see stubs.py) and integrates a synthetic configuration
+file whose Data Models have 1, 2, 4 and 8 shards, each shard notifying its own Cygnus endpoint
+(shard_endpoints). Then it matches a stream of synthetic entity ids, with random (UUID) and sequential
+suffixes, against the entity id pattern of the subscriptions made in Orion, as Orion does before notifying.
+It measures the wall time and Orion requests of the integration, the entities notified by zero or by more
+than one subscription (both must be 0), and the share of the notifications received by the busiest Cygnus
+endpoint. With endpoints of the same capacity, the busiest one bounds the notification throughput of the
+Data Model, so 1 / share is the throughput gained over a single subscription. Every run is a fresh process.
+
+Usage: python benchmarks/sharding.py [--datamodels N] [--shards 1 2 4 8] [--entities N] [--json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import uuid
+from collections import Counter
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_PATH)
+
+from operations import run_operation, write_config
+from stubs import OrionStub, WebHDFSStub, FakeDocker
+
+ENDPOINT = 'http://127.0.0.1:{port}/notify'
+
+
+def write_sharded_config(path, datamodels, shards, orion_url, hdfs_port):
+	"""
+	Writes a synthetic configuration file whose Data Models have some shards, each with its own endpoint
+
+	:param str path: path of the configuration file
+	:param int datamodels: number of Data Model sections
+	:param int shards: shards of every Data Model
+	:param str orion_url: URL of the Orion stand-in
+	:param int hdfs_port: port of the WebHDFS stand-in
+	:return: None
+	"""
+	write_config(path, datamodels, orion_url, hdfs_port, False)
+	with open(path) as file:
+		content = file.read()
+	endpoints = ' '.join(ENDPOINT.format(port=5050 + index) for index in range(shards))
+	content = re.sub(r'(throttling = \d+\n)', r'\1shards = %s\nshard_endpoints = %s\n' % (shards, endpoints),
+					 content)
+	with open(path, 'w') as file:
+		file.write(content)
+
+
+def get_entity_ids(entities):
+	"""
+	:param int entities: number of entity ids of every kind
+	:return: the synthetic entity ids by kind of suffix
+	:rtype: dict
+	"""
+	return {"random": ['urn:ngsi-ld:WeatherObserved:%s' % uuid.uuid4() for _ in range(entities)],
+			"sequential": ['urn:ngsi-ld:WeatherObserved:%d' % index for index in range(entities)]}
+
+
+def route(subscriptions, entity_ids):
+	"""
+	Matches the entity ids against the entity id pattern of the subscriptions of a Data Model
+
+	:param list subscriptions: the subscriptions of a Data Model, as stored by Orion
+	:param list entity_ids: the entity ids
+	:return: the notifications received by every endpoint, the entities not notified and those notified more
+		than once
+	:rtype: tuple
+	"""
+	patterns = []
+	for subscription in subscriptions:
+		notification = subscription["notification"]
+		patterns.append((re.compile(subscription["subject"]["entities"][0].get("idPattern", '.*')),
+						 notification.get("endpoint", {}).get("uri") or notification["http"]["url"]))
+	notifications = Counter()
+	unmatched = duplicated = 0
+	for entity_id in entity_ids:
+		endpoints = [endpoint for pattern, endpoint in patterns if pattern.search(entity_id)]
+		notifications.update(endpoints)
+		unmatched += not endpoints
+		duplicated += len(endpoints) > 1
+	return notifications, unmatched, duplicated
+
+
+def run(datamodels, shards_list, entities):
+	"""
+	Integrates the Data Models with every number of shards and routes the entity ids
+
+	:return: the measures of every number of shards and kind of entity id
+	:rtype: list
+	"""
+	orion = OrionStub()
+	hdfs = WebHDFSStub()
+	docker = FakeDocker()
+	os.environ['PATH'] = docker.bin_path + os.pathsep + os.environ['PATH']
+	context = multiprocessing.get_context('spawn')
+	entity_ids = get_entity_ids(entities)
+	results = []
+	try:
+		for shards in shards_list:
+			with tempfile.TemporaryDirectory(prefix='cb_bdti_bench_') as work_path:
+				open(os.path.join(work_path, 'internal_conf.ini'), 'w').close()
+				write_sharded_config(os.path.join(work_path, 'cb_bdti.ini'), datamodels, shards, orion.url, hdfs.port)
+				orion.subscriptions = {}
+				orion.reset_counts()
+				queue = context.Queue()
+				process = context.Process(target=run_operation, args=('integrate', work_path, False, queue))
+				process.start()
+				measures = queue.get()
+				process.join()
+				requests = sum(orion.reset_counts().values())
+				# the Data Models are alike, the entities are routed to the subscriptions of the first one
+				subscriptions = [subscription for service in orion.subscriptions.values()
+								 for subscription in service.values()
+								 if '.Weather0 ' in subscription.get("description", '')]
+				for kind, ids in entity_ids.items():
+					notifications, unmatched, duplicated = route(subscriptions, ids)
+					share = max(notifications.values()) / len(ids)
+					results.append({"shards": shards, "ids": kind, "seconds": measures["wall_seconds"],
+									"orion_requests": requests,
+									"subscriptions": sum(len(service) for service in orion.subscriptions.values()),
+									"unmatched": unmatched, "duplicated": duplicated, "busiest_share": share,
+									"throughput_gain": 1 / share})
+	finally:
+		orion.close()
+		hdfs.close()
+		docker.close()
+	return results
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+	parser.add_argument('--datamodels', type=int, default=20, help='Data Models of the configuration file')
+	parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4, 8], help='Shards of every Data Model')
+	parser.add_argument('--entities', type=int, default=10000, help='Entity ids of every kind routed')
+	parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+	args = parser.parse_args()
+
+	results = run(args.datamodels, args.shards, args.entities)
+	if args.json:
+		print(json.dumps(results, indent=4))
+		return
+	print('{:>6} {:<10} {:>8} {:>8} {:>13} {:>9} {:>10} {:>8} {:>6}'.format(
+		'SHARDS', 'IDS', 'SECONDS', 'REQUESTS', 'SUBSCRIPTIONS', 'UNMATCHED', 'DUPLICATED', 'BUSIEST', 'GAIN'))
+	for result in results:
+		print('{shards:>6} {ids:<10} {seconds:>8.3f} {orion_requests:>8} {subscriptions:>13} {unmatched:>9} '
+			  '{duplicated:>10} {busiest_share:>8.1%} {throughput_gain:>6.2f}'.format(**result))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,119 @@
+"""
+Benchmark and check of the startup of the cb-bdti command line.
+
+Every command runs in a fresh interpreter, so its startup is paid on each cron run. It measures with
+python -X importtime the import of the command line module and of the main class, and the wall time
+of cb-bdti --help, and checks that the modules only needed by some commands (HTTP clients, YAML, SSH)
+are not imported until those commands run. It exits with code 1 if any check fails.
+
+Usage: python benchmarks/startup.py [--runs N] [--max-import-ms MS] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SOURCE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+# modules imported on demand by the commands that use them
+LAZY_MODULES = ['requests', 'urllib3', 'yaml', 'telnetlib', 'paramiko']
+
+TARGETS = {
+	"cli": "import cb_bdti.commands",
+	"main": "import cb_bdti.core.main",
+}
+
+
+def run_python(code, *options):
+	"""
+	Runs some code in a fresh interpreter with the sources of the solution in its path
+
+	:param str code: the code
+	:param str options: options of the interpreter
+	:return: the finished process
+	:rtype: subprocess.CompletedProcess
+	"""
+	env = dict(os.environ, PYTHONPATH=os.pathsep.join([SOURCE_PATH, os.environ.get('PYTHONPATH', '')]))
+	return subprocess.run([sys.executable, *options, '-c', code], env=env, stdout=subprocess.PIPE,
+						  stderr=subprocess.PIPE, universal_newlines=True, check=True)
+
+
+def get_import_time(code, module):
+	"""
+	Measures the cumulative import time of a module with -X importtime
+
+	:param str code: the code importing the module
+	:param str module: the module
+	:return: the import time in milliseconds
+	:rtype: float
+	"""
+	for line in run_python(code, '-X', 'importtime').stderr.splitlines():
+		if line.startswith('import time:') and line.split('|')[-1].strip() == module:
+			return int(line.split('|')[1]) / 1000
+	raise ValueError('%s was not imported' % module)
+
+
+def get_loaded_modules(code):
+	"""
+	:param str code: the code importing the modules
+	:return: the lazy modules loaded by the code
+	:rtype: list
+	"""
+	check = code + '; import sys; print(" ".join(m for m in %r if m in sys.modules))' % LAZY_MODULES
+	return run_python(check).stdout.split()
+
+
+def get_help_time():
+	"""
+	:return: wall time of cb-bdti --help in milliseconds
+	:rtype: float
+	"""
+	start = time.perf_counter()
+	run_python('from cb_bdti.commands import cli; cli(["--help"])')
+	return (time.perf_counter() - start) * 1000
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+	parser.add_argument('--runs', type=int, default=5, help='Runs of every measure, the median is reported')
+	parser.add_argument('--max-import-ms', type=float, default=250,
+						help='Maximum import time of the command line module and the main class')
+	parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+	args = parser.parse_args()
+
+	# warm up the bytecode cache, so it is not measured
+	run_python(TARGETS["main"])
+	results = {"python_ms": statistics.median(get_import_time('pass', 'site') for _ in range(args.runs))}
+	for name, code in TARGETS.items():
+		module = code.split()[-1]
+		results[name] = {"import_ms": statistics.median(get_import_time(code, module) for _ in range(args.runs)),
+						 "lazy_modules_loaded": get_loaded_modules(code)}
+	results["help_ms"] = statistics.median(get_help_time() for _ in range(args.runs))
+
+	failures = []
+	for name in TARGETS:
+		if results[name]["import_ms"] > args.max_import_ms:
+			failures.append('%s import takes %.1f ms (maximum %.0f ms)' % (name, results[name]["import_ms"],
+																		   args.max_import_ms))
+		if results[name]["lazy_modules_loaded"]:
+			failures.append('%s import loads %s' % (name, ', '.join(results[name]["lazy_modules_loaded"])))
+	results["failures"] = failures
+
+	if args.json:
+		print(json.dumps(results, indent=4))
+	else:
+		print('Interpreter startup (site): %.1f ms' % results["python_ms"])
+		for name in TARGETS:
+			print('%s import: %.1f ms, lazy modules loaded: %s' % (
+				name, results[name]["import_ms"], ', '.join(results[name]["lazy_modules_loaded"]) or 'none'))
+		print('cb-bdti --help: %.1f ms' % results["help_ms"])
+		for failure in failures:
+			print('FAILED: %s' % failure)
+	sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+	main()
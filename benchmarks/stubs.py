@@ -0,0 +1,366 @@
+"""
+Local stand-ins of the services the integration talks to, for benchmarking without a real deployment:
+
+- OrionStub: NGSI-LD subscriptions and entities API with configurable latency and error rate
+- WebHDFSStub: WebHDFS API serving the files stored in memory
+- FakeDocker: ``sudo`` and ``docker`` executables that record every call instead of running containers
+- fake_paramiko: in-process replacement of paramiko that runs the SSH commands locally and copies SFTP files
+"""
+import json
+import os
+import random
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse, parse_qs, urlencode
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+	daemon_threads = True
+	request_queue_size = 128
+
+
+class StubServer(object):
+	"""
+	Base of the HTTP stand-ins. Runs the server in a background thread and counts the requests received
+	"""
+
+	def __init__(self, latency=0.0, error_rate=0.0):
+		"""
+		:param float latency: seconds waited before answering every request
+		:param float error_rate: fraction of requests answered with a 500 error
+		"""
+		self.latency = latency
+		self.error_rate = error_rate
+		self.requests = Counter()
+		self.in_flight = 0
+		self.peak_in_flight = 0
+		self.arrivals = []
+		self.lock = threading.Lock()
+		stub = self
+
+		class Handler(BaseHTTPRequestHandler):
+			protocol_version = 'HTTP/1.1'
+
+			def log_message(self, *args):
+				pass
+
+			def handle_one(self, method):
+				url = urlparse(self.path)
+				length = int(self.headers.get('Content-Length') or 0)
+				body = self.rfile.read(length) if length else b''
+				with stub.lock:
+					stub.requests[method] += 1
+					stub.in_flight += 1
+					stub.peak_in_flight = max(stub.peak_in_flight, stub.in_flight)
+					stub.arrivals.append(time.monotonic())
+				try:
+					if stub.latency:
+						time.sleep(stub.latency)
+					if stub.error_rate and random.random() < stub.error_rate:
+						code, headers, payload = 500, {}, {"error": "stub error"}
+					else:
+						code, headers, payload = stub.handle(method, url.path, parse_qs(url.query), self.headers, body)
+					data = payload if isinstance(payload, bytes) else \
+						json.dumps(payload).encode('utf-8') if payload is not None else b''
+					self.send_response(code)
+					for key, value in headers.items():
+						self.send_header(key, value)
+					self.send_header('Content-Type', 'application/json')
+					self.send_header('Content-Length', str(len(data)))
+					self.end_headers()
+					self.wfile.write(data)
+				except (BrokenPipeError, ConnectionResetError):
+					# the client timed out
+					self.close_connection = True
+				finally:
+					with stub.lock:
+						stub.in_flight -= 1
+
+			def do_GET(self):
+				self.handle_one('GET')
+
+			def do_POST(self):
+				self.handle_one('POST')
+
+			def do_PATCH(self):
+				self.handle_one('PATCH')
+
+			def do_DELETE(self):
+				self.handle_one('DELETE')
+
+		self.server = _ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+		self.port = self.server.server_port
+		self.url = 'http://127.0.0.1:{port}'.format(port=self.port)
+		threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+	def handle(self, method, path, query, headers, body):
+		"""
+		Answers a request
+
+		:return: a tuple (status code, headers, JSON payload or bytes)
+		"""
+		return 200, {}, {}
+
+	def reset_counts(self):
+		with self.lock:
+			counts = dict(self.requests)
+			self.requests.clear()
+		return counts
+
+	def reset_load(self):
+		"""
+		:return: the peak of concurrent requests and the maximum requests received within one second
+			since the last reset
+		:rtype: dict
+		"""
+		with self.lock:
+			arrivals, peak = self.arrivals, self.peak_in_flight
+			self.arrivals, self.peak_in_flight = [], self.in_flight
+		window_start = max_rate = 0
+		for index, arrival in enumerate(arrivals):
+			while arrival - arrivals[window_start] >= 1:
+				window_start += 1
+			max_rate = max(max_rate, index - window_start + 1)
+		return {"peak_concurrency": peak, "max_requests_per_second": max_rate}
+
+	def close(self):
+		self.server.shutdown()
+		self.server.server_close()
+
+
+class OrionStub(StubServer):
+	"""
+	NGSI-LD broker stand-in keeping subscriptions and entities per fiware service in memory
+	"""
+	SUBSCRIPTIONS = '/ngsi-ld/v1/subscriptions'
+	ENTITIES = '/ngsi-ld/v1/entities'
+
+	def __init__(self, latency=0.0, error_rate=0.0):
+		self.subscriptions = {}
+		self.entities = {}
+		super(OrionStub, self).__init__(latency, error_rate)
+
+	def handle(self, method, path, query, headers, body):
+		service = headers.get('fiware-service') or ''
+		payload = json.loads(body.decode('utf-8')) if body else None
+		with self.lock:
+			if path.startswith(self.SUBSCRIPTIONS):
+				return self.handle_subscriptions(method, path, query, service, payload)
+			if path.startswith('/ngsi-ld/v1/entityOperations/'):
+				return self.handle_batch(path.rsplit('/', 1)[-1], service, payload)
+			if path.startswith(self.ENTITIES):
+				return self.handle_entities(method, path, query, service, payload)
+			if path.startswith('/ngsi-ld/v1/types'):
+				types = sorted({entity["type"] for entity in self.entities.get(service, {}).values()})
+				return 200, {}, {"id": "urn:ngsi-ld:EntityTypeList:stub", "type": "EntityTypeList",
+								 "typeList": types}
+		return 404, {}, {"error": "not found"}
+
+	def handle_subscriptions(self, method, path, query, service, payload):
+		subscriptions = self.subscriptions.setdefault(service, {})
+		subscription_id = path[len(self.SUBSCRIPTIONS):].strip('/')
+		if method == 'POST':
+			subscription_id = 'urn:ngsi-ld:Subscription:{id}'.format(id=uuid.uuid4().hex)
+			payload["id"] = subscription_id
+			payload.setdefault("status", "active")
+			subscriptions[subscription_id] = payload
+			return 201, {'Location': '{path}/{id}'.format(path=self.SUBSCRIPTIONS, id=subscription_id)}, None
+		if not subscription_id:
+			offset = int(query.get('offset', ['0'])[0])
+			limit = int(query.get('limit', ['20'])[0])
+			return 200, {}, list(subscriptions.values())[offset:offset + limit]
+		if subscription_id not in subscriptions:
+			return 404, {}, {"error": "not found"}
+		if method == 'GET':
+			return 200, {}, subscriptions[subscription_id]
+		if method == 'PATCH':
+			subscriptions[subscription_id].update(payload)
+			return 204, {}, None
+		if method == 'DELETE':
+			del subscriptions[subscription_id]
+			return 204, {}, None
+		return 405, {}, None
+
+	def handle_batch(self, operation, service, payload):
+		entities = self.entities.setdefault(service, {})
+		if operation in ('create', 'upsert'):
+			for entity in payload:
+				entities.setdefault(entity["id"], {}).update(entity)
+			return 201 if operation == 'create' else 204, {}, None
+		if operation == 'delete':
+			for entity_id in payload:
+				entities.pop(entity_id, None)
+			return 204, {}, None
+		return 404, {}, None
+
+	def handle_entities(self, method, path, query, service, payload):
+		entities = self.entities.setdefault(service, {})
+		parts = path[len(self.ENTITIES):].strip('/').split('/')
+		if not parts[0] and method == 'GET':
+			matched = [entity for entity in entities.values()
+					   if 'type' not in query or entity["type"] in query['type'][0].split(',')]
+			limit = int(query.get('limit', ['20'])[0])
+			return 200, {'NGSILD-Results-Count': str(len(matched))}, matched[:limit]
+		entity = entities.get(parts[0])
+		if entity is None:
+			return 404, {}, {"error": "not found"}
+		if method == 'PATCH':
+			entity.update(payload)
+			return 204, {}, None
+		if method == 'DELETE':
+			del entities[parts[0]]
+			return 204, {}, None
+		return 200, {}, entity
+
+
+class WebHDFSStub(StubServer):
+	"""
+	WebHDFS stand-in serving the files kept in its ``files`` dict (path -> bytes). Reads are redirected to a
+	datanode, as a WebHDFS namenode does
+	"""
+
+	def __init__(self, latency=0.0, error_rate=0.0):
+		self.files = {}
+		super(WebHDFSStub, self).__init__(latency, error_rate)
+
+	def handle(self, method, path, query, headers, body):
+		if not path.startswith('/webhdfs/v1'):
+			return 200, {}, {}
+		file_path = path[len('/webhdfs/v1'):]
+		with self.lock:
+			content = self.files.get(file_path)
+		if content is None:
+			return 404, {}, {"RemoteException": {"exception": "FileNotFoundException"}}
+		if query.get('op', [''])[0] == 'GETFILESTATUS':
+			return 200, {}, {"FileStatus": {"length": len(content), "type": "FILE"}}
+		if 'datanode' not in query:
+			# the namenode redirects the reads to the datanode that has the file, here the stand-in itself
+			return 307, {'Location': '{url}{path}?{query}&datanode=true'.format(
+				url=self.url, path=path, query=urlencode(query, doseq=True))}, None
+		offset = int(query.get('offset', ['0'])[0])
+		length = int(query.get('length', [str(len(content))])[0])
+		return 200, {}, content[offset:offset + length]
+
+	def append(self, path, content):
+		"""
+		Appends content to a file, as Cygnus does when it persists events
+
+		:param str path: absolute path of the file in HDFS
+		:param bytes content: content appended
+		"""
+		with self.lock:
+			self.files[path] = self.files.get(path, b'') + content
+
+
+class FakeDocker(object):
+	"""
+	Creates ``sudo`` and ``docker`` executables in a temporary folder that record every call in a log file.
+	Prepend ``bin_path`` to PATH so the integration runs them instead of the real ones
+	"""
+	SCRIPT = '''#!{python}
+import sys
+with open({log!r}, 'a') as log:
+	log.write(' '.join(sys.argv[1:]) + '\\n')
+args = sys.argv[1:]
+if {sudo}:
+	import os
+	os.execvp(args[0], args)
+if args[:1] == ['images']:
+	print('"0123456789ab"')
+elif args[:1] == ['ps']:
+	print('"ba9876543210|fiware/cygnus-ngsi:latest"')
+'''
+
+	def __init__(self):
+		self.bin_path = tempfile.mkdtemp(prefix='fake_docker_')
+		self.log_path = os.path.join(self.bin_path, 'calls.log')
+		open(self.log_path, 'w').close()
+		for name, sudo in (('sudo', True), ('docker', False)):
+			path = os.path.join(self.bin_path, name)
+			with open(path, 'w') as file:
+				file.write(self.SCRIPT.format(python=sys.executable, log=self.log_path, sudo=sudo))
+			os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+
+	def count_calls(self, command=None):
+		"""
+		:param str command: docker command of the counted calls, every call if None
+		:return: number of docker calls recorded so far
+		"""
+		prefix = 'docker %s ' % command if command else 'docker'
+		with open(self.log_path) as log:
+			return sum(1 for line in log if line.startswith(prefix))
+
+	def close(self):
+		shutil.rmtree(self.bin_path, ignore_errors=True)
+
+
+def fake_paramiko(sftp_root, connect_latency=0.0):
+	"""
+	Builds a module replacing paramiko, whose SSH sessions run the commands locally and
+	whose SFTP sessions copy the files under sftp_root. Install it in ``sys.modules['paramiko']``
+
+	:param str sftp_root: folder where the files put through SFTP are copied
+	:param float connect_latency: seconds taken by the SSH handshake
+	:return: the module
+	"""
+	module = types.ModuleType('paramiko')
+
+	class AutoAddPolicy(object):
+		pass
+
+	class SFTPClient(object):
+		def put(self, local_path, remote_path):
+			target = os.path.join(sftp_root, remote_path.lstrip('/'))
+			os.makedirs(os.path.dirname(target), exist_ok=True)
+			shutil.copyfile(local_path, target)
+
+		def close(self):
+			pass
+
+	class SSHClient(object):
+		def set_missing_host_key_policy(self, policy):
+			pass
+
+		def connect(self, host, username=None, key_filename=None, timeout=None):
+			time.sleep(connect_latency)
+			self.connected = True
+
+		def get_transport(self):
+			return _Transport() if getattr(self, 'connected', False) else None
+
+		def exec_command(self, command):
+			process = subprocess.run(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+			return None, _Output(process.stdout), _Output(process.stderr)
+
+		def open_sftp(self):
+			return SFTPClient()
+
+		def close(self):
+			self.connected = False
+
+	module.AutoAddPolicy = AutoAddPolicy
+	module.SSHClient = SSHClient
+	return module
+
+
+class _Transport(object):
+	def is_active(self):
+		return True
+
+
+class _Output(object):
+	def __init__(self, data):
+		self.data = data
+
+	def read(self):
+		return self.data
@@ -0,0 +1,146 @@
+"""
+Benchmark of the teardown of the integrated Data Models, as done by the reset command and by delete -d all.
+
+It starts local stand-ins of Orion, WebHDFS and docker (see stubs.py) and integrates a synthetic configuration
+file. Then it removes every Data Model in bulk, with BDTI.delete_subscriptions, and with the previous teardown,
+which checked the Orion, removed the subscription and wrote the internal configuration for one Data Model after
+another. It measures the wall time, the Orion requests and the writes of the internal configuration. Every run
+is a fresh process, with the Data Models integrated again.
+
+Usage: python benchmarks/teardown.py [--datamodels N] [--latency MS] [--workers N] [--json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_PATH)
+
+from operations import patch_solution, run_operation, write_config
+from stubs import OrionStub, WebHDFSStub, FakeDocker
+
+MODES = ['sequential', 'bulk']
+
+
+def delete_sequentially(main, datamodels):
+	"""
+	Previous teardown: every Data Model is checked, removed and written on its own, one after another
+
+	:param module main: the main module of the solution
+	:param list datamodels: the integrated Data Models
+	:return: None
+	"""
+	manager = main.ConfigManager
+	for datamodel in datamodels:
+		orion_url = manager.get_internal_value(datamodel, main.ORION_SUBSCRIPTION_URL)
+		main.Validators.check_orion_url(orion_url)
+		main.SubscriptionManager.rm_subscriptions(datamodel, orion_url, manager.get_subscription_id(datamodel),
+												 manager.get_internal_value(datamodel, main.DATA_MODEL_FIWARE_SERVICE))
+		with manager.internal_lock:
+			manager.remove_internal_datamodel(datamodel)
+			manager.update_internal_conf_file()
+			main.Outbox.complete(datamodel)
+
+
+def run_teardown(work_path, mode, workers, results):
+	"""
+	Removes every integrated Data Model in the current process. It is the target of the measured processes
+
+	:param str work_path: folder with the configuration file and where the internal state is kept
+	:param str mode: sequential or bulk
+	:param int workers: maximum number of concurrent requests to Orion in bulk
+	:param results: queue where the measures are put
+	:return: None
+	"""
+	main = patch_solution(work_path, False)
+	manager = main.ConfigManager
+	writes = []
+	write_config_file = manager.write_config_file
+
+	def count_writes(config):
+		writes.append(config)
+		write_config_file(config)
+	manager.write_config_file = staticmethod(count_writes)
+
+	datamodels = main.BDTI.get_datamodels(all=True)
+	start = time.perf_counter()
+	if mode == 'sequential':
+		delete_sequentially(main, datamodels)
+	else:
+		main.BDTI.delete_subscriptions(datamodels, workers=workers)
+	seconds = time.perf_counter() - start
+	results.put({"seconds": seconds, "datamodels": len(datamodels), "left": len(manager.get_internal_sections()),
+				 "internal_writes": sum(config.filename == os.path.join(work_path, 'internal_conf.ini')
+									   for config in writes)})
+
+
+def run_process(context, target, args):
+	"""
+	:return: the measures put by the target run in a fresh process
+	:rtype: dict
+	"""
+	queue = context.Queue()
+	process = context.Process(target=target, args=args + (queue,))
+	process.start()
+	measures = queue.get()
+	process.join()
+	return measures
+
+
+def run(datamodels, latency, workers):
+	"""
+	Integrates the Data Models and removes them with every mode
+
+	:return: the measures of every mode
+	:rtype: list
+	"""
+	orion = OrionStub(latency)
+	hdfs = WebHDFSStub()
+	docker = FakeDocker()
+	os.environ['PATH'] = docker.bin_path + os.pathsep + os.environ['PATH']
+	context = multiprocessing.get_context('spawn')
+	results = []
+	try:
+		for mode in MODES:
+			with tempfile.TemporaryDirectory(prefix='cb_bdti_bench_') as work_path:
+				open(os.path.join(work_path, 'internal_conf.ini'), 'w').close()
+				write_config(os.path.join(work_path, 'cb_bdti.ini'), datamodels, orion.url, hdfs.port, False)
+				orion.subscriptions = {}
+				run_process(context, run_operation, ('integrate', work_path, False))
+				orion.reset_counts()
+				measures = run_process(context, run_teardown, (work_path, mode, workers))
+				measures.update(mode=mode, orion_requests=sum(orion.reset_counts().values()),
+								subscriptions=sum(len(service) for service in orion.subscriptions.values()))
+				results.append(measures)
+	finally:
+		orion.close()
+		hdfs.close()
+		docker.close()
+	return results
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+	parser.add_argument('--datamodels', type=int, default=300, help='Data Models of the configuration file')
+	parser.add_argument('--latency', type=float, default=5, help='Latency of Orion in milliseconds')
+	parser.add_argument('--workers', type=int, default=10, help='Concurrent requests to Orion in bulk')
+	parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+	args = parser.parse_args()
+
+	results = run(args.datamodels, args.latency / 1000, args.workers)
+	if args.json:
+		print(json.dumps(results, indent=4))
+		return
+	print('{:<11} {:>11} {:>8} {:>9} {:>16} {:>5} {:>14}'.format(
+		'MODE', 'DATAMODELS', 'SECONDS', 'REQUESTS', 'INTERNAL WRITES', 'LEFT', 'SUBSCRIPTIONS'))
+	for result in results:
+		print('{mode:<11} {datamodels:>11} {seconds:>8.3f} {orion_requests:>9} {internal_writes:>16} {left:>5} '
+			  '{subscriptions:>14}'.format(**result))
+
+
+if __name__ == '__main__':
+	main()
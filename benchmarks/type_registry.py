@@ -0,0 +1,133 @@
+"""
+Benchmark of the registry of the entity types of the FIWARE Data Models.
+
+It writes a synthetic catalog in the format of the official list of Smart Data Models, with as many domains and
+types as the real one, and measures the time taken to load it without the cache file (reading and indexing the
+catalog and writing the cache) and with it. Then it checks the types of configuration files with 1,000 and
+10,000 Data Models with Validators.validate_types and with the previous check, which scanned every domain for
+one contained in the name of the Data Model and built a set of its types every time.
+
+Usage: python benchmarks/type_registry.py [--domains N] [--types N] [--sections 1000 10000] [--runs N] [--json]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+SOURCE_PATH = os.path.join(os.path.dirname(BENCHMARKS_PATH), 'src')
+sys.path.insert(0, SOURCE_PATH)
+
+import cb_bdti.config.registry as registry
+from cb_bdti.config.registry import TypeRegistry
+from cb_bdti.utils.validators import Validators
+
+
+def write_catalog(path, domains, types):
+	"""
+	Writes a synthetic catalog in the format of the official list of Smart Data Models
+
+	:param str path: path of the catalog
+	:param int domains: number of domains
+	:param int types: number of types of every domain
+	:return: the types of every domain
+	:rtype: dict
+	"""
+	catalog = {'Domain%03d' % domain: ['Domain%03dType%03d' % (domain, index) for index in range(types)]
+			   for domain in range(domains)}
+	with open(path, 'w') as file:
+		json.dump({"updatedDate": "2026-01-01", "officialList": [
+			{"repoName": "dataModel.%s" % domain, "dataModels": domain_types, "domains": ["SmartCities"]}
+			for domain, domain_types in catalog.items()]}, file)
+	return catalog
+
+
+def validate_types_scan(types, datamodel, catalog):
+	"""
+	Previous check of the types of a Data Model: the first domain contained in its name, scanning every domain
+
+	:return: if the types are valid
+	:rtype: bool
+	"""
+	for domain in catalog:
+		if domain in datamodel:
+			return set(types.split()).issubset(catalog[domain])
+	return True
+
+
+def measure(function, runs):
+	"""
+	:return: the best wall time of some runs of a function, in seconds
+	:rtype: float
+	"""
+	best = None
+	for _ in range(runs):
+		start = time.perf_counter()
+		function()
+		seconds = time.perf_counter() - start
+		best = seconds if best is None else min(best, seconds)
+	return best
+
+
+def run(domains, types, sections_list, runs):
+	"""
+	Measures the loads of the catalog and the checks of the types
+
+	:return: the load times and the check times of every number of sections
+	:rtype: dict
+	"""
+	with tempfile.TemporaryDirectory(prefix='cb_bdti_bench_') as work_path:
+		catalog_path = os.path.join(work_path, 'official_list_data_models.json')
+		registry.DATAMODELS_CACHE = os.path.join(work_path, 'datamodels_cache.json')
+		catalog = write_catalog(catalog_path, domains, types)
+		catalog_path = os.path.abspath(catalog_path)
+
+		def load_cold():
+			if os.path.exists(registry.DATAMODELS_CACHE):
+				os.remove(registry.DATAMODELS_CACHE)
+			TypeRegistry.load(catalog_path)
+
+		loads = {"catalog_bytes": os.path.getsize(catalog_path), "cold_seconds": measure(load_cold, runs),
+				 "cached_seconds": measure(lambda: TypeRegistry.load(catalog_path), runs)}
+		TypeRegistry.configure(catalog_path)
+
+		checks = []
+		for sections in sections_list:
+			datamodels = [('Domain%03dType%03d Domain%03dType%03d' % ((index % domains, index % types) * 2),
+						   'datamodel.Domain%03dCity%d' % (index % domains, index)) for index in range(sections)]
+			scan = measure(lambda: [validate_types_scan(entity_types, datamodel, catalog)
+									for entity_types, datamodel in datamodels], runs)
+			indexed = measure(lambda: [Validators.validate_types(entity_types, datamodel)
+									   for entity_types, datamodel in datamodels], runs)
+			checks.append({"sections": sections, "scan_seconds": scan, "registry_seconds": indexed})
+	return {"load": loads, "checks": checks}
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+	parser.add_argument('--domains', type=int, default=80, help='Domains of the catalog')
+	parser.add_argument('--types', type=int, default=12, help='Types of every domain')
+	parser.add_argument('--sections', type=int, nargs='+', default=[1000, 10000],
+						help='Data Models of the configuration files checked')
+	parser.add_argument('--runs', type=int, default=5, help='Runs of every measure, the best one is kept')
+	parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+	args = parser.parse_args()
+
+	results = run(args.domains, args.types, args.sections, args.runs)
+	if args.json:
+		print(json.dumps(results, indent=4))
+		return
+	load = results["load"]
+	print('Catalog of %s bytes loaded in %.2f ms without cache, %.2f ms from the cache' % (
+		load["catalog_bytes"], load["cold_seconds"] * 1000, load["cached_seconds"] * 1000))
+	print('{:>9} {:>10} {:>13} {:>8}'.format('SECTIONS', 'SCAN MS', 'REGISTRY MS', 'SPEEDUP'))
+	for check in results["checks"]:
+		print('{sections:>9} {scan:>10.2f} {registry:>13.2f} {speedup:>7.1f}x'.format(
+			sections=check["sections"], scan=check["scan_seconds"] * 1000,
+			registry=check["registry_seconds"] * 1000, speedup=check["scan_seconds"] / check["registry_seconds"]))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,177 @@
+"""
+Benchmark of the watch command against modifying every Data Model after an edit of the configuration file.
+
+It starts local stand-ins of Orion, WebHDFS and docker (see stubs.py), integrates every Data Model of a
+synthetic configuration file and runs the watch in another process. Then it edits the configuration file
+as a configuration management tool does, replacing it through a rename, and measures for every edit the
+time the watch took to apply it (from its last write, without the debounce period), the Orion requests and
+the docker calls (so the Cygnus redeployments). The same is measured for modify -d all, which is what an edit
+required without the watch.
+
+Usage: python benchmarks/watch.py [--datamodels N] [--debounce SECONDS] [--latency MS] [--remote] [--json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import time
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_PATH)
+
+from operations import DATAMODEL_SECTION, patch_solution, run_operation, write_config
+from stubs import OrionStub, WebHDFSStub, FakeDocker
+
+
+def set_throttling(index, throttling):
+	"""
+	:param int index: index of the Data Model
+	:param int throttling: the new throttling
+	:return: a function setting the throttling of the Data Model in the content of the configuration file
+	:rtype: function
+	"""
+	pattern = re.compile(r'(file_name = weather_%s\nexpires =\nthrottling = )\d+' % index)
+	return lambda content: pattern.sub(r'\g<1>%s' % throttling, content)
+
+
+# edits of the configuration file: name, description and the changes of its content, written one after another
+EDITS = [
+	("throttling", "change the throttling of a Data Model", [set_throttling(0, 10)]),
+	("file_name", "change the HDFS file of a Data Model",
+	 [lambda content: content.replace('file_name = weather_1\n', 'file_name = weather_one\n')]),
+	("add", "add a Data Model", [lambda content: content + DATAMODEL_SECTION.format(index='New', service=0)]),
+	("remove", "remove a Data Model",
+	 [lambda content: content.replace(DATAMODEL_SECTION.format(index=2, service=2), '')]),
+	("burst", "five throttling changes within the debounce period",
+	 [set_throttling(3, throttling) for throttling in (6, 7, 8, 9, 10)]),
+]
+
+
+def watch(work_path, remote, debounce, batches):
+	"""
+	Watches the configuration file in the current process. It is the target of the watch process
+
+	:param str work_path: folder with the configuration file and where the internal state is kept
+	:param bool remote: deploy Cygnus through the in-process SSH stand-in
+	:param float debounce: seconds without changes after which a batch of changes is applied
+	:param batches: queue where the start of the watch and the end of every batch are notified
+	:return: None
+	"""
+	main = patch_solution(work_path, remote)
+	from cb_bdti.utils.watcher import FileWatcher
+	wait = FileWatcher.wait
+
+	# the watch waits for changes when it starts and after applying every batch
+	def notify(self):
+		batches.put(time.time())
+		return wait(self)
+	FileWatcher.wait = notify
+	main.BDTI(os.path.join(work_path, 'cb_bdti.ini')).watch(debounce)
+
+
+def replace_file(path, content):
+	"""
+	Replaces a file through a rename, as configuration management tools do
+
+	:param str path: path of the file
+	:param str content: new content
+	:return: None
+	"""
+	with open(path + '.tmp', 'w') as file:
+		file.write(content)
+	os.replace(path + '.tmp', path)
+
+
+def run(datamodels, debounce, latency, remote):
+	"""
+	Applies every edit through the watch and measures modify -d all
+
+	:return: the measures of every edit and of modify -d all
+	:rtype: dict
+	"""
+	orion = OrionStub(latency)
+	hdfs = WebHDFSStub()
+	docker = FakeDocker()
+	os.environ['PATH'] = docker.bin_path + os.pathsep + os.environ['PATH']
+	context = multiprocessing.get_context('spawn')
+	results = {"watch": []}
+	try:
+		with tempfile.TemporaryDirectory(prefix='cb_bdti_bench_') as work_path:
+			config = os.path.join(work_path, 'cb_bdti.ini')
+			open(os.path.join(work_path, 'internal_conf.ini'), 'w').close()
+			write_config(config, datamodels, orion.url, hdfs.port, remote)
+			for operation in ('integrate', 'modify'):
+				orion.reset_counts()
+				docker_calls = docker.count_calls()
+				queue = context.Queue()
+				process = context.Process(target=run_operation, args=(operation, work_path, remote, queue))
+				process.start()
+				measures = queue.get()
+				process.join()
+				if operation == 'modify':
+					results["modify_all"] = {"seconds": measures["wall_seconds"],
+											 "orion_requests": sum(orion.reset_counts().values()),
+											 "docker_calls": docker.count_calls() - docker_calls}
+
+			batches = context.Queue()
+			process = context.Process(target=watch, args=(work_path, remote, debounce, batches))
+			process.start()
+			batches.get()
+			try:
+				for name, description, edit in EDITS:
+					orion.reset_counts()
+					docker_calls = docker.count_calls()
+					with open(config) as file:
+						content = file.read()
+					for change in edit:
+						content = change(content)
+						replace_file(config, content)
+						written = time.time()
+						time.sleep(debounce / 5)
+					end = batches.get(timeout=60)
+					# a further batch would mean the edits were not debounced together
+					extra_batches = 0
+					while not batches.empty():
+						batches.get()
+						extra_batches += 1
+					results["watch"].append({"edit": name, "description": description,
+											 "seconds": end - written - debounce,
+											 "orion_requests": sum(orion.reset_counts().values()),
+											 "docker_calls": docker.count_calls() - docker_calls,
+											 "batches": 1 + extra_batches})
+			finally:
+				process.terminate()
+				process.join()
+	finally:
+		orion.close()
+		hdfs.close()
+		docker.close()
+	return results
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+	parser.add_argument('--datamodels', type=int, default=100, help='Data Models of the configuration file')
+	parser.add_argument('--debounce', type=float, default=0.5, help='Debounce period of the watch in seconds')
+	parser.add_argument('--latency', type=float, default=0, help='Orion latency in milliseconds')
+	parser.add_argument('--remote', action='store_true', help='Deploy Cygnus through the SSH stand-in')
+	parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+	args = parser.parse_args()
+
+	results = run(args.datamodels, args.debounce, args.latency / 1000, args.remote)
+	if args.json:
+		print(json.dumps(results, indent=4))
+		return
+	print('{:<52} {:>10} {:>12} {:>12} {:>8}'.format('EDIT', 'SECONDS', 'ORION REQS', 'DOCKER CALLS', 'BATCHES'))
+	for result in results["watch"]:
+		print('{description:<52} {seconds:>10.3f} {orion_requests:>12} {docker_calls:>12} {batches:>8}'.format(
+			**result))
+	print('{:<52} {seconds:>10.3f} {orion_requests:>12} {docker_calls:>12}'.format(
+		'modify -d all (without watch)', **results["modify_all"]))
+
+
+if __name__ == '__main__':
+	main()
@@ -1,7 +1,14 @@
 import click
-from cb_bdti.core.main import BDTI
+import json
+from datetime import timedelta
 from cb_bdti.utils.helpers import Helpers
-from cb_bdti.config.manager import ConfigManager
+from cb_bdti.config.constants import ORION_WORKERS, CYGNUS_STATS_INTERVAL, DEFAULT_STALLED_HOURS, HEALTH_OK, \
+	PROBE_TIMEOUT, LOADGEN_WORKERS, SERVE_SOCKET, WATCH_DEBOUNCE, WATCH_POLL_INTERVAL, PLAN_UNCHANGED, \
+	PLAN_INVALID, RESUME_RETRIES, RESUME_BACKOFF
+from cb_bdti.utils.tracing import Tracer
+from cb_bdti.utils.loggers import set_logging_options
+
+LOG_LEVELS = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
 
 class SpecialHelpOrder(click.Group):
 	def __init__(self, *args, **kwargs):
@@ -79,8 +86,18 @@ class MultiOption(click.Option):
 
 @click.group(cls=SpecialHelpOrder)
 @click.option('--config', '-c', type=click.Path(), default='-', help='The configuration file path.  [optional]')
+@click.option('--report', type=click.Path(dir_okay=False), default=None,
+			  help='Write a JSON report with the duration of every step of the run to this path.  [optional]')
+@click.option('--prometheus', type=click.Path(dir_okay=False), default=None,
+			  help='Write the report as a Prometheus textfile collector file (*.prom) to this path.  [optional]')
+@click.option('--log-format', type=click.Choice(['text', 'json']), default='text', show_default=True,
+			  help='Format of the logs. JSON logs are structured and written by a background thread.')
+@click.option('--log-level', type=click.Choice(LOG_LEVELS, case_sensitive=False), default=None,
+			  help='Level of the console logs.  [default: DEBUG]')
+@click.option('--log-file-level', type=click.Choice(LOG_LEVELS, case_sensitive=False), default=None,
+			  help='Level of the file logs.  [default: DEBUG]')
 @click.pass_context
-def cli(ctx, config):
+def cli(ctx, config, report, prometheus, log_format, log_level, log_file_level):
 	"""
 	This application integrates the context data of the CEF Context Broker (CB) with the
 	Big Data Test Infrastructure (BDTI). It manages the subscriptions of data models to the Context Broker
@@ -97,6 +114,10 @@ def cli(ctx, config):
 	Use cb-bdti COMMAND --help for more details about each command.
 	"""
 	ctx.obj = {'config': config}
+	set_logging_options(log_format == 'json', log_level, log_file_level)
+	if report or prometheus:
+		Tracer.enable(ctx.invoked_subcommand)
+		ctx.call_on_close(lambda: Tracer.write_reports(report, prometheus))
 
 
 @cli.command(name="integrate", help_priority=1)
@@ -110,6 +131,7 @@ def integrate(ctx, datamodels):
 		Integrates all the Data Models specified in the configuration file given as parameter,
 		making a subscription for each one and deploying Cygnus.
 	"""
+	from cb_bdti.core.main import BDTI
 	config = Helpers.get_config_path(ctx.obj['config'])
 	bdti_integration = BDTI(config)
 	bdti_integration.integrate(datamodels)
@@ -127,6 +149,7 @@ def modify(ctx, datamodels, force):
 		Modifies the integrations of Data Models given as parameter, making a new subscription for each one and redeploying Cygnus.
 		The Data Models to be modified must have been previosuly integrated by using integrate command.
 	"""
+	from cb_bdti.core.main import BDTI
 	config = Helpers.get_config_path(ctx.obj['config'])
 	bdti_integration = BDTI(config)
 	bdti_integration.modify(datamodels, force)
@@ -146,19 +169,55 @@ def delete(ctx, datamodels, deploy, force):
 		The data model to be deleted must have been previously integrated by using integrate command.
 		Use the parameter --deploy to redeploy Cygnus.
 	"""
+	from cb_bdti.core.main import BDTI
 	config = Helpers.get_config_path(ctx.obj['config'])
 	bdti_integration = BDTI(config, delete=True, deploy=deploy)
 	bdti_integration.delete(datamodels, deploy, force)
 
 
 @cli.command(name="show_integrated", help_priority=4)
+@click.option('--health', '-H', is_flag=True,
+			  help='Retrieve the subscriptions from Orion and show how they are delivering the notifications.')
+@click.option('--json', 'as_json', is_flag=True, help='Print the delivery health as JSON. Implies --health.')
+@click.option('--stalled-after', '-s', type=click.IntRange(min=1), default=DEFAULT_STALLED_HOURS, show_default=True,
+			  help='Hours without notifications after which a subscription is stalled.')
+@click.option('--workers', '-w', type=click.IntRange(min=1), default=ORION_WORKERS, show_default=True,
+			  help='Maximum number of concurrent requests to Orion.')
 @click.pass_context
-def show_integrated(ctx):
+def show_integrated(ctx, health, as_json, stalled_after, workers):
 	""" View Data Models already integrated.
 	
 		These Data Models have been already integrated previously
 		and they have an active subscription to Orion.
+		Use --health to check the notifications delivery of their subscriptions:
+		the command exits with code 1 if any of them is failing, stalled, inactive or missing.
 	"""
+	from cb_bdti.core.main import BDTI
+	from cb_bdti.config.manager import ConfigManager
+	if health or as_json:
+		BDTI.load_orion_limits(Helpers.get_config_path(ctx.obj['config']))
+		report = BDTI.get_subscriptions_health(timedelta(hours=stalled_after), workers)
+		if as_json:
+			click.echo(json.dumps(report, indent=4))
+		elif not report:
+			click.echo('\nThere are no integrated Data Models\n')
+		else:
+			columns = [('DATAMODEL', 'datamodel'), ('HEALTH', 'health'), ('STATUS', 'status'),
+					   ('SENT', 'times_sent'), ('LAST NOTIFICATION', 'last_notification'),
+					   ('LAST SUCCESS', 'last_success'), ('LAST FAILURE', 'last_failure')]
+			rows = [[str(el.get(key, '')) for _, key in columns] for el in report]
+			widths = [max(len(row[i]) for row in rows + [[title for title, _ in columns]])
+					  for i in range(len(columns))]
+			click.echo('  '.join(title.ljust(widths[i]) for i, (title, _) in enumerate(columns)).rstrip())
+			for row in rows:
+				click.echo('  '.join(value.ljust(widths[i]) for i, value in enumerate(row)).rstrip())
+			for el in report:
+				if el.get("error"):
+					click.echo('%s: %s' % (el["datamodel"], el["error"]), err=True)
+		if any(el["health"] != HEALTH_OK for el in report):
+			ctx.exit(1)
+		return
+
 	datamodels_info = ConfigManager.get_datamodels_info()
 	if not datamodels_info:
 		click.echo('\nThere are no integrated Data Models\n')
@@ -171,6 +230,365 @@ def show_integrated(ctx):
 					click.echo("\t %s: %s" %(key_name, key_value))
 			click.echo("")
 
+@cli.command(name="renew", help_priority=6)
+@click.option('--window', '-w', type=click.IntRange(min=1), default=30, show_default=True,
+			  help='Days from now that the renewed subscriptions will last.')
+@click.option('--margin', '-m', type=click.IntRange(min=0), default=24, show_default=True,
+			  help='Renew the subscriptions expiring within these hours.')
+@click.option('--daemon', '-D', is_flag=True, help='Keep running, renewing the subscriptions periodically.')
+@click.option('--interval', '-i', type=click.IntRange(min=1), default=3600, show_default=True,
+			  help='Seconds between renewals in daemon mode.')
+@click.pass_context
+def renew(ctx, window, margin, daemon, interval):
+	""" Renew expiring subscriptions.
+
+		Moves forward the expiration date of the integrated Data Models subscriptions
+		that expire within the margin. Data Models without expiration date are skipped
+		and Cygnus is not redeployed. Schedule it (e.g. with cron) or run it with --daemon.
+	"""
+	from cb_bdti.core.main import BDTI
+	config = Helpers.get_config_path(ctx.obj['config'])
+	BDTI.renew(config, timedelta(days=window), timedelta(hours=margin), daemon, interval)
+
+
+@cli.command(name="gc", help_priority=8)
+@click.option('--dry-run', '-n', is_flag=True, help='Show the orphan subscriptions without removing them.')
+@click.option('--workers', '-w', type=click.IntRange(min=1), default=ORION_WORKERS, show_default=True,
+			  help='Maximum number of concurrent requests to Orion.')
+@click.pass_context
+def gc(ctx, dry_run, workers):
+	""" Remove orphan subscriptions.
+
+		Removes the subscriptions of the fiware services in the configuration file that notify
+		Cygnus or were made for a Data Model, but are not tracked as integrated anymore
+		(e.g. left by failed runs or forced removals).
+	"""
+	from cb_bdti.core.main import BDTI
+	config = Helpers.get_config_path(ctx.obj['config'])
+	bdti_integration = BDTI(config, deploy=False)
+	bdti_integration.gc(dry_run, workers)
+
+
+@cli.command(name="recover", help_priority=9)
+@click.option('--dry-run', '-n', is_flag=True, help='Show the recovered subscriptions without saving them.')
+@click.option('--workers', '-w', type=click.IntRange(min=1), default=ORION_WORKERS, show_default=True,
+			  help='Maximum number of concurrent requests to Orion.')
+@click.pass_context
+def recover(ctx, dry_run, workers):
+	""" Rebuild the integrated Data Models from Orion.
+
+		Rebuilds the internal record of integrated Data Models (e.g. after it was lost)
+		matching each Data Model section of the configuration file with its subscription in Orion.
+		Subscriptions and Cygnus are left untouched.
+	"""
+	from cb_bdti.core.main import BDTI
+	config = Helpers.get_config_path(ctx.obj['config'])
+	bdti_integration = BDTI(config, deploy=False)
+	bdti_integration.recover(dry_run, workers)
+
+
+@cli.command(name="stats", help_priority=10)
+@click.option('--watch', '-W', is_flag=True, help='Keep streaming the stats until interrupted.')
+@click.option('--interval', '-i', type=click.IntRange(min=1), default=CYGNUS_STATS_INTERVAL, show_default=True,
+			  help='Seconds between samples.')
+@click.option('--json', 'as_json', is_flag=True, help='Print the stats of every interval as a JSON line.')
+@click.pass_context
+def stats(ctx, watch, interval, as_json):
+	""" Show Cygnus throughput and backpressure.
+
+		Polls Cygnus management API, locally or through SSH, and shows the events received
+		and persisted per second, the fill of its channels, the notifications rejected and
+		the sink failures between samples. Warns when the sink is falling behind before
+		notifications are rejected. Use --watch to stream them continuously.
+	"""
+	from cb_bdti.core.main import BDTI
+	from cb_bdti.core.handler.monitor import CygnusMonitor
+	config = Helpers.get_config_path(ctx.obj['config'])
+	bdti_integration = BDTI(config, delete=True, deploy=False)
+	try:
+		for cygnus_stats in bdti_integration.stats(interval, watch):
+			click.echo(json.dumps(cygnus_stats) if as_json else CygnusMonitor.format_stats(cygnus_stats))
+	except KeyboardInterrupt:
+		pass
+
+
+@cli.command(name="probe", help_priority=11)
+@click.option('--datamodel', '-d', type=click.STRING, required=True, help='Name of the integrated Data Model to probe.')
+@click.option('--count', '-n', type=click.IntRange(min=1), default=1, show_default=True, help='Number of probes.')
+@click.option('--interval', '-i', type=click.FloatRange(min=0), default=0, show_default=True,
+			  help='Minimum seconds between probes. The throttling of the subscription is respected.')
+@click.option('--timeout', '-t', type=click.FloatRange(min=1), default=PROBE_TIMEOUT, show_default=True,
+			  help='Seconds to wait for every probe to be stored in HDFS.')
+@click.option('--json', 'as_json', is_flag=True, help='Print the latencies as JSON.')
+@click.pass_context
+def probe(ctx, datamodel, count, interval, timeout, as_json):
+	""" Measure the end-to-end latency of a Data Model.
+
+		Upserts a synthetic entity with a unique marker into Orion, under the fiware service of the Data Model,
+		and polls its HDFS file through WebHDFS until the marker is stored. The latency is split into
+		Orion to Cygnus and Cygnus to HDFS when Cygnus management API is reachable. The entity is removed afterwards.
+		Use --count to get the p50, p95 and p99 latencies.
+	"""
+	from cb_bdti.core.main import BDTI
+	config = Helpers.get_config_path(ctx.obj['config'])
+	bdti_integration = BDTI(config, delete=True)
+	report = bdti_integration.probe(datamodel, count, interval, timeout)
+	if not report:
+		ctx.exit(1)
+	if as_json:
+		click.echo(json.dumps(report, indent=4))
+	else:
+		click.echo('\n%-16s %10s %10s %10s' % ('LATENCY (s)', 'p50', 'p95', 'p99'))
+		for key, percentiles in report["percentiles"].items():
+			click.echo('%-16s %10s %10s %10s' % tuple([key] + ['%.3f' % value if value is not None else 'n/a'
+															   for value in percentiles.values()]))
+		click.echo('\n%s of %s probes timed out\n' % (report["timed_out"], len(report["runs"])))
+	if report["timed_out"]:
+		ctx.exit(1)
+
+
+@cli.command(name="loadgen", help_priority=12)
+@click.option('--datamodels', '-d', type=click.STRING, required=True,
+			  help='Name of the Data Models whose types and fiware services are used, separated by blanks. '
+				   'Use "all" to use every Data Model.', cls=MultiOption)
+@click.option('--entities', '-e', type=click.IntRange(min=1), default=100, show_default=True,
+			  help='Number of synthetic entities of every Data Model.')
+@click.option('--rate', '-r', type=click.FloatRange(min=0), default=10, show_default=True,
+			  help='Target updates per second, for a constant load.')
+@click.option('--duration', '-t', type=click.FloatRange(min=1), default=60, show_default=True,
+			  help='Seconds of constant load.')
+@click.option('--profile', '-p', type=click.STRING, default=None,
+			  help='Ramp profile as "seconds:rate" points, linearly interpolated. Overrides --rate and --duration. '
+				   'E.g. 0:0,60:100,300:100 ramps up to 100 updates per second in a minute and holds it.')
+@click.option('--workers', '-w', type=click.IntRange(min=1), default=LOADGEN_WORKERS, show_default=True,
+			  help='Maximum number of concurrent requests to Orion.')
+@click.option('--keep', '-k', is_flag=True, help='Keep the synthetic entities in Orion.')
+@click.option('--json', 'as_json', is_flag=True, help='Print the achieved load as JSON.')
+@click.pass_context
+def loadgen(ctx, datamodels, entities, rate, duration, profile, workers, keep, as_json):
+	""" Generate synthetic NGSI-LD load.
+
+		Creates synthetic entities of the types and fiware services of the Data Models in the configuration file
+		and updates them at a target rate, so Cygnus, HDFS and throttling values can be sized before going live.
+		Reports the achieved rate, the errors and the latency of the updates. The entities are removed afterwards.
+	"""
+	from cb_bdti.core.main import BDTI
+	try:
+		profile = Helpers.get_load_profile(profile) if profile else [(0, rate), (duration, rate)]
+	except Exception as e:
+		raise click.BadParameter(str(e), param_hint='--profile')
+	config = Helpers.get_config_path(ctx.obj['config'])
+	bdti_integration = BDTI(config, deploy=False)
+	load = bdti_integration.loadgen(datamodels, entities, profile, workers, keep)
+	if not load:
+		ctx.exit(1)
+	if as_json:
+		click.echo(json.dumps(load, indent=4))
+	else:
+		click.echo('\nTarget: %(target_updates)s updates (%(target_rate).1f/s)\n'
+				   'Sent: %(sent)s updates, %(skipped)s skipped because every worker was busy\n'
+				   'Achieved: %(achieved_rate).1f updates/s, %(ok)s ok' % load)
+		click.echo('Errors: %s' % (', '.join('%s: %s' % el for el in sorted(load["errors"].items())) or 'none'))
+		click.echo('Latency (s): %s\n' % '  '.join('%s %s' % (key, '%.3f' % value if value is not None else 'n/a')
+												   for key, value in load["latency_seconds"].items()))
+
+
+@cli.command(name="simulate", help_priority=13)
+@click.option('--datamodels', '-d', type=click.STRING, default=None,
+			  help='Name of the Data Models whose grouping rules are evaluated, separated by blanks. '
+				   'Every Data Model by default.', cls=MultiOption)
+@click.option('--events', '-e', 'events_file', type=click.File('r'), required=True,
+			  help='JSON lines file with the recorded notifications or entities, "-" to read from stdin.')
+@click.option('--rules', '-R', 'rules_file', type=click.Path(exists=True, dir_okay=False), default=None,
+			  help='Grouping rules file to evaluate, e.g. the deployed one, instead of the Data Models ones.')
+@click.option('--sample-seconds', '-s', type=click.FloatRange(min=0, min_open=True), default=None,
+			  help='Seconds of traffic covered by the stream. By default, taken from the notifiedAt of '
+				   'the notifications.')
+@click.option('--json', 'as_json', is_flag=True, help='Print the report as JSON.')
+@click.pass_context
+def simulate(ctx, datamodels, events_file, rules_file, sample_seconds, as_json):
+	""" Evaluate grouping rules against a notification stream.
+
+		Matches a recorded notification stream against the grouping rules of the Data Models in the configuration
+		file as Cygnus does, before deploying them. Reports the events stored by every rule, the events matching
+		no rule, the overlapping rules and the HDFS files and bytes per day projected for every destination.
+	"""
+	from cb_bdti.core.main import BDTI
+	config = Helpers.get_config_path(ctx.obj['config'])
+	bdti_integration = BDTI(config, delete=True, deploy=False)
+	report = bdti_integration.simulate(datamodels or ['all'], events_file, rules_file, sample_seconds)
+	if not report:
+		ctx.exit(1)
+	if as_json:
+		click.echo(json.dumps(report, indent=4))
+		return
+	row = '{id:>4}  {destination:<24} {hits:>10} {bytes:>14}  {files}'
+	click.echo('\n' + row.format(id='RULE', destination='DESTINATION', hits='EVENTS', bytes='BYTES/DAY',
+								 files='HDFS FILES'))
+	for rule in report["rules"]:
+		click.echo(row.format(id=rule["id"], destination=rule["destination"], hits=rule["hits"],
+							  bytes=rule["bytes_per_day"], files=', '.join(rule["hdfs_files"]) or '-'))
+	click.echo('\nEvents: %(events)s in %(sample_seconds).0f s, %(unmatched)s unmatched, '
+			   '%(bytes_per_day)s bytes/day projected' % report)
+	for key in report["unmatched_keys"]:
+		click.echo('Unmatched: type %(entity_type)s, service path %(service_path)s: %(events)s events' % key)
+	for overlap in report["overlaps"]:
+		click.echo('Overlap: rule %(rule)s shadows rule %(shadowed_rule)s for %(events)s events' % overlap)
+	click.echo()
+
+
+@cli.command(name="serve", help_priority=14)
+@click.option('--socket', '-s', 'socket_path', type=click.Path(dir_okay=False), default=SERVE_SOCKET,
+			  show_default=True, help='Unix socket where the API listens.')
+@click.pass_context
+def serve(ctx, socket_path):
+	""" Serve the integration through a local API.
+
+		Keeps running and serves the integrate, modify and delete operations over a local HTTP API
+		(POST /integrate, /modify and /delete with a JSON body such as {"datamodels": ["all"], "force": false,
+		"deploy": false, "confirm": false}), along with GET /datamodels, /health and /stats. The configuration,
+		the Orion connections and the SSH session to Cygnus are kept open among operations, which are queued
+		and run one at a time. The configuration file is read again before every operation.
+		The API listens on a unix socket that only the user running the server can connect to,
+		e.g. curl --unix-socket /var/run/cb_bdti.sock http://localhost/datamodels
+	"""
+	from cb_bdti.core.main import BDTI
+	config = Helpers.get_config_path(ctx.obj['config'])
+	bdti_integration = BDTI(config)
+	bdti_integration.serve(socket_path)
+
+
+@cli.command(name="watch", help_priority=15)
+@click.option('--debounce', '-b', type=click.FloatRange(min=0), default=WATCH_DEBOUNCE, show_default=True,
+			  help='Seconds without changes after which a batch of changes is applied.')
+@click.option('--poll', 'polling', is_flag=True, help='Poll the configuration file instead of using inotify.')
+@click.option('--interval', '-i', type=click.FloatRange(min=0, min_open=True), default=WATCH_POLL_INTERVAL,
+			  show_default=True, help='Seconds between checks of the configuration file when polling.')
+@click.pass_context
+def watch(ctx, debounce, polling, interval):
+	""" Apply the changes of the configuration file as it changes.
+
+		Keeps running and watches the configuration file (with inotify, or polling where it is not available).
+		Every batch of changes, once the file is unchanged for the debounce period, is compared with the last
+		applied version: only the Data Models whose sections were added, changed or removed are integrated,
+		modified or deleted, without prompts, and Cygnus is redeployed once, only if its agent or grouping rules
+		changed. The configuration file when the watch starts is taken as already applied.
+	"""
+	from cb_bdti.core.main import BDTI
+	config = Helpers.get_config_path(ctx.obj['config'])
+	bdti_integration = BDTI(config)
+	bdti_integration.watch(debounce, interval, polling)
+
+
+@cli.command(name="apply", help_priority=16)
+@click.option('--plan-only', '-n', is_flag=True, help='Show the plan without executing it.')
+@click.option('--json', 'as_json', is_flag=True, help='Print the plan as JSON.')
+@click.option('--workers', '-w', type=click.IntRange(min=1), default=ORION_WORKERS, show_default=True,
+			  help='Maximum number of concurrent requests to Orion.')
+@click.pass_context
+def apply(ctx, plan_only, as_json, workers):
+	""" Make the integration match the configuration file.
+
+		Takes the configuration file as the desired state: integrates the Data Models that are not integrated,
+		patches the subscriptions whose section changed (or recreates them when their fiware service, service path,
+		Orion or kind of notification changed), deletes the integrated Data Models without section and redeploys
+		Cygnus once, only if its agent or grouping rules change. It never prompts. Use --plan-only to show the plan
+		without executing it. The command exits with code 1 if any step fails.
+	"""
+	from cb_bdti.core.main import BDTI
+	config = Helpers.get_config_path(ctx.obj['config'])
+	bdti_integration = BDTI(config, deploy=not plan_only)
+	plan = bdti_integration.apply(plan_only, workers)
+	if not plan:
+		ctx.exit(1)
+	if as_json:
+		click.echo(json.dumps(plan, indent=4))
+	else:
+		click.echo()
+		for step in plan["steps"]:
+			if step["action"] == PLAN_UNCHANGED:
+				continue
+			details = ', '.join(step.get("fields", [])) if step["action"] != PLAN_INVALID else step["error"]
+			error = '' if not step.get("error") or step["action"] == PLAN_INVALID else \
+				'  %s: %s' % ('PENDING' if step.get("pending") else 'FAILED', step["error"])
+			click.echo('{action:<10} {datamodel}{details}{error}'.format(
+				action=step["action"], datamodel=step["datamodel"], details=': %s' % details if details else '',
+				error=error))
+		rules = plan["grouping_rules"]
+		click.echo('\nGrouping rules: %s added, %s changed, %s removed' % (len(rules["added"]), len(rules["changed"]),
+																		   len(rules["removed"])))
+		click.echo('Cygnus agent: %s' % ('changed' if plan["agent_changed"] else 'unchanged'))
+		click.echo('Orion requests: %s' % plan["orion_requests"])
+		click.echo('Cygnus redeploy: %s\n' % ('yes' if plan["redeploy"] else 'no'))
+	if plan.get("deploy_pending") or any(step.get("error") for step in plan["steps"]):
+		ctx.exit(1)
+
+
+@cli.command(name="resume", help_priority=17)
+@click.option('--retries', '-r', type=click.IntRange(min=0), default=RESUME_RETRIES, show_default=True,
+			  help='Passes over the mutations still pending after the first one.')
+@click.option('--backoff', '-b', type=click.FloatRange(min=0), default=RESUME_BACKOFF, show_default=True,
+			  help='Seconds waited before the first retry, doubled on every retry.')
+@click.option('--dry-run', '-n', is_flag=True, help='Show the pending mutations without doing them.')
+@click.option('--discard', is_flag=True, help='Discard the pending mutations without doing them.')
+@click.pass_context
+def resume(ctx, retries, backoff, dry_run, discard):
+	""" Resume the interrupted integrate, modify and delete runs.
+
+		Every run records the subscriptions it will create, recreate or delete before it starts, and removes each
+		one once it is done. This command does the ones left by the interrupted runs, without prompts and without
+		redoing the ones that were done, retrying the failed ones with an exponential backoff, and deploys Cygnus
+		once if any was done or an interrupted run did not deploy it. The command exits with code 1 if anything is
+		still pending.
+	"""
+	from cb_bdti.core.main import BDTI
+	config = Helpers.get_config_path(ctx.obj['config'])
+	bdti_integration = BDTI(config, delete=dry_run or discard, deploy=not (dry_run or discard))
+	if not bdti_integration.resume(retries, backoff, dry_run, discard):
+		ctx.exit(1)
+
+
+@cli.command(name="discover", help_priority=18)
+@click.option('--services', '-s', 'fiware_services', type=click.STRING, default=None,
+			  help='Fiware services to discover separated by blanks. By default, the ones of the configuration '
+				   'file.', cls=MultiOption)
+@click.option('--orion', '-O', type=click.STRING, default=None,
+			  help='Name of the orion section of the Orion to discover. The one of the fiware section by default.')
+@click.option('--all', '-a', 'include_configured', is_flag=True,
+			  help='Also suggest a section for the types already configured.')
+@click.option('--output', '-o', type=click.File('a'), default=None,
+			  help='Append the suggested sections to this file, e.g. the configuration file, instead of printing '
+				   'them.')
+@click.option('--json', 'as_json', is_flag=True, help='Print the discovered types as JSON.')
+@click.option('--workers', '-w', type=click.IntRange(min=1), default=ORION_WORKERS, show_default=True,
+			  help='Maximum number of concurrent requests to Orion.')
+@click.pass_context
+def discover(ctx, fiware_services, orion, include_configured, output, as_json, workers):
+	""" Suggest Data Model sections from the entities in Orion.
+
+		Lists the entity types of every fiware service in Orion and counts their entities, and prints a Data Model
+		section for every type not configured yet, the types with the most entities first, with the throttling
+		suggested by its number of entities. Warns about the types that are not in the FIWARE Data Models, whose
+		types are not checked, and does not suggest the sections that would be rejected. The command exits with
+		code 1 if the types cannot be discovered.
+	"""
+	from cb_bdti.core.main import BDTI
+	config = Helpers.get_config_path(ctx.obj['config'])
+	bdti_integration = BDTI(config, delete=True, deploy=False)
+	discovered = bdti_integration.discover(list(fiware_services or []), orion, include_configured, workers)
+	if discovered is None:
+		ctx.exit(1)
+	if as_json:
+		click.echo(json.dumps(discovered, indent=4))
+		return
+	from cb_bdti.config.manager import ConfigManager
+	sections = ConfigManager.format_sections(*BDTI.get_suggested_sections(discovered, include_configured))
+	if output:
+		output.write(sections)
+	else:
+		click.echo(sections)
+
+
 @cli.command(name="new_config", help_priority=5)
 @click.pass_context
 def new_config(ctx):
@@ -179,6 +597,7 @@ def new_config(ctx):
 		It generates an empty configuration file from a template into default path (/etc/cb_bdti.ini).
 		If the configuration file already exits a error is given.
 	"""
+	from cb_bdti.core.main import BDTI
 	BDTI.get_config_file()
 
 @cli.command(name="reset", help_priority=7)
@@ -190,6 +609,7 @@ def reset(ctx, force):
 	
 		It removes the configuration file and removes all previously integrated datamodels.
 	"""
+	from cb_bdti.core.main import BDTI
 	BDTI.reset(force)
 
 
@@ -14,6 +14,14 @@ ORION_HOST = "orion.host"
 CYGNUS_HOST = "cygnus.host"
 CYGNUS_KEY_PATH = "cygnus.ssh_key_path"
 CYGNUS_USERNAME = "cygnus.ssh_username"
+ORION_RATE_LIMIT = "orion.rate_limit"
+ORION_MAX_CONCURRENCY = "orion.max_concurrency"
+ORION_TIMEOUT = "orion.timeout"
+ORION_BREAKER_FAILURES = "orion.breaker_failures"
+ORION_BREAKER_RESET = "orion.breaker_reset"
+DATAMODELS_CATALOG_PATH = "datamodels.catalog"
+# sections of the other Orions, [orion.<name>], named by the orion key of the datamodels
+ORION_SECTION_PREFIX = "orion."
 
 HDFS_SECTION = "hdfs"
 HDFS_HOST = "hdfs.host"
@@ -32,10 +40,22 @@ DATA_MODEL_FILE_PATH = "file_path"
 DATA_MODEL_FILE_NAME = "file_name"
 DATA_MODEL_THROTTLING = 'throttling'
 DATA_MODEL_EXPIRES = 'expires'
+DATA_MODEL_WATCHED_ATTRIBUTES = 'watched_attributes'
+DATA_MODEL_NOTIFY_ATTRIBUTES = 'notify_attributes'
+DATA_MODEL_Q = 'q'
+DATA_MODEL_GEO_Q = 'geo_q'
+DATA_MODEL_ID_PATTERN = 'id_pattern'
+DATA_MODEL_ORION = 'orion'
+DATA_MODEL_SHARDS = 'shards'
+DATA_MODEL_SHARD_ENDPOINTS = 'shard_endpoints'
 DATA_MODEL_SUBSCRIPTION_ID = "subscription_id"
 ORION_SUBSCRIPTION_URL = "orion_url"
 INTEGRATION_DATE = "integration_date"
 MODIFICATION_DATE = "modification_date"
+DATA_MODEL_GROUPING_RULE_ID = "grouping_rule_id"
+# keys of the integrated datamodels that are not copied from their sections of the configuration file
+DATA_MODEL_INTERNAL_KEYS = [DATA_MODEL_SUBSCRIPTION_ID, ORION_SUBSCRIPTION_URL, INTEGRATION_DATE, MODIFICATION_DATE,
+							DATA_MODEL_GROUPING_RULE_ID]
 
 # Variables about agent.conf building
 TEMPLATE_AGENT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cygnus/agent_hdfs.conf")
@@ -50,6 +70,85 @@ MAP_AGENT_CONF = {
 	HDFS_KRB5_PASSWORD: "cygnus-ngsi.sinks.hdfs-sink.krb5_password"
 }
 
+# Subscription filters
+DEFAULT_ID_PATTERN = ".*"
+# Sharded datamodels have a subscription by shard, each one for the entity ids ending in some of these characters,
+# dealt out among the shards. The last one also takes the ids ending in any other character
+SHARD_ID_CHARACTERS = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+MAX_SHARDS = 10
+GEO_Q_GEORELS = ["near", "within", "contains", "intersects", "equals", "disjoint", "overlaps"]
+GEO_Q_GEOMETRIES = ["Point", "MultiPoint", "LineString", "MultiLineString", "Polygon", "MultiPolygon"]
+
+# Orion client
+ORION_SUBSCRIPTIONS_PATH = "ngsi-ld/v1/subscriptions"
+ORION_ENTITIES_PATH = "ngsi-ld/v1/entities"
+ORION_TYPES_PATH = "ngsi-ld/v1/types"
+ORION_UPSERT_PATH = "ngsi-ld/v1/entityOperations/upsert"
+ORION_BATCH_DELETE_PATH = "ngsi-ld/v1/entityOperations/delete"
+ORION_ENTITY_ATTRS_PATH = "ngsi-ld/v1/entities/{id}/attrs"
+ORION_POOL_SIZE = 20
+ORION_PAGE_LIMIT = 100
+ORION_WORKERS = 10
+
+# discover command. The types with at least these entities, checked in order, are suggested this throttling
+# (seconds), as they notify Cygnus the most. The types with fewer entities are not throttled
+DISCOVER_THROTTLING = [(100000, 10), (10000, 5), (1000, 1)]
+
+# Orion client limits, by Orion. Requests wait for the rate (per second, unlimited if 0) and the concurrency,
+# time out after the timeout seconds and, after the breaker failures consecutive failures (never if 0),
+# are refused without being sent for the breaker reset seconds. Then one request is tried again
+ORION_LIMITS = {ORION_RATE_LIMIT: 0, ORION_MAX_CONCURRENCY: ORION_POOL_SIZE, ORION_TIMEOUT: 10,
+				ORION_BREAKER_FAILURES: 5, ORION_BREAKER_RESET: 30}
+# Orion status codes counted as failures by the circuit breaker, besides those of server errors
+ORION_FAILURE_STATUS_CODES = [429]
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half-open"
+
+# Delivery health of the integrated subscriptions. Subscriptions without notifications
+# for longer than the stall hours are stalled
+HEALTH_OK = "ok"
+HEALTH_FAILING = "failing"
+HEALTH_STALLED = "stalled"
+HEALTH_INACTIVE = "inactive"
+HEALTH_MISSING = "missing"
+HEALTH_UNKNOWN = "unknown"
+DEFAULT_STALLED_HOURS = 24
+
+# End-to-end latency probe. The probe entity carries a unique marker that is searched in the HDFS file
+PROBE_ENTITY_ID = "urn:ngsi-ld:{type}:cb-bdti-probe-{id}"
+PROBE_ATTRIBUTE = "cbBdtiProbe"
+PROBE_MARKER = "cb-bdti-probe-{id}"
+PROBE_TIMEOUT = 120
+PROBE_POLL_INTERVAL = 0.5
+LATENCY_PERCENTILES = [50, 95, 99]
+
+# Synthetic load generator. Updates that cannot be sent because every worker is busy for longer than
+# the max pending factor allows are skipped, so the target rate is never silently lowered
+LOADGEN_ENTITY_ID = "urn:ngsi-ld:{type}:cb-bdti-load-{index}"
+LOADGEN_ATTRIBUTE = "cbBdtiLoad"
+LOADGEN_BATCH_SIZE = 100
+LOADGEN_WORKERS = ORION_POOL_SIZE
+LOADGEN_MAX_PENDING_FACTOR = 2
+LOADGEN_TICK = 0.005
+LOADGEN_REPORT_INTERVAL = 5
+
+# Grouping rules simulator. The concatenated fields of a rule are matched by its regex, as Cygnus does.
+# Events without service path are considered notified at the root one
+SIMULATOR_RULE_FIELDS = {"entityId": 0, "entityType": 1, "servicePath": 2}
+SIMULATOR_DEFAULT_SERVICE_PATH = "/"
+SIMULATOR_NOT_ATTRIBUTES = ["id", "type", "@context"]
+SIMULATOR_RECV_TIME_TS = "1429535775000"
+SIMULATOR_RECV_TIME = "2015-04-20T12:13:22.041Z"
+SIMULATOR_COLUMN_ATTRIBUTE_OVERHEAD = len(', "": , "_md": []')
+SIMULATOR_CACHE_SIZE = 65536
+SIMULATOR_TOP_UNMATCHED = 10
+SECONDS_PER_DAY = 86400
+
+# WebHDFS API, where Cygnus stores the data of each Data Model in a file per grouping rule
+WEBHDFS_PATH = "/webhdfs/v1"
+HDFS_FILE_PATH = "/user/{username}/{fiware_service}{fiware_service_path}/{destination}/{destination}.txt"
+
 # HDFS posible formats files
 HDFS_FORMAT_FILE_LIST = ["json-row", "json-column", "csv-row", "csv-column"]
 
@@ -57,9 +156,21 @@ HDFS_FORMAT_FILE_LIST = ["json-row", "json-column", "csv-row", "csv-column"]
 CYGNUS_IMAGE_NAME = 'fiware/cygnus-ngsi'
 CYGNUS_NOTIFICATION_PORT = "5050"
 CYGNUS_NOTIFICATION_PATH = "/notify"
+# Seconds given to Cygnus container to start after running it
+CYGNUS_STARTUP_WAIT = 10
+# Cygnus management API, used to poll the sources, channels and sinks counters
+CYGNUS_API_PORT = "5080"
+CYGNUS_API_STATS = "/v1/stats"
+CYGNUS_API_GROUPING_RULES = "/v1/groupingrules"
+CYGNUS_CHANNEL_CAPACITY_PATTERN = r"^cygnus-ngsi\.channels\.([\w-]+)\.capacity\s*=\s*(\d+)"
+DEFAULT_CYGNUS_CHANNEL_CAPACITY = 1000
+# Seconds between samples of Cygnus stats and channel fill ratio from which backpressure is warned
+CYGNUS_STATS_INTERVAL = 5
+CYGNUS_CHANNEL_FILL_WARNING = 0.8
 
 # CONFIGURATION files paths
 INTERNAL_CONF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "internal_conf.ini")
+OUTBOX_CONF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "outbox.ini")
 PRODUCTION_TEMPLATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "template.ini")
 PRODUCTION_INI_PATH = '/etc'
 PRODUCTION_INI_NAME = 'cb_bdti.ini'
@@ -69,31 +180,60 @@ CYGNUS_FILES_PATH = '/var/tmp'
 AGENT = os.path.join(CYGNUS_FILES_PATH, "agent.conf")
 GROUPING_RULES = os.path.join(CYGNUS_FILES_PATH, "grouping_rules.conf")
 
-# Types of 17 Fiware Datamodels
-FIWARE_DATAMODELS = {"Alert": ["Alert"],
-					 "CivicIssueTracking": ["Open311:ServiceType", "Open311:ServiceRequest"],
-					 "Device": ["Device", "DeviceModel"],
-					 "Environment": ["AeroAllergenObserved", "AirQualityObserved", "WaterQualityObserved",
-									 "NoiseLevelObserved"],
-					 "Indicators": ["KeyPerformanceIndicator"],
-					 "Parking": ["OffStreetParking", "OnStreetParking", "ParkingGroup", "ParkingAccess", "ParkingSpot"],
-					 "ParksAndGardens": ["Garden", "GreenspaceRecord", "FlowerBed"],
-					 "PointsOfInterest": ["PointOfInterest", "Beach", "Museum"],
-					 "StreetLightning": ["Streetlight", "StreetlightModel", "StreetlightGroup",
-										 "StreetlightControlCabinet"],
-					 "Transportation": ["BikeHireDockingStation", "Road", "RoadSegment", "TrafficFlowObserved",
-										"Vehicle", "VehicleModel", "EVChargingStation"],
-					 "Weather": ["WeatherObserved", "WeatherForecast", "WeatherAlert"],
-					 "WasteManagement": ["WasteContainerIsle", "WasteContainerModel", "WasteContainer"],
-					 "Agrifood": ["AgriApp", "AgriCrop", "AgriFarm", "AgriGreenhouse", "AgriParcel",
-									"AgriParcelOperation","AgriParcelRecord", "AgriPest"],
-					 "Building": ["Building", "BuildingOperation"],
-					 "Energy":["ThreePhaseAcMeasurement"],
-					 "PointsOfInteraction":["SmartPointOfInteraction", "SmartSpot"],
-					 "UrbanMobility":["GtfsAgency", "GtfsStop", "GtfsStation", "GtfsAccessPoint", "GtfsRoute",
-									"GtfsTrip", "GtfsStopTime", "GtfsService", "GtfsCalendarRule", "GtfsCalendarDateRule",
-									"GtfsFrequency", "GtfsTransferRule","GtfsShape ", "ArrivalEstimation"],
-					}
+# Catalog of the types of the FIWARE Data Models by domain, either a dict with the types of every domain or the
+# official list of Smart Data Models, and the cache of its indexes, in the cache folder of the user
+DATAMODELS_CATALOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datamodels.json")
+DATAMODELS_CACHE = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+								"cb_bdti", "datamodels_cache.json")
+DATAMODELS_CACHE_VERSION = 3
+SMART_DATA_MODELS_LIST = "officialList"
+SMART_DATA_MODELS_REPO_PREFIX = "dataModel."
+
+# Local API of serve command, on a unix socket that only the user running it can connect to
+SERVE_SOCKET = "/var/run/cb_bdti.sock"
+SERVE_SOCKET_UMASK = 0o177
+SERVE_OPERATIONS = ["integrate", "modify", "delete"]
+
+# Actions of the apply plan
+PLAN_CREATE = "create"
+PLAN_PATCH = "patch"
+PLAN_RECREATE = "recreate"
+PLAN_DELETE = "delete"
+PLAN_UPDATE = "update"
+PLAN_UNCHANGED = "unchanged"
+PLAN_INVALID = "invalid"
+PLAN_ORION_REQUESTS = {PLAN_CREATE: 1, PLAN_PATCH: 1, PLAN_RECREATE: 2, PLAN_DELETE: 1, PLAN_UPDATE: 0,
+					   PLAN_UNCHANGED: 0, PLAN_INVALID: 0}
+
+# Watch
+WATCH_DEBOUNCE = 2
+WATCH_POLL_INTERVAL = 1
+# inotify events of a file written in place, replaced through a rename, created or removed
+INOTIFY_MASK = 0x008 | 0x040 | 0x080 | 0x100 | 0x200
+INOTIFY_EVENT_SIZE = 16
+INOTIFY_BUFFER_SIZE = 65536
+
+# Outbox of the Orion mutations of the datamodels of a run. Resume retries the pending ones, waiting
+# the backoff seconds between passes, doubled after every pass up to the max backoff
+OUTBOX_CREATE = "create"
+OUTBOX_RECREATE = "recreate"
+OUTBOX_DELETE = "delete"
+OUTBOX_OPERATION = "operation"
+OUTBOX_ATTEMPTS = "attempts"
+OUTBOX_LAST_ERROR = "last_error"
+OUTBOX_RECORDED = "recorded"
+OUTBOX_DEPLOY_PENDING = "deploy_pending"
+RESUME_RETRIES = 3
+RESUME_BACKOFF = 2
+RESUME_MAX_BACKOFF = 60
+
+# Outcomes of the datamodels of a bulk removal (delete and reset commands). Forced ones are removed from the
+# internal configuration although their subscriptions could not be removed, pending ones were not sent
+# because their Orion is failing
+DELETE_DELETED = "deleted"
+DELETE_FORCED = "forced"
+DELETE_FAILED = "failed"
+DELETE_PENDING = "pending"
 
 # Message of errors
 SUDO_ERROR = "{date} ERROR    [main] Permission denied: you must run cb-bdti with sudo privileges"
@@ -1,7 +1,9 @@
 import json
 import logging
+import os
 from cb_bdti.config.constants import *
 from cb_bdti.utils.helpers import Helpers
+from cb_bdti.utils.tracing import Tracer
 
 
 class CygnusConfManager(object):
@@ -9,45 +11,110 @@ class CygnusConfManager(object):
 	Creation manager for files that Cygnus needs to run  
 	"""
 	@staticmethod
-	def generate_flume_agent(hdfs_dict, out_file):
+	def build_flume_agent(hdfs_dict):
 		"""
-		Generates a new flume agent with fields indicated in hdfs section of config file
+		Builds the content of a flume agent with fields indicated in hdfs section of config file
 
 		:param dict hdfs_dict: values of hdfs section
-		:param out_file: path of where flume agent file will be writed 
-		:return: None
+		:return: the content of the agent file
+		:rtype: str
 		"""
-		logging.debug('Generating Flume agent file')
-		logging.debug('Loading agent file template at {path}'.format(path=TEMPLATE_AGENT))
+		logging.debug('Loading agent file template at %s', TEMPLATE_AGENT)
 		with open(TEMPLATE_AGENT) as file:
 			config_str = file.read()
 
 		for key, value in hdfs_dict.items():
 			config_str += "{key_name} = {key_value}\n".format(key_name=MAP_AGENT_CONF[key], key_value=value)
+		return config_str
 
-		with open(out_file, 'w') as config_path:
-			config_path.write(config_str)
-			logging.debug('New Cygnus agent file created: {path}'.format(path=out_file))
+	@staticmethod
+	def read_file(file_path):
+		"""
+		:param str file_path: path of a file generated for Cygnus
+		:return: the content of the file, None if there is no file
+		:rtype: str
+		"""
+		if not os.path.isfile(file_path):
+			return None
+		with open(file_path) as file:
+			return file.read()
 
-		logging.debug('Flume agent generation process finished OK')
+	@staticmethod
+	def read_flume_agent(agent_file):
+		"""
+		:param str agent_file: path of the agent file
+		:return: the content of the agent file, None if there is no agent file
+		:rtype: str
+		"""
+		return CygnusConfManager.read_file(agent_file)
 
 	@staticmethod
-	def generate_grouping_rules(models, format_file, out_file):
+	@Tracer.traced('cygnus.generate_agent')
+	def generate_flume_agent(hdfs_dict, out_file):
 		"""
-		Generates a new flume grouping rules fields indicated in datamodels sections of config file
+		Generates a new flume agent with fields indicated in hdfs section of config file.
+		The file is only written when its content differs from the one it already has
 
 		:param dict hdfs_dict: values of hdfs section
-		:param out_file: path of where grouping rules file will be writed 
-		:return: None
+		:param out_file: path of where flume agent file will be writed 
+		:return: if the agent file changed
+		:rtype: bool
 		"""
-		logging.debug('Generating grouping rules file')
-		rules = {"grouping_rules": []}
-		for counter, model in enumerate(models, start=1):
-			logging.debug('Processing {model}'.format(model=model))
-			model[DATA_MODEL_FILE_PATH] = "%s_%s" %(format_file.replace('-', '_'), model[DATA_MODEL_FILE_PATH])
+		logging.debug('Generating Flume agent file')
+		config_str = CygnusConfManager.build_flume_agent(hdfs_dict)
+		changed = config_str != CygnusConfManager.read_file(out_file)
+		if changed:
+			Helpers.write_file(out_file, config_str)
+			logging.debug('New Cygnus agent file created: %s', out_file)
+
+		logging.debug('Flume agent generation process finished OK')
+		return changed
+
+	@staticmethod
+	def get_destination(model, format_file):
+		"""
+		Gets where Cygnus stores the data of a datamodel, as set in its grouping rule
+
+		:param dict model: values of the datamodel section
+		:param str format_file: format of the HDFS files
+		:return: a tuple (fiware service path, destination) of the grouping rule
+		:rtype: tuple
+		"""
+		fiware_service_path = "%s_%s" %(format_file.replace('-', '_'), model[DATA_MODEL_FILE_PATH])
+		if not fiware_service_path.startswith('/'):
+			fiware_service_path = '/' + fiware_service_path
+		return fiware_service_path, model[DATA_MODEL_FILE_NAME]
+
+	@staticmethod
+	def get_hdfs_file_path(model, format_file, username):
+		"""
+		Gets the path of the HDFS file where Cygnus stores the data of a datamodel
+
+		:param dict model: values of the datamodel section
+		:param str format_file: format of the HDFS files
+		:param str username: HDFS username
+		:return: absolute path of the file in HDFS
+		:rtype: str
+		"""
+		fiware_service_path, destination = CygnusConfManager.get_destination(model, format_file)
+		return HDFS_FILE_PATH.format(username=username, fiware_service=model[DATA_MODEL_FIWARE_SERVICE],
+									 fiware_service_path=fiware_service_path, destination=destination)
 
-			if not model[DATA_MODEL_FILE_PATH].startswith('/'):
-				model[DATA_MODEL_FILE_PATH] = '/' + model[DATA_MODEL_FILE_PATH]
+	@staticmethod
+	def build_grouping_rules(models, format_file):
+		"""
+		Builds the grouping rules of some datamodels, without modifying them. Every rule keeps the grouping rule id
+		of its datamodel, and rules are sorted by id, so Cygnus applies the oldest rule when several match
+
+		:param list models: values of the datamodels sections, with their grouping rule id
+		:param str format_file: format of the HDFS files
+		:return: the grouping rules
+		:rtype: list
+		"""
+		rules = []
+		for model in models:
+			logging.debug('Processing %s', model)
+			fiware_service_path, destination = CygnusConfManager.get_destination(model, format_file)
 
 			fields = ["entityType"]
 			regex = Helpers.get_type_pattern(model[DATA_MODEL_TYPES])
@@ -55,16 +122,77 @@ class CygnusConfManager(object):
 				fields.append("servicePath")
 				regex += model[DATA_MODEL_FIWARE_SERVICEPATH]
 
-			dic = {"id": counter,
-				   "fields": fields,
-				   "regex": regex,
-				   "destination": model[DATA_MODEL_FILE_NAME],
-				   "fiware_service_path": model[DATA_MODEL_FILE_PATH]
-				   }
-			rules["grouping_rules"].append(dic)
+			rules.append({"id": int(model[DATA_MODEL_GROUPING_RULE_ID]),
+						  "fields": fields,
+						  "regex": regex,
+						  "destination": destination,
+						  "fiware_service_path": fiware_service_path
+						  })
+		return sorted(rules, key=lambda rule: rule["id"])
+
+	@staticmethod
+	def read_grouping_rules(grouping_rules_file):
+		"""
+		Reads the grouping rules of a grouping rules file
+
+		:param str grouping_rules_file: path of the grouping rules file
+		:return: the grouping rules, empty if there is no grouping rules file or it cannot be read, e.g. it was
+			left half written, as it is written again
+		:rtype: list
+		"""
+		if not os.path.isfile(grouping_rules_file):
+			return []
+		try:
+			with open(grouping_rules_file) as file:
+				rules = json.load(file)["grouping_rules"]
+			if isinstance(rules, list) and all(isinstance(rule, dict) and "id" in rule for rule in rules):
+				return rules
+		except (OSError, ValueError, KeyError, TypeError):
+			pass
+		logging.warning('The grouping rules file %s cannot be read, it is written again', grouping_rules_file)
+		return []
+
+	@staticmethod
+	def diff_grouping_rules(previous, current):
+		"""
+		Compares two sets of grouping rules by their id
+
+		:param list previous: the previous grouping rules
+		:param list current: the new grouping rules
+		:return: the rules added, changed and removed in the new grouping rules, under those keys
+		:rtype: dict
+		"""
+		previous = {rule["id"]: rule for rule in previous}
+		current_ids = {rule["id"] for rule in current}
+		return {"added": [rule for rule in current if rule["id"] not in previous],
+				"changed": [rule for rule in current if rule["id"] in previous and rule != previous[rule["id"]]],
+				"removed": [rule for rule_id, rule in previous.items() if rule_id not in current_ids]}
+
+	@staticmethod
+	@Tracer.traced('cygnus.generate_grouping_rules')
+	def generate_grouping_rules(models, format_file, out_file):
+		"""
+		Generates a new flume grouping rules fields indicated in datamodels sections of config file.
+		The file is only written when the rules differ from the ones it already has
+
+		:param list models: values of the datamodels sections, with their grouping rule id
+		:param str format_file: format of the HDFS files
+		:param out_file: path of where grouping rules file will be writed 
+		:return: the rules added, changed and removed in the file
+		:rtype: dict
+		"""
+		logging.debug('Generating grouping rules file')
+		rules = CygnusConfManager.build_grouping_rules(models, format_file)
+		previous = CygnusConfManager.read_grouping_rules(out_file)
+		diff = CygnusConfManager.diff_grouping_rules(previous, rules)
+		logging.debug('Grouping rules: %s added, %s changed, %s removed', len(diff["added"]), len(diff["changed"]),
+					  len(diff["removed"]))
 
-		with open(out_file, "w") as js:
-			json.dump(rules, js, indent=4)
-			logging.debug('New grouping rules file created: {path}'.format(path=out_file))
+		# the order matters to Cygnus, so it is also compared. A file that cannot be read is written again
+		content = json.dumps({"grouping_rules": rules}, indent=4)
+		if rules != previous or CygnusConfManager.read_file(out_file) != content:
+			Helpers.write_file(out_file, content)
+			logging.debug('New grouping rules file created: %s', out_file)
 
 		logging.debug('Grouping rules generation process finished OK')
+		return diff
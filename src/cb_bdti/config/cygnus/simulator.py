@@ -0,0 +1,143 @@
+import json
+import re
+from collections import Counter
+from functools import lru_cache
+from cb_bdti.config.constants import *
+
+
+class GroupingRulesSimulator(object):
+	"""
+	Evaluates notified entities against grouping rules as Cygnus does: the values of the fields of every rule are
+	concatenated and fully matched by its regex, and the first matching rule sets the destination.
+	Regexes are compiled once and the outcome is memoized per distinct entity key, so large streams are cheap
+	"""
+
+	def __init__(self, rules, format_file, cache_size=SIMULATOR_CACHE_SIZE):
+		"""
+		:param list rules: the grouping rules
+		:param str format_file: format of the HDFS files
+		:param int cache_size: maximum number of distinct entity keys memoized
+		"""
+		self.rules = [(rule, re.compile(rule["regex"]), tuple(SIMULATOR_RULE_FIELDS[field] for field in rule["fields"]))
+					  for rule in rules]
+		self.uses_id = any("entityId" in rule["fields"] for rule in rules)
+		self.row_overhead = self.get_row_overhead(format_file)
+		self.column_format = format_file.endswith('column')
+		self.match = lru_cache(maxsize=cache_size)(self.match_key)
+		self.hits = Counter()
+		self.overlaps = Counter()
+		self.unmatched = Counter()
+		self.events = 0
+		self.bytes = Counter()
+		self.files = {}
+
+	def match_key(self, entity_id, entity_type, service_path):
+		"""
+		Matches an entity key against the rules
+
+		:return: a tuple with the IDs of every matching rule, the first one being the rule applied by Cygnus
+		:rtype: tuple
+		"""
+		values = (entity_id, entity_type, service_path)
+		return tuple(rule["id"] for rule, regex, fields in self.rules
+					 if regex.fullmatch(''.join(values[field] for field in fields)))
+
+	@staticmethod
+	def get_row_overhead(format_file):
+		"""
+		Gets the bytes that Cygnus writes for an attribute besides its id, type, service path, name,
+		type and value, by rendering an empty row of the format
+
+		:param str format_file: format of the HDFS files
+		:return: bytes per attribute row, or per entity row for column formats
+		:rtype: int
+		"""
+		row = {"recvTimeTs": SIMULATOR_RECV_TIME_TS, "recvTime": SIMULATOR_RECV_TIME, "fiwareServicePath": "",
+			   "entityId": "", "entityType": ""}
+		if format_file.endswith('column'):
+			content = json.dumps(row) if format_file.startswith('json') else ','.join(row.values())
+		else:
+			row.update({"attrName": "", "attrType": "", "attrValue": "", "attrMd": []})
+			content = json.dumps(row) if format_file.startswith('json') else ','.join(str(el) for el in row.values())
+		return len(content) + 1
+
+	def get_entity_bytes(self, entity, service_path):
+		"""
+		Estimates the bytes that Cygnus writes in HDFS for a notified entity
+
+		:param dict entity: the entity
+		:param str service_path: service path of the notification
+		:return: the bytes
+		:rtype: int
+		"""
+		key_bytes = len(entity.get("id", "")) + len(entity.get("type", "")) + len(service_path)
+		attributes = [(name, value) for name, value in entity.items() if name not in SIMULATOR_NOT_ATTRIBUTES]
+		values_bytes = 0
+		for name, value in attributes:
+			if isinstance(value, dict) and ("value" in value or "object" in value):
+				attribute_type, value = value.get("type", "Property"), value.get("value", value.get("object"))
+			else:
+				attribute_type = "Property"
+			values_bytes += len(name) + len(json.dumps(value))
+			# Column formats write the attribute and its metadata column instead of its type
+			values_bytes += len(name) + SIMULATOR_COLUMN_ATTRIBUTE_OVERHEAD if self.column_format \
+				else len(attribute_type)
+		if self.column_format:
+			return self.row_overhead + key_bytes + values_bytes
+		return len(attributes) * (self.row_overhead + key_bytes) + values_bytes
+
+	def add(self, record):
+		"""
+		Evaluates a record of a notification stream: a notification with its entities in "data",
+		or a single entity. The fiware service and service path are taken from the "fiware-service" and
+		"fiware-servicepath" keys of the record, if present
+
+		:param dict record: the record
+		:return: None
+		"""
+		service = record.get("fiware-service", record.get("service", ""))
+		service_path = record.get("fiware-servicepath", record.get("servicePath", SIMULATOR_DEFAULT_SERVICE_PATH))
+		for entity in record["data"] if "data" in record else [record]:
+			self.events += 1
+			entity_type = entity.get("type", "")
+			matches = self.match(entity.get("id", "") if self.uses_id else "", entity_type, service_path)
+			if not matches:
+				self.unmatched[(entity_type, service_path)] += 1
+				continue
+			rule_id = matches[0]
+			self.hits[rule_id] += 1
+			for shadowed in matches[1:]:
+				self.overlaps[(rule_id, shadowed)] += 1
+			self.bytes[rule_id] += self.get_entity_bytes(entity, service_path)
+			self.files.setdefault(rule_id, set()).add(service)
+
+	def get_report(self, sample_seconds, hdfs_username):
+		"""
+		Reports the hits of every rule, the unmatched events, the overlaps and the projected HDFS files
+		and bytes per day of every destination
+
+		:param float sample_seconds: seconds of traffic covered by the evaluated records
+		:param str hdfs_username: HDFS username
+		:return: the report
+		:rtype: dict
+		"""
+		scale = SECONDS_PER_DAY / sample_seconds
+		rules = []
+		for rule, _, _ in self.rules:
+			rules.append({"id": rule["id"], "destination": rule["destination"], "regex": rule["regex"],
+						  "hits": self.hits[rule["id"]],
+						  "hdfs_files": sorted(HDFS_FILE_PATH.format(
+							  username=hdfs_username, fiware_service=service,
+							  fiware_service_path=rule["fiware_service_path"], destination=rule["destination"])
+							  for service in self.files.get(rule["id"], [])),
+						  "bytes_per_day": int(self.bytes[rule["id"]] * scale)})
+		return {"events": self.events,
+				"sample_seconds": sample_seconds,
+				"rules": rules,
+				"unmatched": sum(self.unmatched.values()),
+				"unmatched_keys": [{"entity_type": key[0], "service_path": key[1], "events": count}
+								   for key, count in self.unmatched.most_common(SIMULATOR_TOP_UNMATCHED)],
+				"overlaps": [{"rule": key[0], "shadowed_rule": key[1], "events": count}
+							 for key, count in sorted(self.overlaps.items())],
+				"bytes_per_day": int(sum(self.bytes.values()) * scale),
+				"cache": self.match.cache_info()._asdict()}
@@ -1,17 +1,22 @@
 from configobj import ConfigObj
 from configobj import ConfigObjError
 from datetime import datetime
+import threading
 
 
 # BDTI
 from cb_bdti.config.constants import *
-from cb_bdti.errors.core.handler import SectionKeyError
+from cb_bdti.errors.core.handler import SectionKeyError, OrionNotDefined
+from cb_bdti.utils.helpers import Helpers
+from cb_bdti.utils.tracing import Tracer
 
 
 class ConfigManager:
 	__instance = None
 	__internal_instance = None
 	__config_file_path = None
+	# guards the internal configuration, changed and written by the threads of each Orion
+	internal_lock = threading.RLock()
 
 	def __init__(self, config_file_path):
 		"""
@@ -34,7 +39,8 @@ class ConfigManager:
 		:return: The ConfigManager class singleton.
 		"""
 		if cls.__instance is None:
-			cls.__instance = ConfigManager(cls.__config_file_path)
+			with Tracer.span('config.load'):
+				cls.__instance = ConfigManager(cls.__config_file_path)
 
 		return cls.__instance
 
@@ -48,7 +54,9 @@ class ConfigManager:
 		:return: The ConfigManager class singleton.
 		"""
 		if cls.__internal_instance is None:
-			cls.__internal_instance = ConfigManager(INTERNAL_CONF)
+			with Tracer.span('config.load_internal'):
+				cls.__internal_instance = ConfigManager(INTERNAL_CONF)
+				cls.set_grouping_rule_ids()
 		return cls.__internal_instance
 
 	@classmethod
@@ -60,6 +68,14 @@ class ConfigManager:
 		"""
 		cls.__config_file_path = config_file_path
 
+	@classmethod
+	@Tracer.traced('config.load')
+	def reload_config(cls):
+		"""
+		Reads again the config file, so the changes made since it was read are applied
+		"""
+		cls._get_configparser().reload()
+
 	@classmethod
 	def _get_configparser(cls):
 		"""
@@ -103,6 +119,24 @@ class ConfigManager:
 		except KeyError:
 			raise SectionKeyError(section, key)
 
+	@classmethod
+	def get_optional_value(cls, section, key, default=''):
+		"""
+		Reads an optional value from the config file.
+		Returns the default value if the key is not present in the section.
+
+		:param section: Section where the key is located in config file.
+		:param key: Name of the key whose value has to be returned.
+		:param default: Value returned when the key is not present.
+		:return: The value of the corresponding section-key.
+		"""
+		try:
+			value = cls._get_configparser()[section][key]
+		except KeyError:
+			return default
+		# configobj splits unquoted values containing commas into lists
+		return ','.join(value) if isinstance(value, list) else value
+
 	@classmethod
 	def is_section_present(cls, section):
 		"""
@@ -119,12 +153,70 @@ class ConfigManager:
 	def get_section_dict(cls, section):
 		"""
 		Makes a dictionary from some section where the keys are the section 
-		keys and values ​​are the values ​​from those keys
+		keys and values ​​are the values ​​from those keys. The dictionaries are copies,
+		so they can be modified without changing the internal configuration
 
 		:Param section: 
 		:return: dict
 		"""
-		return cls._get_configparser()[section]
+		return cls._get_configparser()[section].dict()
+
+	@classmethod
+	def get_datamodel_sections(cls):
+		"""
+		Makes a dictionary with a copy of the values of every datamodel section of the config file
+
+		:return: dict with the values of each datamodel section by name
+		"""
+		return {section: cls.get_section_dict(section) for section in cls.get_datamodel_names()}
+
+	@classmethod
+	def get_datamodel_names(cls):
+		"""
+		:return: a list with the name of every datamodel section of the config file
+		"""
+		return [section for section in cls._get_configparser() if section not in [MAIN_SECTION, HDFS_SECTION]
+				and not section.startswith(ORION_SECTION_PREFIX)]
+
+	@classmethod
+	def get_orion_sections(cls):
+		"""
+		:return: a list with the sections of the Orions other than the one of the main section
+		"""
+		return [section for section in cls._get_configparser() if section.startswith(ORION_SECTION_PREFIX)]
+
+	@classmethod
+	def get_orion_section(cls, datamodel, values=None):
+		"""
+		Resolves the section of the Orion of a datamodel: the orion.<name> section named by its orion key,
+		or the main section if it has none.
+		Raises an OrionNotDefined exception if the named section is not present.
+
+		:param datamodel: Section of the datamodel in config file.
+		:param values: Values of the datamodel, e.g. of the integrated one. By default, the ones of its section.
+		:return: The section of the Orion of the datamodel.
+		"""
+		name = values.get(DATA_MODEL_ORION) if values is not None else \
+			cls.get_optional_value(datamodel, DATA_MODEL_ORION)
+		if not name:
+			return MAIN_SECTION
+		if not cls.is_section_present(ORION_SECTION_PREFIX + name):
+			raise OrionNotDefined(name, datamodel)
+		return ORION_SECTION_PREFIX + name
+
+	@staticmethod
+	def diff_datamodel_sections(previous, current):
+		"""
+		Compares two versions of the datamodels sections of the config file
+
+		:param dict previous: values of each datamodel section by name in the previous version
+		:param dict current: values of each datamodel section by name in the new version
+		:return: the datamodels created, updated and deleted in the new version, under those keys
+		"""
+		return {"created": [datamodel for datamodel in current if datamodel not in previous],
+				"updated": [datamodel for datamodel in current
+							if datamodel in previous and current[datamodel] != previous[datamodel]],
+				"deleted": [datamodel for datamodel in previous if datamodel not in current]}
 
 	@classmethod
 	def get_hdfs_section(cls):
@@ -144,6 +236,18 @@ class ConfigManager:
 
 		return dict
 
+	@classmethod
+	def get_orion_limits(cls, section=MAIN_SECTION):
+		"""
+		Reads the limits of the Orion requests of a section of the config file.
+		Keys not present or empty take the value of the main section, and then their default value
+
+		:param section: Section where the limits are located in config file.
+		:return: dict with the value of each limit by key
+		"""
+		return {key: cls.get_optional_value(section, key) or cls.get_optional_value(MAIN_SECTION, key) or default
+				for key, default in ORION_LIMITS.items()}
+
 	@classmethod
 	def _get_internal_conf_parser(cls):
 		"""
@@ -165,10 +269,48 @@ class ConfigManager:
 	def get_datamodels_info(cls):
 		return [{el: cls._get_internal_conf_parser()[el]} for el in cls._get_internal_conf_parser()]
 
+	@classmethod
+	def get_grouping_rule_ids(cls, datamodels):
+		"""
+		Gets the grouping rule ids of some datamodels: the one kept in the internal configuration for the
+		integrated ones, and the next free ids, in order, for the rest. Ids are not reused while their
+		datamodel is integrated, so adding a datamodel does not renumber the other rules.
+
+		:param list datamodels: Name of the datamodels.
+		:return: dict with the grouping rule id of each datamodel
+		"""
+		internal = cls._get_internal_conf_parser()
+		ids = {datamodel: int(internal[datamodel][DATA_MODEL_GROUPING_RULE_ID]) for datamodel in datamodels
+			   if datamodel in internal and internal[datamodel].get(DATA_MODEL_GROUPING_RULE_ID)}
+		next_id = max([int(internal[datamodel].get(DATA_MODEL_GROUPING_RULE_ID) or 0) for datamodel in internal] +
+					  [0]) + 1
+		for datamodel in datamodels:
+			if datamodel not in ids:
+				ids[datamodel] = next_id
+				next_id += 1
+		return ids
+
+	@classmethod
+	def set_grouping_rule_ids(cls):
+		"""
+		Stores a grouping rule id for the integrated datamodels without one, i.e. integrated by previous
+		versions, following the order of the internal configuration as those versions numbered the rules.
+		It is done whenever the internal configuration is read, before any datamodel is integrated, so the
+		rules of those datamodels keep their ids. The ids are written with the next change of the internal
+		configuration
+		"""
+		for datamodel, rule_id in cls.get_grouping_rule_ids(cls.get_internal_sections()).items():
+			cls._get_internal_conf_parser()[datamodel][DATA_MODEL_GROUPING_RULE_ID] = str(rule_id)
+
 	@classmethod
 	def set_internal_datamodel(cls, datamodel, id, orion_url):
-		datamodel_dict = {el: cls._get_configparser()[datamodel][el] for el in cls._get_configparser()[datamodel]}
+		rule_id = cls.get_grouping_rule_ids([datamodel])[datamodel]
+		# integrated again without subscription, e.g. after a failed recreate: a renewal is kept
+		datamodel_dict = Helpers.keep_renewed_expires(
+			{el: cls._get_configparser()[datamodel][el] for el in cls._get_configparser()[datamodel]},
+			dict(cls._get_internal_conf_parser().get(datamodel, {})))
 		cls._get_internal_conf_parser()[datamodel] = datamodel_dict
+		cls._get_internal_conf_parser()[datamodel][DATA_MODEL_GROUPING_RULE_ID] = str(rule_id)
 		cls._get_internal_conf_parser()[datamodel][DATA_MODEL_SUBSCRIPTION_ID] = id
 		cls._get_internal_conf_parser()[datamodel][ORION_SUBSCRIPTION_URL] = orion_url
 		current_date = datetime.strftime(datetime.now(), "%Y-%m-%d %H:%M:%S")
@@ -178,15 +320,23 @@ class ConfigManager:
 	@classmethod
 	def update_internal_datamodel(cls, datamodel, id, orion_url):
 		integration_date = cls.get_internal_value(datamodel, INTEGRATION_DATE)
+		rule_id = cls.get_grouping_rule_ids([datamodel])[datamodel]
+		record = cls.get_internal_datamodel(datamodel)
 		cls.remove_internal_datamodel(datamodel)
-		datamodel_dict = {el: cls._get_configparser()[datamodel][el] for el in cls._get_configparser()[datamodel]}
+		datamodel_dict = Helpers.keep_renewed_expires(
+			{el: cls._get_configparser()[datamodel][el] for el in cls._get_configparser()[datamodel]}, record)
 		cls._get_internal_conf_parser()[datamodel] = datamodel_dict
+		cls._get_internal_conf_parser()[datamodel][DATA_MODEL_GROUPING_RULE_ID] = str(rule_id)
 		cls._get_internal_conf_parser()[datamodel][DATA_MODEL_SUBSCRIPTION_ID] = id
 		cls._get_internal_conf_parser()[datamodel][ORION_SUBSCRIPTION_URL] = orion_url
 		cls._get_internal_conf_parser()[datamodel][INTEGRATION_DATE] = integration_date
 		current_date = datetime.strftime(datetime.now(), "%Y-%m-%d %H:%M:%S")
 		cls._get_internal_conf_parser()[datamodel][MODIFICATION_DATE] = current_date
 
+	@classmethod
+	def clear_internal_datamodels(cls):
+		cls._get_internal_conf_parser().clear()
+
 	@classmethod
 	def remove_internal_datamodel(cls, datamodel):
 		cls._get_internal_conf_parser().pop(datamodel)
@@ -198,24 +348,105 @@ class ConfigManager:
 		except:
 			return None
 
+	@classmethod
+	def get_subscription_ids(cls, datamodel):
+		"""
+		:param datamodel: Name of the datamodel.
+		:return: a list with the subscription id of every shard of the datamodel, empty if it is not integrated
+		"""
+		return (cls.get_subscription_id(datamodel) or '').split()
+
 	@classmethod
 	def get_internal_value(cls, datamodel, key):
 		return cls._get_internal_conf_parser()[datamodel][key]
 
+	@classmethod
+	def get_optional_internal_value(cls, datamodel, key, default=''):
+		"""
+		Reads an optional value of an integrated datamodel.
+		Returns the default value if the key is not present in the section.
+
+		:param datamodel: Name of the integrated datamodel.
+		:param key: Name of the key whose value has to be returned.
+		:param default: Value returned when the key is not present.
+		:return: The value of the corresponding datamodel-key.
+		"""
+		try:
+			value = cls._get_internal_conf_parser()[datamodel][key]
+		except KeyError:
+			return default
+		return ','.join(value) if isinstance(value, list) else value
+
+	@classmethod
+	def get_internal_datamodel(cls, datamodel):
+		"""
+		:param datamodel: Name of the integrated datamodel.
+		:return: dict with a copy of the values of the integrated datamodel
+		"""
+		return dict(cls._get_internal_conf_parser()[datamodel])
+
+	@classmethod
+	def set_internal_value(cls, datamodel, key, value):
+		cls._get_internal_conf_parser()[datamodel][key] = value
+
+	@classmethod
+	@Tracer.traced('config.load_internal')
+	def reload_internal_conf(cls):
+		"""
+		Reads again the internal config file, discarding the changes not written
+		"""
+		cls._get_internal_conf_parser().reload()
+		cls.set_grouping_rule_ids()
+
 	@classmethod
 	def get_integrated_datamodels(cls):
 		"""
 		Makes a dictionary from some section where the keys are the section 
-		keys and values ​​are the values ​​from those keys
+		keys and values ​​are the values ​​from those keys. The dictionaries are copies,
+		so they can be modified without changing the internal configuration
 
 		:Param section: 
 		:return: dict
 		"""
-		return [cls._get_internal_conf_parser()[datamodel] for datamodel in cls._get_internal_conf_parser()]
+		return [dict(cls._get_internal_conf_parser()[datamodel]) for datamodel in cls._get_internal_conf_parser()]
 
 	@classmethod
+	@Tracer.traced('config.write_internal')
 	def update_internal_conf_file(cls):
 		"""
-		Writes all the changes made using the set_ methods in the config file
+		Writes all the changes made using the set_ methods in the config file.
+		The file is written aside and then moved over the previous one, so it is never left half written
+		"""
+		cls.write_config_file(cls._get_internal_conf_parser())
+
+	@staticmethod
+	def format_sections(sections, comments=None):
+		"""
+		Writes some sections in the format of the config file, e.g. to be appended to it
+
+		:param dict sections: values of every section by name, in the order they are written
+		:param dict comments: comment lines written before some sections, by name
+		:return: the sections
+		:rtype: str
+		"""
+		config = ConfigObj(write_empty_values=True)
+		for section, values in sections.items():
+			config[section] = values
+			config.comments[section] = [''] + ['# %s' % line for line in (comments or {}).get(section, [])]
+		return '\n'.join(config.write()) + '\n'
+
+	@staticmethod
+	def write_config_file(config):
 		"""
-		cls._get_internal_conf_parser().write()
+		Writes a ConfigObj config in its file, which is never left half written (see Helpers.write_file)
+
+		:param config: the ConfigObj config
+		"""
+		file_path = config.filename
+		# without a file, ConfigObj returns the lines instead of writing them
+		config.filename = None
+		try:
+			lines = config.write()
+		finally:
+			config.filename = file_path
+		Helpers.write_file(file_path, '\n'.join(lines) + '\n')
@@ -1,37 +1,37 @@
 # core/main.py
 STARTING_BDTI = "Starting CB-BDTI"
-READING_CONFIG = 'Reading config file from {path}'
+READING_CONFIG = 'Reading config file from %(path)s'
 GETTING_ORION_URL = 'Getting Orion Url'
-ORION_URL = 'Orion URL: {url}'
+ORION_URL = 'Orion URL: %(url)s'
 GETTING_CYGNUS_URL = 'Getting Cygnus Url'
-CYGNUS_URL = 'Cygnus URL: {url}'
+CYGNUS_URL = 'Cygnus URL: %(url)s'
 INSTANTIATING_HANDLER = 'Instantiating deployment handler'
 CREATING_NEW_SUBSCRIPTIONS = 'Creating new subscriptions'
-DATAMODEL_EXISTS = 'Data Model {datamodel} is already integrated'
+DATAMODEL_EXISTS = 'Data Model %(datamodel)s is already integrated'
 ASK_MODIFY = 'Do you want to modify it?'
-CREATING_SUBSCRIPTION = 'Creating new subscription for {datamodel} Data Model'
-SUBSCRIPTION_CREATED = 'Subscription for {datamodel} Data Model created successfully'
-SUBSCRIPTION_INFO = '{datamodel}: {subscription_id}'
-SUBSCRIPTION_ID_SAVED = 'Subscription ID for {datamodel} saved'
+CREATING_SUBSCRIPTION = 'Creating new subscription for %(datamodel)s Data Model'
+SUBSCRIPTION_CREATED = 'Subscription for %(datamodel)s Data Model created successfully'
+SUBSCRIPTION_INFO = '%(datamodel)s: %(subscription_id)s'
+SUBSCRIPTION_ID_SAVED = 'Subscription ID for %(datamodel)s saved'
 MODIFYING_SUBSCRIPTIONS = 'Modifying subscriptions'
-FORCING_DELETE = 'Forcing the deletion of {datamodel} Data Model'
-SUBSCRIPTION_REMOVED = 'Removed subscription for {datamodel}'
-NEW_SUBSCRIPTION = 'New subscription for {datamodel}: {id}'
-SUBSCRIPTION_MODIFIED = 'Subscription for {datamodel} Data Model modified successfully'
-DATAMODEL_NOT_INTEGRATED = 'Data Model {datamodel} is not integrated'
+FORCING_DELETE = 'Forcing the deletion of %(datamodel)s Data Model'
+SUBSCRIPTION_REMOVED = 'Removed subscription for %(datamodel)s'
+NEW_SUBSCRIPTION = 'New subscription for %(datamodel)s: %(id)s'
+SUBSCRIPTION_MODIFIED = 'Subscription for %(datamodel)s Data Model modified successfully'
+DATAMODEL_NOT_INTEGRATED = 'Data Model %(datamodel)s is not integrated'
 ASK_INTEGRATE = 'Do you want to integrate it?'
-DATAMODEL_SUBSCRIPTION = '{datamodel} Data Model subscription ID: {id}'
-SUBSCRIPTION_REMOVED_SUCCESSFULLY = 'Subscription removed successfully'
+DATAMODEL_SUBSCRIPTION = '%(datamodel)s Data Model subscription ID: %(id)s'
 CREATING_AGENT = 'Creating new Cygnus Agent file'
 AGENT_CREATED = 'New Cygnus Agent file created successfully'
 CREATING_GROUPING_RULES = 'Creating new Grouping Rules file'
 GROUPING_RULES_CREATED = 'New Grouping Rules file created successfully'
-CYGNUS_MODE = 'Cygnus will be deployed {deploy_mode}'
-CYGNUS_DEPLOYMENT = 'Cygnus will {deploy}be deployed'
+GROUPING_RULES_DIFF = 'Grouping rules added: %(added)s; changed: %(changed)s; removed: %(removed)s'
+CYGNUS_MODE = 'Cygnus will be deployed %(deploy_mode)s'
+CYGNUS_DEPLOYMENT = 'Cygnus will %(deploy)sbe deployed'
 ASK_RESET_OPTION = 'This action will remove Orion subscriptions and remove the configuration file.\n' \
                    'Do you want to continue?'
 CONFIGURATION_FILE_REMOVED = "Configuration file removed successfully"
-CONFIGURATION_FILE_CREATED = "Configuration file created successfully: {production}"
+CONFIGURATION_FILE_CREATED = "Configuration file created successfully: %(production)s"
 CONFIGURATION_FILE_EXISTS = "Configuration file already exists"
 CONFIGURATION_FILE_PERMISSION_DENIED = "Cannot create configuration file: Permission denied"
 STARTING_INTEGRATION = 'Starting integration process'
@@ -42,4 +42,99 @@ MODIFICATION_SUCCESS = 'Modify integration process finished'
 MODIFICATION_ERROR = 'Modify integration process finished with errors'
 STARTING_REMOVAL = 'Starting integration removal process'
 REMOVAL_SUCCESS = 'Integration removal process finished'
-REMOVAL_ERROR = 'Integration removal process finished with errors'
\ No newline at end of file
+REMOVAL_ERROR = 'Integration removal process finished with errors'
+STARTING_RENEWAL = 'Starting subscriptions renewal process'
+SUBSCRIPTION_NOT_EXPIRING = '%(datamodel)s Data Model subscription expires at %(expires)s, no renewal needed'
+RENEWING_SUBSCRIPTION = 'Renewing %(datamodel)s Data Model subscription until %(expires)s'
+SUBSCRIPTION_RENEWED = 'Subscription for %(datamodel)s Data Model renewed successfully'
+NO_SUBSCRIPTIONS_RENEWED = 'No subscription needed to be renewed'
+RENEWAL_SUCCESS = 'Subscriptions renewal process finished: %(renewed)s renewed'
+RENEWAL_ERROR = 'Subscriptions renewal process finished with errors: %(renewed)s renewed, %(failed)s failed'
+NEXT_RENEWAL = 'Next renewal in %(interval)s seconds'
+STARTING_GC = 'Starting orphan subscriptions collection process'
+LISTING_SUBSCRIPTIONS = 'Listing subscriptions of "%(service)s" fiware service at %(url)s'
+ORPHAN_SUBSCRIPTION = 'Orphan subscription %(id)s of "%(service)s" fiware service: %(description)s'
+NO_ORPHAN_SUBSCRIPTIONS = 'There are no orphan subscriptions'
+GC_DRY_RUN = '%(count)s orphan subscriptions would be removed'
+ORPHAN_SUBSCRIPTION_REMOVED = 'Orphan subscription %(id)s removed'
+GC_SUCCESS = 'Orphan subscriptions collection process finished: %(removed)s removed'
+GC_ERROR = 'Orphan subscriptions collection process finished with errors: %(removed)s removed, %(failed)s failed'
+GC_FAILED = 'Orphan subscriptions collection process finished with errors'
+STARTING_RECOVERY = 'Starting internal configuration recovery process'
+SUBSCRIPTION_RECOVERED = 'Subscription %(id)s recovered for %(datamodel)s Data Model'
+DUPLICATED_SUBSCRIPTIONS = 'Subscriptions %(ids)s also match %(datamodel)s Data Model. Use gc command to remove them'
+SUBSCRIPTION_NOT_RECOVERED = 'No subscription found for %(datamodel)s Data Model'
+RECOVERY_DRY_RUN = '%(recovered)s Data Models would be recovered'
+RECOVERY_SUCCESS = 'Internal configuration recovery process finished: %(recovered)s Data Models recovered'
+RECOVERY_ERROR = 'Internal configuration recovery process finished with errors'
+
+CYGNUS_EVENTS_REJECTED = 'Cygnus is rejecting %(rate).1f notifications per second: its channel is full'
+CYGNUS_SINK_FAILURES = 'Cygnus sink is failing to persist %(rate).1f events per second'
+CYGNUS_CHANNEL_FILLING_UP = 'Cygnus %(channel)s channel is %(fill).0f%% full and will be full in %(seconds).0f seconds: ' \
+							'the sink is falling behind the notifications'
+CYGNUS_CHANNEL_FULL = 'Cygnus %(channel)s channel is %(fill).0f%% full'
+CYGNUS_GROUPING_RULES_MISMATCH = 'Cygnus has %(loaded)s grouping rules loaded but %(deployed)s were deployed'
+STARTING_PROBE = 'Probing %(datamodel)s Data Model %(count)s times: entity %(entity)s, HDFS file %(file)s'
+PROBE_FILTERS = 'The probe entity may not match the %(keys)s of %(datamodel)s Data Model subscription and time out'
+PROBE_RESULT = 'Probe %(run)s: %(total).3f s (Orion to Cygnus %(orion_to_cygnus)s s, Cygnus to HDFS %(cygnus_to_hdfs)s s)'
+PROBE_TIMED_OUT = 'Probe %(run)s: the marker was not stored in HDFS within %(timeout)s seconds'
+PROBE_ENTITY_REMOVED = 'Probe entity %(entity)s removed'
+PROBE_SUCCESS = 'Probe process finished'
+PROBE_ERROR = 'Probe process finished with errors'
+STARTING_LOADGEN = 'Creating %(entities)s synthetic entities for each of %(datamodels)s Data Models'
+LOADGEN_STARTED = 'Sending updates for %(duration).0f seconds following the load profile %(profile)s'
+LOADGEN_PROGRESS = '%(elapsed).0f s: %(sent)s updates sent (%(rate).1f/s, target %(target).1f/s), %(skipped)s skipped so far'
+LOADGEN_ENTITIES_REMOVED = 'Synthetic entities removed'
+LOADGEN_SUCCESS = 'Load generation process finished'
+LOADGEN_ERROR = 'Load generation process finished with errors'
+STARTING_SIMULATION = 'Evaluating the notification stream against %(rules)s grouping rules'
+SIMULATION_SAMPLE_SECONDS = 'The seconds covered by the stream are unknown, projecting it as a whole day of traffic'
+GROUPING_RULES_OVERLAP = 'Grouping rule %(rule)s shadows grouping rule %(shadowed_rule)s for %(events)s events'
+UNMATCHED_EVENTS = '%(events)s events do not match any grouping rule and are stored in default destinations'
+SIMULATION_SUCCESS = 'Simulation process finished: %(events)s events evaluated'
+SIMULATION_ERROR = 'Simulation process finished with errors'
+SERVING = 'Serving the integration API on %(address)s'
+OPERATION_QUEUED = '%(operation)s operation queued, %(pending)s pending'
+OPERATION_FINISHED = '%(operation)s operation finished in %(seconds).3f s'
+SERVER_STOPPED = 'Integration API stopped'
+WATCHING = 'Watching %(path)s for changes (%(mode)s, %(debounce)s s debounce)'
+CONFIG_FILE_CHANGED = 'Configuration file changed %(changes)s times, applying the changes'
+CONFIG_FILE_NOT_APPLIED = 'The configuration file cannot be read, its changes are not applied: %(error)s'
+NO_CONFIG_CHANGES = 'No changes in the Data Models sections'
+CONFIG_CHANGES = 'Data Models created: %(created)s; updated: %(updated)s; deleted: %(deleted)s'
+CYGNUS_UNCHANGED = 'Cygnus agent and grouping rules are unchanged, Cygnus is not redeployed'
+WATCH_STOPPED = 'Configuration file watch stopped'
+STARTING_APPLY = 'Planning the changes that make the integration match the configuration file'
+APPLY_PLAN = 'Plan: %(create)s to create, %(patch)s to patch, %(recreate)s to recreate, %(delete)s to delete, ' \
+			 '%(update)s to update, %(unchanged)s unchanged, %(invalid)s invalid; %(orion_requests)s Orion requests, ' \
+			 'Cygnus will %(redeploy)sbe redeployed'
+PLAN_STEP_APPLIED = '%(datamodel)s Data Model: %(action)s applied'
+APPLY_SUCCESS = 'Apply process finished'
+APPLY_ERROR = 'Apply process finished with errors'
+ORION_CIRCUIT_OPEN = 'Orion at %(url)s failed %(failures)s consecutive times, its requests fail fast for %(seconds)s s'
+ORION_CIRCUIT_HALF_OPEN = 'Trying Orion at %(url)s again'
+ORION_CIRCUIT_CLOSED = 'Orion at %(url)s is responding again'
+DATAMODELS_PENDING = '%(count)s Data Models are pending because Orion is failing: %(datamodels)s'
+STARTING_RESUME = 'Resuming the Orion mutations of the interrupted runs'
+PENDING_MUTATION = '%(datamodel)s Data Model: %(operation)s pending since %(recorded)s, ' \
+				   '%(attempts)s failed attempts. Last error: %(last_error)s'
+PENDING_DEPLOYMENT = 'Cygnus deployment pending'
+NOTHING_TO_RESUME = 'Nothing to resume'
+OUTBOX_DISCARDED = '%(count)s pending mutations and the pending deployment discarded'
+RESUME_RETRY = '%(pending)s Data Models still pending, retrying in %(seconds)s s'
+MUTATION_RESUMED = '%(datamodel)s Data Model: %(operation)s done'
+RESUME_SUCCESS = 'Resume process finished: %(completed)s mutations done'
+RESUME_ERROR = 'Resume process finished with errors: %(pending)s Data Models still pending'
+ORION_FAILED = 'Orion at %(url)s failed: %(error)s. Data Models of this Orion: %(datamodels)s'
+ORION_STEPS_FAILED = 'Orion at %(url)s: %(failed)s of %(total)s steps failed: %(datamodels)s'
+STARTING_DISCOVERY = 'Discovering the entity types of %(services)s fiware services in Orion at %(url)s'
+TYPES_DISCOVERED = '%(types)s entity types discovered in "%(service)s" fiware service'
+TYPES_NOT_COVERED = 'Entity types not in the FIWARE Data Models, their types are not checked: %(types)s'
+SECTION_REJECTED = 'The %(datamodel)s section would be rejected, it is not suggested: %(error)s'
+DISCOVERY_SUCCESS = 'Discovery process finished: %(types)s entity types, %(entities)s entities, ' \
+					'%(suggested)s sections suggested'
+DISCOVERY_ERROR = 'Discovery process finished with errors'
+REMOVING_SUBSCRIPTIONS = 'Removing the subscriptions of %(count)s Data Models of "%(service)s" fiware service in ' \
+						 'Orion at %(url)s'
+DATAMODEL_REMOVAL_FAILED = '%(datamodel)s Data Model: %(outcome)s: %(error)s'
+REMOVAL_OUTCOMES = '%(deleted)s Data Models deleted, %(forced)s forced, %(failed)s failed, %(pending)s pending'
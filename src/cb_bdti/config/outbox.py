@@ -0,0 +1,122 @@
+from configobj import ConfigObj
+from datetime import datetime
+
+# BDTI
+from cb_bdti.config.constants import *
+from cb_bdti.config.manager import ConfigManager
+from cb_bdti.utils.tracing import Tracer
+
+
+class Outbox:
+	"""
+	Durable record of the Orion mutations of a run, kept next to the internal configuration. The mutation of every
+	datamodel of the run (create, recreate or delete its subscription) is recorded before the run starts and
+	removed once it is done and the internal configuration is written, so an interrupted run can be resumed
+	without redoing the datamodels already finished. It also records if Cygnus must be deployed
+	"""
+	__outbox = None
+
+	@classmethod
+	def _get_parser(cls):
+		"""
+		Singleton method that retrieves the outbox, read from its file the first time
+
+		:return: The ConfigObj outbox.
+		"""
+		if cls.__outbox is None:
+			with Tracer.span('outbox.load'):
+				cls.__outbox = ConfigObj(OUTBOX_CONF, write_empty_values=True)
+		return cls.__outbox
+
+	@classmethod
+	@Tracer.traced('outbox.write')
+	def save(cls):
+		"""
+		Writes the outbox in its file, which is never left half written
+		"""
+		ConfigManager.write_config_file(cls._get_parser())
+
+	@classmethod
+	def reload(cls):
+		"""
+		Reads again the outbox file, discarding the changes not written
+		"""
+		cls._get_parser().reload()
+
+	@classmethod
+	def record(cls, mutations, deploy=False):
+		"""
+		Records the mutations of a run before it starts, replacing the pending mutations of the same datamodels
+
+		:param dict mutations: dict with the operation (create, recreate or delete) and the values needed to
+			retry it of each datamodel
+		:param bool deploy: Cygnus must be deployed at the end of the run
+		"""
+		outbox = cls._get_parser()
+		recorded = datetime.strftime(datetime.now(), "%Y-%m-%d %H:%M:%S")
+		for datamodel, mutation in mutations.items():
+			outbox[datamodel] = dict(mutation, **{OUTBOX_ATTEMPTS: '0', OUTBOX_LAST_ERROR: '',
+												  OUTBOX_RECORDED: recorded})
+		if deploy:
+			outbox[OUTBOX_DEPLOY_PENDING] = 'True'
+		if mutations or deploy:
+			cls.save()
+
+	@classmethod
+	def get_pending(cls):
+		"""
+		:return: dict with a copy of each pending mutation by datamodel, in the order they were recorded
+		"""
+		outbox = cls._get_parser()
+		return {datamodel: dict(outbox[datamodel]) for datamodel in outbox.sections}
+
+	@classmethod
+	def complete(cls, *datamodels):
+		"""
+		Removes the mutations of some datamodels once they are done. The outbox is written once, and only if any
+		of them was pending
+
+		:param datamodels: Names of the datamodels.
+		"""
+		outbox = cls._get_parser()
+		pending = [datamodel for datamodel in datamodels if datamodel in outbox.sections]
+		for datamodel in pending:
+			outbox.pop(datamodel)
+		if pending:
+			cls.save()
+
+	@classmethod
+	def record_failure(cls, datamodel, error):
+		"""
+		Counts a failed attempt of the mutation of a datamodel, without writing the outbox
+
+		:param datamodel: Name of the datamodel.
+		:param error: The error of the attempt.
+		"""
+		mutation = cls._get_parser()[datamodel]
+		mutation[OUTBOX_ATTEMPTS] = str(int(mutation.get(OUTBOX_ATTEMPTS) or 0) + 1)
+		mutation[OUTBOX_LAST_ERROR] = str(error)
+
+	@classmethod
+	def is_deploy_pending(cls):
+		"""
+		:return: if Cygnus must be deployed because a run did not deploy it
+		"""
+		return cls._get_parser().get(OUTBOX_DEPLOY_PENDING) == 'True'
+
+	@classmethod
+	def complete_deploy(cls):
+		"""
+		Records that Cygnus was deployed. The outbox is only written if the deployment was pending
+		"""
+		if cls.is_deploy_pending():
+			cls._get_parser().pop(OUTBOX_DEPLOY_PENDING)
+			cls.save()
+
+	@classmethod
+	def clear(cls):
+		"""
+		Discards every pending mutation and deployment
+		"""
+		cls._get_parser().clear()
+		cls.save()
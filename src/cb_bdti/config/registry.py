@@ -0,0 +1,192 @@
+import json
+import logging
+import os
+import threading
+
+# BDTI
+from cb_bdti.config.constants import *
+from cb_bdti.errors.core.handler import NotValidCatalog
+from cb_bdti.utils.tracing import Tracer
+
+
+class TypeRegistry:
+	"""
+	Registry of the entity types of the FIWARE Data Models by domain, loaded the first time it is used from a JSON
+	catalog: the one bundled with the solution or the one of the datamodels.catalog key of the configuration file.
+	The catalog is indexed by domain and by type, and the indexes are kept in a JSON cache file that is reused while
+	the catalog does not change. A datamodel belongs to the domain its name contains, e.g. datamodel.MadridParking
+	to Parking, the first one in the order of the catalog if it contains several, as the types were checked before
+	the registry. The domains are looked for in that order with the substring test, which for catalogs of the size
+	of the official list is faster than looking them up by the prefixes of the name
+	"""
+	__catalog_path = DATAMODELS_CATALOG
+	__indexes = None
+	__lock = threading.Lock()
+
+	@classmethod
+	def configure(cls, catalog_path=None):
+		"""
+		Sets the catalog of the registry, which is loaded the next time the registry is used
+
+		:param str catalog_path: path of the JSON catalog. The bundled one if None or empty
+		"""
+		with cls.__lock:
+			catalog_path = os.path.abspath(os.path.expanduser(catalog_path or DATAMODELS_CATALOG))
+			if catalog_path != cls.__catalog_path:
+				cls.__catalog_path = catalog_path
+				cls.__indexes = None
+
+	@classmethod
+	def _get_indexes(cls):
+		"""
+		Singleton method that retrieves the indexes of the catalog, loaded the first time
+
+		:return: the indexes (see build_indexes)
+		:rtype: dict
+		"""
+		indexes = cls.__indexes
+		if indexes is None:
+			with cls.__lock:
+				if cls.__indexes is None:
+					cls.__indexes = cls.load(cls.__catalog_path)
+				indexes = cls.__indexes
+		return indexes
+
+	@staticmethod
+	def read_catalog(catalog_path):
+		"""
+		Reads a JSON catalog, either a dict with the types of every domain or the official list of Smart Data
+		Models, whose domains are the names of their repositories without the dataModel. prefix.
+		Raises a NotValidCatalog exception if it cannot be read.
+
+		:param str catalog_path: path of the JSON catalog
+		:return: the types of every domain
+		:rtype: dict
+		"""
+		try:
+			with open(catalog_path) as file:
+				catalog = json.load(file)
+		except (OSError, ValueError) as e:
+			raise NotValidCatalog(catalog_path, e)
+		if isinstance(catalog, dict) and SMART_DATA_MODELS_LIST in catalog:
+			try:
+				catalog = {repository["repoName"][len(SMART_DATA_MODELS_REPO_PREFIX):]
+						   if repository["repoName"].startswith(SMART_DATA_MODELS_REPO_PREFIX)
+						   else repository["repoName"]: repository["dataModels"]
+						   for repository in catalog[SMART_DATA_MODELS_LIST]}
+			except (KeyError, TypeError, AttributeError):
+				raise NotValidCatalog(catalog_path, 'every repository of %s must have repoName and dataModels'
+										% SMART_DATA_MODELS_LIST)
+		if not isinstance(catalog, dict) or not all(
+				isinstance(types, list) and all(isinstance(entity_type, str) for entity_type in types)
+				for types in catalog.values()):
+			raise NotValidCatalog(catalog_path, 'it must have the list of types of every domain')
+		return {domain.strip(): [entity_type.strip() for entity_type in types] for domain, types in catalog.items()}
+
+	@staticmethod
+	def build_indexes(catalog):
+		"""
+		Indexes the types of a catalog by domain and the domains by type
+
+		:param dict catalog: the types of every domain
+		:return: the types of every domain, in the order of the catalog, and the domains of every type
+		:rtype: dict
+		"""
+		domains = {}
+		for domain, types in catalog.items():
+			for entity_type in types:
+				domains.setdefault(entity_type, []).append(domain)
+		return {"types": {domain: frozenset(types) for domain, types in catalog.items()},
+				"domains": {entity_type: tuple(sorted(type_domains)) for entity_type, type_domains in domains.items()}}
+
+	@staticmethod
+	def dump_indexes(indexes):
+		"""
+		:param dict indexes: the indexes (see build_indexes)
+		:return: the indexes with lists instead of sets and tuples, to be written as JSON. The domains keep the order
+			of the catalog
+		:rtype: dict
+		"""
+		return {"types": {domain: sorted(types) for domain, types in indexes["types"].items()},
+				"domains": {entity_type: list(domains) for entity_type, domains in indexes["domains"].items()}}
+
+	@staticmethod
+	def parse_indexes(content):
+		"""
+		:param dict content: the indexes as written as JSON (see dump_indexes)
+		:return: the indexes (see build_indexes)
+		:rtype: dict
+		"""
+		return {"types": {domain: frozenset(types) for domain, types in content["types"].items()},
+				"domains": {entity_type: tuple(domains) for entity_type, domains in content["domains"].items()}}
+
+	@classmethod
+	@Tracer.traced('registry.load')
+	def load(cls, catalog_path):
+		"""
+		Loads the indexes of a catalog from the cache file, if they were cached from the same catalog, unchanged.
+		Otherwise, reads and indexes the catalog and caches its indexes, if the cache file can be written.
+		The cache is only an optimization, so the reasons it is not used are logged at debug level
+
+		:param str catalog_path: path of the JSON catalog
+		:return: the indexes (see build_indexes)
+		:rtype: dict
+		"""
+		try:
+			stat = os.stat(catalog_path)
+		except OSError as e:
+			raise NotValidCatalog(catalog_path, e)
+		key = [DATAMODELS_CACHE_VERSION, catalog_path, stat.st_mtime_ns, stat.st_size]
+		try:
+			with open(DATAMODELS_CACHE) as file:
+				cache = json.load(file)
+			if cache["key"] == key:
+				return cls.parse_indexes(cache["indexes"])
+			logging.debug('Data Models catalog cache %s is out of date', DATAMODELS_CACHE)
+		except FileNotFoundError:
+			pass
+		except Exception as e:
+			logging.debug('Data Models catalog cache %s not read: %s', DATAMODELS_CACHE, e)
+
+		indexes = cls.build_indexes(cls.read_catalog(catalog_path))
+		# helpers imports the validators, which use the registry
+		from cb_bdti.utils.helpers import Helpers
+		try:
+			os.makedirs(os.path.dirname(DATAMODELS_CACHE), exist_ok=True)
+			Helpers.write_file(DATAMODELS_CACHE, json.dumps({"key": key, "indexes": cls.dump_indexes(indexes)}))
+		except OSError as e:
+			logging.debug('Data Models catalog indexes not cached: %s', e)
+		return indexes
+
+	@classmethod
+	def get_domain(cls, datamodel):
+		"""
+		Finds the domain of a datamodel: the domain its name contains, e.g. Parking for datamodel.MadridParking,
+		and the first one in the order of the catalog if it contains several
+
+		:param str datamodel: name of the datamodel section
+		:return: the domain, None if its name does not contain any domain
+		:rtype: str
+		"""
+		for domain in cls._get_indexes()["types"]:
+			if domain and domain in datamodel:
+				return domain
+		return None
+
+	@classmethod
+	def get_types(cls, domain):
+		"""
+		:param str domain: the domain
+		:return: the types of the domain, empty if it is not in the catalog
+		:rtype: frozenset
+		"""
+		return cls._get_indexes()["types"].get(domain, frozenset())
+
+	@classmethod
+	def get_domains(cls, entity_type):
+		"""
+		:param str entity_type: the entity type
+		:return: the domains of the type, empty if it is not in the catalog
+		:rtype: tuple
+		"""
+		return cls._get_indexes()["domains"].get(entity_type, ())
@@ -1,8 +1,10 @@
 import subprocess
 import logging
 import time
+import json
 from cb_bdti.errors.core.handler import *
 from cb_bdti.config.constants import *
+from cb_bdti.utils.tracing import Tracer
 
 class DeploymentHandler:
 	def __init__(self, remote, ip, key_path, user):
@@ -17,16 +19,43 @@ class DeploymentHandler:
 		"""
 		self.remote = remote
 		self.cygnus_ip = ip
+		self.key_path = key_path
+		self.user = user
+		# a long running process keeps the SSH session open among operations
+		self.keep_alive = False
 		if remote:
-			logging.info('Creating SSH session to {ip}'.format(ip=ip))
-			import paramiko
-			self.ssh_session = paramiko.SSHClient()
-			self.ssh_session.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-			try:
-				self.ssh_session.connect(ip, username=user, key_filename=key_path, timeout=5)
-			except:
-				raise CygnysNotReachableSSH()
+			self.connect()
 
+	def connect(self):
+		"""
+		Creates the SSH session to Cygnus host
+
+		:return: None
+		"""
+		logging.info('Creating SSH session to %s', self.cygnus_ip)
+		import paramiko
+		self.ssh_session = paramiko.SSHClient()
+		self.ssh_session.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+		try:
+			with Tracer.span('deploy.ssh_connect'):
+				self.ssh_session.connect(self.cygnus_ip, username=self.user, key_filename=self.key_path, timeout=5)
+		except:
+			raise CygnysNotReachableSSH()
+
+	def check_session(self):
+		"""
+		Creates the SSH session again if Cygnus is deployed remotely and the session was closed or dropped
+
+		:return: None
+		"""
+		if not self.remote:
+			return
+		transport = self.ssh_session.get_transport()
+		if transport is None or not transport.is_active():
+			logging.debug('SSH session to %s is not active', self.cygnus_ip)
+			self.connect()
+
+	@Tracer.traced('deploy.sftp_copy_files')
 	def copy_files(self):
 		"""
 		Copies the files to Cygnus through SFTP if Cygnus is deployed remotely
@@ -39,6 +68,7 @@ class DeploymentHandler:
 		sftp.put(GROUPING_RULES, GROUPING_RULES)
 		sftp.close()
 
+	@Tracer.traced('deploy.stop_cygnus')
 	def stop_cygnus(self):
 		"""
 		Stops Cygnus container
@@ -47,11 +77,11 @@ class DeploymentHandler:
 		"""
 		logging.debug('Stopping Cygnus...')
 		cygnus_container = self.get_cygnus_container_id()
-		logging.debug("Stopping Cygnus container: " + cygnus_container)
+		logging.debug("Stopping Cygnus container: %s", cygnus_container)
 		if not cygnus_container:
 			return
 		command = 'sudo docker rm -f {container}'.format(container=cygnus_container)
-		logging.debug("Excecuting command: " + command)
+		logging.debug("Excecuting command: %s", command)
 		if self.remote:
 			stdin, stdout, stderr = self.ssh_session.exec_command(command)
 			stderr.read()
@@ -59,6 +89,7 @@ class DeploymentHandler:
 			command += ' >/dev/null 2>&1'
 			os.system(command)
 
+	@Tracer.traced('deploy.run_cygnus')
 	def run_cygnus(self):
 		"""
 		Starts Cygnus container
@@ -74,16 +105,18 @@ class DeploymentHandler:
 		# command = 'sudo docker run --network=host -d -v {agent}:/opt/apache-flume/conf/agent.conf:ro' \
 		# 		  ' -v {grouping_rules}:/opt/apache-flume/conf/grouping_rules.conf ' \
 		# 		  '--name cygnus fiware/cygnus-ngsi:1.18.0 '.format(agent=AGENT, grouping_rules=GROUPING_RULES)
-		logging.debug("Excecuting command: " + command)
+		logging.debug("Excecuting command: %s", command)
 		if self.remote:
 			stdin, stdout, stderr = self.ssh_session.exec_command(command)
 			stderr.read()
 		else:
 			command += ' >/dev/null 2>&1'
 			os.system(command)
-		time.sleep(10)
+		with Tracer.span('deploy.cygnus_startup_wait'):
+			time.sleep(CYGNUS_STARTUP_WAIT)
 
 
+	@Tracer.traced('deploy.check_hdfs_connection')
 	def check_hdfs_connection(self, hdfs_host, hdfs_port):
 		"""
 		Returns the state of the HDFS connection
@@ -106,6 +139,7 @@ class DeploymentHandler:
 		if not healthy:
 			raise HdfsNotReachable(hdfs_host, hdfs_port, self.remote, self.cygnus_ip)
 
+	@Tracer.traced('deploy.docker_images')
 	def get_docker_img_id(self):
 		"""
 		Retrieves the ID of Cygnus image
@@ -116,7 +150,7 @@ class DeploymentHandler:
 		logging.debug("Getting Cygnus image of Docker")
 		# command = 'sudo docker images {cygnus_image_name} '.format(cygnus_image_name=CYGNUS_IMAGE_NAME)
 		command = 'sudo docker images %s --format="{{.ID}}"' % CYGNUS_IMAGE_NAME
-		logging.debug("Excecuting command: " + command)
+		logging.debug("Excecuting command: %s", command)
 		if self.remote:
 			stdin, stdout, stderr = self.ssh_session.exec_command(command)
 			cygnus_id = stdout.read().decode("utf-8").strip()
@@ -130,6 +164,7 @@ class DeploymentHandler:
 
 		return cygnus_id.strip()
 
+	@Tracer.traced('deploy.docker_ps')
 	def get_cygnus_container_id(self):
 		"""
 		Retrieves the ID of Cygnus container
@@ -158,12 +193,65 @@ class DeploymentHandler:
 		return cygnus_container_id
 
 
-	def close_handler(self):
+	def http_request(self, url, headers=None):
+		"""
+		Makes a GET request from Cygnus host, through the SSH session if Cygnus is deployed remotely,
+		so services only reachable from there (e.g. HDFS through a tunnel) can be requested. Redirects are
+		followed, as WebHDFS redirects the reads of a file from the namenode to a datanode
+
+		:param str url: URL of the resource
+		:param dict headers: headers of the request
+		:return: a tuple (status code, body) of the response
+		:rtype: tuple
+		"""
+		headers = headers or {}
+		if self.remote:
+			command = "curl -s -L --max-redirs 5 --max-time 3 -w '\\n%{{http_code}}' {headers} '{url}'".format(
+				url=url, headers=' '.join("-H '{key}: {value}'".format(key=key, value=value)
+										  for key, value in headers.items()))
+			stdin, stdout, stderr = self.ssh_session.exec_command(command)
+			body, _, status_code = stdout.read().decode("utf-8").rpartition('\n')
+			if not status_code.isdigit() or not int(status_code):
+				raise ConnectionError(url)
+			return int(status_code), body
+		import requests
+		response = requests.get(url, headers=headers, timeout=3)
+		return response.status_code, response.text
+
+	@Tracer.traced('cygnus.api_get')
+	def http_get(self, url):
+		"""
+		Requests a resource of Cygnus management API
+
+		:param str url: URL of the API resource
+		:return: the JSON response
+		:rtype: dict
+		"""
+		logging.debug("Requesting Cygnus API: %s", url)
+		try:
+			status_code, body = self.http_request(url)
+			if status_code != 200:
+				raise ValueError(status_code)
+			return json.loads(body)
+		except Exception:
+			raise CygnusApiNotReachable(url)
+
+	@Tracer.traced('deploy.close_ssh')
+	def close_handler(self, force=False):
+		"""
+		Closes the SSH session if Cygnus is deployed remotely, unless it is kept alive
+
+		:param bool force: close it even if it is kept alive
+		:return: None
+		"""
+		if self.keep_alive and not force:
+			return
 		if self.remote:
 			self.ssh_session.close()
-			logging.info('Closing SSH session to {cygnus_ip}'.format(cygnus_ip=self.cygnus_ip))
+			logging.info('Closing SSH session to %s', self.cygnus_ip)
 
 
+	@Tracer.traced('deploy.deploy_cygnus')
 	def deploy_cygnus(self):
 		"""
 		Deploys Cygnus with the provided configuration
@@ -0,0 +1,198 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from cb_bdti.errors.core.handler import *
+from cb_bdti.config.constants import *
+from cb_bdti.config import messages as msg
+from cb_bdti.utils.tracing import Tracer
+
+
+class TokenBucket(object):
+	"""
+	Limits the rate of some operations. Every operation takes a token, and tokens are refilled at the rate
+	up to the burst. An operation without tokens reserves the next one and waits for it, so concurrent
+	operations are spaced out instead of waking up together
+	"""
+
+	def __init__(self, rate, burst=1.0):
+		"""
+		:param float rate: operations per second, unlimited if 0
+		:param float burst: tokens that can be taken at once after being idle. By default one, so operations
+			are evenly spaced and never exceed the rate within any second
+		"""
+		self.rate = rate
+		self.burst = burst
+		self.tokens = self.burst
+		self.updated = time.monotonic()
+		self.lock = threading.Lock()
+
+	def acquire(self):
+		"""
+		Takes a token, waiting for it if there is none
+
+		:return: seconds waited
+		:rtype: float
+		"""
+		if not self.rate:
+			return 0
+		with self.lock:
+			now = time.monotonic()
+			self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate) - 1
+			self.updated = now
+			wait = -self.tokens / self.rate if self.tokens < 0 else 0
+		if wait:
+			time.sleep(wait)
+		return wait
+
+
+class CircuitBreaker(object):
+	"""
+	Stops sending requests to a service that keeps failing. It opens after some consecutive failures and
+	refuses every request until the reset period passes. Then it is half-open: one request is tried, and
+	its success closes the breaker while its failure opens it again
+	"""
+
+	def __init__(self, url, failures, reset):
+		"""
+		:param str url: URL of the service, for the messages
+		:param int failures: consecutive failures after which the breaker opens. It never opens if 0
+		:param float reset: seconds that the breaker stays open
+		"""
+		self.url = url
+		self.failures = failures
+		self.reset = reset
+		self.consecutive_failures = 0
+		self.opened = None
+		self.trying = False
+		self.lock = threading.Lock()
+
+	@property
+	def state(self):
+		if self.opened is None:
+			return BREAKER_CLOSED
+		return BREAKER_OPEN if time.monotonic() - self.opened < self.reset else BREAKER_HALF_OPEN
+
+	def check(self, try_again=True):
+		"""
+		Raises an exception if a request cannot be sent, because the breaker is open or the request
+		that tries the service again is running
+
+		:param bool try_again: if the breaker is half-open, the request is the one that tries the service again
+		:return: None
+		"""
+		with self.lock:
+			state = self.state
+			if state == BREAKER_CLOSED:
+				return
+			if state == BREAKER_HALF_OPEN and not self.trying:
+				if try_again:
+					self.trying = True
+					logging.debug(msg.ORION_CIRCUIT_HALF_OPEN, {'url': self.url})
+				return
+			Tracer.count('orion.requests_refused')
+			raise OrionCircuitOpen(self.url, max(0, self.reset - (time.monotonic() - self.opened)))
+
+	def record_success(self):
+		with self.lock:
+			if self.opened is not None:
+				logging.info(msg.ORION_CIRCUIT_CLOSED, {'url': self.url})
+			self.consecutive_failures = 0
+			self.opened = None
+			self.trying = False
+
+	def record_failure(self):
+		with self.lock:
+			self.consecutive_failures += 1
+			if self.trying or (self.failures and self.opened is None and self.consecutive_failures >= self.failures):
+				logging.warning(msg.ORION_CIRCUIT_OPEN, {'url': self.url, 'failures': self.consecutive_failures,
+														 'seconds': self.reset})
+				Tracer.count('orion.circuit_opened')
+				self.opened = time.monotonic()
+				self.trying = False
+
+
+class OrionLimiter(object):
+	"""
+	Limits the requests to an Orion, so bulk operations are gentle on a shared broker and give up quickly when
+	it is down: requests wait for a token of its rate and a slot of its concurrency, time out, and fail fast while
+	its circuit breaker is open. There is one limiter by Orion, shared by every thread
+	"""
+	__limits = {}
+	__limiters = {}
+	__lock = threading.Lock()
+
+	def __init__(self, url, limits):
+		"""
+		:param str url: base URL of the Orion
+		:param dict limits: value of each limit by key (see ORION_LIMITS)
+		"""
+		self.url = url
+		self.limits = limits
+		self.timeout = float(limits[ORION_TIMEOUT])
+		self.bucket = TokenBucket(float(limits[ORION_RATE_LIMIT]))
+		self.slots = threading.BoundedSemaphore(int(limits[ORION_MAX_CONCURRENCY]))
+		self.breaker = CircuitBreaker(url, int(limits[ORION_BREAKER_FAILURES]), float(limits[ORION_BREAKER_RESET]))
+
+	@staticmethod
+	def get_base_url(url):
+		"""
+		:param str url: URL of any resource of an Orion
+		:return: the base URL of the Orion, scheme and location
+		:rtype: str
+		"""
+		parts = urlsplit(url)
+		return '{scheme}://{location}'.format(scheme=parts.scheme, location=parts.netloc)
+
+	@classmethod
+	def configure(cls, limits, orion_url=None):
+		"""
+		Sets the limits of the requests to an Orion. The limiter of the Orion, and its breaker state, is only
+		replaced when its limits change
+
+		:param dict limits: value of each limit by key (see ORION_LIMITS)
+		:param str orion_url: URL of any resource of the Orion. If None, the limits of every Orion without
+			limits of its own
+		:return: None
+		"""
+		base_url = cls.get_base_url(orion_url) if orion_url else None
+		limits = dict(ORION_LIMITS, **limits)
+		with cls.__lock:
+			if cls.__limits.get(base_url) == limits:
+				return
+			cls.__limits[base_url] = limits
+			for url in list(cls.__limiters):
+				if url == base_url or (base_url is None and url not in cls.__limits):
+					cls.__limiters.pop(url)
+
+	@classmethod
+	def get(cls, url):
+		"""
+		Singleton method that retrieves the limiter of an Orion
+
+		:param str url: URL of any resource of the Orion
+		:return: the limiter of the Orion
+		:rtype: OrionLimiter
+		"""
+		base_url = cls.get_base_url(url)
+		with cls.__lock:
+			if base_url not in cls.__limiters:
+				limits = cls.__limits.get(base_url) or cls.__limits.get(None, ORION_LIMITS)
+				cls.__limiters[base_url] = cls(base_url, limits)
+			return cls.__limiters[base_url]
+
+	@contextmanager
+	def slot(self):
+		"""
+		Waits until a request can be sent, or raises an exception if the circuit breaker is open, either before
+		or after waiting
+
+		:return: None
+		"""
+		self.breaker.check(try_again=False)
+		with self.slots:
+			if self.bucket.acquire():
+				Tracer.count('orion.requests_delayed')
+			self.breaker.check()
+			yield
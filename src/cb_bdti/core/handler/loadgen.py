@@ -0,0 +1,167 @@
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from cb_bdti.errors.core.handler import *
+from cb_bdti.config.constants import *
+from cb_bdti.config import messages as msg
+from cb_bdti.core.handler.manager import SubscriptionManager
+from cb_bdti.utils.helpers import Helpers
+from cb_bdti.utils.tracing import Tracer
+
+
+class LoadGenerator(object):
+	"""
+	Generates synthetic NGSI-LD load: creates entities of the types of some Data Models and updates their
+	attributes at a target rate that follows a load profile. Updates are sent by a pool of threads sharing
+	the pooled Orion sessions, in an open loop: they are scheduled by the profile, not by the responses
+	"""
+
+	def __init__(self, targets, workers=LOADGEN_WORKERS):
+		"""
+		:param list targets: a dict for every Data Model with the Orion URL where its subscription is made
+			(orion_url), its fiware_service, fiware_servicepath, types and updated attribute
+		:param int workers: maximum number of concurrent requests to Orion
+		"""
+		self.targets = targets
+		self.workers = workers
+		self.lock = threading.Lock()
+		self.entities = []
+		self.results = Counter()
+		self.latencies = []
+
+	@Tracer.traced('loadgen.create_entities')
+	def create_entities(self, count):
+		"""
+		Creates the synthetic entities of every Data Model in batches
+
+		:param int count: number of entities of every Data Model
+		:return: None
+		"""
+		for target in self.targets:
+			types = target["types"]
+			entities = [{"id": LOADGEN_ENTITY_ID.format(type=types[index % len(types)], index=index),
+						 "type": types[index % len(types)],
+						 target["attribute"]: {"type": "Property", "value": 0}} for index in range(count)]
+			for start in range(0, count, LOADGEN_BATCH_SIZE):
+				batch = entities[start:start + LOADGEN_BATCH_SIZE]
+				SubscriptionManager.upsert_entities(target["orion_url"], target["fiware_service"],
+													target["fiware_servicepath"], batch)
+			self.entities += [(target, entity["id"]) for entity in entities]
+
+	@Tracer.traced('loadgen.delete_entities')
+	def delete_entities(self):
+		"""
+		Removes the synthetic entities in batches
+
+		:return: None
+		"""
+		for target in self.targets:
+			entity_ids = [entity_id for entity_target, entity_id in self.entities if entity_target is target]
+			for start in range(0, len(entity_ids), LOADGEN_BATCH_SIZE):
+				batch = entity_ids[start:start + LOADGEN_BATCH_SIZE]
+				SubscriptionManager.delete_entities(target["orion_url"], target["fiware_service"],
+													target["fiware_servicepath"], batch)
+		self.entities = []
+
+	def update(self, entity, value):
+		"""
+		Updates the attribute of an entity, recording the outcome and latency of the request
+
+		:param tuple entity: a tuple (target, entity ID)
+		:param int value: new value of the attribute
+		:return: None
+		"""
+		target, entity_id = entity
+		start = time.perf_counter()
+		try:
+			SubscriptionManager.update_entity_attributes(target["orion_url"], target["fiware_service"],
+														 target["fiware_servicepath"], entity_id,
+														 {target["attribute"]: {"type": "Property", "value": value}})
+			outcome = "ok"
+		except EntityOperationError as e:
+			outcome = str(e.status_code)
+		except Exception as e:
+			outcome = type(e).__name__
+		latency = time.perf_counter() - start
+		with self.lock:
+			self.results[outcome] += 1
+			self.latencies.append(latency)
+
+	@staticmethod
+	def get_expected_updates(profile, elapsed):
+		"""
+		Integrates the load profile: number of updates that should have been sent when some time has elapsed
+
+		:param list profile: (seconds, rate) points of the load profile
+		:param float elapsed: seconds since the start of the load
+		:return: the number of updates
+		:rtype: float
+		"""
+		total = 0.0
+		for (start, start_rate), (end, end_rate) in zip(profile, profile[1:]):
+			if elapsed <= start:
+				break
+			until = min(elapsed, end)
+			rate = start_rate + (end_rate - start_rate) * (until - start) / (end - start)
+			total += (start_rate + rate) / 2 * (until - start)
+		return total
+
+	@Tracer.traced('loadgen.run')
+	def run(self, profile, report_interval=LOADGEN_REPORT_INTERVAL):
+		"""
+		Sends attribute updates following the load profile until its last point
+
+		:param list profile: (seconds, rate) points of the load profile
+		:param float report_interval: seconds between progress logs
+		:return: the achieved load
+		:rtype: dict
+		"""
+		duration = profile[-1][0]
+		max_pending = self.workers * LOADGEN_MAX_PENDING_FACTOR
+		pending = threading.Semaphore(max_pending)
+		sent = skipped = 0
+		next_report, reported_sent, reported_at = report_interval, 0, 0.0
+
+		def release(future):
+			pending.release()
+
+		start = time.perf_counter()
+		with ThreadPoolExecutor(max_workers=self.workers) as executor:
+			while True:
+				elapsed = time.perf_counter() - start
+				if elapsed >= duration:
+					break
+				due = int(self.get_expected_updates(profile, elapsed))
+				while sent + skipped < due:
+					if not pending.acquire(blocking=False):
+						skipped += due - sent - skipped
+						break
+					entity = self.entities[(sent + skipped) % len(self.entities)]
+					executor.submit(self.update, entity, sent + skipped).add_done_callback(release)
+					sent += 1
+				if elapsed >= next_report:
+					seconds = elapsed - reported_at
+					target = self.get_expected_updates(profile, elapsed) - \
+						self.get_expected_updates(profile, reported_at)
+					logging.info(msg.LOADGEN_PROGRESS, {'elapsed': elapsed, 'sent': sent - reported_sent,
+														'rate': (sent - reported_sent) / seconds,
+														'target': target / seconds, 'skipped': skipped})
+					next_report, reported_sent, reported_at = next_report + report_interval, sent, elapsed
+				time.sleep(LOADGEN_TICK)
+		elapsed = time.perf_counter() - start
+
+		with self.lock:
+			results = dict(self.results)
+			latencies = list(self.latencies)
+		return {"duration_seconds": elapsed,
+				"target_updates": int(self.get_expected_updates(profile, duration)),
+				"sent": sent,
+				"skipped": skipped,
+				"ok": results.get("ok", 0),
+				"errors": {key: value for key, value in results.items() if key != "ok"},
+				"target_rate": self.get_expected_updates(profile, duration) / duration,
+				"achieved_rate": sum(results.values()) / elapsed,
+				"latency_seconds": {"p%s" % percentile: Helpers.get_percentile(latencies, percentile)
+									for percentile in LATENCY_PERCENTILES}}
@@ -1,23 +1,160 @@
-import requests
 import json
 import logging
+import threading
 from cb_bdti.errors.core.handler import *
+from cb_bdti.config.constants import *
+from cb_bdti.core.handler.limiter import OrionLimiter
+from cb_bdti.utils.tracing import Tracer
+from cb_bdti.utils.helpers import Helpers
+from cb_bdti.utils.validators import Validators
 
 class SubscriptionManager:
 	"""
 	This class manages the subscriptions to the Orion CB. It implements the method
-	to make a new subscription (do_subscription) and to remove a subscription (rm_dubscription)
+	to make a new subscription (do_subscription) and to remove a subscription (rm_dubscription), and those to make,
+	update and remove the subscriptions of every shard of a datamodel (do_subscriptions, update_subscriptions and
+	rm_subscriptions), whose IDs are kept together separated by blanks
 	"""
+	__sessions = {}
+	__lock = threading.Lock()
+
+	@classmethod
+	def get_session(cls, url):
+		"""
+		Singleton method that retrieves the HTTP session used for every request to an Orion, so connections are
+		pooled and reused among requests and threads. Each Orion has its own session, whose pool keeps as many
+		connections as its concurrent requests
+
+		:param str url: URL of any resource of the Orion
+		:return: the HTTP session
+		:rtype: requests.Session
+		"""
+		base_url = OrionLimiter.get_base_url(url)
+		with cls.__lock:
+			if base_url not in cls.__sessions:
+				import requests
+				pool_size = int(OrionLimiter.get(url).limits[ORION_MAX_CONCURRENCY])
+				session = requests.Session()
+				adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+				session.mount('http://', adapter)
+				session.mount('https://', adapter)
+				cls.__sessions[base_url] = session
+			return cls.__sessions[base_url]
+
+	@classmethod
+	def send(cls, method, url, **kwargs):
+		"""
+		Sends a request to Orion through the limiter of that Orion (see OrionLimiter): it waits for the rate
+		and concurrency limits, times out and fails fast while the circuit breaker is open. Network errors,
+		timeouts and server error responses are failures of the circuit breaker
+
+		:param str method: HTTP method
+		:param str url: URL of the request
+		:param kwargs: arguments of the request, as in requests.Session.request
+		:return: the response
+		:rtype: requests.Response
+		"""
+		limiter = OrionLimiter.get(url)
+		with limiter.slot():
+			try:
+				response = cls.get_session(url).request(method, url, timeout=limiter.timeout, **kwargs)
+			except Exception:
+				limiter.breaker.record_failure()
+				raise
+		if response.status_code >= 500 or response.status_code in ORION_FAILURE_STATUS_CODES:
+			limiter.breaker.record_failure()
+		else:
+			limiter.breaker.record_success()
+		return response
+
 	@staticmethod
-	def do_subscription(orion_url, cygnus_url, type_pattern, fiware_service,
-						fiware_servicepath, throttling, expires, description):
+	def get_subscription_params(data_model, values):
 		"""
-		Makes a Orion subscription under rules passed by arguments and
-		raises an exception if it is not successful
+		Reads and validates the subscription parameters of a datamodel from the values of its section,
+		either in the configuration file or in the internal configuration
+
+		:param str data_model: the datamodel
+		:param dict values: values of the datamodel section
+		:return: the parameters of SubscriptionManager.do_subscription but the Orion and Cygnus URLs
+		:rtype: dict
+		"""
+		def get_value(key):
+			if key not in values:
+				raise SectionKeyError(data_model, key)
+			return values[key]
+
+		def get_optional_value(key):
+			value = values.get(key, '')
+			# configobj splits unquoted values containing commas into lists
+			return ','.join(value) if isinstance(value, list) else value
+
+		types = get_value(DATA_MODEL_TYPES)
+		Validators.validate_types(types, data_model)
+		throttling = get_value(DATA_MODEL_THROTTLING)
+		Validators.validate_throttling(throttling, data_model)
+		expires = get_value(DATA_MODEL_EXPIRES)
+		Validators.validate_expires(expires, data_model)
+		watched_attributes = get_optional_value(DATA_MODEL_WATCHED_ATTRIBUTES)
+		Validators.validate_attributes(watched_attributes, DATA_MODEL_WATCHED_ATTRIBUTES, data_model)
+		notify_attributes = get_optional_value(DATA_MODEL_NOTIFY_ATTRIBUTES)
+		Validators.validate_attributes(notify_attributes, DATA_MODEL_NOTIFY_ATTRIBUTES, data_model)
+		q = get_optional_value(DATA_MODEL_Q)
+		Validators.validate_q(q, data_model)
+		geo_q = get_optional_value(DATA_MODEL_GEO_Q)
+		Validators.validate_geo_q(geo_q, data_model)
+		id_pattern = get_optional_value(DATA_MODEL_ID_PATTERN)
+		Validators.validate_id_pattern(id_pattern, data_model)
+		# file_path file_name only for comprobations pourposes
+		get_value(DATA_MODEL_FILE_NAME)
+		get_value(DATA_MODEL_FILE_PATH)
+		return {"type_pattern": Helpers.get_type_pattern(types),
+				"fiware_service": get_value(DATA_MODEL_FIWARE_SERVICE),
+				"fiware_servicepath": get_value(DATA_MODEL_FIWARE_SERVICEPATH),
+				"throttling": throttling, "expires": expires, "description": Helpers.get_description(data_model),
+				"watched_attributes": Helpers.get_attributes(watched_attributes),
+				"notify_attributes": Helpers.get_attributes(notify_attributes), "q": q,
+				"geo_q": Helpers.get_geo_q(geo_q) if geo_q else None, "id_pattern": id_pattern}
+
+	@staticmethod
+	def get_shards(data_model, values, cygnus_url):
+		"""
+		Reads and validates the shards of a datamodel from the values of its section, either in the configuration
+		file or in the internal configuration. A datamodel without shards key has a single shard
+
+		:param str data_model: the datamodel
+		:param dict values: values of the datamodel section
+		:param str cygnus_url: URL where Orion notifies Cygnus, for the shards without endpoint
+		:return: a tuple (entity id regex, notification URL) for every shard. The regex of a single shard is None,
+			as it keeps the id_pattern of the datamodel
+		:rtype: list
+		"""
+		def get_optional_value(key):
+			value = values.get(key, '')
+			return ','.join(value) if isinstance(value, list) else value
+
+		shards = get_optional_value(DATA_MODEL_SHARDS) or '1'
+		endpoints = get_optional_value(DATA_MODEL_SHARD_ENDPOINTS).split()
+		Validators.validate_shards(shards, endpoints, get_optional_value(DATA_MODEL_ID_PATTERN), data_model)
+		endpoints = endpoints or [cygnus_url] * int(shards)
+		if int(shards) == 1:
+			return [(None, endpoints[0])]
+		return list(zip(Helpers.get_shard_id_patterns(int(shards)), endpoints))
+
+	@staticmethod
+	def build_subscription(cygnus_url, type_pattern, fiware_service, fiware_servicepath, throttling, expires,
+						   description, watched_attributes=None, notify_attributes=None, q=None, geo_q=None,
+						   id_pattern=None):
+		"""
+		Builds the headers and the payload of an Orion subscription under rules passed by arguments
 
 		:param args: parameters required to make a subscription
-		:return: the outcome of the subscription
-		:rtype: str
+		:param list watched_attributes: attributes whose changes trigger a notification. All if None
+		:param list notify_attributes: attributes included in the notifications. All if None
+		:param str q: NGSI-LD query that entities must match
+		:param dict geo_q: NGSI-LD geo-query that entities must match
+		:param str id_pattern: regex that entity ids must match
+		:return: a tuple (headers, payload)
+		:rtype: tuple
 		"""
 		headers = {
 			'Content-Type': 'application/json',
@@ -30,7 +167,7 @@ class SubscriptionManager:
 			"description": description,
 			"subject": {
 				"entities": [
-					{"idPattern": ".*",
+					{"idPattern": id_pattern or DEFAULT_ID_PATTERN,
 					 "typePattern": type_pattern
 					 }]},
 			"notification": {
@@ -38,46 +175,409 @@ class SubscriptionManager:
 				"attrsFormat": "legacy"
 			}
 		}
+		if (watched_attributes):
+			payload["watchedAttributes"] = watched_attributes
+
+		if (notify_attributes):
+			payload["notification"]["attributes"] = notify_attributes
+
+		if (q):
+			payload["q"] = q
+
+		if (geo_q):
+			payload["geoQ"] = geo_q
+
 		if (throttling):
 			payload["throttling"] = throttling
 
 		if (expires):
 			payload["expires"] = expires
 
-		logging.debug('Doing POST request to Orion: {url}'.format(url=orion_url))
-		response = requests.post(orion_url, headers=headers, data=json.dumps(payload))
+		return headers, payload
+
+	@classmethod
+	@Tracer.traced('orion.create_subscription')
+	def do_subscription(cls, orion_url, cygnus_url, type_pattern, fiware_service,
+						fiware_servicepath, throttling, expires, description, watched_attributes=None,
+						notify_attributes=None, q=None, geo_q=None, id_pattern=None):
+		"""
+		Makes a Orion subscription under rules passed by arguments and
+		raises an exception if it is not successful
+
+		:param args: parameters required to make a subscription
+		:param list watched_attributes: attributes whose changes trigger a notification. All if None
+		:param list notify_attributes: attributes included in the notifications. All if None
+		:param str q: NGSI-LD query that entities must match
+		:param dict geo_q: NGSI-LD geo-query that entities must match
+		:param str id_pattern: regex that entity ids must match
+		:return: the outcome of the subscription
+		:rtype: str
+		"""
+		headers, payload = cls.build_subscription(cygnus_url, type_pattern, fiware_service, fiware_servicepath,
+												  throttling, expires, description, watched_attributes,
+												  notify_attributes, q, geo_q, id_pattern)
+
+		logging.debug('Doing POST request to Orion: %s', orion_url)
+		response = cls.send('POST', orion_url, headers=headers, data=json.dumps(payload))
 		if response.status_code == 201:
 			logging.debug('Correct Orion response after POST request')
 			return response.headers["location"].split("/")[-1]
 		else:
 			raise CreateSubscriptionError(response.status_code)
 
-	@staticmethod
-	def rm_subscription(data_model, orion_url, subscription_id, fiware_service):
+	@classmethod
+	def do_subscriptions(cls, data_model, orion_url, shards, **params):
+		"""
+		Makes the Orion subscription of every shard of a datamodel. If one of them fails, the ones already made
+		are removed before raising the exception, so a datamodel is never left partly subscribed
+
+		:param str data_model: the datamodel
+		:param str orion_url: the Orion URL where the subscriptions are made
+		:param list shards: a tuple (entity id regex, notification URL) for every shard (see get_shards)
+		:param params: parameters of the subscriptions (see get_subscription_params)
+		:return: the IDs of the subscriptions, separated by blanks
+		:rtype: str
+		"""
+		subscription_ids = []
+		try:
+			for id_pattern, cygnus_url in shards:
+				subscription_ids.append(cls.do_subscription(orion_url, cygnus_url, **dict(
+					params, id_pattern=id_pattern or params["id_pattern"])))
+		except Exception:
+			for subscription_id in subscription_ids:
+				try:
+					cls.rm_subscription(data_model, orion_url, subscription_id, params["fiware_service"], True)
+				except Exception as e:
+					logging.warning(e)
+			raise
+		return ' '.join(subscription_ids)
+
+	@classmethod
+	def rm_subscriptions(cls, data_model, orion_url, subscription_ids, fiware_service, missing_ok=False):
+		"""
+		Removes the Orion subscriptions of every shard of a datamodel. Every removal is tried, and the first
+		error is raised afterwards
+
+		:param str data_model: the datamodel
+		:param str orion_url: the Orion URL where the subscriptions are made
+		:param str subscription_ids: the IDs of the subscriptions, separated by blanks
+		:param str fiware_service: fiware service of the subscriptions
+		:param bool missing_ok: a subscription that does not exist, e.g. already removed, is not an error
+		:return: None
+		"""
+		errors = []
+		for subscription_id in subscription_ids.split() or [subscription_ids]:
+			try:
+				cls.rm_subscription(data_model, orion_url, subscription_id, fiware_service, missing_ok)
+			except Exception as e:
+				errors.append(e)
+		if errors:
+			raise errors[0]
+
+	@classmethod
+	def update_subscriptions(cls, data_model, orion_url, subscription_ids, fiware_service, fields):
+		"""
+		Updates some fields of the Orion subscriptions of every shard of a datamodel
+
+		:param str data_model: the datamodel
+		:param str orion_url: the Orion URL where the subscriptions are made
+		:param str subscription_ids: the IDs of the subscriptions, separated by blanks
+		:param str fiware_service: fiware service of the subscriptions
+		:param dict fields: subscription fields to be updated with their new values
+		:return: None
+		"""
+		for subscription_id in subscription_ids.split():
+			cls.update_subscription(data_model, orion_url, subscription_id, fiware_service, fields)
+
+	@classmethod
+	@Tracer.traced('orion.delete_subscription')
+	def rm_subscription(cls, data_model, orion_url, subscription_id, fiware_service, missing_ok=False):
 		"""
 		Removes an existing Orion subscription and
 		raises an exception if the removal fails
 
+		:param str data_model: datamodel of the subscription, None if it has none, e.g. an orphan subscription
 		:param str orion_url: the Orion URL where the dubscription is made
 		:param str subscription_id: the subscription ID to be removed
 		:param str fiware_service: fiware service of the subscription
+		:param bool missing_ok: a subscription that does not exist, e.g. already removed, is not an error
 		:return: None
 		"""
 		delete_url = os.path.join(orion_url, subscription_id).replace("\\", "/")
 		headers = {'fiware-service': fiware_service, }
 
-		logging.debug('Doing delete request to Orion: {url}'.format(url=delete_url))
-		response = requests.delete(delete_url, headers=headers)
+		logging.debug('Doing delete request to Orion: %s', delete_url)
+		response = cls.send('DELETE', delete_url, headers=headers)
 		if response.status_code == 204:
 			logging.debug('204 Orion response OK')
+		elif response.status_code == 404 and missing_ok:
+			logging.debug('Subscription already removed')
 		elif response.status_code == 404:
 			logging.debug('Orion request returned wrong status code')
 			msg = 'Subscription ID not found: 404'
-			raise DeleteSubscriptionError(data_model, orion_url, msg)
+			raise DeleteSubscriptionError(data_model, orion_url, msg, subscription_id)
 		elif response.status_code == 405:
 			logging.debug('Orion request returned wrong status code')
 			msg = 'Empty subscription ID'
-			raise DeleteSubscriptionError(data_model, orion_url, msg)
+			raise DeleteSubscriptionError(data_model, orion_url, msg, subscription_id)
 		else:
 			logging.debug('Orion request returned wrong status code')
-			raise DeleteSubscriptionError(data_model, orion_url)
+			raise DeleteSubscriptionError(data_model, orion_url, subscription_id=subscription_id)
+
+	@classmethod
+	@Tracer.traced('orion.update_subscription')
+	def update_subscription(cls, data_model, orion_url, subscription_id, fiware_service, fields):
+		"""
+		Updates some fields of an existing Orion subscription and
+		raises an exception if the update fails
+
+		:param str data_model: datamodel of the subscription
+		:param str orion_url: the Orion URL where the subscription is made
+		:param str subscription_id: the subscription ID to be updated
+		:param str fiware_service: fiware service of the subscription
+		:param dict fields: subscription fields to be updated with their new values
+		:return: None
+		"""
+		update_url = os.path.join(orion_url, subscription_id).replace("\\", "/")
+		headers = {'Content-Type': 'application/json', 'fiware-service': fiware_service}
+
+		logging.debug('Doing PATCH request to Orion: %s', update_url)
+		response = cls.send('PATCH', update_url, headers=headers, data=json.dumps(fields))
+		if response.status_code == 204:
+			logging.debug('204 Orion response OK')
+		else:
+			logging.debug('Orion request returned wrong status code')
+			raise UpdateSubscriptionError(data_model, update_url, response.status_code)
+
+	@classmethod
+	@Tracer.traced('orion.get_subscription')
+	def get_subscription(cls, data_model, orion_url, subscription_id, fiware_service):
+		"""
+		Retrieves an existing Orion subscription and
+		raises an exception if it cannot be retrieved
+
+		:param str data_model: datamodel of the subscription
+		:param str orion_url: the Orion URL where the subscription is made
+		:param str subscription_id: the subscription ID to be retrieved
+		:param str fiware_service: fiware service of the subscription
+		:return: the subscription
+		:rtype: dict
+		"""
+		get_url = os.path.join(orion_url, subscription_id).replace("\\", "/")
+		headers = {'fiware-service': fiware_service, }
+
+		logging.debug('Doing GET request to Orion: %s', get_url)
+		response = cls.send('GET', get_url, headers=headers)
+		if response.status_code != 200:
+			logging.debug('Orion request returned wrong status code')
+			raise GetSubscriptionError(data_model, get_url, response.status_code)
+		return response.json()
+
+	@classmethod
+	@Tracer.traced('orion.list_subscriptions')
+	def list_subscriptions(cls, orion_url, fiware_service):
+		"""
+		Retrieves every subscription of a fiware service, page by page, and
+		raises an exception if the listing fails
+
+		:param str orion_url: the Orion URL where the subscriptions are made
+		:param str fiware_service: fiware service of the subscriptions
+		:return: the subscriptions
+		:rtype: list
+		"""
+		headers = {'fiware-service': fiware_service, }
+		subscriptions = []
+		while True:
+			params = {'limit': ORION_PAGE_LIMIT, 'offset': len(subscriptions)}
+			logging.debug('Doing GET request to Orion: %s', orion_url)
+			response = cls.send('GET', orion_url, headers=headers, params=params)
+			if response.status_code != 200:
+				logging.debug('Orion request returned wrong status code')
+				raise ListSubscriptionsError(orion_url, fiware_service, response.status_code)
+			page = response.json()
+			subscriptions += page
+			if len(page) < ORION_PAGE_LIMIT:
+				return subscriptions
+
+	@classmethod
+	@Tracer.traced('orion.list_types')
+	def list_types(cls, orion_url, fiware_service):
+		"""
+		Retrieves the entity types of a fiware service and
+		raises an exception if the listing fails
+
+		:param str orion_url: the Orion URL where the subscriptions are made
+		:param str fiware_service: fiware service of the entities
+		:return: the entity types
+		:rtype: list
+		"""
+		types_url = Helpers.get_orion_api_url(orion_url, ORION_TYPES_PATH)
+		headers = {'fiware-service': fiware_service, }
+
+		logging.debug('Doing GET request to Orion: %s', types_url)
+		response = cls.send('GET', types_url, headers=headers)
+		if response.status_code != 200:
+			logging.debug('Orion request returned wrong status code')
+			raise EntityOperationError('list the types of', types_url, response.status_code)
+		return response.json().get("typeList", [])
+
+	@classmethod
+	@Tracer.traced('orion.count_entities')
+	def count_entities(cls, orion_url, fiware_service, entity_type):
+		"""
+		Counts the entities of a type, without retrieving them, and
+		raises an exception if the count fails
+
+		:param str orion_url: the Orion URL where the subscriptions are made
+		:param str fiware_service: fiware service of the entities
+		:param str entity_type: type of the entities
+		:return: the number of entities
+		:rtype: int
+		"""
+		entities_url = Helpers.get_orion_api_url(orion_url, ORION_ENTITIES_PATH)
+		headers = {'fiware-service': fiware_service, }
+		params = {'type': entity_type, 'count': 'true', 'limit': 0}
+
+		logging.debug('Doing GET request to Orion: %s', entities_url)
+		response = cls.send('GET', entities_url, headers=headers, params=params)
+		if response.status_code != 200:
+			logging.debug('Orion request returned wrong status code')
+			raise EntityOperationError('count', entities_url, response.status_code)
+		return int(response.headers.get('NGSILD-Results-Count', 0))
+
+	@classmethod
+	@Tracer.traced('orion.upsert_entities')
+	def upsert_entities(cls, orion_url, fiware_service, fiware_servicepath, entities):
+		"""
+		Creates or updates some entities in Orion and
+		raises an exception if the operation fails
+
+		:param str orion_url: the Orion URL where the subscriptions are made
+		:param str fiware_service: fiware service of the entities
+		:param str fiware_servicepath: fiware service path of the entities
+		:param list entities: the entities
+		:return: None
+		"""
+		upsert_url = Helpers.get_orion_api_url(orion_url, ORION_UPSERT_PATH)
+		headers = {'Content-Type': 'application/json', 'fiware-service': fiware_service,
+				   'fiware-servicepath': fiware_servicepath}
+
+		logging.debug('Doing POST request to Orion: %s', upsert_url)
+		response = cls.send('POST', upsert_url, headers=headers, data=json.dumps(entities))
+		if response.status_code not in (201, 204):
+			logging.debug('Orion request returned wrong status code')
+			raise EntityOperationError('upsert', upsert_url, response.status_code)
+
+	@classmethod
+	@Tracer.traced('orion.delete_entity')
+	def delete_entity(cls, orion_url, fiware_service, fiware_servicepath, entity_id):
+		"""
+		Removes an entity from Orion, if it exists, and
+		raises an exception if the removal fails
+
+		:param str orion_url: the Orion URL where the subscriptions are made
+		:param str fiware_service: fiware service of the entity
+		:param str fiware_servicepath: fiware service path of the entity
+		:param str entity_id: the entity ID to be removed
+		:return: None
+		"""
+		delete_url = Helpers.get_orion_api_url(orion_url, '{path}/{id}'.format(path=ORION_ENTITIES_PATH, id=entity_id))
+		headers = {'fiware-service': fiware_service, 'fiware-servicepath': fiware_servicepath}
+
+		logging.debug('Doing delete request to Orion: %s', delete_url)
+		response = cls.send('DELETE', delete_url, headers=headers)
+		if response.status_code not in (204, 404):
+			logging.debug('Orion request returned wrong status code')
+			raise EntityOperationError('delete', delete_url, response.status_code)
+
+	@classmethod
+	@Tracer.traced('orion.delete_entities')
+	def delete_entities(cls, orion_url, fiware_service, fiware_servicepath, entity_ids):
+		"""
+		Removes some entities from Orion in a batch and
+		raises an exception if the removal fails
+
+		:param str orion_url: the Orion URL where the subscriptions are made
+		:param str fiware_service: fiware service of the entities
+		:param str fiware_servicepath: fiware service path of the entities
+		:param list entity_ids: the entity IDs to be removed
+		:return: None
+		"""
+		delete_url = Helpers.get_orion_api_url(orion_url, ORION_BATCH_DELETE_PATH)
+		headers = {'Content-Type': 'application/json', 'fiware-service': fiware_service,
+				   'fiware-servicepath': fiware_servicepath}
+
+		logging.debug('Doing POST request to Orion: %s', delete_url)
+		response = cls.send('POST', delete_url, headers=headers, data=json.dumps(entity_ids))
+		if response.status_code not in (204, 207):
+			logging.debug('Orion request returned wrong status code')
+			raise EntityOperationError('delete', delete_url, response.status_code)
+
+	@classmethod
+	def update_entity_attributes(cls, orion_url, fiware_service, fiware_servicepath, entity_id, attributes):
+		"""
+		Updates some attributes of an entity in Orion and
+		raises an exception if the update fails
+
+		:param str orion_url: the Orion URL where the subscriptions are made
+		:param str fiware_service: fiware service of the entity
+		:param str fiware_servicepath: fiware service path of the entity
+		:param str entity_id: the entity ID to be updated
+		:param dict attributes: the attributes with their new values
+		:return: None
+		"""
+		update_url = Helpers.get_orion_api_url(orion_url, ORION_ENTITY_ATTRS_PATH.format(id=entity_id))
+		headers = {'Content-Type': 'application/json', 'fiware-service': fiware_service,
+				   'fiware-servicepath': fiware_servicepath}
+
+		response = cls.send('PATCH', update_url, headers=headers, data=json.dumps(attributes))
+		if response.status_code != 204:
+			raise EntityOperationError('update', update_url, response.status_code)
+
+	@staticmethod
+	def get_notification_url(subscription):
+		"""
+		Retrieves the URL notified by a subscription, either NGSI-LD or legacy
+
+		:param dict subscription: the subscription as returned by Orion
+		:return: the notification URL
+		:rtype: str
+		"""
+		notification = subscription.get("notification", {})
+		return notification.get("endpoint", {}).get("uri") or notification.get("http", {}).get("url")
+
+	@staticmethod
+	def get_delivery_health(subscription, since, now, stalled_after):
+		"""
+		Classifies how a subscription is delivering its notifications. It is inactive if it is not active
+		(e.g. paused or expired), failing if its last notification failed and stalled if it has not notified
+		for longer than stalled_after (counting from since if it has never notified)
+
+		:param dict subscription: the subscription as returned by Orion
+		:param datetime since: when the subscription was made
+		:param datetime now: current datetime
+		:param timedelta stalled_after: time without notifications after which the subscription is stalled
+		:return: the health and the notification status of the subscription
+		:rtype: dict
+		"""
+		notification = subscription.get("notification", {})
+		delivery = {"status": subscription.get("status", "active"),
+					"times_sent": int(notification.get("timesSent", 0)),
+					"last_notification": notification.get("lastNotification", ''),
+					"last_success": notification.get("lastSuccess", ''),
+					"last_failure": notification.get("lastFailure", '')}
+		last_success = Helpers.parse_iso_datetime(delivery["last_success"]) if delivery["last_success"] else None
+		last_failure = Helpers.parse_iso_datetime(delivery["last_failure"]) if delivery["last_failure"] else None
+		last_notification = Helpers.parse_iso_datetime(delivery["last_notification"]) \
+			if delivery["last_notification"] else max(filter(None, [last_success, last_failure]), default=None)
+
+		if delivery["status"] != "active":
+			delivery["health"] = HEALTH_INACTIVE
+		elif notification.get("status") == "failed" or \
+				(last_failure and (not last_success or last_failure > last_success)):
+			delivery["health"] = HEALTH_FAILING
+		elif now - (last_notification or since) > stalled_after:
+			delivery["health"] = HEALTH_STALLED
+		else:
+			delivery["health"] = HEALTH_OK
+		return delivery
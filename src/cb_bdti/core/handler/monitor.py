@@ -0,0 +1,135 @@
+import os
+import re
+import time
+from datetime import datetime, timezone
+from cb_bdti.config.constants import *
+from cb_bdti.utils.helpers import Helpers
+from cb_bdti.utils.tracing import Tracer
+
+
+class CygnusMonitor(object):
+	"""
+	Samples the counters of the sources, channels and sinks of Cygnus through its management API and computes
+	the throughput and backpressure between consecutive samples
+	"""
+
+	def __init__(self, deployment_handler, host, agent_file=AGENT):
+		"""
+		:param DeploymentHandler deployment_handler: handler to reach Cygnus locally o remotely
+		:param str host: cygnus host given in conf.ini
+		:param str agent_file: path of the deployed Flume agent, from which the channels capacity is read
+		"""
+		self.deployment_handler = deployment_handler
+		self.stats_url = Helpers.get_cygnus_api_url(host, CYGNUS_API_STATS)
+		self.grouping_rules_url = Helpers.get_cygnus_api_url(host, CYGNUS_API_GROUPING_RULES)
+		self.capacities = self.get_channel_capacities(agent_file)
+		self.previous = None
+
+	@staticmethod
+	def get_channel_capacities(agent_file):
+		"""
+		Reads the capacity of every channel of a Flume agent file
+
+		:param str agent_file: path of the Flume agent file
+		:return: capacity of every channel by name
+		:rtype: dict
+		"""
+		capacities = {}
+		if not os.path.isfile(agent_file):
+			return capacities
+		pattern = re.compile(CYGNUS_CHANNEL_CAPACITY_PATTERN)
+		with open(agent_file) as file:
+			for line in file:
+				match = pattern.match(line.strip())
+				if match:
+					capacities[match.group(1)] = int(match.group(2))
+		return capacities
+
+	@Tracer.traced('cygnus.stats_sample')
+	def sample(self):
+		"""
+		Requests the counters and the grouping rules loaded by Cygnus
+
+		:return: the sample
+		:rtype: dict
+		"""
+		stats = self.deployment_handler.http_get(self.stats_url).get("stats", {})
+		grouping_rules = self.deployment_handler.http_get(self.grouping_rules_url).get("grouping_rules", [])
+		return {"time": time.monotonic(),
+				"sources": {el["name"]: el for el in stats.get("sources", [])},
+				"channels": {el["name"]: el for el in stats.get("channels", [])},
+				"sinks": {el["name"]: el for el in stats.get("sinks", [])},
+				"grouping_rules": len(grouping_rules)}
+
+	def poll(self):
+		"""
+		Takes a new sample and computes the rates since the previous one
+
+		:return: the stats between both samples, or None if it is the first sample
+		:rtype: dict
+		"""
+		current = self.sample()
+		previous, self.previous = self.previous, current
+		if previous is None:
+			return None
+		return self.get_stats(previous, current, self.capacities)
+
+	@staticmethod
+	def get_stats(previous, current, capacities):
+		"""
+		Computes the throughput and backpressure between two samples. Events in are the notifications received
+		by the sources, events out the events persisted by the sinks, rejected the events the sources could not
+		put into a full channel, and sink failures the events the sinks took but could not persist.
+		The growth of the channels is positive while the sinks fall behind the sources.
+		Counters reset by a Cygnus restart are taken from zero
+
+		:param dict previous: previous sample
+		:param dict current: current sample
+		:param dict capacities: capacity of every channel
+		:return: the stats
+		:rtype: dict
+		"""
+		elapsed = max(current["time"] - previous["time"], 1e-6)
+
+		def rate(component, *keys):
+			total = 0
+			for name, counters in current[component].items():
+				value = sum(int(counters.get(key, 0)) for key in keys)
+				before = sum(int(previous[component].get(name, {}).get(key, 0)) for key in keys)
+				total += value - before if value >= before else value
+			return total / elapsed
+
+		channels = {}
+		for name, counters in current["channels"].items():
+			capacity = capacities.get(name, DEFAULT_CYGNUS_CHANNEL_CAPACITY)
+			events = int(counters.get("num_events", 0))
+			growth = events - int(previous["channels"].get(name, {}).get("num_events", 0))
+			channels[name] = {"events": events, "capacity": capacity, "fill_ratio": events / capacity,
+							  "growth_per_second": growth / elapsed}
+
+		processed = rate("sinks", "num_processed_events")
+		persisted = rate("sinks", "num_persisted_events")
+		return {"time": Helpers.format_iso_datetime(datetime.now(timezone.utc)),
+				"interval_seconds": round(elapsed, 3),
+				"events_in_per_second": rate("sources", "num_received_events"),
+				"events_out_per_second": persisted,
+				"rejected_per_second": rate("channels", "num_puts_failed"),
+				"sink_failures_per_second": max(processed - persisted, 0.0),
+				"fill_ratio": max([el["fill_ratio"] for el in channels.values()] or [0.0]),
+				"channels": channels,
+				"grouping_rules": current["grouping_rules"]}
+
+	@staticmethod
+	def format_stats(stats):
+		"""
+		Formats the stats in a single line
+
+		:param dict stats: stats between two samples
+		:return: the formatted stats
+		:rtype: str
+		"""
+		channels = '  '.join('%s %s/%s (%.0f%%)' % (name, el["events"], el["capacity"], el["fill_ratio"] * 100)
+							 for name, el in sorted(stats["channels"].items()))
+		return '%s  in %.1f ev/s  out %.1f ev/s  %s  rejected %.1f ev/s  sink failures %.1f ev/s  rules %s' % (
+			stats["time"], stats["events_in_per_second"], stats["events_out_per_second"], channels or 'no channels',
+			stats["rejected_per_second"], stats["sink_failures_per_second"], stats["grouping_rules"])
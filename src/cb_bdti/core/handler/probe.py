@@ -0,0 +1,134 @@
+import json
+import logging
+import time
+import uuid
+from cb_bdti.config.constants import *
+from cb_bdti.core.handler.manager import SubscriptionManager
+from cb_bdti.utils.helpers import Helpers
+from cb_bdti.utils.tracing import Tracer
+
+
+class LatencyProbe(object):
+	"""
+	Measures the end-to-end latency of a Data Model: upserts a synthetic entity carrying a unique marker
+	into Orion and polls the HDFS file of the Data Model until the marker is stored by Cygnus.
+	When Cygnus management API is reachable, the latency is split at the moment Cygnus receives the notification,
+	with the resolution of the poll interval
+	"""
+
+	def __init__(self, deployment_handler, orion_url, fiware_service, fiware_servicepath, entity_type,
+				 attribute, hdfs_host, hdfs_port, hdfs_username, hdfs_file_path, hdfs_token=None, monitor=None):
+		"""
+		:param DeploymentHandler deployment_handler: handler to reach HDFS and Cygnus from Cygnus host
+		:param str orion_url: the Orion URL where the subscription of the Data Model is made
+		:param str fiware_service: fiware service of the Data Model
+		:param str fiware_servicepath: fiware service path of the Data Model
+		:param str entity_type: type of the probe entity, one of the Data Model types
+		:param str attribute: attribute of the probe entity carrying the marker
+		:param str hdfs_host: HDFS host
+		:param str hdfs_port: WebHDFS port
+		:param str hdfs_username: HDFS username
+		:param str hdfs_file_path: path of the HDFS file of the Data Model
+		:param str hdfs_token: OAuth2 token for the HDFS authentication
+		:param CygnusMonitor monitor: monitor of Cygnus counters. The latency is not split if None
+		"""
+		self.deployment_handler = deployment_handler
+		self.orion_url = orion_url
+		self.fiware_service = fiware_service
+		self.fiware_servicepath = fiware_servicepath
+		self.entity_id = PROBE_ENTITY_ID.format(type=entity_type, id=uuid.uuid4().hex[:12])
+		self.entity_type = entity_type
+		self.attribute = attribute
+		self.hdfs = (hdfs_host, hdfs_port, hdfs_username, hdfs_file_path)
+		self.hdfs_headers = {'X-Auth-Token': hdfs_token} if hdfs_token else {}
+		self.monitor = monitor
+
+	def get_file_length(self):
+		"""
+		:return: length of the HDFS file, 0 if it does not exist yet
+		:rtype: int
+		"""
+		host, port, username, path = self.hdfs
+		status_code, body = self.deployment_handler.http_request(
+			Helpers.get_webhdfs_url(host, port, path, 'GETFILESTATUS', username), self.hdfs_headers)
+		if status_code == 404:
+			return 0
+		if status_code != 200:
+			raise ConnectionError('WebHDFS returned {code} for {path}'.format(code=status_code, path=path))
+		return int(json.loads(body)["FileStatus"]["length"])
+
+	def read_file(self, offset, length):
+		"""
+		Reads the bytes appended to the HDFS file, without reading it whole
+
+		:param int offset: position from which the file is read
+		:param int length: number of bytes to read
+		:return: the content read
+		:rtype: str
+		"""
+		host, port, username, path = self.hdfs
+		status_code, body = self.deployment_handler.http_request(
+			Helpers.get_webhdfs_url(host, port, path, 'OPEN', username, offset=offset, length=length),
+			self.hdfs_headers)
+		if status_code != 200:
+			raise ConnectionError('WebHDFS returned {code} for {path}'.format(code=status_code, path=path))
+		return body
+
+	def get_received_events(self):
+		"""
+		:return: events received by Cygnus so far, or None if they cannot be retrieved
+		:rtype: int
+		"""
+		if not self.monitor:
+			return None
+		try:
+			return sum(int(el.get("num_received_events", 0)) for el in self.monitor.sample()["sources"].values())
+		except Exception as e:
+			logging.debug('Cygnus stats not available, latency will not be split: %s', e)
+			self.monitor = None
+			return None
+
+	@Tracer.traced('probe.run')
+	def run(self, timeout=PROBE_TIMEOUT, poll_interval=PROBE_POLL_INTERVAL):
+		"""
+		Upserts the probe entity with a new marker and waits until it is stored in HDFS
+
+		:param float timeout: seconds to wait for the marker
+		:param float poll_interval: seconds between checks of the HDFS file
+		:return: the total latency and, when available, the Orion to Cygnus and Cygnus to HDFS latencies in seconds.
+			The total latency is None if the marker was not stored before the timeout
+		:rtype: dict
+		"""
+		marker = PROBE_MARKER.format(id=uuid.uuid4().hex)
+		offset = self.get_file_length()
+		received = self.get_received_events()
+		entity = {"id": self.entity_id, "type": self.entity_type,
+				  self.attribute: {"type": "Property", "value": marker}}
+
+		start = time.perf_counter()
+		SubscriptionManager.upsert_entities(self.orion_url, self.fiware_service, self.fiware_servicepath, [entity])
+		cygnus_latency = None
+		while time.perf_counter() - start < timeout:
+			if received is not None and cygnus_latency is None:
+				current = self.get_received_events()
+				if current is not None and current > received:
+					cygnus_latency = time.perf_counter() - start
+			length = self.get_file_length()
+			if length > offset:
+				content = self.read_file(offset, length - offset)
+				if marker in content:
+					total = time.perf_counter() - start
+					return {"total": total, "orion_to_cygnus": cygnus_latency,
+							"cygnus_to_hdfs": total - cygnus_latency if cygnus_latency is not None else None}
+				offset = length
+			time.sleep(poll_interval)
+		return {"total": None, "orion_to_cygnus": cygnus_latency, "cygnus_to_hdfs": None}
+
+	def clean(self):
+		"""
+		Removes the probe entity from Orion
+
+		:return: None
+		"""
+		SubscriptionManager.delete_entity(self.orion_url, self.fiware_service, self.fiware_servicepath,
+										  self.entity_id)
@@ -1,17 +1,30 @@
 from cb_bdti.errors.core.handler import *
 from cb_bdti.config.cygnus.manager import CygnusConfManager
+from cb_bdti.config.cygnus.simulator import GroupingRulesSimulator
 from cb_bdti.config.manager import ConfigManager
+from cb_bdti.config.outbox import Outbox
+from cb_bdti.config.registry import TypeRegistry
 from cb_bdti.core.handler.manager import SubscriptionManager
 from cb_bdti.utils.helpers import Helpers
 from cb_bdti.core.handler.handler import DeploymentHandler
+from cb_bdti.core.handler.monitor import CygnusMonitor
+from cb_bdti.core.handler.probe import LatencyProbe
+from cb_bdti.core.handler.loadgen import LoadGenerator
+from cb_bdti.core.handler.limiter import OrionLimiter
+from cb_bdti.core.planner import IntegrationPlanner
 from cb_bdti.utils.validators import Validators
-from cb_bdti.utils.loggers import config_logging
+from cb_bdti.utils.loggers import config_logging, log_context, log_step
+from cb_bdti.utils.tracing import Tracer
 from cb_bdti.config.constants import *
 import logging
+import signal
 import sys
 import os
+import re
+import json
+import time
 from shutil import copyfile
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from cb_bdti.config import messages as msg
 
 class BDTI(object):
@@ -34,17 +47,20 @@ class BDTI(object):
 		try:
 			config_logging()
 			logging.debug(msg.STARTING_BDTI)
-			logging.debug(msg.READING_CONFIG.format(path=file_path))
+			logging.debug(msg.READING_CONFIG, {'path': file_path})
 			ConfigManager.set_config_path(file_path)
+			self.file_path = file_path
+			self.configure_orion_limits()
+			self.configure_type_registry()
 			if not delete:
 				logging.debug(msg.GETTING_ORION_URL)
 				self.orion_url = Helpers.get_orion_url(ConfigManager.get_value(MAIN_SECTION, ORION_HOST))
 				Validators.check_orion_url(self.orion_url)
-				logging.debug(msg.ORION_URL.format(url=self.orion_url))
+				logging.debug(msg.ORION_URL, {'url': self.orion_url})
 
 				logging.debug(msg.GETTING_CYGNUS_URL)
 				self.cygnus_url = Helpers.get_cygnus_url(ConfigManager.get_value(MAIN_SECTION, CYGNUS_HOST))
-				logging.debug(msg.CYGNUS_URL.format(url=self.cygnus_url))
+				logging.debug(msg.CYGNUS_URL, {'url': self.cygnus_url})
 			if deploy:
 				logging.debug(msg.INSTANTIATING_HANDLER)
 				self.deployment_handler = self.initialize_deploy_handler()
@@ -56,6 +72,117 @@ class BDTI(object):
 			logging.error(e)
 			sys.exit()
 
+	@staticmethod
+	def configure_orion_limits():
+		"""
+		Sets the limits of the Orion requests given in the main section of the configuration file, and the ones
+		of every other Orion given in its section
+
+		:return: None
+		"""
+		limits = ConfigManager.get_orion_limits()
+		Validators.check_orion_limits(limits)
+		OrionLimiter.configure(limits)
+		for section in ConfigManager.get_orion_sections():
+			limits = ConfigManager.get_orion_limits(section)
+			Validators.check_orion_limits(limits, section)
+			OrionLimiter.configure(limits, Helpers.get_orion_url(ConfigManager.get_value(section, ORION_HOST), section))
+
+	@classmethod
+	def load_orion_limits(cls, file_path):
+		"""
+		Reads the configuration file for the commands that only send requests to the Orions of the integrated
+		datamodels, without instantiating BDTI, and sets the limits of those requests
+
+		:param str file_path: path of configuration file
+		:return: None
+		"""
+		logging.debug(msg.READING_CONFIG, {'path': file_path})
+		ConfigManager.set_config_path(file_path)
+		cls.configure_orion_limits()
+
+	@staticmethod
+	def configure_type_registry():
+		"""
+		Sets the catalog of the FIWARE Data Models given in the main section of the configuration file, or the
+		bundled one, which is loaded the first time the types of a Data Model are checked
+
+		:return: None
+		"""
+		TypeRegistry.configure(ConfigManager.get_optional_value(MAIN_SECTION, DATAMODELS_CATALOG_PATH))
+
+	@staticmethod
+	def get_orion_url(datamodel):
+		"""
+		Resolves the Orion of a datamodel of the configuration file: the one of the orion section named by its
+		orion key, or the one of the main section
+
+		:param str datamodel: the datamodel
+		:return: the URL of the Orion subscriptions of the datamodel
+		:rtype: str
+		"""
+		section = ConfigManager.get_orion_section(datamodel)
+		return Helpers.get_orion_url(ConfigManager.get_value(section, ORION_HOST), section)
+
+	@staticmethod
+	def run_by_orion(function, datamodels, get_orion_url):
+		"""
+		Groups some datamodels by their Orion and calls the function with the datamodels of each Orion, every
+		Orion in its own thread, so a slow or failing Orion does not hold up the rest. The failure of an Orion
+		is logged once every Orion finished
+
+		:param function: function that receives the datamodels of an Orion
+		:param list datamodels: the datamodels
+		:param get_orion_url: function that receives a datamodel and returns the URL of its Orion
+		:return: a tuple with the results of the Orions that did not fail and the URLs of the ones that failed
+		:rtype: tuple
+		"""
+		orions = {}
+		for datamodel in datamodels:
+			orions.setdefault(get_orion_url(datamodel), []).append(datamodel)
+		results, failed = [], []
+		for orion_url, result, error in Helpers.run_in_parallel(lambda orion_url: function(orions[orion_url]),
+																 list(orions), len(orions)):
+			if error:
+				logging.error(msg.ORION_FAILED, {'url': orion_url, 'error': error,
+												 'datamodels': ', '.join(orions[orion_url])})
+				failed.append(orion_url)
+			else:
+				results.append(result)
+		return results, failed
+
+	@staticmethod
+	def log_pending(pending):
+		"""
+		Logs the datamodels whose Orion requests were not sent because their Orion is failing
+
+		:param list pending: the datamodels
+		:return: None
+		"""
+		if pending:
+			logging.warning(msg.DATAMODELS_PENDING, {'count': len(pending), 'datamodels': ', '.join(pending)})
+
+	@staticmethod
+	def confirm_datamodels(datamodels, warning, question):
+		"""
+		Asks the user to confirm an action on each of some datamodels, before the datamodels of every Orion are
+		processed concurrently, so the questions are asked one after another by the main thread
+
+		:param list datamodels: the datamodels
+		:param str warning: message naming the datamodel, logged before its question
+		:param str question: the question
+		:return: the datamodels whose action was confirmed
+		:rtype: set
+		"""
+		confirmed = set()
+		for datamodel in datamodels:
+			with log_context(datamodel=datamodel):
+				logging.warning(warning, {'datamodel': datamodel})
+				if Helpers.confirm_action(question):
+					confirmed.add(datamodel)
+		return confirmed
+
+	@Tracer.traced('bdti.subscribe')
 	def subscribe(self, data_model):
 		"""
 		Makes a orion's subscription with datamodel info passed.
@@ -64,155 +191,238 @@ class BDTI(object):
 		:return: id of subscription done
 		:rtype: str
 		"""
-		types = ConfigManager.get_value(data_model, DATA_MODEL_TYPES)
-		Validators.validate_types(types, data_model)
-		type_pattern = Helpers.get_type_pattern(types)
-		fiware_service = ConfigManager.get_value(data_model, DATA_MODEL_FIWARE_SERVICE)
-		fiware_servicepath = ConfigManager.get_value(data_model, DATA_MODEL_FIWARE_SERVICEPATH)
-		throttling = ConfigManager.get_value(data_model, DATA_MODEL_THROTTLING)
-		Validators.validate_throttling(throttling, data_model)
-		expires = ConfigManager.get_value(data_model, DATA_MODEL_EXPIRES)
-		Validators.validate_expires(expires, data_model)
-		# file_path file_name only for comprobations pourposes
-		ConfigManager.get_value(data_model, DATA_MODEL_FILE_NAME)
-		ConfigManager.get_value(data_model, DATA_MODEL_FILE_PATH)
-		description = Helpers.get_description(data_model)
-		subscription_id = SubscriptionManager.do_subscription(self.orion_url, self.cygnus_url, type_pattern,
-															  fiware_service, fiware_servicepath, throttling,
-															  expires, description)
+		values = ConfigManager.get_section_dict(data_model)
+		# the datamodels of other Orions may be changing the internal configuration meanwhile
+		with ConfigManager.internal_lock:
+			record = ConfigManager.get_internal_datamodel(data_model) \
+				if data_model in ConfigManager.get_internal_sections() else None
+		if record is not None:
+			# subscribed again, e.g. modified or resumed: a renewal of its subscription is kept
+			values = Helpers.keep_renewed_expires(values, record)
+		params = SubscriptionManager.get_subscription_params(data_model, values)
+		shards = SubscriptionManager.get_shards(data_model, values, self.cygnus_url)
+		subscription_id = SubscriptionManager.do_subscriptions(data_model, self.get_orion_url(data_model), shards,
+															   **params)
 		return subscription_id
 
-	def create_subscriptions(self, datamodels):
+	@log_step('create_subscriptions')
+	def create_subscriptions(self, datamodels, confirmed=None):
 		"""
 		Create the subsciptions of datamodels indicated in 'iot.datamodels' key of the configuration file
 		and writes the  corresponding id of the subs
 
+		:param list datamodels: the datamodels
+		:param set confirmed: the integrated datamodels whose modification was confirmed. If None, it is asked
 		:return: None
 		"""
 		logging.info(msg.CREATING_NEW_SUBSCRIPTIONS)
+		if confirmed is None:
+			confirmed = self.confirm_datamodels([data_model for data_model in datamodels
+												 if ConfigManager.get_subscription_id(data_model)],
+												msg.DATAMODEL_EXISTS, msg.ASK_MODIFY)
 		cont = 0
 		for data_model in datamodels:
-			self.check_datamodel(data_model)
-			old_subscription_id = ConfigManager.get_subscription_id(data_model)
-			if old_subscription_id:
-				logging.warning(msg.DATAMODEL_EXISTS.format(datamodel=data_model))
-				modify_datamodel = Helpers.confirm_action(msg.ASK_MODIFY)
-				if modify_datamodel:
-					self.modify_subscriptions([data_model])
+			with log_context(datamodel=data_model):
+				self.check_datamodel(data_model)
+				old_subscription_id = ConfigManager.get_subscription_id(data_model)
+				if old_subscription_id:
+					if data_model in confirmed:
+						self.modify_subscriptions([data_model])
+						cont += 1
+				else:
+					logging.debug(msg.CREATING_SUBSCRIPTION, {'datamodel': data_model})
+					new_subscription_id = self.subscribe(data_model)
 					cont += 1
-			else:
-				logging.debug(msg.CREATING_SUBSCRIPTION.format(datamodel=data_model))
-				new_subscription_id = self.subscribe(data_model)
-				cont += 1
-				logging.info(msg.SUBSCRIPTION_CREATED.format(datamodel=data_model))
-				logging.debug(msg.SUBSCRIPTION_INFO.format(datamodel=data_model,
-																	  subscription_id=new_subscription_id))
-				ConfigManager.set_internal_datamodel(data_model, new_subscription_id, self.orion_url)
-				ConfigManager.update_internal_conf_file()
-				logging.debug(msg.SUBSCRIPTION_ID_SAVED.format(datamodel=data_model))
+					logging.info(msg.SUBSCRIPTION_CREATED, {'datamodel': data_model})
+					Tracer.count('datamodels.created')
+					logging.debug(msg.SUBSCRIPTION_INFO, {'datamodel': data_model,
+														  'subscription_id': new_subscription_id})
+					with ConfigManager.internal_lock:
+						ConfigManager.set_internal_datamodel(data_model, new_subscription_id,
+															 self.get_orion_url(data_model))
+						ConfigManager.update_internal_conf_file()
+						Outbox.complete(data_model)
+					logging.debug(msg.SUBSCRIPTION_ID_SAVED, {'datamodel': data_model})
 
 		return cont > 0
 
-	def modify_subscriptions(self, data_models, force=False):
+	@log_step('modify_subscriptions')
+	def modify_subscriptions(self, data_models, force=False, confirmed=None):
 		"""
 		Remove a subscription and creates a new one with changes done in production.ini
 
 		:param str data_model: datamodel passed by parameter on modify and delete commands.
+		:param set confirmed: the datamodels not integrated whose integration was confirmed. If None, it is asked
 		:return: None
 		"""
 		logging.info(msg.MODIFYING_SUBSCRIPTIONS)
+		if confirmed is None:
+			confirmed = self.confirm_datamodels([data_model for data_model in data_models
+												 if not ConfigManager.get_subscription_id(data_model)],
+												msg.DATAMODEL_NOT_INTEGRATED, msg.ASK_INTEGRATE)
 		cont = 0
 		for data_model in data_models:
-			self.check_datamodel(data_model)
-			old_subscription_id = ConfigManager.get_subscription_id(data_model)
-			if old_subscription_id:
-				fiware_service = ConfigManager.get_internal_value(data_model, DATA_MODEL_FIWARE_SERVICE)
-				try:
-					SubscriptionManager.rm_subscription(data_model, self.orion_url, old_subscription_id, fiware_service)
-				except Exception as e:
-					if force:
-						logging.warning(e)
-						logging.info(msg.FORCING_DELETE.format(datamodel=data_model))
-					else:
-						raise (e)
-				logging.debug(msg.SUBSCRIPTION_REMOVED.format(datamodel=data_model))
-				new_subscription_id = self.subscribe(data_model)
-				cont += 1
-				logging.debug(msg.NEW_SUBSCRIPTION.format(datamodel=data_model,
-																			  id=new_subscription_id))
-				ConfigManager.update_internal_datamodel(data_model, new_subscription_id, self.orion_url)
-				ConfigManager.update_internal_conf_file()
-				logging.debug(msg.SUBSCRIPTION_ID_SAVED.format(datamodel=data_model))
-				logging.info(msg.SUBSCRIPTION_MODIFIED.format(datamodel=data_model))
-			else:
-				logging.warning(msg.DATAMODEL_NOT_INTEGRATED.format(datamodel=data_model))
-				integrate_datamodel = Helpers.confirm_action(msg.ASK_INTEGRATE)
-				if integrate_datamodel:
+			with log_context(datamodel=data_model):
+				self.check_datamodel(data_model)
+				old_subscription_id = ConfigManager.get_subscription_id(data_model)
+				if old_subscription_id:
+					fiware_service = ConfigManager.get_internal_value(data_model, DATA_MODEL_FIWARE_SERVICE)
+					orion_url = ConfigManager.get_internal_value(data_model, ORION_SUBSCRIPTION_URL)
+					try:
+						SubscriptionManager.rm_subscriptions(data_model, orion_url, old_subscription_id, fiware_service)
+					except Exception as e:
+						if force:
+							logging.warning(e)
+							logging.info(msg.FORCING_DELETE, {'datamodel': data_model})
+						else:
+							raise (e)
+					logging.debug(msg.SUBSCRIPTION_REMOVED, {'datamodel': data_model})
+					new_subscription_id = self.subscribe(data_model)
+					cont += 1
+					logging.debug(msg.NEW_SUBSCRIPTION, {'datamodel': data_model, 'id': new_subscription_id})
+					with ConfigManager.internal_lock:
+						ConfigManager.update_internal_datamodel(data_model, new_subscription_id,
+																self.get_orion_url(data_model))
+						ConfigManager.update_internal_conf_file()
+						Outbox.complete(data_model)
+					logging.debug(msg.SUBSCRIPTION_ID_SAVED, {'datamodel': data_model})
+					logging.info(msg.SUBSCRIPTION_MODIFIED, {'datamodel': data_model})
+					Tracer.count('datamodels.modified')
+				elif data_model in confirmed:
 					self.create_subscriptions([data_model])
 					cont += 1
 		return cont > 0
 
 	@staticmethod
-	def delete_subscription(data_model, force=False):
+	@Tracer.traced('bdti.delete_subscriptions')
+	@log_step('delete_subscriptions')
+	def delete_subscriptions(datamodels, force=False, workers=ORION_WORKERS):
 		"""
-		Delete datamodel subscription from the orion service.
+		Deletes the subscriptions of some integrated datamodels from their Orions in bulk. The datamodels are grouped
+		by Orion and fiware service, every Orion is checked once and the subscriptions are removed concurrently.
+		The internal configuration is written once, without the datamodels removed.
 
-		:param str data_model: datamodel passed by parameter on modify and delete commands.
-		:return: None
+		:param list datamodels: integrated datamodels passed by parameter on delete and reset commands.
+		:param bool force: remove the datamodels from the internal configuration even if their subscriptions
+			could not be removed
+		:param int workers: maximum number of concurrent requests to the Orions
+		:return: the outcome (deleted, forced, failed or pending) and the error of every datamodel
+		:rtype: dict
 		"""
-		logging.info('Removing subscription for {datamodel} Data Model'.format(datamodel=data_model))
-		try:
-			fiware_service = ConfigManager.get_internal_value(data_model, DATA_MODEL_FIWARE_SERVICE)
-			orion_url = ConfigManager.get_internal_value(data_model, ORION_SUBSCRIPTION_URL)
-			Validators.check_orion_url(orion_url)
-			subscription_id = ConfigManager.get_subscription_id(data_model)
-			logging.debug(msg.DATAMODEL_SUBSCRIPTION.format(datamodel=data_model, id=subscription_id))
-			SubscriptionManager.rm_subscription(data_model, orion_url, subscription_id, fiware_service)
-			ConfigManager.remove_internal_datamodel(data_model)
-			ConfigManager.update_internal_conf_file()
-			logging.info(msg.SUBSCRIPTION_REMOVED_SUCCESSFULLY)
+		groups = {}
+		for datamodel in datamodels:
+			group = (ConfigManager.get_internal_value(datamodel, ORION_SUBSCRIPTION_URL),
+					 ConfigManager.get_internal_value(datamodel, DATA_MODEL_FIWARE_SERVICE))
+			groups.setdefault(group, []).append(datamodel)
+		unreachable = {orion_url: error for orion_url, _, error in Helpers.run_in_parallel(
+			Validators.check_orion_url, sorted({orion_url for orion_url, _ in groups}), workers) if error}
 
-		except Exception as e:
-			if force:
-				logging.warning(e)
-				logging.info(msg.FORCING_DELETE.format(datamodel=data_model))
-				ConfigManager.remove_internal_datamodel(data_model)
-				ConfigManager.update_internal_conf_file()
+		removals = []
+		errors = {}
+		for (orion_url, fiware_service), group_datamodels in groups.items():
+			logging.info(msg.REMOVING_SUBSCRIPTIONS, {'count': len(group_datamodels), 'service': fiware_service,
+													  'url': orion_url})
+			for datamodel in group_datamodels:
+				if orion_url in unreachable:
+					errors[datamodel] = unreachable[orion_url]
+				else:
+					removals.append((datamodel, orion_url, fiware_service,
+									 ConfigManager.get_subscription_id(datamodel)))
+
+		def remove(removal):
+			datamodel, orion_url, fiware_service, subscription_id = removal
+			with log_context(datamodel=datamodel):
+				logging.debug(msg.DATAMODEL_SUBSCRIPTION, {'datamodel': datamodel, 'id': subscription_id})
+				# no subscription ID if an apply failed to recreate it
+				if subscription_id:
+					SubscriptionManager.rm_subscriptions(datamodel, orion_url, subscription_id, fiware_service)
+
+		for removal, _, error in Helpers.run_in_parallel(remove, removals, workers):
+			if error:
+				errors[removal[0]] = error
+
+		outcomes = {}
+		for datamodel in datamodels:
+			error = errors.get(datamodel)
+			if error is None:
+				outcome = DELETE_DELETED
+			elif force:
+				outcome = DELETE_FORCED
+			elif isinstance(error, OrionCircuitOpen):
+				outcome = DELETE_PENDING
 			else:
-				raise e
+				outcome = DELETE_FAILED
+			outcomes[datamodel] = {"outcome": outcome, "error": error}
+
+		removed = [datamodel for datamodel in datamodels if outcomes[datamodel]["outcome"] in (DELETE_DELETED,
+																								 DELETE_FORCED)]
+		if removed:
+			with ConfigManager.internal_lock:
+				for datamodel in removed:
+					ConfigManager.remove_internal_datamodel(datamodel)
+				ConfigManager.update_internal_conf_file()
+				Outbox.complete(*removed)
 
+		counts = dict.fromkeys((DELETE_DELETED, DELETE_FORCED, DELETE_FAILED, DELETE_PENDING), 0)
+		for datamodel, outcome in outcomes.items():
+			counts[outcome["outcome"]] += 1
+			with log_context(datamodel=datamodel):
+				if outcome["outcome"] == DELETE_DELETED:
+					logging.info(msg.SUBSCRIPTION_REMOVED, {'datamodel': datamodel})
+				elif outcome["outcome"] == DELETE_PENDING:
+					logging.debug(outcome["error"])
+				else:
+					logging.log(logging.WARNING if force else logging.ERROR, msg.DATAMODEL_REMOVAL_FAILED,
+								{'datamodel': datamodel, 'outcome': outcome["outcome"], 'error': outcome["error"]})
+		Tracer.count('datamodels.deleted', counts[DELETE_DELETED])
+		logging.info(msg.REMOVAL_OUTCOMES, counts)
+		return outcomes
+
+	@Tracer.traced('bdti.create_cygnus_agent')
+	@log_step('create_cygnus_agent')
 	def create_cygnus_agent(self, out_file):
 		"""
 		Will create a Flume agent that cygnus needs to run
 
 		:param str out_file: path on where agent file will be created
-		:return: None
+		:return: if the agent file changed
+		:rtype: bool
 		"""
 		logging.info(msg.CREATING_AGENT)
 		hdfs_section_dict = ConfigManager.get_hdfs_section()
 		Validators.check_hdfs_section(hdfs_section_dict)
-		CygnusConfManager.generate_flume_agent(hdfs_section_dict, out_file)
+		changed = CygnusConfManager.generate_flume_agent(hdfs_section_dict, out_file)
 		logging.info(msg.AGENT_CREATED)
+		return changed
 
 
+	@Tracer.traced('bdti.create_grouping_rules')
+	@log_step('create_grouping_rules')
 	def create_grouping_rules(self, out_file):
 		"""
 		Will create a Grouping Rules file that cygnus needs to store data in HDFS under files paths and names
 
 		:param str out_file: ath on where grouping rules file will be created
-		:return: None
+		:return: the rules added, changed and removed in the file
+		:rtype: dict
 		"""
 		logging.info(msg.CREATING_GROUPING_RULES)
 		data_models_dicts = ConfigManager.get_integrated_datamodels()
 		format_file = ConfigManager.get_value(HDFS_SECTION, HDFS_FORMAT_FILE)
-		CygnusConfManager.generate_grouping_rules(data_models_dicts, format_file, out_file)
+		diff = CygnusConfManager.generate_grouping_rules(data_models_dicts, format_file, out_file)
 		logging.info(msg.GROUPING_RULES_CREATED)
+		logging.debug(msg.GROUPING_RULES_DIFF, {key: ', '.join(str(rule["id"]) for rule in rules) or 'none'
+												for key, rules in diff.items()})
+		return diff
 
 	@classmethod
-	def initialize_deploy_handler(cls):
+	@Tracer.traced('bdti.initialize_deploy_handler')
+	@log_step('initialize_deploy_handler')
+	def initialize_deploy_handler(cls, check_hdfs=True):
 		"""
 		Initializes the deployment handler and checks HDFS's coneection.
 
+		:param bool check_hdfs: check the HDFS connection from Cygnus host
 		:return: None
 		"""
 		cygnus_ip = ConfigManager.get_value(MAIN_SECTION, CYGNUS_HOST)
@@ -220,9 +430,11 @@ class BDTI(object):
 		cygnus_key_path = ConfigManager.get_value(MAIN_SECTION, CYGNUS_KEY_PATH)
 		cygnus_username = ConfigManager.get_value(MAIN_SECTION, CYGNUS_USERNAME)
 		cygnus_remotely = cygnus_key_path is not '' and cygnus_username is not ''
-		logging.debug(msg.CYGNUS_MODE.format(deploy_mode='remotely' if cygnus_remotely else 'locally'))
+		logging.debug(msg.CYGNUS_MODE, {'deploy_mode': 'remotely' if cygnus_remotely else 'locally'})
 
 		deployment_handler = DeploymentHandler(cygnus_remotely, cygnus_ip, cygnus_key_path, cygnus_username)
+		if not check_hdfs:
+			return deployment_handler
 
 		hdfs_host = ConfigManager.get_value(HDFS_SECTION, HDFS_HOST)
 		if not hdfs_host: raise FieldNotInformed(HDFS_HOST, HDFS_SECTION)
@@ -254,18 +466,107 @@ class BDTI(object):
 
 		overwrite = Helpers.confirm_action(msg.ASK_RESET_OPTION)
 		if overwrite:
+			# the limits are read before the configuration file is removed. Without it, the default ones apply
+			if os.path.isfile(PRODUCTION_INI):
+				try:
+					cls.load_orion_limits(PRODUCTION_INI)
+				except Exception as e:
+					logging.warning(e)
 			try:
 				os.remove(PRODUCTION_INI)
 				logging.info(msg.CONFIGURATION_FILE_REMOVED)
 			except Exception as e:
 				logging.error(e)
-			integrated_datamodels = cls.get_datamodels(all=True)
-			for datamodel in integrated_datamodels:
+			outcomes = cls.delete_subscriptions(cls.get_datamodels(all=True), force)
+			pending = [datamodel for datamodel, outcome in outcomes.items() if outcome["outcome"] == DELETE_PENDING]
+			# the interrupted runs cannot be resumed without the configuration file
+			Outbox.clear()
+			cls.log_pending(pending)
+
+	@classmethod
+	def renew(cls, file_path, window, margin, daemon=False, interval=3600):
+		"""
+		Main method of renew command: moves forward the expiration of the integrated subscriptions
+		that are about to expire. Cygnus is not redeployed, as the subscriptions keep their IDs
+
+		:param str file_path: path of configuration file, with the limits of the Orion requests
+		:param timedelta window: time from now that the renewed subscriptions will last
+		:param timedelta margin: subscriptions expiring within this time from now are renewed
+		:param bool daemon: keep renewing the subscriptions every interval seconds
+		:param int interval: seconds between renewals in daemon mode
+		:return: None
+		"""
+		try:
+			config_logging()
+		except ValueError:
+			print(SUDO_ERROR.format(date=datetime.strftime(datetime.now(), '%H:%M:%S')))
+			sys.exit()
+		try:
+			cls.load_orion_limits(file_path)
+		except Exception as e:
+			logging.error(e)
+			sys.exit()
+
+		cls.renew_subscriptions(window, margin)
+		while daemon:
+			logging.debug(msg.NEXT_RENEWAL, {'interval': interval})
+			time.sleep(interval)
+			ConfigManager.reload_internal_conf()
+			cls.renew_subscriptions(window, margin)
+
+	@staticmethod
+	@log_step('renew')
+	def renew_subscriptions(window, margin):
+		"""
+		Renews in one pass every integrated subscription with an expiration date within the margin,
+		writing the internal configuration once at the end
+
+		:param timedelta window: time from now that the renewed subscriptions will last
+		:param timedelta margin: subscriptions expiring within this time from now are renewed
+		:return: None
+		"""
+		logging.info(msg.STARTING_RENEWAL)
+		now = datetime.now(timezone.utc)
+		new_expires = Helpers.format_iso_datetime(now + window)
+		renewed = failed = 0
+		pending = []
+		for datamodel in ConfigManager.get_internal_sections():
+			with log_context(datamodel=datamodel):
 				try:
-					cls.delete_subscription(datamodel, force)
+					expires = ConfigManager.get_internal_value(datamodel, DATA_MODEL_EXPIRES)
+					if not expires:
+						continue
+					if Helpers.parse_iso_datetime(expires) - now > margin:
+						logging.debug(msg.SUBSCRIPTION_NOT_EXPIRING, {'datamodel': datamodel, 'expires': expires})
+						continue
+					logging.debug(msg.RENEWING_SUBSCRIPTION, {'datamodel': datamodel, 'expires': new_expires})
+					SubscriptionManager.update_subscriptions(
+						datamodel, ConfigManager.get_internal_value(datamodel, ORION_SUBSCRIPTION_URL),
+						ConfigManager.get_subscription_id(datamodel),
+						ConfigManager.get_internal_value(datamodel, DATA_MODEL_FIWARE_SERVICE),
+						{DATA_MODEL_EXPIRES: new_expires})
+					ConfigManager.set_internal_value(datamodel, DATA_MODEL_EXPIRES, new_expires)
+					renewed += 1
+					Tracer.count('datamodels.renewed')
+					logging.info(msg.SUBSCRIPTION_RENEWED, {'datamodel': datamodel})
+				except OrionCircuitOpen as e:
+					failed += 1
+					logging.debug(e)
+					pending.append(datamodel)
 				except Exception as e:
+					failed += 1
 					logging.error(e)
 
+		BDTI.log_pending(pending)
+		if renewed:
+			ConfigManager.update_internal_conf_file()
+		elif not failed:
+			logging.info(msg.NO_SUBSCRIPTIONS_RENEWED)
+		if failed:
+			logging.info(msg.RENEWAL_ERROR, {'renewed': renewed, 'failed': failed})
+		else:
+			logging.info(msg.RENEWAL_SUCCESS, {'renewed': renewed})
+
 	@staticmethod
 	def get_config_file():
 		try:
@@ -277,7 +578,7 @@ class BDTI(object):
 			if not os.path.isfile(PRODUCTION_INI):
 				copyfile(PRODUCTION_TEMPLATE, PRODUCTION_INI)
 				with open(INTERNAL_CONF, 'w') as f: f.write("")
-				logging.info(msg.CONFIGURATION_FILE_CREATED.format(production=PRODUCTION_INI))
+				logging.info(msg.CONFIGURATION_FILE_CREATED, {'production': PRODUCTION_INI})
 			else:
 				logging.error(msg.CONFIGURATION_FILE_EXISTS)
 		except:
@@ -290,80 +591,1053 @@ class BDTI(object):
 				if internal:
 					datamodels_option = ConfigManager.get_internal_sections()
 				else:
-					datamodels_option = [el for el in ConfigManager.get_sections() if el
-										 not in [MAIN_SECTION, HDFS_SECTION]]
+					datamodels_option = ConfigManager.get_datamodel_names()
 		elif all:
 			datamodels_option = ConfigManager.get_internal_sections()
 		return datamodels_option
 
+	def get_orphan_subscriptions(self, workers=ORION_WORKERS):
+		"""
+		Lists concurrently the subscriptions of every fiware service of the configuration file and the internal
+		configuration, and retrieves those notifying this Cygnus or described as a Data Model subscription
+		that are not tracked in the internal configuration
+
+		:param int workers: maximum number of concurrent requests to Orion
+		:return: a tuple (orion_url, fiware_service, subscription) for every orphan subscription
+		:rtype: list
+		"""
+		integrated_datamodels = self.get_datamodels(all=True)
+		tracked_ids = {subscription_id for datamodel in integrated_datamodels
+					   for subscription_id in ConfigManager.get_subscription_ids(datamodel)}
+		fiware_services = {ConfigManager.get_value(datamodel, DATA_MODEL_FIWARE_SERVICE)
+						   for datamodel in self.get_datamodels(['all'])}
+		fiware_services.update(ConfigManager.get_internal_value(datamodel, DATA_MODEL_FIWARE_SERVICE)
+							   for datamodel in integrated_datamodels)
+		orion_urls = {self.orion_url}
+		orion_urls.update(self.get_orion_url(datamodel) for datamodel in self.get_datamodels(['all']))
+		orion_urls.update(ConfigManager.get_internal_value(datamodel, ORION_SUBSCRIPTION_URL)
+						  for datamodel in integrated_datamodels)
+
+		def list_subscriptions(target):
+			logging.debug(msg.LISTING_SUBSCRIPTIONS, {'url': target[0], 'service': target[1]})
+			return SubscriptionManager.list_subscriptions(*target)
+
+		targets = sorted((orion_url, fiware_service) for orion_url in orion_urls for fiware_service in fiware_services)
+		orphans = []
+		for (orion_url, fiware_service), subscriptions, error in Helpers.run_in_parallel(list_subscriptions,
+																						  targets, workers):
+			if error:
+				logging.error(error)
+				continue
+			for subscription in subscriptions:
+				if subscription.get("id") in tracked_ids:
+					continue
+				if SubscriptionManager.get_notification_url(subscription) == self.cygnus_url or \
+						Helpers.get_description_datamodel(subscription.get("description")):
+					orphans.append((orion_url, fiware_service, subscription))
+		return orphans
+
+	@log_step('gc')
+	def gc(self, dry_run=False, workers=ORION_WORKERS):
+		"""
+		Main method of gc command: removes concurrently the orphan subscriptions
+
+		:param bool dry_run: only show the orphan subscriptions, without removing them
+		:param int workers: maximum number of concurrent requests to Orion
+		:return: None
+		"""
+		logging.info(msg.STARTING_GC)
+		try:
+			orphans = self.get_orphan_subscriptions(workers)
+			if not orphans:
+				logging.info(msg.NO_ORPHAN_SUBSCRIPTIONS)
+			for orion_url, fiware_service, subscription in orphans:
+				logging.info(msg.ORPHAN_SUBSCRIPTION, {'id': subscription["id"], 'service': fiware_service,
+													   'description': subscription.get("description", "")})
+			if dry_run:
+				logging.info(msg.GC_DRY_RUN, {'count': len(orphans)})
+				return
+
+			def remove_subscription(orphan):
+				orion_url, fiware_service, subscription = orphan
+				# the datamodel of its description, if it was made for one
+				SubscriptionManager.rm_subscription(Helpers.get_description_datamodel(subscription.get("description")),
+													orion_url, subscription["id"], fiware_service)
+
+			removed = failed = 0
+			for orphan, _, error in Helpers.run_in_parallel(remove_subscription, orphans, workers):
+				if error:
+					failed += 1
+					logging.error(error)
+				else:
+					removed += 1
+					Tracer.count('subscriptions.orphans_removed')
+					logging.debug(msg.ORPHAN_SUBSCRIPTION_REMOVED, {'id': orphan[2]["id"]})
+			if failed:
+				logging.info(msg.GC_ERROR, {'removed': removed, 'failed': failed})
+			else:
+				logging.info(msg.GC_SUCCESS, {'removed': removed})
+		except Exception as e:
+			logging.error(e)
+			logging.info(msg.GC_FAILED)
+
+	@log_step('recover')
+	def recover(self, dry_run=False, workers=ORION_WORKERS):
+		"""
+		Main method of recover command: rebuilds the internal configuration from the subscriptions in Orion.
+		Every Data Model section is matched with the subscription of its fiware service with the same description,
+		type pattern and notification URL, and a Data Model with shards with a subscription for every shard, with
+		its entity id pattern and notification URL. The internal configuration is written once, with every match
+		found
+
+		:param bool dry_run: only show the recovered subscriptions, without writing the internal configuration
+		:param int workers: maximum number of concurrent requests to Orion
+		:return: None
+		"""
+		logging.info(msg.STARTING_RECOVERY)
+		try:
+			datamodels = self.get_datamodels(['all'])
+			targets = {datamodel: (self.get_orion_url(datamodel),
+								   ConfigManager.get_value(datamodel, DATA_MODEL_FIWARE_SERVICE))
+					   for datamodel in datamodels}
+			subscriptions = {}
+			for target, target_subscriptions, error in Helpers.run_in_parallel(
+					lambda target: SubscriptionManager.list_subscriptions(*target), sorted(set(targets.values())),
+					workers):
+				if error:
+					raise error
+				subscriptions[target] = target_subscriptions
+
+			recovered = {}
+			for datamodel in datamodels:
+				with log_context(datamodel=datamodel):
+					type_pattern = Helpers.get_type_pattern(ConfigManager.get_value(datamodel, DATA_MODEL_TYPES))
+					description = Helpers.get_description(datamodel)
+					shards = SubscriptionManager.get_shards(datamodel, ConfigManager.get_section_dict(datamodel),
+															self.cygnus_url)
+					shard_matches = [[subscription for subscription in subscriptions[targets[datamodel]]
+									  if subscription.get("description") == description
+									  and type_pattern in [el.get("typePattern") for el in
+														   subscription.get("subject", {}).get("entities", [])]
+									  and (id_pattern is None or id_pattern in [
+											el.get("idPattern") for el in subscription["subject"]["entities"]])
+									  and SubscriptionManager.get_notification_url(subscription) == notification_url]
+									 for id_pattern, notification_url in shards]
+					if not all(shard_matches):
+						logging.warning(msg.SUBSCRIPTION_NOT_RECOVERED, {'datamodel': datamodel})
+						continue
+					recovered[datamodel] = [matches[0] for matches in shard_matches]
+					logging.info(msg.SUBSCRIPTION_RECOVERED, {'datamodel': datamodel, 'id': ' '.join(
+						subscription["id"] for subscription in recovered[datamodel])})
+					duplicates = [subscription["id"] for matches in shard_matches for subscription in matches[1:]]
+					if duplicates:
+						logging.warning(msg.DUPLICATED_SUBSCRIPTIONS, {'datamodel': datamodel,
+																	   'ids': ', '.join(duplicates)})
+
+			if dry_run:
+				logging.info(msg.RECOVERY_DRY_RUN, {'recovered': len(recovered)})
+				return
+
+			integration_dates = {datamodel: ConfigManager.get_internal_value(datamodel, INTEGRATION_DATE)
+								 for datamodel in self.get_datamodels(all=True)}
+			rule_ids = ConfigManager.get_grouping_rule_ids(list(recovered))
+			ConfigManager.clear_internal_datamodels()
+			for datamodel, shard_subscriptions in recovered.items():
+				ConfigManager.set_internal_datamodel(datamodel, ' '.join(
+					subscription["id"] for subscription in shard_subscriptions), targets[datamodel][0])
+				# the expiration may have been moved forward by renew command, which renews every shard together
+				if shard_subscriptions[0].get(DATA_MODEL_EXPIRES):
+					ConfigManager.set_internal_value(datamodel, DATA_MODEL_EXPIRES,
+													 shard_subscriptions[0][DATA_MODEL_EXPIRES])
+				if datamodel in integration_dates:
+					ConfigManager.set_internal_value(datamodel, INTEGRATION_DATE, integration_dates[datamodel])
+				ConfigManager.set_internal_value(datamodel, DATA_MODEL_GROUPING_RULE_ID, str(rule_ids[datamodel]))
+			ConfigManager.update_internal_conf_file()
+			logging.info(msg.RECOVERY_SUCCESS, {'recovered': len(recovered)})
+		except Exception as e:
+			logging.error(e)
+			logging.info(msg.RECOVERY_ERROR)
+
+	@log_step('discover')
+	def discover(self, fiware_services=None, orion=None, include_configured=False, workers=ORION_WORKERS):
+		"""
+		Main method of discover command: lists concurrently the entity types of some fiware services of an Orion
+		and counts the entities of every type, and suggests a Data Model section for every type, with the
+		throttling suggested by its number of entities. Warns about the types that are not in the FIWARE Data
+		Models, as their types are not checked, and about the sections that Validators.validate_types would
+		reject, which are not suggested
+
+		:param list fiware_services: fiware services to discover. By default, the ones of the configuration file,
+			or the default one if there is none
+		:param str orion: name of the orion section of the Orion to discover. The one of the main section if None
+		:param bool include_configured: also suggest a section for the types already configured in a section of
+			the same fiware service
+		:param int workers: maximum number of concurrent requests to Orion
+		:return: the discovered types, sorted by number of entities, the most first, with the suggested section
+			of each one, or None if the types could not be discovered
+		:rtype: list
+		"""
+		try:
+			orion_section = MAIN_SECTION
+			if orion:
+				orion_section = ORION_SECTION_PREFIX + orion
+				if not ConfigManager.is_section_present(orion_section):
+					raise OrionNotDefined(orion)
+			orion_url = Helpers.get_orion_url(ConfigManager.get_value(orion_section, ORION_HOST), orion_section)
+			datamodels = self.get_datamodels(['all'])
+			configured = {(ConfigManager.get_optional_value(datamodel, DATA_MODEL_FIWARE_SERVICE), entity_type)
+						  for datamodel in datamodels
+						  for entity_type in ConfigManager.get_optional_value(datamodel, DATA_MODEL_TYPES).split()}
+			if not fiware_services:
+				fiware_services = sorted({fiware_service for fiware_service, _ in configured}) or ['']
+			logging.info(msg.STARTING_DISCOVERY, {'services': len(fiware_services), 'url': orion_url})
+
+			types = []
+			for fiware_service, service_types, error in Helpers.run_in_parallel(
+					lambda fiware_service: SubscriptionManager.list_types(orion_url, fiware_service), fiware_services,
+					workers):
+				if error:
+					raise error
+				logging.debug(msg.TYPES_DISCOVERED, {'types': len(service_types), 'service': fiware_service})
+				types += [(fiware_service, entity_type) for entity_type in service_types]
+
+			services_by_type = {}
+			for fiware_service, entity_type in types:
+				services_by_type.setdefault(entity_type, set()).add(fiware_service)
+			discovered = []
+			for (fiware_service, entity_type), entities, error in Helpers.run_in_parallel(
+					lambda target: SubscriptionManager.count_entities(orion_url, *target), types, workers):
+				if error:
+					raise error
+				name = Helpers.get_type_name(entity_type)
+				# the types of several fiware services need a section for each one
+				datamodel = 'datamodel.%s' % '.'.join(
+					filter(None, [fiware_service if len(services_by_type[entity_type]) > 1 else '', name]))
+				section = {DATA_MODEL_TYPES: entity_type, DATA_MODEL_FIWARE_SERVICE: fiware_service,
+						   DATA_MODEL_FIWARE_SERVICEPATH: '', DATA_MODEL_FILE_PATH: name.lower(),
+						   DATA_MODEL_FILE_NAME: '_'.join(filter(None, [name.lower(), fiware_service])),
+						   DATA_MODEL_EXPIRES: '', DATA_MODEL_THROTTLING: Helpers.get_suggested_throttling(entities)}
+				if orion:
+					section[DATA_MODEL_ORION] = orion
+				try:
+					Validators.validate_types(entity_type, datamodel)
+					error = None
+				except NotValidTypes as e:
+					error = str(e)
+				discovered.append({"datamodel": datamodel, "entity_type": entity_type,
+								   "fiware_service": fiware_service, "entities": entities,
+								   "fiware_datamodel": next(iter(TypeRegistry.get_domains(entity_type)), None),
+								   "configured": (fiware_service, entity_type) in configured, "error": error,
+								   "section": section})
+			discovered.sort(key=lambda el: (-el["entities"], el["datamodel"]))
+
+			not_covered = sorted({el["entity_type"] for el in discovered if not el["fiware_datamodel"]})
+			if not_covered:
+				logging.warning(msg.TYPES_NOT_COVERED, {'types': ', '.join(not_covered)})
+			for el in discovered:
+				if el["error"] and (include_configured or not el["configured"]):
+					logging.warning(msg.SECTION_REJECTED, {'datamodel': el["datamodel"], 'error': el["error"]})
+			logging.info(msg.DISCOVERY_SUCCESS, {
+				'types': len(discovered), 'entities': sum(el["entities"] for el in discovered),
+				'suggested': len(self.get_suggested_sections(discovered, include_configured)[0])})
+			return discovered
+		except Exception as e:
+			logging.error(e)
+			logging.info(msg.DISCOVERY_ERROR)
+
+	@staticmethod
+	def get_suggested_sections(discovered, include_configured=False):
+		"""
+		Selects the sections suggested by discover command: the ones that would not be rejected, of the types
+		not configured yet unless the configured ones are included
+
+		:param list discovered: the discovered types (see discover)
+		:param bool include_configured: also suggest a section for the types already configured
+		:return: the values of every suggested section by name and the comment lines of each one
+		:rtype: tuple
+		"""
+		sections = {}
+		comments = {}
+		for el in discovered:
+			if el["error"] or (el["configured"] and not include_configured):
+				continue
+			sections[el["datamodel"]] = el["section"]
+			comments[el["datamodel"]] = ['%s entities of %s type in "%s" fiware service' % (
+				el["entities"], el["entity_type"], el["fiware_service"])]
+			if not el["fiware_datamodel"]:
+				comments[el["datamodel"]].append('%s is not a type of the FIWARE Data Models, its type is not checked'
+												 % el["entity_type"])
+		return sections, comments
+
+	@staticmethod
+	def get_subscriptions_health(stalled_after=timedelta(hours=DEFAULT_STALLED_HOURS), workers=ORION_WORKERS,
+								 datamodels=None):
+		"""
+		Retrieves concurrently the subscription of every integrated Data Model from Orion, one per shard, and joins
+		its notification status with the internal configuration
+
+		:param timedelta stalled_after: time without notifications after which a subscription is stalled
+		:param int workers: maximum number of concurrent requests to Orion
+		:param dict datamodels: values of every integrated Data Model by name, e.g. a snapshot of the internal
+			configuration. If None, they are read from the internal configuration
+		:return: the delivery health of every subscription of the integrated Data Models
+		:rtype: list
+		"""
+		now = datetime.now(timezone.utc)
+		if datamodels is None:
+			with ConfigManager.internal_lock:
+				datamodels = {datamodel: ConfigManager.get_internal_datamodel(datamodel)
+							  for datamodel in ConfigManager.get_internal_sections()}
+
+		def get_subscription(shard):
+			datamodel, subscription_id = shard
+			return SubscriptionManager.get_subscription(
+				datamodel, datamodels[datamodel][ORION_SUBSCRIPTION_URL], subscription_id,
+				datamodels[datamodel][DATA_MODEL_FIWARE_SERVICE])
+
+		report = []
+		shards = [(datamodel, subscription_id) for datamodel, values in datamodels.items()
+				  for subscription_id in (values.get(DATA_MODEL_SUBSCRIPTION_ID) or '').split()]
+		for (datamodel, subscription_id), subscription, error in Helpers.run_in_parallel(get_subscription, shards,
+																						  workers):
+			health = {"datamodel": datamodel,
+					  "subscription_id": subscription_id,
+					  "fiware_service": datamodels[datamodel][DATA_MODEL_FIWARE_SERVICE],
+					  "orion_url": datamodels[datamodel][ORION_SUBSCRIPTION_URL]}
+			if error:
+				missing = getattr(error, 'status_code', None) == 404
+				health.update({"health": HEALTH_MISSING if missing else HEALTH_UNKNOWN, "error": str(error)})
+			else:
+				integration_date = datamodels[datamodel].get(INTEGRATION_DATE)
+				since = datetime.strptime(integration_date, "%Y-%m-%d %H:%M:%S").astimezone() \
+					if integration_date else now
+				health.update(SubscriptionManager.get_delivery_health(subscription, since, now, stalled_after))
+			report.append(health)
+		return report
+
+	@log_step('stats')
+	def stats(self, interval=CYGNUS_STATS_INTERVAL, watch=False):
+		"""
+		Main method of stats command: samples the counters of Cygnus management API every interval seconds
+		and yields the throughput and backpressure between samples, warning when events are being lost or
+		the channels are filling up
+
+		:param int interval: seconds between samples
+		:param bool watch: keep sampling until interrupted. Otherwise, only the stats between two samples are yielded
+		:return: the stats between consecutive samples
+		:rtype: generator
+		"""
+		try:
+			self.deployment_handler = self.initialize_deploy_handler(check_hdfs=False)
+		except Exception as e:
+			logging.error(e)
+			return
+		try:
+			monitor = CygnusMonitor(self.deployment_handler, ConfigManager.get_value(MAIN_SECTION, CYGNUS_HOST))
+			grouping_rules = self.get_grouping_rules_count(GROUPING_RULES)
+			monitor.poll()
+			while True:
+				time.sleep(interval)
+				stats = monitor.poll()
+				self.check_backpressure(stats, grouping_rules)
+				yield stats
+				if not watch:
+					break
+		except Exception as e:
+			logging.error(e)
+		finally:
+			self.deployment_handler.close_handler()
+
+	@staticmethod
+	def get_grouping_rules_count(grouping_rules_file):
+		"""
+		:param str grouping_rules_file: path of the grouping rules file
+		:return: number of grouping rules deployed, or None if there is no grouping rules file
+		:rtype: int
+		"""
+		if not os.path.isfile(grouping_rules_file):
+			return None
+		with open(grouping_rules_file) as file:
+			return len(json.load(file).get("grouping_rules", []))
+
+	@staticmethod
+	def check_backpressure(stats, grouping_rules=None):
+		"""
+		Warns about the events being lost, the channels filling up and the grouping rules loaded by Cygnus
+		not matching the deployed ones
+
+		:param dict stats: stats between two samples of Cygnus counters
+		:param int grouping_rules: number of grouping rules deployed
+		:return: None
+		"""
+		if stats["rejected_per_second"]:
+			logging.warning(msg.CYGNUS_EVENTS_REJECTED, {'rate': stats["rejected_per_second"]})
+		if stats["sink_failures_per_second"]:
+			logging.warning(msg.CYGNUS_SINK_FAILURES, {'rate': stats["sink_failures_per_second"]})
+		for name, channel in stats["channels"].items():
+			if channel["fill_ratio"] < CYGNUS_CHANNEL_FILL_WARNING:
+				continue
+			if channel["growth_per_second"] > 0:
+				logging.warning(msg.CYGNUS_CHANNEL_FILLING_UP, {
+					'channel': name, 'fill': channel["fill_ratio"] * 100,
+					'seconds': (channel["capacity"] - channel["events"]) / channel["growth_per_second"]})
+			else:
+				logging.warning(msg.CYGNUS_CHANNEL_FULL, {'channel': name, 'fill': channel["fill_ratio"] * 100})
+		if grouping_rules is not None and grouping_rules != stats["grouping_rules"]:
+			logging.warning(msg.CYGNUS_GROUPING_RULES_MISMATCH, {'loaded': stats["grouping_rules"],
+																 'deployed': grouping_rules})
+
+	@log_step('probe')
+	def probe(self, datamodel, count=1, interval=0, timeout=PROBE_TIMEOUT):
+		"""
+		Main method of probe command: measures the end-to-end latency of an integrated Data Model, from the update
+		of an entity in Orion until it is stored in HDFS, as many times as requested. The probe entity is
+		removed afterwards
+
+		:param str datamodel: integrated Data Model to probe
+		:param int count: number of probes
+		:param float interval: minimum seconds between probes. The throttling of the subscription is respected
+		:param float timeout: seconds to wait for every probe
+		:return: the latency of every probe and their percentiles, or None if the probe could not be made
+		:rtype: dict
+		"""
+		probe = None
+		try:
+			if datamodel not in ConfigManager.get_internal_sections():
+				raise DataModelNotIntegrated(datamodel)
+			with log_context(datamodel=datamodel):
+				model = {key: ConfigManager.get_optional_internal_value(datamodel, key) for key in
+						 [DATA_MODEL_TYPES, DATA_MODEL_FIWARE_SERVICE, DATA_MODEL_FIWARE_SERVICEPATH,
+						  DATA_MODEL_FILE_PATH, DATA_MODEL_FILE_NAME]}
+				hdfs = ConfigManager.get_hdfs_section()
+				hdfs_file = CygnusConfManager.get_hdfs_file_path(model, hdfs[HDFS_FORMAT_FILE], hdfs[HDFS_USERNAME])
+				attribute = Helpers.get_notified_attribute(
+					ConfigManager.get_optional_internal_value(datamodel, DATA_MODEL_WATCHED_ATTRIBUTES),
+					ConfigManager.get_optional_internal_value(datamodel, DATA_MODEL_NOTIFY_ATTRIBUTES), PROBE_ATTRIBUTE)
+				try:
+					monitor = CygnusMonitor(self.deployment_handler, ConfigManager.get_value(MAIN_SECTION, CYGNUS_HOST))
+				except Exception:
+					monitor = None
+				orion_url = ConfigManager.get_internal_value(datamodel, ORION_SUBSCRIPTION_URL)
+				probe = LatencyProbe(self.deployment_handler, orion_url,
+									 model[DATA_MODEL_FIWARE_SERVICE], model[DATA_MODEL_FIWARE_SERVICEPATH],
+									 model[DATA_MODEL_TYPES].split()[0], attribute, hdfs[HDFS_HOST], hdfs[HDFS_PORT],
+									 hdfs[HDFS_USERNAME], hdfs_file, hdfs[HDFS_OAUTH2_TOKEN], monitor)
+				logging.info(msg.STARTING_PROBE, {'datamodel': datamodel, 'count': count, 'entity': probe.entity_id,
+												  'file': hdfs_file})
+				unmatched = [key for key in (DATA_MODEL_Q, DATA_MODEL_GEO_Q)
+							 if ConfigManager.get_optional_internal_value(datamodel, key)]
+				id_pattern = ConfigManager.get_optional_internal_value(datamodel, DATA_MODEL_ID_PATTERN)
+				if id_pattern and not re.fullmatch(id_pattern, probe.entity_id):
+					unmatched.append(DATA_MODEL_ID_PATTERN)
+				if unmatched:
+					logging.warning(msg.PROBE_FILTERS, {'keys': ', '.join(unmatched), 'datamodel': datamodel})
+
+				throttling = ConfigManager.get_optional_internal_value(datamodel, DATA_MODEL_THROTTLING)
+				wait = max(interval, float(throttling) if throttling else 0)
+				runs = []
+				for run in range(1, count + 1):
+					if run > 1:
+						time.sleep(wait)
+					latency = probe.run(timeout)
+					runs.append(latency)
+					if latency["total"] is None:
+						Tracer.count('probes.timed_out')
+						logging.warning(msg.PROBE_TIMED_OUT, {'run': run, 'timeout': timeout})
+					else:
+						logging.info(msg.PROBE_RESULT, dict(
+							{key: '%.3f' % value if value is not None else 'n/a' for key, value in latency.items()},
+							run=run, total=latency["total"]))
+
+			report = {"datamodel": datamodel, "entity": probe.entity_id, "hdfs_file": hdfs_file, "runs": runs,
+					  "timed_out": sum(1 for el in runs if el["total"] is None), "percentiles": {}}
+			for key in ("total", "orion_to_cygnus", "cygnus_to_hdfs"):
+				values = [el[key] for el in runs if el["total"] is not None and el[key] is not None]
+				report["percentiles"][key] = {"p%s" % percentile: Helpers.get_percentile(values, percentile)
+											  for percentile in LATENCY_PERCENTILES}
+			logging.info(msg.PROBE_SUCCESS)
+			return report
+		except Exception as e:
+			logging.error(e)
+			logging.info(msg.PROBE_ERROR)
+		finally:
+			if probe:
+				try:
+					probe.clean()
+					logging.debug(msg.PROBE_ENTITY_REMOVED, {'entity': probe.entity_id})
+				except Exception as e:
+					logging.error(e)
+			self.deployment_handler.close_handler()
+
+	@log_step('loadgen')
+	def loadgen(self, datamodels, entities, profile, workers=LOADGEN_WORKERS, keep=False):
+		"""
+		Main method of loadgen command: creates synthetic entities of the types and fiware services of some
+		Data Models of the configuration file and updates them following a load profile. The entities are
+		removed afterwards
+
+		:param list datamodels: datamodels passed by parameter on loadgen command
+		:param int entities: number of synthetic entities of every Data Model
+		:param list profile: (seconds, rate) points of the load profile
+		:param int workers: maximum number of concurrent requests to Orion
+		:param bool keep: keep the synthetic entities in Orion
+		:return: the achieved load, or None if the load could not be generated
+		:rtype: dict
+		"""
+		generator = None
+		try:
+			targets = []
+			for datamodel in self.get_datamodels(datamodels):
+				self.check_datamodel(datamodel)
+				targets.append({
+					"orion_url": self.get_orion_url(datamodel),
+					"fiware_service": ConfigManager.get_value(datamodel, DATA_MODEL_FIWARE_SERVICE),
+					"fiware_servicepath": ConfigManager.get_value(datamodel, DATA_MODEL_FIWARE_SERVICEPATH),
+					"types": ConfigManager.get_value(datamodel, DATA_MODEL_TYPES).split(),
+					"attribute": Helpers.get_notified_attribute(
+						ConfigManager.get_optional_value(datamodel, DATA_MODEL_WATCHED_ATTRIBUTES),
+						ConfigManager.get_optional_value(datamodel, DATA_MODEL_NOTIFY_ATTRIBUTES), LOADGEN_ATTRIBUTE)})
+			generator = LoadGenerator(targets, workers)
+			logging.info(msg.STARTING_LOADGEN, {'entities': entities, 'datamodels': len(targets)})
+			generator.create_entities(entities)
+			logging.info(msg.LOADGEN_STARTED, {'duration': profile[-1][0],
+											   'profile': ','.join('%g:%g' % point for point in profile)})
+			load = generator.run(profile)
+			Tracer.count('loadgen.updates', load["sent"])
+			logging.info(msg.LOADGEN_SUCCESS)
+			return load
+		except Exception as e:
+			logging.error(e)
+			logging.info(msg.LOADGEN_ERROR)
+		finally:
+			if generator and generator.entities and not keep:
+				try:
+					generator.delete_entities()
+					logging.info(msg.LOADGEN_ENTITIES_REMOVED)
+				except Exception as e:
+					logging.error(e)
+
+	@log_step('simulate')
+	def simulate(self, datamodels, events_file, rules_file=None, sample_seconds=None):
+		"""
+		Main method of simulate command: evaluates a recorded notification stream against the grouping rules
+		of some Data Models of the configuration file, or against a grouping rules file, as Cygnus does.
+		Reports the hits of every rule, the unmatched events, the overlapping rules and the projected
+		HDFS files and bytes per day of every destination
+
+		:param list datamodels: datamodels passed by parameter on simulate command
+		:param file events_file: JSON lines file with the notifications or entities of the stream
+		:param str rules_file: grouping rules file. The rules of the datamodels are built if None
+		:param float sample_seconds: seconds of traffic covered by the stream. They are taken from the
+			notifiedAt of the notifications if None
+		:return: the report, or None if the stream could not be evaluated
+		:rtype: dict
+		"""
+		try:
+			format_file = ConfigManager.get_value(HDFS_SECTION, HDFS_FORMAT_FILE)
+			if rules_file:
+				with open(rules_file) as file:
+					rules = json.load(file)["grouping_rules"]
+			else:
+				models = []
+				datamodels = self.get_datamodels(datamodels)
+				rule_ids = ConfigManager.get_grouping_rule_ids(datamodels)
+				for datamodel in datamodels:
+					self.check_datamodel(datamodel)
+					model = {key: ConfigManager.get_value(datamodel, key) for key in
+							 [DATA_MODEL_TYPES, DATA_MODEL_FIWARE_SERVICEPATH, DATA_MODEL_FILE_PATH,
+							  DATA_MODEL_FILE_NAME]}
+					model[DATA_MODEL_GROUPING_RULE_ID] = rule_ids[datamodel]
+					models.append(model)
+				rules = CygnusConfManager.build_grouping_rules(models, format_file)
+			logging.info(msg.STARTING_SIMULATION, {'rules': len(rules)})
+
+			simulator = GroupingRulesSimulator(rules, format_file)
+			notified_at = []
+			for line in events_file:
+				if not line.strip():
+					continue
+				record = json.loads(line)
+				simulator.add(record)
+				if "notifiedAt" in record:
+					notified_at.append(Helpers.parse_iso_datetime(record["notifiedAt"]).timestamp())
+			if not sample_seconds:
+				sample_seconds = max(notified_at) - min(notified_at) if notified_at else 0
+				if sample_seconds <= 0:
+					logging.warning(msg.SIMULATION_SAMPLE_SECONDS)
+					sample_seconds = SECONDS_PER_DAY
+
+			report = simulator.get_report(sample_seconds, ConfigManager.get_value(HDFS_SECTION, HDFS_USERNAME))
+			Tracer.count('simulate.events', report["events"])
+			for overlap in report["overlaps"]:
+				logging.warning(msg.GROUPING_RULES_OVERLAP, overlap)
+			if report["unmatched"]:
+				logging.warning(msg.UNMATCHED_EVENTS, {'events': report["unmatched"]})
+			logging.info(msg.SIMULATION_SUCCESS, {'events': report["events"]})
+			return report
+		except Exception as e:
+			logging.error(e)
+			logging.info(msg.SIMULATION_ERROR)
+
+	def serve(self, socket_path=SERVE_SOCKET):
+		"""
+		Main method of serve command: serves the integrate, modify and delete operations and the integration
+		state through a local HTTP API until the process is interrupted or terminated, keeping the configuration,
+		the Orion session and the SSH session to Cygnus warm among operations
+
+		:param str socket_path: path of the unix socket where the API listens
+		:return: None
+		"""
+		from cb_bdti.core.server import BDTIServer
+		try:
+			server = BDTIServer(self, socket_path)
+		except Exception as e:
+			logging.error(e)
+			self.deployment_handler.close_handler()
+			return
+		signal.signal(signal.SIGTERM, lambda signum, frame: server.shutdown())
+		try:
+			server.serve()
+		except KeyboardInterrupt:
+			pass
+		logging.info(msg.SERVER_STOPPED)
+
+	def watch(self, debounce=WATCH_DEBOUNCE, poll_interval=WATCH_POLL_INTERVAL, polling=False):
+		"""
+		Main method of watch command: waits for the changes of the configuration file and applies those
+		of its datamodels sections, in debounced batches, until the process is interrupted or terminated.
+		The configuration file when the watch starts is taken as already applied
+
+		:param float debounce: seconds without changes after which a batch of changes is applied
+		:param float poll_interval: seconds between checks of the configuration file when polling
+		:param bool polling: poll the configuration file even if inotify is available
+		:return: None
+		"""
+		from cb_bdti.utils.watcher import FileWatcher
+		watcher = FileWatcher(self.file_path, debounce, poll_interval, polling)
+		self.deployment_handler.keep_alive = True
+		signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit())
+		snapshot = ConfigManager.get_datamodel_sections()
+		pending_deploy = False
+		logging.info(msg.WATCHING, {'path': self.file_path, 'mode': watcher.mode, 'debounce': debounce})
+		try:
+			while True:
+				changes = watcher.wait()
+				logging.debug(msg.CONFIG_FILE_CHANGED, {'changes': changes})
+				snapshot, pending_deploy = self.apply_config_changes(snapshot, pending_deploy)
+		except (KeyboardInterrupt, SystemExit):
+			pass
+		finally:
+			watcher.close()
+			self.deployment_handler.close_handler(force=True)
+		logging.info(msg.WATCH_STOPPED)
+
+	@log_step('apply_config_changes')
+	def apply_config_changes(self, snapshot, pending_deploy=False):
+		"""
+		Applies the changes of the datamodels sections of the configuration file since the last applied version,
+		planning only the datamodels whose sections were added, changed or removed (see apply).
+		The datamodels whose change fails keep their last applied version, so the change is retried on the
+		next batch
+
+		:param dict snapshot: values of each datamodel section by name in the last applied version
+		:param bool pending_deploy: if the deployment of a previous batch failed
+		:return: a tuple (last applied version, if the deployment is still pending)
+		:rtype: tuple
+		"""
+		try:
+			ConfigManager.reload_config()
+			ConfigManager.reload_internal_conf()
+			self.configure_orion_limits()
+			self.configure_type_registry()
+			current = ConfigManager.get_datamodel_sections()
+		except Exception as e:
+			logging.error(msg.CONFIG_FILE_NOT_APPLIED, {'error': e})
+			return snapshot, pending_deploy
+
+		changes = ConfigManager.diff_datamodel_sections(snapshot, current)
+		if not any(changes.values()) and not pending_deploy:
+			logging.info(msg.NO_CONFIG_CHANGES)
+		else:
+			logging.info(msg.CONFIG_CHANGES, {key: ', '.join(datamodels) or 'none'
+											  for key, datamodels in changes.items()})
+		applied = dict(snapshot)
+		try:
+			plan = IntegrationPlanner.get_plan(self.cygnus_url,
+											   changes["created"] + changes["updated"] + changes["deleted"])
+			pending_deploy = self.execute_plan(plan, pending_deploy=pending_deploy)
+		except Exception as e:
+			logging.error(e)
+			return snapshot, pending_deploy
+		failed = [step["datamodel"] for step in plan["steps"] if step.get("error")]
+		for datamodel in changes["created"] + changes["updated"] + changes["deleted"]:
+			if datamodel in failed:
+				continue
+			if datamodel in current:
+				applied[datamodel] = current[datamodel]
+			else:
+				applied.pop(datamodel)
+		return applied, pending_deploy
+
+	def apply(self, plan_only=False, workers=ORION_WORKERS):
+		"""
+		Main method of apply command: takes the configuration file as the desired state of the integration
+		and plans the changes that make the integration match it (see IntegrationPlanner). Then, unless only
+		the plan is wanted, executes it without prompts
+
+		:param bool plan_only: only compute the plan, without executing it
+		:param int workers: maximum number of concurrent requests to Orion
+		:return: the plan, with the error of every failed step, or None if it cannot be computed
+		:rtype: dict
+		"""
+		logging.info(msg.STARTING_APPLY)
+		try:
+			plan = IntegrationPlanner.get_plan(self.cygnus_url)
+			actions = [step["action"] for step in plan["steps"]]
+			logging.info(msg.APPLY_PLAN, dict({action: actions.count(action) for action in PLAN_ORION_REQUESTS},
+											  orion_requests=plan["orion_requests"],
+											  redeploy='' if plan["redeploy"] else 'not '))
+			if plan_only:
+				return plan
+			plan["deploy_pending"] = self.execute_plan(plan, workers)
+			self.deployment_handler.close_handler()
+		except Exception as e:
+			logging.error(e)
+			logging.info(msg.APPLY_ERROR)
+			return None
+		if plan["deploy_pending"] or any(step.get("error") for step in plan["steps"]):
+			logging.info(msg.APPLY_ERROR)
+		else:
+			logging.info(msg.APPLY_SUCCESS)
+		return plan
+
+	@log_step('execute_plan')
+	def execute_plan(self, plan, workers=ORION_WORKERS, pending_deploy=False):
+		"""
+		Executes a plan: its Orion requests run concurrently, grouped by Orion so each one has its own workers,
+		the internal configuration is written once and Cygnus is redeployed once, only if the agent or the grouping
+		rules changed or a previous deployment failed. The error of every failed step is added to it, and the
+		datamodel keeps its integration, without subscription if a recreate failed after removing the previous one.
+		Creating it again keeps its integration date and a renewal of its expiration. The failed steps are also reported by Orion. Steps whose requests were not sent because their Orion is
+		failing are also marked as pending
+
+		:param dict plan: the plan (see IntegrationPlanner.get_plan)
+		:param int workers: maximum number of concurrent requests to each Orion
+		:param bool pending_deploy: if a previous deployment failed
+		:return: if the deployment is still pending because it failed
+		:rtype: bool
+		"""
+		steps = [step for step in plan["steps"] if step["action"] not in [PLAN_UNCHANGED, PLAN_INVALID]]
+		# a create step may have a record too: the datamodel lost its subscription in a recreate that failed
+		integrated = ConfigManager.get_internal_sections()
+		records = {step["datamodel"]: ConfigManager.get_internal_datamodel(step["datamodel"]) for step in steps
+				   if step["datamodel"] in integrated}
+		values = {step["datamodel"]: Helpers.keep_renewed_expires(
+			ConfigManager.get_section_dict(step["datamodel"]), records.get(step["datamodel"], {}))
+				  for step in steps if step["action"] != PLAN_DELETE}
+
+		def request(step):
+			datamodel, action, record = step["datamodel"], step["action"], records.get(step["datamodel"])
+			with log_context(datamodel=datamodel):
+				if action in [PLAN_DELETE, PLAN_RECREATE] and record.get(DATA_MODEL_SUBSCRIPTION_ID):
+					# no subscription ID if a previous recreate failed after the removal
+					SubscriptionManager.rm_subscriptions(datamodel, record[ORION_SUBSCRIPTION_URL],
+														 record[DATA_MODEL_SUBSCRIPTION_ID],
+														 record[DATA_MODEL_FIWARE_SERVICE], missing_ok=True)
+					if action == PLAN_RECREATE:
+						# until the new subscription is made, the datamodel has none, so a failure is retried as a
+						# create by the next plan
+						with ConfigManager.internal_lock:
+							ConfigManager.set_internal_value(datamodel, DATA_MODEL_SUBSCRIPTION_ID, '')
+						step["removed"] = True
+				if action == PLAN_PATCH:
+					SubscriptionManager.update_subscriptions(datamodel, record[ORION_SUBSCRIPTION_URL],
+															 record[DATA_MODEL_SUBSCRIPTION_ID],
+															 record[DATA_MODEL_FIWARE_SERVICE], step["patch"])
+				if action in [PLAN_CREATE, PLAN_RECREATE]:
+					params = SubscriptionManager.get_subscription_params(datamodel, values[datamodel])
+					shards = SubscriptionManager.get_shards(datamodel, values[datamodel], self.cygnus_url)
+					return SubscriptionManager.do_subscriptions(datamodel, step["orion_url"], shards, **params)
+				return record[DATA_MODEL_SUBSCRIPTION_ID] if record else None
+
+		orions = {}
+		for step in steps:
+			orions.setdefault(step["orion_url"], []).append(step)
+		results = Helpers.run_in_parallel(
+			lambda orion_url: Helpers.run_in_parallel(request, orions[orion_url], workers), list(orions), len(orions))
+		applied = 0
+		for step, subscription_id, error in [result for orion_url, orion_results, error in results
+											 for result in orion_results]:
+			datamodel, action = step["datamodel"], step["action"]
+			with log_context(datamodel=datamodel):
+				if isinstance(error, OrionCircuitOpen):
+					step.update(error=str(error), pending=True)
+					logging.debug(error)
+					continue
+				if error:
+					step["error"] = str(error)
+					logging.error(error)
+					continue
+				if action == PLAN_DELETE:
+					ConfigManager.remove_internal_datamodel(datamodel)
+				elif action == PLAN_CREATE and datamodel not in records:
+					ConfigManager.set_internal_datamodel(datamodel, subscription_id, step["orion_url"])
+					ConfigManager.set_internal_value(datamodel, DATA_MODEL_GROUPING_RULE_ID,
+													 str(step["grouping_rule_id"]))
+				else:
+					ConfigManager.update_internal_datamodel(datamodel, subscription_id, step["orion_url"])
+				if action != PLAN_DELETE and values[datamodel].get(DATA_MODEL_EXPIRES):
+					ConfigManager.set_internal_value(datamodel, DATA_MODEL_EXPIRES,
+													 values[datamodel][DATA_MODEL_EXPIRES])
+				applied += 1
+				Tracer.count('datamodels.%s' % action)
+				logging.info(msg.PLAN_STEP_APPLIED, {'datamodel': datamodel, 'action': action})
+		if applied or any(step.get("removed") for step in steps):
+			ConfigManager.update_internal_conf_file()
+		for orion_url, orion_steps in orions.items():
+			failed = [step["datamodel"] for step in orion_steps if step.get("error") and not step.get("pending")]
+			if failed:
+				logging.warning(msg.ORION_STEPS_FAILED, {'url': orion_url, 'failed': len(failed),
+														 'total': len(orion_steps), 'datamodels': ', '.join(failed)})
+		self.log_pending([step["datamodel"] for step in steps if step.get("pending")])
+
+		try:
+			agent_changed = self.create_cygnus_agent(AGENT)
+			rules_changed = any(self.create_grouping_rules(GROUPING_RULES).values())
+			if agent_changed or rules_changed or pending_deploy:
+				self.deployment_handler.check_session()
+				self.deployment_handler.deploy_cygnus()
+			else:
+				logging.info(msg.CYGNUS_UNCHANGED)
+			return False
+		except Exception as e:
+			logging.error(e)
+			return True
+
+	@log_step('integrate')
 	def integrate(self, datamodels):
 		"""
-		Main method of integrate command: creates subscription, Cygnus agent and Grouping Rules and deploy Cygnus
+		Main method of integrate command: creates subscription, Cygnus agent and Grouping Rules and deploy Cygnus.
+		The datamodels of each Orion are integrated concurrently, once the user confirmed which integrated ones are
+		modified, and Cygnus is deployed for the ones integrated even if an Orion failed
 
-		:return: None 
+		:return: if the integration finished without errors
+		:rtype: bool
 		"""
 		logging.info(msg.STARTING_INTEGRATION)
 		try:
 			datamodels = self.get_datamodels(datamodels)
-			deploy_cygnus = self.create_subscriptions(datamodels)
-			if deploy_cygnus:
+			confirmed = self.confirm_datamodels([datamodel for datamodel in datamodels
+												 if ConfigManager.is_section_present(datamodel) and
+												 ConfigManager.get_subscription_id(datamodel)],
+												msg.DATAMODEL_EXISTS, msg.ASK_MODIFY)
+			Outbox.record({datamodel: {OUTBOX_OPERATION: OUTBOX_CREATE} for datamodel in datamodels
+						   if not ConfigManager.get_subscription_id(datamodel)}, deploy=True)
+			deploy_cygnus, failed = self.run_by_orion(lambda orion_datamodels: self.create_subscriptions(
+				orion_datamodels, confirmed), datamodels, self.get_orion_url)
+			if any(deploy_cygnus):
 				self.create_cygnus_agent(AGENT)
 				self.create_grouping_rules(GROUPING_RULES)
 				self.deployment_handler.deploy_cygnus()
-			self.deployment_handler.close_handler()
+			if failed:
+				raise OrionsFailed(failed)
+			Outbox.complete_deploy()
 			logging.info(msg.INTEGRATION_SUCCESS)
+			return True
 		except Exception as e:
 			logging.error(e)
 			logging.info(msg.INTEGRATION_ERROR)
+			return False
+		finally:
+			self.deployment_handler.close_handler()
 
+	@log_step('modify')
 	def modify(self, datamodels, force=False):
 		"""
-		Main method of modify command: modify subscriptions, creates Cygnus agent and Grouping Rules and deploy Cygnus
+		Main method of modify command: modify subscriptions, creates Cygnus agent and Grouping Rules and deploy Cygnus.
+		The datamodels of each Orion are modified concurrently, once the user confirmed which ones not integrated are
+		integrated, and Cygnus is deployed for the ones modified even if an Orion failed
 
 		:param list datamodels: list of datamodels passed by parameter on modify command
-		:return: None
+		:return: if the modification finished without errors
+		:rtype: bool
 		"""
 		logging.info(msg.STARTING_MODIFICATION)
 		try:
 			datamodels = self.get_datamodels(datamodels)
-			deploy_cygnus = self.modify_subscriptions(datamodels, force)
-			if deploy_cygnus:
+			confirmed = self.confirm_datamodels([datamodel for datamodel in datamodels
+												 if ConfigManager.is_section_present(datamodel) and
+												 not ConfigManager.get_subscription_id(datamodel)],
+												msg.DATAMODEL_NOT_INTEGRATED, msg.ASK_INTEGRATE)
+			Outbox.record({datamodel: {OUTBOX_OPERATION: OUTBOX_RECREATE,
+									   DATA_MODEL_SUBSCRIPTION_ID: ConfigManager.get_subscription_id(datamodel)}
+						   for datamodel in datamodels if ConfigManager.get_subscription_id(datamodel)}, deploy=True)
+			deploy_cygnus, failed = self.run_by_orion(lambda orion_datamodels: self.modify_subscriptions(
+				orion_datamodels, force, confirmed), datamodels, self.get_orion_url)
+			if any(deploy_cygnus):
 				self.create_grouping_rules(GROUPING_RULES)
 				self.create_cygnus_agent(AGENT)
 				self.deployment_handler.deploy_cygnus()
-			self.deployment_handler.close_handler()
+			if failed:
+				raise OrionsFailed(failed)
+			Outbox.complete_deploy()
 			logging.info(msg.MODIFICATION_SUCCESS)
+			return True
 		except Exception as e:
 			logging.error(e)
 			logging.info(msg.MODIFICATION_ERROR)
+			return False
+		finally:
+			self.deployment_handler.close_handler()
 
+	@log_step('delete')
 	def delete(self, datamodels, deploy, force):
 		"""
 		Main method of delete command: delete subscriptions and, optionally, creates Cygnus agent and 
-		Grouping Rules and deploy Cygnus
+		Grouping Rules and deploy Cygnus. The datamodels are deleted in bulk (see delete_subscriptions), and
+		Cygnus is deployed for the ones deleted even if an Orion failed
 
 		:param list datamodels: datamodels passed by parameter on delete command
 		:param bool deploy: Flag that indicates if redeployment of cygnus is needed
-		:return: None
+		:return: if the removal finished without errors
+		:rtype: bool
 		"""
 		try:
 			logging.info(msg.STARTING_REMOVAL)
 			integrated_datamodels = self.get_datamodels(all=True)
 			datamodels2delete = self.get_datamodels(datamodels, internal=True)
-			for datamodel in datamodels2delete:
-				if datamodel in integrated_datamodels:
-					self.delete_subscription(datamodel, force)
-				else:
-					logging.error(msg.DATAMODEL_NOT_INTEGRATED.format(datamodel=datamodel))
+			Outbox.record({datamodel: {OUTBOX_OPERATION: OUTBOX_DELETE,
+									   DATA_MODEL_SUBSCRIPTION_ID: ConfigManager.get_subscription_id(datamodel)}
+						   for datamodel in datamodels2delete if datamodel in integrated_datamodels}, deploy=deploy)
 
-			logging.info(msg.CYGNUS_DEPLOYMENT.format(deploy='' if deploy else 'not '))
+			for datamodel in datamodels2delete:
+				if datamodel not in integrated_datamodels:
+					logging.error(msg.DATAMODEL_NOT_INTEGRATED, {'datamodel': datamodel})
+			outcomes = self.delete_subscriptions([datamodel for datamodel in datamodels2delete
+												  if datamodel in integrated_datamodels], force)
+			self.log_pending([datamodel for datamodel, outcome in outcomes.items()
+							  if outcome["outcome"] == DELETE_PENDING])
+			failed = sorted({ConfigManager.get_optional_internal_value(datamodel, ORION_SUBSCRIPTION_URL)
+							 for datamodel, outcome in outcomes.items()
+							 if outcome["outcome"] in (DELETE_FAILED, DELETE_PENDING)})
+			logging.info(msg.CYGNUS_DEPLOYMENT, {'deploy': '' if deploy else 'not '})
 			if deploy:
 				self.create_cygnus_agent(AGENT)
 				self.create_grouping_rules(GROUPING_RULES)
 				self.deployment_handler.deploy_cygnus()
+				if not failed:
+					Outbox.complete_deploy()
 				self.deployment_handler.close_handler()
+			if failed:
+				raise OrionsFailed(failed)
 			logging.info(msg.REMOVAL_SUCCESS)
+			return True
 
 		except Exception as e:
 			logging.error(e)
 			logging.info(msg.REMOVAL_ERROR)
+			return False
+
+	@log_step('resume')
+	def resume(self, retries=RESUME_RETRIES, backoff=RESUME_BACKOFF, dry_run=False, discard=False):
+		"""
+		Main method of resume command: completes the Orion mutations of the interrupted integrate, modify and
+		delete runs recorded in the outbox, without prompts. The failed ones are retried after a backoff doubled
+		on every pass. Mutations that the interrupted run did but could not remove from the outbox are not redone.
+		Cygnus is deployed if any mutation was completed or an interrupted run did not deploy it
+
+		:param int retries: passes over the mutations still pending after the first one
+		:param float backoff: seconds waited before the first retry
+		:param bool dry_run: only show the pending mutations
+		:param bool discard: discard the pending mutations and deployment, without doing them
+		:return: if nothing is pending at the end, or it is a dry run
+		:rtype: bool
+		"""
+		logging.info(msg.STARTING_RESUME)
+		try:
+			pending = Outbox.get_pending()
+			deploy = Outbox.is_deploy_pending()
+			for datamodel, mutation in pending.items():
+				logging.info(msg.PENDING_MUTATION, dict(mutation, datamodel=datamodel))
+			if deploy:
+				logging.info(msg.PENDING_DEPLOYMENT)
+			if not pending and not deploy:
+				logging.info(msg.NOTHING_TO_RESUME)
+				return True
+			if dry_run:
+				return True
+			if discard:
+				Outbox.clear()
+				logging.info(msg.OUTBOX_DISCARDED, {'count': len(pending)})
+				return True
+
+			completed = 0
+			for attempt in range(retries + 1):
+				if attempt:
+					seconds = min(backoff * 2 ** (attempt - 1), RESUME_MAX_BACKOFF)
+					logging.info(msg.RESUME_RETRY, {'pending': len(pending), 'seconds': seconds})
+					time.sleep(seconds)
+				failed = {}
+				for datamodel, mutation in pending.items():
+					with log_context(datamodel=datamodel):
+						try:
+							self.resume_mutation(datamodel, mutation)
+							Outbox.complete(datamodel)
+							completed += 1
+							logging.info(msg.MUTATION_RESUMED, dict(mutation, datamodel=datamodel))
+						except Exception as e:
+							logging.debug(e) if isinstance(e, OrionCircuitOpen) else logging.error(e)
+							Outbox.record_failure(datamodel, e)
+							failed[datamodel] = mutation
+				if failed:
+					Outbox.save()
+				pending = failed
+				if not pending:
+					break
+
+			if completed or deploy:
+				self.create_cygnus_agent(AGENT)
+				self.create_grouping_rules(GROUPING_RULES)
+				self.deployment_handler.deploy_cygnus()
+				Outbox.complete_deploy()
+			self.deployment_handler.close_handler()
+		except Exception as e:
+			logging.error(e)
+			logging.info(msg.RESUME_ERROR, {'pending': len(Outbox.get_pending())})
+			return False
+		if pending:
+			logging.info(msg.RESUME_ERROR, {'pending': len(pending)})
+			return False
+		logging.info(msg.RESUME_SUCCESS, {'completed': completed})
+		return True
+
+	def resume_mutation(self, datamodel, mutation):
+		"""
+		Does the pending mutation of a datamodel, unless the interrupted run already did it: a datamodel to create
+		is already integrated, one to recreate has another subscription or one to delete is not integrated
+
+		:param str datamodel: the datamodel
+		:param dict mutation: the mutation, as recorded in the outbox
+		:return: None
+		"""
+		operation = mutation[OUTBOX_OPERATION]
+		subscription_id = ConfigManager.get_subscription_id(datamodel)
+		if not subscription_id and operation != OUTBOX_CREATE:
+			return
+		if subscription_id and (operation == OUTBOX_CREATE or
+								subscription_id != mutation.get(DATA_MODEL_SUBSCRIPTION_ID, subscription_id)):
+			return
+		if operation != OUTBOX_DELETE:
+			self.check_datamodel(datamodel)
+		if operation != OUTBOX_CREATE:
+			# the interrupted run may have removed it
+			orion_url = ConfigManager.get_internal_value(datamodel, ORION_SUBSCRIPTION_URL)
+			fiware_service = ConfigManager.get_internal_value(datamodel, DATA_MODEL_FIWARE_SERVICE)
+			SubscriptionManager.rm_subscriptions(datamodel, orion_url, subscription_id, fiware_service, missing_ok=True)
+		if operation == OUTBOX_DELETE:
+			ConfigManager.remove_internal_datamodel(datamodel)
+		elif operation == OUTBOX_CREATE:
+			ConfigManager.set_internal_datamodel(datamodel, self.subscribe(datamodel), self.get_orion_url(datamodel))
+		else:
+			ConfigManager.update_internal_datamodel(datamodel, self.subscribe(datamodel), self.get_orion_url(datamodel))
+		ConfigManager.update_internal_conf_file()
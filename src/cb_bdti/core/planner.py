@@ -0,0 +1,140 @@
+from cb_bdti.config.constants import *
+from cb_bdti.config.cygnus.manager import CygnusConfManager
+from cb_bdti.config.manager import ConfigManager
+from cb_bdti.core.handler.manager import SubscriptionManager
+from cb_bdti.utils.helpers import Helpers
+from cb_bdti.utils.validators import Validators
+
+
+class IntegrationPlanner(object):
+	"""
+	Computes the plan that makes the integration match the configuration file, taken as the desired state:
+	the subscriptions to create, patch, recreate or delete, the integrated datamodels whose record changes
+	without any Orion request, and the changes of the Cygnus agent and grouping rules.
+	Planning makes no request and writes no file
+	"""
+
+	@staticmethod
+	def get_changed_keys(values, record):
+		"""
+		:param dict values: values of the datamodel section
+		:param dict record: values of the integrated datamodel
+		:return: the keys of the datamodel section whose values differ from the integrated ones, sorted
+		:rtype: list
+		"""
+		record_values = {key: value for key, value in record.items() if key not in DATA_MODEL_INTERNAL_KEYS}
+		return sorted(key for key in set(values) | set(record_values) if values.get(key) != record_values.get(key))
+
+	@classmethod
+	def plan_datamodel(cls, datamodel, values, record, cygnus_url):
+		"""
+		Plans the change of a datamodel of the configuration file. An integrated subscription is patched when
+		only its body changes, and recreated when its fiware service or service path, its Orion or its shards
+		change, as those cannot be patched. The subscriptions of the shards are also recreated when their subject
+		or notification change, as each shard has its own
+
+		:param str datamodel: the datamodel
+		:param dict values: values of the datamodel section
+		:param dict record: values of the integrated datamodel, None if it is not integrated
+		:param str cygnus_url: URL where Orion notifies Cygnus
+		:return: the step of the plan, with the URL of the Orion subscriptions of the datamodel and its number of
+			shards
+		:rtype: dict
+		"""
+		step = {"datamodel": datamodel}
+		if record is not None:
+			values = Helpers.keep_renewed_expires(values, record)
+		try:
+			params = SubscriptionManager.get_subscription_params(datamodel, values)
+			shards = SubscriptionManager.get_shards(datamodel, values, cygnus_url)
+			step["shards"] = len(shards)
+			orion_section = ConfigManager.get_orion_section(datamodel, values)
+			step["orion_url"] = Helpers.get_orion_url(ConfigManager.get_value(orion_section, ORION_HOST), orion_section)
+		except Exception as e:
+			step.update(action=PLAN_INVALID, error=str(e))
+			return step
+		if record is None or not record.get(DATA_MODEL_SUBSCRIPTION_ID):
+			# an integrated datamodel without subscription lost it in a recreate that failed after the removal
+			step["action"] = PLAN_CREATE
+			return step
+
+		step["fields"] = cls.get_changed_keys(values, record)
+		headers, payload = SubscriptionManager.build_subscription(cygnus_url, **params)
+		try:
+			current_headers, current = SubscriptionManager.build_subscription(
+				cygnus_url, **SubscriptionManager.get_subscription_params(datamodel, record))
+			current_shards = SubscriptionManager.get_shards(datamodel, record, cygnus_url)
+		except Exception:
+			# integrated by a version that did not record every key
+			current_headers, current, current_shards = None, {}, None
+		if record.get(ORION_SUBSCRIPTION_URL) != step["orion_url"] or headers != current_headers or \
+				shards != current_shards:
+			step["action"] = PLAN_RECREATE
+			return step
+		patch = {key: payload.get(key) for key in sorted(set(payload) | set(current))
+				 if payload.get(key) != current.get(key)}
+		if len(shards) > 1 and {"subject", "notification"} & set(patch):
+			step["action"] = PLAN_RECREATE
+		elif patch:
+			step.update(action=PLAN_PATCH, patch=patch)
+		else:
+			step["action"] = PLAN_UPDATE if step["fields"] else PLAN_UNCHANGED
+		return step
+
+	@classmethod
+	def get_plan(cls, cygnus_url, datamodels=None, agent_file=AGENT, grouping_rules_file=GROUPING_RULES):
+		"""
+		Plans the changes that make the integration match the configuration file
+
+		:param str cygnus_url: URL where Orion notifies Cygnus
+		:param list datamodels: datamodels to plan. If None, every datamodel of the configuration file and every
+			integrated one
+		:param str agent_file: path of the current Cygnus agent file
+		:param str grouping_rules_file: path of the current grouping rules file
+		:return: the steps of every datamodel, the grouping rules added, changed and removed, if the agent
+			changes, if Cygnus must be redeployed and the number of Orion requests
+		:rtype: dict
+		"""
+		desired = ConfigManager.get_datamodel_sections()
+		integrated = ConfigManager.get_internal_sections()
+		if datamodels is None:
+			datamodels = list(desired) + [datamodel for datamodel in integrated if datamodel not in desired]
+		rule_ids = ConfigManager.get_grouping_rule_ids(integrated + [datamodel for datamodel in datamodels
+																	 if datamodel not in integrated])
+		models = {datamodel: dict(ConfigManager.get_internal_datamodel(datamodel),
+								  **{DATA_MODEL_GROUPING_RULE_ID: rule_ids[datamodel]})
+				  for datamodel in integrated}
+
+		steps = []
+		for datamodel in datamodels:
+			record = models.get(datamodel)
+			if datamodel not in desired:
+				if record is not None:
+					steps.append({"datamodel": datamodel, "action": PLAN_DELETE,
+								  "orion_url": record.get(ORION_SUBSCRIPTION_URL),
+								  "shards": len(ConfigManager.get_subscription_ids(datamodel))})
+					models.pop(datamodel)
+				continue
+			step = cls.plan_datamodel(datamodel, desired[datamodel], record, cygnus_url)
+			if step["action"] == PLAN_CREATE:
+				step["grouping_rule_id"] = rule_ids[datamodel]
+			if step["action"] != PLAN_INVALID:
+				values = Helpers.keep_renewed_expires(desired[datamodel], record) if record else desired[datamodel]
+				models[datamodel] = dict(values, **{DATA_MODEL_GROUPING_RULE_ID: rule_ids[datamodel]})
+			steps.append(step)
+
+		hdfs_section_dict = ConfigManager.get_hdfs_section()
+		Validators.check_hdfs_section(hdfs_section_dict)
+		agent = CygnusConfManager.build_flume_agent(hdfs_section_dict)
+		agent_changed = agent != CygnusConfManager.read_flume_agent(agent_file)
+		rules = CygnusConfManager.build_grouping_rules(list(models.values()),
+													   ConfigManager.get_value(HDFS_SECTION, HDFS_FORMAT_FILE))
+		previous_rules = CygnusConfManager.read_grouping_rules(grouping_rules_file)
+		rules_diff = CygnusConfManager.diff_grouping_rules(previous_rules, rules)
+
+		return {"steps": steps,
+				"grouping_rules": {key: [rule["id"] for rule in diff_rules] for key, diff_rules in rules_diff.items()},
+				"agent_changed": agent_changed,
+				# the order of the rules matters to Cygnus, so it is also compared
+				"redeploy": agent_changed or rules != previous_rules,
+				"orion_requests": sum(PLAN_ORION_REQUESTS[step["action"]] * step.get("shards", 1) for step in steps)}
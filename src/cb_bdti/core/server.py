@@ -0,0 +1,313 @@
+import contextvars
+import json
+import logging
+import os
+import socket
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler
+from socketserver import ThreadingUnixStreamServer
+from urllib.parse import urlparse, parse_qs
+from cb_bdti.config.constants import *
+from cb_bdti.config.manager import ConfigManager
+from cb_bdti.config import messages as msg
+from cb_bdti.core.handler.monitor import CygnusMonitor
+from cb_bdti.errors.core.handler import SocketInUse
+from cb_bdti.utils.helpers import Helpers
+
+# log handler of the operation in progress, copied to the threads of the operation by Helpers.run_in_parallel
+_operation_log = contextvars.ContextVar('operation_log', default=None)
+
+
+class UnixHTTPServer(ThreadingUnixStreamServer):
+	"""
+	HTTP server listening on a unix socket that only the user running it can connect to, as the operations
+	of the API change the integration without any other authentication
+	"""
+	daemon_threads = True
+
+	def server_bind(self):
+		# the socket is created without permissions for the rest of users, instead of removing them once it exists
+		umask = os.umask(SERVE_SOCKET_UMASK)
+		try:
+			super(UnixHTTPServer, self).server_bind()
+		finally:
+			os.umask(umask)
+
+
+class OperationLogHandler(logging.Handler):
+	"""
+	Collects the records logged by an operation, including the ones of the threads it runs, so the logs of an
+	operation are returned with its result
+	"""
+
+	def __init__(self, level=logging.INFO):
+		super(OperationLogHandler, self).__init__(level)
+		self.records = []
+
+	def emit(self, record):
+		if _operation_log.get() is self:
+			self.records.append({"level": record.levelname, "message": record.getMessage()})
+
+
+class BDTIRequestHandler(BaseHTTPRequestHandler):
+	"""
+	Maps the requests of the local API to the operations of the server
+	"""
+
+	def log_message(self, format, *args):
+		logging.debug('API %s', format % args)
+
+	def send_json(self, status_code, content):
+		body = json.dumps(content, indent=4).encode('utf-8')
+		self.send_response(status_code)
+		self.send_header('Content-Type', 'application/json')
+		self.send_header('Content-Length', str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	@staticmethod
+	def get_query_params(query, names):
+		"""
+		Validates the parameters of a query, which are positive numbers
+
+		:param dict query: value of each parameter of the query
+		:param list names: parameters accepted by the query
+		:return: value of each parameter
+		:rtype: dict
+		"""
+		unknown = sorted(set(query) - set(names))
+		if unknown:
+			raise ValueError('Unknown parameters: %s' % ', '.join(unknown))
+		params = {}
+		for name, value in query.items():
+			try:
+				params[name] = float(value)
+				valid = 0 < params[name] < float('inf')
+			except ValueError:
+				valid = False
+			if not valid:
+				raise ValueError('%s must be a positive number: %s' % (name, value))
+		return params
+
+	def do_GET(self):
+		url = urlparse(self.path)
+		query = {key: values[0] for key, values in parse_qs(url.query).items()}
+		queries = {"/": (self.server.api.get_status, []), "/datamodels": (self.server.api.get_datamodels, []),
+				   "/health": (self.server.api.get_health, ["stalled_after"]),
+				   "/stats": (self.server.api.get_stats, ["interval"])}
+		if url.path not in queries:
+			self.send_json(404, {"error": "Unknown resource %s" % url.path})
+			return
+		get, names = queries[url.path]
+		try:
+			params = self.get_query_params(query, names)
+		except ValueError as e:
+			self.send_json(400, {"error": str(e)})
+			return
+		try:
+			self.send_json(200, get(**params))
+		except Exception as e:
+			logging.error(e)
+			self.send_json(502, {"error": str(e)})
+
+	def do_POST(self):
+		operation = urlparse(self.path).path.strip('/')
+		if operation not in SERVE_OPERATIONS:
+			self.send_json(404, {"error": "Unknown operation %s" % operation})
+			return
+		try:
+			length = int(self.headers.get('Content-Length') or 0)
+			params = json.loads(self.rfile.read(length) or b'{}')
+			datamodels = params.get("datamodels")
+			if not datamodels:
+				raise ValueError('datamodels are required')
+			params["datamodels"] = datamodels.split() if isinstance(datamodels, str) else list(datamodels)
+		except ValueError as e:
+			self.send_json(400, {"error": str(e)})
+			return
+		result = self.server.api.submit(operation, params).result()
+		self.send_json(200 if result["success"] else 500, result)
+
+
+class BDTIServer(object):
+	"""
+	Serves the integrate, modify and delete operations and the integration state through a local HTTP API,
+	on a unix socket that only the user running the server can connect to. The configuration, the pooled Orion session and the deployment handler, with its SSH session,
+	are kept warm among operations. Operations are queued and run one at a time, in arrival order,
+	so the internal configuration is changed by a single thread. Queries do not wait for the queue
+	"""
+
+	def __init__(self, bdti, socket_path=SERVE_SOCKET):
+		"""
+		:param BDTI bdti: the solution, with its deployment handler initialized
+		:param str socket_path: path of the unix socket where the API listens
+		"""
+		self.bdti = bdti
+		self.bdti.deployment_handler.keep_alive = True
+		self.socket_path = socket_path
+		self.executor = ThreadPoolExecutor(max_workers=1)
+		self.state_lock = threading.Lock()
+		self.monitor_lock = threading.Lock()
+		self.monitor = None
+		self.pending = 0
+		self.started_at = time.monotonic()
+		self.datamodels = self.get_snapshot()
+		self.remove_stale_socket(socket_path)
+		self.httpd = UnixHTTPServer(socket_path, BDTIRequestHandler)
+		self.httpd.api = self
+
+	@staticmethod
+	def remove_stale_socket(socket_path):
+		"""
+		Removes the socket left by a server that did not stop cleanly. Raises a SocketInUse exception if the path
+		is not a socket, or a server is listening on it
+
+		:param str socket_path: path of the unix socket
+		:return: None
+		"""
+		try:
+			mode = os.lstat(socket_path).st_mode
+		except FileNotFoundError:
+			return
+		if not stat.S_ISSOCK(mode):
+			raise SocketInUse(socket_path, 'it is not a socket')
+		with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+			try:
+				sock.connect(socket_path)
+			except ConnectionRefusedError:
+				os.remove(socket_path)
+				return
+		raise SocketInUse(socket_path, 'another server is listening on it')
+
+	@staticmethod
+	def get_snapshot():
+		"""
+		:return: a copy of the values of every integrated datamodel by name
+		:rtype: dict
+		"""
+		return {name: dict(values) for datamodel in ConfigManager.get_datamodels_info()
+				for name, values in datamodel.items()}
+
+	def submit(self, operation, params):
+		"""
+		Queues an operation
+
+		:param str operation: integrate, modify or delete
+		:param dict params: datamodels of the operation and its force, deploy and confirm flags
+		:return: the future result of the operation
+		:rtype: Future
+		"""
+		with self.state_lock:
+			self.pending += 1
+		logging.debug(msg.OPERATION_QUEUED, {'operation': operation, 'pending': self.pending})
+		return self.executor.submit(self.run_operation, operation, params)
+
+	def run_operation(self, operation, params):
+		"""
+		Runs a queued operation over the current configuration file and internal configuration
+
+		:param str operation: integrate, modify or delete
+		:param dict params: datamodels of the operation and its force, deploy and confirm flags
+		:return: the outcome, duration and logs of the operation
+		:rtype: dict
+		"""
+		log_handler = OperationLogHandler()
+		log_token = _operation_log.set(log_handler)
+		logging.getLogger().addHandler(log_handler)
+		start = time.perf_counter()
+		success = False
+		try:
+			ConfigManager.reload_config()
+			ConfigManager.reload_internal_conf()
+			self.bdti.deployment_handler.check_session()
+			# there is nobody to confirm the modification of integrated datamodels
+			Helpers.default_answer = bool(params.get("confirm", False))
+			datamodels, force = params["datamodels"], bool(params.get("force", False))
+			if operation == "integrate":
+				success = self.bdti.integrate(datamodels)
+			elif operation == "modify":
+				success = self.bdti.modify(datamodels, force)
+			else:
+				success = self.bdti.delete(datamodels, bool(params.get("deploy", False)), force)
+		except Exception as e:
+			logging.error(e)
+		finally:
+			Helpers.default_answer = None
+			logging.getLogger().removeHandler(log_handler)
+			_operation_log.reset(log_token)
+			with self.state_lock:
+				self.datamodels = self.get_snapshot()
+				self.pending -= 1
+		seconds = time.perf_counter() - start
+		logging.info(msg.OPERATION_FINISHED, {'operation': operation, 'seconds': seconds})
+		return {"operation": operation, "datamodels": params["datamodels"], "success": bool(success),
+				"seconds": seconds, "logs": log_handler.records}
+
+	def get_status(self):
+		return {"uptime_seconds": time.monotonic() - self.started_at, "pending_operations": self.pending,
+				"integrated_datamodels": len(self.datamodels)}
+
+	def get_datamodels(self):
+		"""
+		:return: the integrated datamodels when the last operation finished
+		:rtype: dict
+		"""
+		return self.datamodels
+
+	def get_health(self, stalled_after=DEFAULT_STALLED_HOURS):
+		"""
+		:param float stalled_after: hours without notifications after which a subscription is stalled
+		:return: the delivery health of the subscriptions of the datamodels integrated when the last operation
+			finished
+		:rtype: list
+		"""
+		# the snapshot is replaced, never changed, so the operation in progress is neither read nor held up
+		with self.state_lock:
+			datamodels = self.datamodels
+		return self.bdti.get_subscriptions_health(timedelta(hours=float(stalled_after)), datamodels=datamodels)
+
+	def get_stats(self, interval=CYGNUS_STATS_INTERVAL):
+		"""
+		Gets Cygnus stats since the previous request, or during an interval on the first request
+
+		:param float interval: seconds between samples on the first request
+		:return: the stats
+		:rtype: dict
+		"""
+		with self.monitor_lock:
+			if self.monitor is None:
+				monitor = CygnusMonitor(self.bdti.deployment_handler, ConfigManager.get_value(MAIN_SECTION, CYGNUS_HOST))
+				monitor.poll()
+				time.sleep(float(interval))
+				self.monitor = monitor
+			stats = self.monitor.poll()
+		self.bdti.check_backpressure(stats)
+		return stats
+
+	def serve(self):
+		"""
+		Serves the API until it is shut down
+
+		:return: None
+		"""
+		logging.info(msg.SERVING, {'address': self.socket_path})
+		try:
+			self.httpd.serve_forever()
+		finally:
+			self.httpd.server_close()
+			self.executor.shutdown(wait=True)
+			if self.socket_path and os.path.exists(self.socket_path):
+				os.remove(self.socket_path)
+			self.bdti.deployment_handler.close_handler(force=True)
+
+	def shutdown(self):
+		"""
+		Stops serving the API, after the operation in progress and the queued ones finish
+
+		:return: None
+		"""
+		threading.Thread(target=self.httpd.shutdown, daemon=True).start()
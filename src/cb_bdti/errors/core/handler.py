@@ -22,6 +22,16 @@ class CygnysNotReachable(Exception):
 		message = 'Cygnus notification service is not reachable at {url}'.format(url=url)
 		super(CygnysNotReachable, self).__init__(message)
 
+class CygnusApiNotReachable(Exception):
+	def __init__(self, url):
+		"""
+		This exception is called when the Cygnus's management API is not reachable or gives an invalid response
+
+		:param str url: URL of the API resource
+		"""
+		message = 'Cygnus management API is not reachable at {url}'.format(url=url)
+		super(CygnusApiNotReachable, self).__init__(message)
+
 class CygnysNotReachableSSH(Exception):
 	def __init__(self):
 		"""
@@ -53,7 +63,7 @@ class NoDataModelsIntegrated(Exception):
 		:param str section: a section of the configuration file
 		:param str key: a key of a section of the configuration file
 		"""
-		message = 'You did not specify any Data Model for {datamodels} key in config file'.format(datamodels=FIWARE_DATAMODELS)
+		message = 'You did not specify any Data Model in config file'
 		super(NoDataModelsIntegrated, self).__init__(message)
 
 
@@ -127,6 +137,68 @@ class NotValidTypes(Exception):
 		super(NotValidTypes, self).__init__(message)
 
 
+class NotValidAttributes(Exception):
+	def __init__(self, datamodel, key):
+		"""
+		This exception is called if a datamodel contains an invalid list of attributes
+
+		:param str datamodel: the name of a datamodel
+		:param str key: the key holding the attributes
+		"""
+		message = 'Not valid {key} for {datamodel} Data Model. It must be a list of attribute names ' \
+				  'separated by blanks'.format(key=key, datamodel=datamodel)
+		super(NotValidAttributes, self).__init__(message)
+
+
+class NotValidQuery(Exception):
+	def __init__(self, datamodel):
+		"""
+		This exception is called if a datamodel contains an invalid NGSI-LD query
+
+		:param str datamodel: the name of a datamodel
+		"""
+		message = 'Not valid q for {datamodel} Data Model. It must be a NGSI-LD query. ' \
+				  'E.g. brightness>50;status=="on"'.format(datamodel=datamodel)
+		super(NotValidQuery, self).__init__(message)
+
+
+class NotValidGeoQuery(Exception):
+	def __init__(self, datamodel):
+		"""
+		This exception is called if a datamodel contains an invalid NGSI-LD geo-query
+
+		:param str datamodel: the name of a datamodel
+		"""
+		message = 'Not valid geo_q for {datamodel} Data Model. It must follow the format ' \
+				  '"georel geometry coordinates [geoproperty]". ' \
+				  'E.g. near;maxDistance==2000 Point [-3.70,40.41]'.format(datamodel=datamodel)
+		super(NotValidGeoQuery, self).__init__(message)
+
+
+class NotValidIdPattern(Exception):
+	def __init__(self, datamodel):
+		"""
+		This exception is called if a datamodel contains an invalid entity id pattern
+
+		:param str datamodel: the name of a datamodel
+		"""
+		message = 'Not valid id_pattern for {datamodel} Data Model. It must be a valid regular expression'.format(
+			datamodel=datamodel)
+		super(NotValidIdPattern, self).__init__(message)
+
+
+class NotValidShards(Exception):
+	def __init__(self, datamodel, reason):
+		"""
+		This exception is called if a datamodel contains an invalid number of shards or shard endpoints
+
+		:param str datamodel: the name of a datamodel
+		:param str reason: what is wrong
+		"""
+		message = 'Not valid shards for {datamodel} Data Model: {reason}'.format(datamodel=datamodel, reason=reason)
+		super(NotValidShards, self).__init__(message)
+
+
 class CreateSubscriptionError(Exception):
 	def __init__(self, status_code):
 		"""
@@ -138,16 +210,86 @@ class CreateSubscriptionError(Exception):
 		super(CreateSubscriptionError, self).__init__(message)
 
 class DeleteSubscriptionError(Exception):
-	def __init__(self, data_model, url, msg=None):
+	def __init__(self, data_model, url, msg=None, subscription_id=None):
 		"""
 		This exception is called if a subscription for a datamodel cannot be deleted
 
+		:param str data_model: the name of the datamodel, None if the subscription has none, e.g. an orphan one
 		:param str url: the URL of the subscription
+		:param str subscription_id: the subscription ID, shown when there is no datamodel
 		"""
-		message = 'Error trying to delete a {datamodel} subscription at {url}'.format(datamodel=data_model, url=url)
+		if data_model:
+			message = 'Error trying to delete a {datamodel} subscription at {url}'.format(datamodel=data_model, url=url)
+		else:
+			message = 'Error trying to delete the {id} subscription at {url}'.format(id=subscription_id, url=url)
 		message = '%s. %s'%(message, msg) if msg else message
 		super(DeleteSubscriptionError, self).__init__(message)
 
+class UpdateSubscriptionError(Exception):
+	def __init__(self, data_model, url, status_code):
+		"""
+		This exception is called if a subscription for a datamodel cannot be updated
+
+		:param str data_model: the name of a datamodel
+		:param str url: the URL of the subscription
+		:param int status_code: status code of the Orion response
+		"""
+		message = 'Error trying to update a {datamodel} subscription at {url}. Code error: {status_code}'.format(
+			datamodel=data_model, url=url, status_code=status_code)
+		super(UpdateSubscriptionError, self).__init__(message)
+
+class GetSubscriptionError(Exception):
+	def __init__(self, data_model, url, status_code):
+		"""
+		This exception is called if a subscription cannot be retrieved
+
+		:param str data_model: datamodel of the subscription
+		:param str url: the URL of the subscription
+		:param int status_code: status code of the Orion response
+		"""
+		self.status_code = status_code
+		message = 'Error trying to retrieve the subscription of {data_model} Data Model at {url}. ' \
+				  'Code error: {status_code}'.format(data_model=data_model, url=url, status_code=status_code)
+		super(GetSubscriptionError, self).__init__(message)
+
+class EntityOperationError(Exception):
+	def __init__(self, operation, url, status_code):
+		"""
+		This exception is called if an operation over the entities of Orion fails
+
+		:param str operation: name of the operation
+		:param str url: the URL of the operation
+		:param int status_code: status code of the Orion response
+		"""
+		self.status_code = status_code
+		message = 'Error trying to {operation} entities at {url}. ' \
+				  'Code error: {status_code}'.format(operation=operation, url=url, status_code=status_code)
+		super(EntityOperationError, self).__init__(message)
+
+class NotValidLoadProfile(Exception):
+	def __init__(self, profile):
+		"""
+		This exception is called if a load profile is not valid
+
+		:param str profile: the load profile
+		"""
+		message = 'Not valid load profile: {profile}. It must be a list of "seconds:rate" points with increasing ' \
+				  'seconds, starting at 0. E.g. 0:10,60:100,120:100'.format(profile=profile)
+		super(NotValidLoadProfile, self).__init__(message)
+
+class ListSubscriptionsError(Exception):
+	def __init__(self, url, fiware_service, status_code):
+		"""
+		This exception is called if the subscriptions of a fiware service cannot be listed
+
+		:param str url: the URL of the subscriptions
+		:param str fiware_service: fiware service of the subscriptions
+		:param int status_code: status code of the Orion response
+		"""
+		message = 'Error trying to list the subscriptions of "{service}" fiware service at {url}. ' \
+				  'Code error: {status_code}'.format(service=fiware_service, url=url, status_code=status_code)
+		super(ListSubscriptionsError, self).__init__(message)
+
 class NotValidHost(Exception):
 	def __init__(self, type_host, host):
 		"""
@@ -191,3 +333,78 @@ class DataModelNotPresent(Exception):
 		"""
 		message = 'There is no {datamodel} section in the configuration file' .format(datamodel=datamodel)
 		super(DataModelNotPresent, self).__init__(message)
+
+class OrionCircuitOpen(Exception):
+	def __init__(self, url, seconds):
+		"""
+		This exception is called when a request to an Orion is refused without being sent, because its
+		circuit breaker opened after consecutive failures
+
+		:param str url: base URL of the Orion
+		:param float seconds: seconds until a request is tried again
+		"""
+		message = 'Orion at {url} is failing, its requests are not sent for the next {seconds:.1f} seconds'.format(
+			url=url, seconds=seconds)
+		super(OrionCircuitOpen, self).__init__(message)
+
+class NotValidOrionLimit(Exception):
+	def __init__(self, key, section, value):
+		"""
+		This exception is called when a limit of the Orion requests is not a valid number
+
+		:param str key: the key of the limit
+		:param str section: section of the limit in the configuration file
+		:param value: the value of the limit
+		"""
+		message = 'Not valid {key} in {section} section: {value}. It must be a number, positive for {positive} ' \
+				  'and non-negative for the rest'.format(key=key, section=section, value=value,
+														  positive=' and '.join([ORION_MAX_CONCURRENCY, ORION_TIMEOUT]))
+		super(NotValidOrionLimit, self).__init__(message)
+
+class OrionNotDefined(Exception):
+	def __init__(self, name, datamodel=None):
+		"""
+		This exception is called when a datamodel, or a command, names an Orion without section in the
+		configuration file
+
+		:param str name: the name of the Orion
+		:param str datamodel: the name of the datamodel, None if it is named by a command
+		"""
+		message = '{named_by} names Orion {name}, but there is no {section} section in the configuration ' \
+				  'file'.format(named_by='%s Data Model' % datamodel if datamodel else 'The command', name=name,
+								section=ORION_SECTION_PREFIX + name)
+		super(OrionNotDefined, self).__init__(message)
+
+class OrionsFailed(Exception):
+	def __init__(self, orion_urls):
+		"""
+		This exception is called when the datamodels of some Orions could not be processed, once the datamodels
+		of every Orion were processed
+
+		:param list orion_urls: URLs of the Orions that failed
+		"""
+		message = 'The Data Models of {count} Orions failed: {urls}'.format(count=len(orion_urls),
+																		   urls=', '.join(orion_urls))
+		super(OrionsFailed, self).__init__(message)
+
+class NotValidCatalog(Exception):
+	def __init__(self, path, reason):
+		"""
+		This exception is called when the catalog of the FIWARE Data Models cannot be read
+
+		:param str path: path of the catalog
+		:param str reason: what is wrong
+		"""
+		message = 'Not valid Data Models catalog {path}: {reason}'.format(path=path, reason=reason)
+		super(NotValidCatalog, self).__init__(message)
+
+class SocketInUse(Exception):
+	def __init__(self, path, reason):
+		"""
+		This exception is called when the local API cannot listen on a unix socket, as its path is taken
+
+		:param str path: path of the socket
+		:param str reason: what takes the path
+		"""
+		message = 'Cannot listen on {path}: {reason}'.format(path=path, reason=reason)
+		super(SocketInUse, self).__init__(message)
@@ -1,11 +1,20 @@
+import contextvars
 import os.path
 import sys
+import logging
+import json
+import math
+import re
+from concurrent.futures import ThreadPoolExecutor
 from cb_bdti.utils.validators import Validators
-from datetime import datetime
+from datetime import datetime, timezone
 from cb_bdti.errors.core.handler import *
 from cb_bdti.config.constants import *
 
 class Helpers(object):
+	# answer of confirm_action when there is nobody to ask, None to ask the user
+	default_answer = None
+
 	def __init__(self):
 		"""
 		All the classes methods should be classmethod, making it unnecessary to instanciate the class whatsoever
@@ -13,23 +22,92 @@ class Helpers(object):
 		pass
 
 	@staticmethod
-	def get_orion_url(host):
+	def get_orion_url(host, section=MAIN_SECTION):
 		"""
 		Makes a valid orion url in order to access to the subscription service
 
 		:param str host: orion host given in conf.ini
+		:param str section: section of the orion host in conf.ini
 		:return: orion's subscriptions service url
 		"""
 		if not host:
-			raise FieldNotInformed(ORION_HOST, MAIN_SECTION)
+			raise FieldNotInformed(ORION_HOST, section)
 		if Validators.is_ip(host):
-			orion_url = "http://{host}:1026/ngsi-ld/v1/subscriptions".format(host=host)
+			orion_url = "http://{host}:1026/{path}".format(host=host, path=ORION_SUBSCRIPTIONS_PATH)
 		elif Validators.is_valid_url(host):
-			orion_url = os.path.join(host, "ngsi-ld/v1/subscriptions")
+			orion_url = os.path.join(host, ORION_SUBSCRIPTIONS_PATH)
 		else:
 			raise NotValidHost('Orion LD', host)
 		return orion_url
 
+	@staticmethod
+	def get_orion_api_url(orion_url, path):
+		"""
+		Makes the url of another resource of the Orion API from its subscriptions service url
+
+		:param str orion_url: orion's subscriptions service url
+		:param str path: path of the API resource, e.g. ngsi-ld/v1/entities
+		:return: url of the API resource
+		:rtype: str
+		"""
+		base_url = orion_url[:-len(ORION_SUBSCRIPTIONS_PATH)] if orion_url.endswith(ORION_SUBSCRIPTIONS_PATH) \
+			else orion_url.rstrip('/') + '/'
+		return base_url + path
+
+	@staticmethod
+	def get_webhdfs_url(host, port, path, operation, username, **params):
+		"""
+		Makes the url of a WebHDFS operation over a file
+
+		:param str host: HDFS host given in conf.ini
+		:param str port: WebHDFS port given in conf.ini
+		:param str path: absolute path of the file in HDFS
+		:param str operation: WebHDFS operation, e.g. OPEN
+		:param str username: HDFS username
+		:param params: other parameters of the operation
+		:return: url of the operation
+		:rtype: str
+		"""
+		host = host if Validators.is_valid_url(host) else "http://{host}".format(host=host)
+		query = '&'.join('{key}={value}'.format(key=key, value=value)
+						 for key, value in dict(op=operation, **{'user.name': username}, **params).items())
+		return "{host}:{port}{webhdfs}{path}?{query}".format(host=host, port=port, webhdfs=WEBHDFS_PATH,
+															 path=path, query=query)
+
+	@staticmethod
+	def get_load_profile(profile):
+		"""
+		Parses a load profile: the target rate at some moments, linearly interpolated between them
+
+		:param str profile: "seconds:rate" points separated by commas, e.g. 0:10,60:100,120:100
+		:return: a list of (seconds, rate) points
+		:rtype: list
+		"""
+		try:
+			points = [tuple(float(value) for value in point.split(':')) for point in profile.split(',')]
+		except ValueError:
+			raise NotValidLoadProfile(profile)
+		if len(points) < 2 or any(len(point) != 2 or point[1] < 0 for point in points) or points[0][0] != 0 or \
+				any(second[0] <= first[0] for first, second in zip(points, points[1:])):
+			raise NotValidLoadProfile(profile)
+		return points
+
+	@staticmethod
+	def get_percentile(values, percentile):
+		"""
+		Gets a percentile of some values by the nearest-rank method
+
+		:param list values: the values
+		:param int percentile: the percentile, from 0 to 100
+		:return: the percentile, or None if there are no values
+		:rtype: float
+		"""
+		if not values:
+			return None
+		values = sorted(values)
+		rank = max(math.ceil(percentile * len(values) / 100), 1)
+		return values[rank - 1]
+
 	@staticmethod
 	def get_cygnus_url(host):
 		"""
@@ -49,6 +127,24 @@ class Helpers(object):
 			raise NotValidHost('Cygnus', host)
 		return cygnus_url
 
+	@staticmethod
+	def get_cygnus_api_url(host, path):
+		"""
+		Makes a valid url of Cygnus management API
+
+		:param host: cygnus host given in conf.ini
+		:param str path: path of the API resource
+		:return: url of the API resource
+		:rtype: str
+		"""
+		if not host:
+			raise FieldNotInformed(CYGNUS_HOST, MAIN_SECTION)
+		if Validators.is_ip(host):
+			return "http://{host}:{port}{path}".format(host=host, port=CYGNUS_API_PORT, path=path)
+		elif Validators.is_valid_url(host):
+			return "{host}:{port}{path}".format(host=host, port=CYGNUS_API_PORT, path=path)
+		raise NotValidHost('Cygnus', host)
+
 	@staticmethod
 	def get_type_pattern(type):
 		"""
@@ -60,6 +156,91 @@ class Helpers(object):
 		"""
 		return "(%s)" %"|".join(type.split())
 
+	@staticmethod
+	def get_shard_id_patterns(shards):
+		"""
+		Splits the entity ids among some shards by their last character, dealing out the characters of
+		SHARD_ID_CHARACTERS in turn, so decimal and hexadecimal suffixes are spread evenly. The regexes are
+		disjoint and, together, match every entity id
+
+		:param int shards: number of shards
+		:return: the entity id regex of every shard
+		:rtype: list
+		"""
+		patterns = ['.*[%s]$' % SHARD_ID_CHARACTERS[index::shards] for index in range(shards)]
+		patterns[-1] = '.*([%s]|[^%s])$' % (SHARD_ID_CHARACTERS[shards - 1::shards], SHARD_ID_CHARACTERS)
+		return patterns
+
+	@staticmethod
+	def get_attributes(attributes):
+		"""
+		Get the list of attribute names of a datamodel key
+
+		:param str attributes: attribute names extracted from production.ini, separated by blanks
+		:return: list of attribute names
+		:rtype: list
+		"""
+		return attributes.replace(',', ' ').split()
+
+	@staticmethod
+	def get_notified_attribute(watched_attributes, notify_attributes, default):
+		"""
+		Get an attribute whose update triggers a notification of a datamodel subscription and is included in it
+
+		:param str watched_attributes: watched attributes of the datamodel, separated by blanks
+		:param str notify_attributes: notified attributes of the datamodel, separated by blanks
+		:param str default: attribute returned when the datamodel restricts none of them
+		:return: the attribute name
+		:rtype: str
+		"""
+		watched = Helpers.get_attributes(watched_attributes)
+		notified = Helpers.get_attributes(notify_attributes)
+		if watched and notified:
+			both = [el for el in watched if el in notified]
+			return both[0] if both else watched[0]
+		return (watched or notified or [default])[0]
+
+	@staticmethod
+	def get_geo_q(geo_q):
+		"""
+		Get the NGSI-LD geoQ object from the geo_q value of a datamodel
+
+		:param str geo_q: geo-query with format "georel geometry coordinates [geoproperty]"
+		:return: NGSI-LD geoQ
+		:rtype: dict
+		"""
+		georel, geometry, coordinates = geo_q.split(None, 2)
+		geoproperty = None
+		if not coordinates.endswith(']'):
+			coordinates, geoproperty = coordinates.rsplit(None, 1)
+		geo_q_dict = {"georel": georel, "geometry": geometry, "coordinates": json.loads(coordinates)}
+		if geoproperty:
+			geo_q_dict["geoproperty"] = geoproperty
+		return geo_q_dict
+
+	@staticmethod
+	def get_suggested_throttling(entities):
+		"""
+		Suggests the throttling of a Data Model from its number of entities (see DISCOVER_THROTTLING)
+
+		:param int entities: number of entities
+		:return: the throttling in seconds, empty if it should not be throttled
+		:rtype: str
+		"""
+		return next((str(seconds) for minimum, seconds in DISCOVER_THROTTLING if entities >= minimum), '')
+
+	@staticmethod
+	def get_type_name(entity_type):
+		"""
+		Makes a name for the sections and files of an entity type: the last part of the type, when it is a URI,
+		with the characters other than letters, digits, hyphens and underscores replaced
+
+		:param str entity_type: the entity type
+		:return: the name
+		:rtype: str
+		"""
+		return re.sub(r'[^0-9A-Za-z_-]', '_', re.split(r'[/#]', entity_type.rstrip('/#'))[-1])
+
 	@staticmethod
 	def get_description(data_model):
 		"""
@@ -71,6 +252,117 @@ class Helpers(object):
 		"""
 		return "Notify Cygnus of all context changes about {datamodel} datamodel".format(datamodel=data_model)
 
+	@staticmethod
+	def parse_iso_datetime(value):
+		"""
+		Parses an ISO8601 date or datetime. Datetimes without time zone are considered UTC
+
+		:param str value: ISO8601 date or datetime, e.g. 2020-01-01, 2020-01-01T10:10Z
+		:return: the datetime with time zone
+		:rtype: datetime
+		"""
+		date = datetime.fromisoformat(value[:-1] + '+00:00' if value.upper().endswith('Z') else value)
+		return date if date.tzinfo else date.replace(tzinfo=timezone.utc)
+
+	@staticmethod
+	def keep_renewed_expires(values, record):
+		"""
+		Keeps the expiration of an integrated datamodel when renew command moved it forward beyond the one of
+		its section, so subscribing it again or applying the configuration file does not undo the renewal
+
+		:param dict values: values of the datamodel section
+		:param dict record: values of the integrated datamodel
+		:return: the values of the datamodel section with the expiration to apply
+		:rtype: dict
+		"""
+		expires, renewed = values.get(DATA_MODEL_EXPIRES), record.get(DATA_MODEL_EXPIRES)
+		if not expires or not renewed or expires == renewed:
+			return values
+		try:
+			if Helpers.parse_iso_datetime(renewed) > Helpers.parse_iso_datetime(expires):
+				return dict(values, **{DATA_MODEL_EXPIRES: renewed})
+		except ValueError:
+			pass
+		return values
+
+	@staticmethod
+	def format_iso_datetime(date):
+		"""
+		Formats a datetime as an ISO8601 UTC datetime accepted as subscription expiration
+
+		:param datetime date: the datetime
+		:return: ISO8601 datetime, e.g. 2020-01-01T10:10:00Z
+		:rtype: str
+		"""
+		return date.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+	@staticmethod
+	def get_description_datamodel(description):
+		"""
+		Gets the datamodel of a subscription description made by get_description
+
+		:param str description: the description of a subscription
+		:return: Name of datamodel or None if the description was not made by get_description
+		:rtype: str
+		"""
+		prefix, suffix = Helpers.get_description('\0').split('\0')
+		match = re.match('^%s(.+)%s$' % (re.escape(prefix), re.escape(suffix)), description or '')
+		return match.group(1) if match else None
+
+	@staticmethod
+	def write_file(file_path, content):
+		"""
+		Writes a text file. The file is written aside and then moved over the previous one, so it is never left
+		half written
+
+		:param str file_path: path of the file
+		:param str content: content of the file
+		:return: None
+		"""
+		import shutil
+		import tempfile
+		fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(file_path)),
+										prefix='.%s.' % os.path.basename(file_path))
+		try:
+			with os.fdopen(fd, 'w') as file:
+				file.write(content)
+			if os.path.exists(file_path):
+				shutil.copymode(file_path, tmp_path)
+			else:
+				os.chmod(tmp_path, 0o644)
+			os.replace(tmp_path, file_path)
+		except Exception:
+			if os.path.exists(tmp_path):
+				os.remove(tmp_path)
+			raise
+
+	@staticmethod
+	def run_in_parallel(function, items, workers=ORION_WORKERS):
+		"""
+		Calls the function for every item using a pool of threads. Every call runs in a copy of the context of the
+		caller, so the records it logs keep the log context, e.g. the step, and the ones of the caller's context
+
+		:param function: function that receives an item
+		:param list items: items to be processed
+		:param int workers: maximum number of concurrent calls
+		:return: a tuple (item, result, exception) for every item, in the same order as items.
+			Exception is None if the call was successful
+		:rtype: list
+		"""
+		def call(item):
+			try:
+				return item, function(item), None
+			except Exception as e:
+				return item, None, e
+
+		items = list(items)
+		if not items:
+			return []
+		with ThreadPoolExecutor(max_workers=min(workers, len(items))) as executor:
+			# a context cannot be run by several threads at once, so every call gets its own copy
+			futures = [executor.submit(contextvars.copy_context().run, call, item) for item in items]
+			return [future.result() for future in futures]
+
 	@staticmethod
 	def get_config_path(path_from_option):
 		"""
@@ -98,12 +390,23 @@ class Helpers(object):
 
 	@staticmethod
 	def confirm_action(msg):
+		"""
+		Asks the user to confirm an action, unless a default answer is set for non-interactive runs
+
+		:param str msg: the question
+		:return: if the action is confirmed
+		:rtype: bool
+		"""
+		if Helpers.default_answer is not None:
+			logging.info('%s (y/n): %s', msg, 'y' if Helpers.default_answer else 'n')
+			return Helpers.default_answer
 		done = False
 		answer = ''
 		while not done:
 			answer = input('{message} (y/n): '.format(message=msg))
 			if answer.lower() not in ('y', 'n'):
-				print("Your response ('{answer}') was not one of the expected responses: y, n" .format(answer=answer))
+				print("Your response ('{answer}') was not one of the expected responses: y, n"
+					  .format(answer=answer))
 			else:
 				done = True
 		return answer.lower() == 'y'
\ No newline at end of file
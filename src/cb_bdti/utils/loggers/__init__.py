@@ -1,18 +1,80 @@
-import yaml
-
+import atexit
 import logging.config
+import logging.handlers
+import queue
 import cb_bdti.utils.loggers.handlers
 from cb_bdti.config import constants as const
+from cb_bdti.utils.loggers.formatters import ContextFilter, JsonFormatter, log_context, log_step
+
+_options = {'json_format': False, 'console_level': None, 'file_level': None}
+_listener = None
+_configured = None
+
+
+def set_logging_options(json_format=False, console_level=None, file_level=None):
+    """
+    Sets the options applied by ``config_logging`` over the YAML configuration.
+
+    :param bool json_format: log structured JSON records through a background writer thread
+    :param str console_level: level of the console sink. The YAML level if None
+    :param str file_level: level of the file sink. The YAML level if None
+    :return: None
+    """
+    _options.update(json_format=json_format, console_level=console_level, file_level=file_level)
 
 
 def config_logging():
     """
     Configures logging library.
-    
+
     It loads the YAML file on the project that establishes the different loggers and their handlers.
+    The configuration is applied once per process and set of options, so later calls are free.
+    The root logger level is lowered only to the most verbose sink level, so disabled records are discarded early.
+    In JSON mode, the handlers are fed by a queue and run in a background thread, off the critical path.
 
     :return: None
     """
+    global _listener, _configured
+    if _configured == _options:
+        return
+    import yaml
+    _stop_listener()
+
     with open(const.BASE_PATH / 'config' / 'logger' / 'logger.yml', 'r') as file:
         config = yaml.safe_load(file.read())
-        logging.config.dictConfig(config)
+
+    for handler, level in (('console', _options['console_level']), ('file', _options['file_level'])):
+        if level:
+            config['handlers'][handler]['level'] = level.upper()
+    config['root']['level'] = min((logging.getLevelName(handler['level']) for handler in config['handlers'].values()))
+    if _options['json_format']:
+        config['formatters']['json'] = {'()': JsonFormatter}
+        for handler in config['handlers'].values():
+            handler['formatter'] = 'json'
+    logging.config.dictConfig(config)
+
+    if _options['json_format']:
+        root = logging.getLogger()
+        handlers = root.handlers[:]
+        records = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(records)
+        queue_handler.addFilter(ContextFilter())
+        for handler in handlers:
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+        _listener.start()
+    _configured = dict(_options)
+
+
+@atexit.register
+def _stop_listener():
+    """
+    Stops the background writer thread, if any, after every queued record has been written.
+
+    :return: None
+    """
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,75 @@
+import json
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import wraps
+
+_datamodel = ContextVar('datamodel', default=None)
+_step = ContextVar('step', default=None)
+
+
+@contextmanager
+def log_context(datamodel=None, step=None):
+    """
+    Sets the Data Model and/or the step that the records logged inside the context are about.
+
+    :param str datamodel: name of the Data Model
+    :param str step: name of the step
+    """
+    tokens = []
+    if datamodel is not None:
+        tokens.append((_datamodel, _datamodel.set(datamodel)))
+    if step is not None:
+        tokens.append((_step, _step.set(step)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def log_step(step):
+    """
+    Decorator that sets the step that the records logged during every call to a function are about.
+
+    :param str step: name of the step
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with log_context(step=step):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class ContextFilter(logging.Filter):
+    """
+    Logging filter that adds the ``datamodel`` and ``step`` fields of the current log context to the records.
+
+    It must run in the thread that logs the record, so it is attached to the queue handler.
+    """
+
+    def filter(self, record):
+        record.datamodel = _datamodel.get()
+        record.step = _step.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Logging formatter that writes every record as a JSON object in a single line.
+    """
+
+    def format(self, record):
+        entry = {'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+                 'level': record.levelname,
+                 'module': record.module,
+                 'message': record.getMessage()}
+        for field in ('datamodel', 'step'):
+            if getattr(record, field, None):
+                entry[field] = getattr(record, field)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry)
@@ -0,0 +1,185 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+
+
+class Tracer(object):
+	"""
+	Collects the duration, number of calls and failures of the steps of a run and writes them as a JSON report
+	and as a Prometheus textfile collector file. It does nothing until it is enabled
+	"""
+	__enabled = False
+	__command = None
+	__started_at = None
+	__start = None
+	__steps = {}
+	__spans = []
+	__counters = {}
+	__lock = threading.Lock()
+
+	def __init__(self):
+		"""
+		All the classes methods should be classmethod, making it unnecessary to instanciate the class whatsoever
+		"""
+		pass
+
+	@classmethod
+	def enable(cls, command):
+		"""
+		Starts collecting the steps of a run
+
+		:param str command: name of the command being run
+		:return: None
+		"""
+		cls.__enabled = True
+		cls.__command = command
+		cls.__started_at = datetime.now(timezone.utc)
+		cls.__start = time.perf_counter()
+		cls.__steps = {}
+		cls.__spans = []
+		cls.__counters = {}
+
+	@classmethod
+	def is_enabled(cls):
+		return cls.__enabled
+
+	@classmethod
+	@contextmanager
+	def span(cls, name):
+		"""
+		Context manager that measures the duration of a step. The step fails if an exception is raised
+
+		:param str name: name of the step
+		"""
+		if not cls.__enabled:
+			yield
+			return
+		start = time.perf_counter()
+		failed = False
+		try:
+			yield
+		except BaseException:
+			failed = True
+			raise
+		finally:
+			cls.__record(name, start, time.perf_counter() - start, failed)
+
+	@classmethod
+	def traced(cls, name):
+		"""
+		Decorator that measures the duration of every call to a function as a step
+
+		:param str name: name of the step
+		"""
+		def decorator(function):
+			@wraps(function)
+			def wrapper(*args, **kwargs):
+				if not cls.__enabled:
+					return function(*args, **kwargs)
+				with cls.span(name):
+					return function(*args, **kwargs)
+			return wrapper
+		return decorator
+
+	@classmethod
+	def count(cls, name, value=1):
+		"""
+		Increases a counter of the run
+
+		:param str name: name of the counter
+		:param int value: increment
+		:return: None
+		"""
+		if not cls.__enabled:
+			return
+		with cls.__lock:
+			cls.__counters[name] = cls.__counters.get(name, 0) + value
+
+	@classmethod
+	def __record(cls, name, start, duration, failed):
+		with cls.__lock:
+			step = cls.__steps.setdefault(name, {"count": 0, "failures": 0, "total_seconds": 0.0,
+												 "max_seconds": 0.0})
+			step["count"] += 1
+			step["failures"] += int(failed)
+			step["total_seconds"] += duration
+			step["max_seconds"] = max(step["max_seconds"], duration)
+			cls.__spans.append({"step": name, "offset_seconds": round(start - cls.__start, 6),
+								"duration_seconds": round(duration, 6), "failed": failed})
+
+	@classmethod
+	def get_report(cls):
+		"""
+		:return: the report of the run with the steps measured so far
+		:rtype: dict
+		"""
+		with cls.__lock:
+			steps = {name: dict(step, mean_seconds=step["total_seconds"] / step["count"])
+					 for name, step in sorted(cls.__steps.items())}
+			return {"command": cls.__command,
+					"started_at": cls.__started_at.isoformat(),
+					"duration_seconds": time.perf_counter() - cls.__start,
+					"failures": sum(step["failures"] for step in steps.values()),
+					"steps": steps,
+					"counters": dict(cls.__counters),
+					"spans": list(cls.__spans)}
+
+	@classmethod
+	def write_reports(cls, report_path=None, prometheus_path=None):
+		"""
+		Writes the report of the run as JSON and/or as a Prometheus textfile collector file
+
+		:param str report_path: path of the JSON report
+		:param str prometheus_path: path of the Prometheus file. It should end with .prom
+		:return: None
+		"""
+		if not cls.__enabled:
+			return
+		report = cls.get_report()
+		if report_path:
+			cls.__write(report_path, json.dumps(report, indent=4))
+		if prometheus_path:
+			cls.__write(prometheus_path, cls.get_prometheus_metrics(report))
+
+	@staticmethod
+	def get_prometheus_metrics(report):
+		"""
+		Formats a report in Prometheus text exposition format
+
+		:param dict report: report of the run
+		:return: the metrics
+		:rtype: str
+		"""
+		command = report["command"]
+		lines = ['# HELP cb_bdti_run_duration_seconds Duration of the last cb-bdti run.',
+				 '# TYPE cb_bdti_run_duration_seconds gauge',
+				 'cb_bdti_run_duration_seconds{command="%s"} %f' % (command, report["duration_seconds"]),
+				 '# HELP cb_bdti_run_timestamp_seconds Start time of the last cb-bdti run.',
+				 '# TYPE cb_bdti_run_timestamp_seconds gauge',
+				 'cb_bdti_run_timestamp_seconds{command="%s"} %f' % (
+					 command, datetime.fromisoformat(report["started_at"]).timestamp())]
+		metrics = [('step_duration_seconds', 'total_seconds', 'Total duration of the step in the last run.'),
+				   ('step_max_duration_seconds', 'max_seconds', 'Longest call to the step in the last run.'),
+				   ('step_calls', 'count', 'Calls to the step in the last run.'),
+				   ('step_failures', 'failures', 'Failed calls to the step in the last run.')]
+		for metric, key, help_text in metrics:
+			lines += ['# HELP cb_bdti_%s %s' % (metric, help_text), '# TYPE cb_bdti_%s gauge' % metric]
+			lines += ['cb_bdti_%s{command="%s",step="%s"} %s' % (metric, command, name, step[key])
+					  for name, step in report["steps"].items()]
+		if report["counters"]:
+			lines += ['# HELP cb_bdti_counter Counters of the last run.', '# TYPE cb_bdti_counter gauge']
+			lines += ['cb_bdti_counter{command="%s",name="%s"} %s' % (command, name, value)
+					  for name, value in sorted(report["counters"].items())]
+		return '\n'.join(lines) + '\n'
+
+	@staticmethod
+	def __write(path, content):
+		"""
+		Writes a file aside and moves it to its path, so collectors never read it half written
+		"""
+		# helpers imports the modules that are traced
+		from cb_bdti.utils.helpers import Helpers
+		Helpers.write_file(path, content)
@@ -1,9 +1,10 @@
 import socket
 import re
-import requests
-import telnetlib
+import json
 from cb_bdti.errors.core.handler import *
 from cb_bdti.config.constants import *
+from cb_bdti.config.registry import TypeRegistry
+from cb_bdti.utils.tracing import Tracer
 
 
 
@@ -42,6 +43,7 @@ class Validators(object):
 		return re.match(regex, host) is not None
 
 	@staticmethod
+	@Tracer.traced('orion.check_url')
 	def check_orion_url(orion_url):
 		"""
 		Check if some url have a valid Orions subscription service. Otherwise is an error
@@ -50,6 +52,7 @@ class Validators(object):
 		:return: if a is valid url
 		:rtype: bool
 		"""
+		import requests
 		try:
 			response = requests.get(orion_url, timeout=3)
 			if (response.status_code != 200):
@@ -66,6 +69,7 @@ class Validators(object):
 		:param str cygnus_host: cygnus notification url.
 		:return: None
 		"""
+		import telnetlib
 		try:
 			telnetlib.Telnet(cygnus_host, CYGNUS_NOTIFICATION_PORT, 3)
 		except:
@@ -74,8 +78,8 @@ class Validators(object):
 	@staticmethod
 	def validate_types(types, datamodel):
 		"""
-		Validate if types of some datamodel that is part of 12 Fiware datamodels are correctly.
-		If not raise an error
+		Validate if types of some datamodel whose name contains a domain of the FIWARE Data Models catalog
+		are types of that domain. If not raise an error
 
 		:param str types: types indicated for datamodel in production.ini
 		:param str datamodel: datamodel indicated in iot.datamodels in production.ini
@@ -84,15 +88,12 @@ class Validators(object):
 		if not types:
 			raise FieldNotInformed(DATA_MODEL_TYPES, datamodel)
 
-		valid = True
-		valid_types = []
-		for fiware_datamodel in FIWARE_DATAMODELS:
-			if fiware_datamodel in datamodel:
-				valid_types = FIWARE_DATAMODELS[fiware_datamodel]
-				valid = set(types.split()).issubset(valid_types)
-				break
-		if not valid:
-			raise NotValidTypes(datamodel, valid_types)
+		domain = TypeRegistry.get_domain(datamodel)
+		if domain is None:
+			return
+		valid_types = TypeRegistry.get_types(domain)
+		if not valid_types.issuperset(types.split()):
+			raise NotValidTypes(datamodel, sorted(valid_types))
 
 	@staticmethod
 	def validate_throttling(throttling, datamodel):
@@ -129,6 +130,109 @@ class Validators(object):
 		if not re.match(regex, expires):
 			raise NotValidExpires(datamodel)
 
+	@staticmethod
+	def validate_attributes(attributes, key, datamodel):
+		"""
+		Validate if a list of attributes for some datamodel only contains valid attribute names.
+
+		:param str attributes: attribute names separated by blanks
+		:param str key: name of the key holding the attributes
+		:param str datamodel: name of datamodel
+		:return: None
+		"""
+		if not attributes:
+			return
+		regex = re.compile(r'^[^\s<>"\'=;()&|]+$')
+		for attribute in attributes.replace(',', ' ').split():
+			if not re.match(regex, attribute):
+				raise NotValidAttributes(datamodel, key)
+
+	@staticmethod
+	def validate_q(q, datamodel):
+		"""
+		Validate if the NGSI-LD query for some datamodel is well formed.
+
+		:param str q: value of q
+		:param str datamodel: name of datamodel
+		:return: None
+		"""
+		if not q:
+			return
+		if q.strip()[0] in ';|' or q.strip()[-1] in ';|':
+			raise NotValidQuery(datamodel)
+		depth = 0
+		for char in q:
+			depth += 1 if char == '(' else -1 if char == ')' else 0
+			if depth < 0:
+				raise NotValidQuery(datamodel)
+		if depth != 0:
+			raise NotValidQuery(datamodel)
+
+	@staticmethod
+	def validate_geo_q(geo_q, datamodel):
+		"""
+		Validate if the geo-query for some datamodel follows the format
+		"georel geometry coordinates [geoproperty]".
+
+		:param str geo_q: value of geo_q
+		:param str datamodel: name of datamodel
+		:return: None
+		"""
+		if not geo_q:
+			return
+		parts = geo_q.split(None, 2)
+		if len(parts) != 3:
+			raise NotValidGeoQuery(datamodel)
+		georel, geometry, coordinates = parts
+		if georel.split(';')[0] not in GEO_Q_GEORELS or geometry not in GEO_Q_GEOMETRIES:
+			raise NotValidGeoQuery(datamodel)
+		if not coordinates.endswith(']'):
+			coordinates = coordinates.rsplit(None, 1)[0]
+		try:
+			if not isinstance(json.loads(coordinates), list):
+				raise NotValidGeoQuery(datamodel)
+		except ValueError:
+			raise NotValidGeoQuery(datamodel)
+
+	@staticmethod
+	def validate_id_pattern(id_pattern, datamodel):
+		"""
+		Validate if the entity id pattern for some datamodel is a valid regular expression.
+
+		:param str id_pattern: value of id_pattern
+		:param str datamodel: name of datamodel
+		:return: None
+		"""
+		if not id_pattern:
+			return
+		try:
+			re.compile(id_pattern)
+		except re.error:
+			raise NotValidIdPattern(datamodel)
+
+	@staticmethod
+	def validate_shards(shards, endpoints, id_pattern, datamodel):
+		"""
+		Validate if the shards of some datamodel are an integer between 1 and the maximum, that a sharded datamodel
+		has no id_pattern, as the shards split the entity ids, and that there is a valid URL for every shard in
+		the shard endpoints, if any.
+
+		:param str shards: value of shards
+		:param list endpoints: URLs of shard_endpoints
+		:param str id_pattern: value of id_pattern
+		:param str datamodel: name of datamodel
+		:return: None
+		"""
+		if not shards.isdigit() or not 1 <= int(shards) <= MAX_SHARDS:
+			raise NotValidShards(datamodel, 'it must be an integer between 1 and {max}'.format(max=MAX_SHARDS))
+		if int(shards) > 1 and id_pattern:
+			raise NotValidShards(datamodel, 'it cannot be combined with id_pattern')
+		if endpoints and len(endpoints) != int(shards):
+			raise NotValidShards(datamodel, 'there must be one shard endpoint for every shard')
+		for endpoint in endpoints:
+			if not Validators.is_valid_url(endpoint):
+				raise NotValidShards(datamodel, 'not valid shard endpoint {url}'.format(url=endpoint))
+
 
 	@staticmethod
 	def check_format_file(file_format):
@@ -156,4 +260,22 @@ class Validators(object):
 				raise FieldNotInformed(key, HDFS_SECTION)
 
 		if not hdfs_dict[HDFS_FORMAT_FILE] in HDFS_FORMAT_FILE_LIST:
-			raise NotValidHdfsFormatFile(hdfs_dict[HDFS_FORMAT_FILE])
\ No newline at end of file
+			raise NotValidHdfsFormatFile(hdfs_dict[HDFS_FORMAT_FILE])
+
+	@staticmethod
+	def check_orion_limits(limits, section=MAIN_SECTION):
+		"""
+		Checks if every limit of the Orion requests is a non-negative number, and that the concurrency
+		and the timeout are positive
+
+		:param dict limits: value of each limit by key
+		:param str section: section of the limits in the configuration file
+		:return: None
+		"""
+		for key, value in limits.items():
+			try:
+				valid = float(value) > 0 if key in [ORION_MAX_CONCURRENCY, ORION_TIMEOUT] else float(value) >= 0
+			except (TypeError, ValueError):
+				valid = False
+			if not valid:
+				raise NotValidOrionLimit(key, section, value)
@@ -0,0 +1,139 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from cb_bdti.config.constants import *
+
+
+class FileWatcher(object):
+	"""
+	Waits for the changes of a file. It uses inotify on Linux, watching the folder of the file so editors and
+	configuration management tools that replace it through a rename are also seen, and falls back to polling
+	the file metadata elsewhere. Every change starts a debounce period that is extended by further changes,
+	so a batch of edits is reported once
+	"""
+
+	def __init__(self, file_path, debounce=WATCH_DEBOUNCE, poll_interval=WATCH_POLL_INTERVAL, polling=False):
+		"""
+		:param str file_path: path of the watched file
+		:param float debounce: seconds without changes after which a batch of changes is reported
+		:param float poll_interval: seconds between checks of the file metadata when polling
+		:param bool polling: poll the file metadata even if inotify is available
+		"""
+		self.file_path = os.path.abspath(file_path)
+		self.file_name = os.fsencode(os.path.basename(self.file_path))
+		self.debounce = debounce
+		self.poll_interval = poll_interval
+		self.fd = None if polling else self.add_inotify_watch(os.path.dirname(self.file_path))
+		self.state = self.get_state()
+
+	@staticmethod
+	def add_inotify_watch(folder):
+		"""
+		:param str folder: the watched folder
+		:return: the inotify file descriptor watching the folder, or None if inotify is not available
+		:rtype: int
+		"""
+		if not sys.platform.startswith('linux'):
+			return None
+		try:
+			libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+			fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+		except (OSError, AttributeError):
+			return None
+		if fd < 0:
+			return None
+		if libc.inotify_add_watch(fd, os.fsencode(folder), INOTIFY_MASK) < 0:
+			os.close(fd)
+			return None
+		return fd
+
+	@property
+	def mode(self):
+		return 'inotify' if self.fd is not None else 'polling'
+
+	def get_state(self):
+		"""
+		:return: the identity, size and modification time of the file, or None if it does not exist
+		:rtype: tuple
+		"""
+		try:
+			stat = os.stat(self.file_path)
+		except FileNotFoundError:
+			return None
+		return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+	def read_events(self, timeout):
+		"""
+		Waits for inotify events of the watched file, skipping the events of other files of its folder
+
+		:param float timeout: maximum seconds to wait, None to wait forever
+		:return: if the file changed
+		:rtype: bool
+		"""
+		deadline = None if timeout is None else time.monotonic() + timeout
+		while True:
+			remaining = None if deadline is None else max(0, deadline - time.monotonic())
+			readable, _, _ = select.select([self.fd], [], [], remaining)
+			if not readable:
+				return False
+			try:
+				data = os.read(self.fd, INOTIFY_BUFFER_SIZE)
+			except BlockingIOError:
+				continue
+			offset = 0
+			while offset < len(data):
+				_, _, _, length = struct.unpack_from('iIII', data, offset)
+				name = data[offset + INOTIFY_EVENT_SIZE:offset + INOTIFY_EVENT_SIZE + length].rstrip(b'\0')
+				if name == self.file_name:
+					return True
+				offset += INOTIFY_EVENT_SIZE + length
+
+	def poll(self, timeout):
+		"""
+		Checks the file metadata until it changes
+
+		:param float timeout: maximum seconds to wait, None to wait forever
+		:return: if the file changed
+		:rtype: bool
+		"""
+		deadline = None if timeout is None else time.monotonic() + timeout
+		while True:
+			state = self.get_state()
+			if state != self.state:
+				self.state = state
+				return True
+			if deadline is not None and time.monotonic() >= deadline:
+				return False
+			time.sleep(self.poll_interval if deadline is None else
+					   max(0, min(self.poll_interval, deadline - time.monotonic())))
+
+	def changed(self, timeout=None):
+		"""
+		:param float timeout: maximum seconds to wait, None to wait forever
+		:return: if the file changed within the timeout
+		:rtype: bool
+		"""
+		return self.read_events(timeout) if self.fd is not None else self.poll(timeout)
+
+	def wait(self):
+		"""
+		Waits until the file changes and no further change happens during the debounce period
+
+		:return: number of changes of the batch
+		:rtype: int
+		"""
+		while not self.changed():
+			pass
+		changes = 1
+		while self.changed(self.debounce):
+			changes += 1
+		return changes
+
+	def close(self):
+		if self.fd is not None:
+			os.close(self.fd)
+			self.fd = None
@@ -0,0 +1,171 @@
+"""
+Fixtures shared by the tests: the sources of the solution in the path, and a test case whose configuration file,
+internal configuration, outbox and generated files are kept in a temporary folder
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+TESTS_PATH = os.path.dirname(os.path.abspath(__file__))
+SOURCE_PATH = os.path.join(os.path.dirname(TESTS_PATH), 'src')
+BENCHMARKS_PATH = os.path.join(os.path.dirname(TESTS_PATH), 'benchmarks')
+for path in (SOURCE_PATH, BENCHMARKS_PATH):
+	if path not in sys.path:
+		sys.path.insert(0, path)
+
+CONFIG_HEADER = """[fiware]
+orion.host = {orion_url}
+cygnus.host = 127.0.0.1
+cygnus.ssh_key_path =
+cygnus.ssh_username =
+
+[hdfs]
+hdfs.host = 127.0.0.1
+hdfs.port = 50070
+hdfs.format_file = json-row
+hdfs.username = hdfs
+hdfs.oauth2_token =
+hdfs.krb5_auth =
+hdfs.krb5_user =
+hdfs.krb5_password =
+"""
+
+DATAMODEL_SECTION = """
+[{datamodel}]
+types = {types}
+fiware_service = {fiware_service}
+fiware_servicepath = {fiware_servicepath}
+file_path = {file_path}
+file_name = {file_name}
+expires = {expires}
+throttling =
+"""
+
+CYGNUS_URL = 'http://127.0.0.1:5050/notify'
+
+
+def get_section(datamodel, **values):
+	"""
+	:param str datamodel: name of the datamodel section, e.g. datamodel.Weather
+	:param values: values of the section other than the default ones
+	:return: the datamodel section in the format of the configuration file
+	:rtype: str
+	"""
+	name = datamodel.split('.', 1)[-1].lower()
+	defaults = {"types": "WeatherObserved", "fiware_service": "city", "fiware_servicepath": "/" + name,
+				"file_path": name, "file_name": name, "expires": ""}
+	extra = {key: value for key, value in values.items() if key not in defaults}
+	section = DATAMODEL_SECTION.format(datamodel=datamodel, **dict(defaults, **{
+		key: value for key, value in values.items() if key in defaults}))
+	return section + ''.join('%s = %s\n' % item for item in extra.items())
+
+
+class ConfigTestCase(unittest.TestCase):
+	"""
+	Test case whose configuration file, internal configuration, outbox, catalog cache and Cygnus files are kept in
+	a temporary folder, read again by every test
+	"""
+	orion_url = 'http://127.0.0.1:1026'
+
+	def setUp(self):
+		import cb_bdti.config.manager as config_manager
+		import cb_bdti.config.outbox as outbox
+		import cb_bdti.config.registry as registry
+		import cb_bdti.core.main as main
+		from cb_bdti.config.manager import ConfigManager
+		from cb_bdti.config.outbox import Outbox
+
+		self.work_path = tempfile.mkdtemp(prefix='cb_bdti_test_')
+		self.addCleanup(shutil.rmtree, self.work_path)
+		self.config_path = os.path.join(self.work_path, 'cb_bdti.ini')
+		self.internal_path = os.path.join(self.work_path, 'internal_conf.ini')
+		open(self.internal_path, 'w').close()
+		for module, name, value in [(config_manager, 'INTERNAL_CONF', self.internal_path),
+									(outbox, 'OUTBOX_CONF', os.path.join(self.work_path, 'outbox.ini')),
+									(registry, 'DATAMODELS_CACHE', os.path.join(self.work_path, 'cache.json')),
+									(main, 'AGENT', os.path.join(self.work_path, 'agent.conf')),
+									(main, 'GROUPING_RULES', os.path.join(self.work_path, 'grouping_rules.conf'))]:
+			patcher = mock.patch.object(module, name, value)
+			patcher.start()
+			self.addCleanup(patcher.stop)
+		self.reset_state()
+		self.addCleanup(self.reset_state)
+		self.ConfigManager, self.Outbox = ConfigManager, Outbox
+
+	@staticmethod
+	def reset_state():
+		"""
+		Forgets the configuration, internal configuration, outbox, Orion limits and catalog read by the previous test
+		"""
+		from cb_bdti.config.manager import ConfigManager
+		from cb_bdti.config.outbox import Outbox
+		from cb_bdti.config.registry import TypeRegistry
+		from cb_bdti.core.handler.limiter import OrionLimiter
+		ConfigManager._ConfigManager__instance = None
+		ConfigManager._ConfigManager__internal_instance = None
+		Outbox._Outbox__outbox = None
+		OrionLimiter._OrionLimiter__limits.clear()
+		OrionLimiter._OrionLimiter__limiters.clear()
+		TypeRegistry.configure()
+		TypeRegistry._TypeRegistry__indexes = None
+
+	def write_config(self, *sections, **main_values):
+		"""
+		Writes the configuration file with some datamodel sections, and reads it again
+
+		:param sections: the datamodel sections (see get_section)
+		:param main_values: keys of the main section other than the Orion and Cygnus ones, e.g. the Orion limits
+		"""
+		header = CONFIG_HEADER.format(orion_url=self.orion_url).replace(
+			'\n\n[hdfs]', ''.join('\n%s = %s' % item for item in main_values.items()) + '\n\n[hdfs]')
+		with open(self.config_path, 'w') as file:
+			file.write(header + ''.join(sections))
+		self.ConfigManager.set_config_path(self.config_path)
+		self.ConfigManager._ConfigManager__instance = None
+
+	def write_internal(self, content):
+		"""
+		Writes the internal configuration, and reads it again
+
+		:param str content: the internal configuration
+		"""
+		with open(self.internal_path, 'w') as file:
+			file.write(content)
+		self.ConfigManager._ConfigManager__internal_instance = None
+
+
+class OrionTestCase(ConfigTestCase):
+	"""
+	Test case whose configuration points to an Orion stand-in, shared by the tests of the class
+	"""
+
+	@classmethod
+	def setUpClass(cls):
+		from stubs import OrionStub
+		cls.orion = OrionStub()
+		cls.orion_url = cls.orion.url
+
+	@classmethod
+	def tearDownClass(cls):
+		cls.orion.close()
+
+	def setUp(self):
+		super(OrionTestCase, self).setUp()
+		import cb_bdti.core.main as main
+		patcher = mock.patch.object(main, 'config_logging', lambda: None)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+		self.orion.subscriptions.clear()
+		self.orion.reset_counts()
+
+	def get_bdti(self, **kwargs):
+		"""
+		:param kwargs: arguments of BDTI other than the configuration file, e.g. deploy
+		:return: a BDTI of the configuration file written by the test
+		:rtype: BDTI
+		"""
+		from cb_bdti.core.main import BDTI
+		return BDTI(self.config_path, **dict({"deploy": False}, **kwargs))
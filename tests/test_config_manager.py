@@ -0,0 +1,36 @@
+import unittest
+
+from support import ConfigTestCase, get_section
+
+
+class SectionDictTest(ConfigTestCase):
+	"""
+	Values of the sections of the configuration file
+	"""
+
+	def test_section_dict_is_a_copy(self):
+		self.write_config(get_section('datamodel.Weather', expires='2030-01-01'))
+		values = self.ConfigManager.get_section_dict('datamodel.Weather')
+		self.assertIsInstance(values, dict)
+		values["expires"] = '2040-01-01'
+		values["orion"] = 'other'
+		self.assertEqual(self.ConfigManager.get_value('datamodel.Weather', 'expires'), '2030-01-01')
+		self.assertEqual(self.ConfigManager.get_optional_value('datamodel.Weather', 'orion'), '')
+
+	def test_nested_sections_are_copies(self):
+		self.write_config(get_section('datamodel.Weather'))
+		self.ConfigManager.set_value('datamodel.Weather', 'nested', {'key': 'value'})
+		values = self.ConfigManager.get_section_dict('datamodel.Weather')
+		values["nested"]["key"] = 'changed'
+		self.assertIsInstance(values["nested"], dict)
+		self.assertEqual(self.ConfigManager.get_value('datamodel.Weather', 'nested')['key'], 'value')
+
+	def test_datamodel_sections(self):
+		self.write_config(get_section('datamodel.Weather'), get_section('datamodel.Parking', types='ParkingSpot'))
+		sections = self.ConfigManager.get_datamodel_sections()
+		self.assertEqual(list(sections), ['datamodel.Weather', 'datamodel.Parking'])
+		self.assertEqual(sections['datamodel.Parking']['types'], 'ParkingSpot')
+
+
+if __name__ == '__main__':
+	unittest.main()
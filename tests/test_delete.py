@@ -0,0 +1,106 @@
+import unittest
+from unittest import mock
+
+from support import OrionTestCase, get_section
+from stubs import OrionStub
+
+from cb_bdti.config.constants import *
+from cb_bdti.core.handler.manager import SubscriptionManager
+from cb_bdti.core.main import BDTI
+from cb_bdti.errors.core.handler import OrionCircuitOpen, OrionNotReachable
+
+
+class DeleteSubscriptionsTest(OrionTestCase):
+	"""
+	Outcome of every datamodel of a bulk removal of subscriptions, whose Orions may fail
+	"""
+
+	def setUp(self):
+		super(DeleteSubscriptionsTest, self).setUp()
+		self.other = OrionStub()
+		self.addCleanup(self.other.close)
+		self.write_config(get_section('datamodel.A'), get_section('datamodel.B'),
+						  get_section('datamodel.C', orion='other'),
+						  '\n[orion.other]\norion.host = %s\n' % self.other.url)
+		self.bdti = self.get_bdti()
+		self.bdti.deployment_handler = mock.Mock()
+		self.assertTrue(self.bdti.integrate(['all']))
+		self.datamodels = ['datamodel.A', 'datamodel.B', 'datamodel.C']
+		self.Outbox.record({datamodel: {OUTBOX_OPERATION: OUTBOX_DELETE,
+										DATA_MODEL_SUBSCRIPTION_ID: self.ConfigManager.get_subscription_id(datamodel)}
+							for datamodel in self.datamodels})
+		self.orion.reset_counts(), self.other.reset_counts()
+		self.bdti.deployment_handler.reset_mock()
+
+	def get_outcomes(self, outcomes):
+		return {datamodel: outcome["outcome"] for datamodel, outcome in outcomes.items()}
+
+	def test_deleted(self):
+		outcomes = BDTI.delete_subscriptions(self.datamodels)
+		self.assertEqual(self.get_outcomes(outcomes), dict.fromkeys(self.datamodels, DELETE_DELETED))
+		self.assertEqual({outcome["error"] for outcome in outcomes.values()}, {None})
+		# every Orion is checked once
+		self.assertEqual(self.orion.reset_counts(), {'GET': 1, 'DELETE': 2})
+		self.assertEqual(self.other.reset_counts(), {'GET': 1, 'DELETE': 1})
+		self.assertEqual(self.orion.subscriptions['city'], {})
+		self.assertEqual(self.ConfigManager.get_internal_sections(), [])
+		self.assertEqual(self.Outbox.get_pending(), {})
+
+	def test_unreachable_orion(self):
+		self.other.close()
+		outcomes = BDTI.delete_subscriptions(self.datamodels)
+		self.assertEqual(self.get_outcomes(outcomes), {'datamodel.A': DELETE_DELETED, 'datamodel.B': DELETE_DELETED,
+													   'datamodel.C': DELETE_FAILED})
+		self.assertIsInstance(outcomes['datamodel.C']["error"], OrionNotReachable)
+		# the datamodels not removed stay integrated and pending
+		self.assertEqual(self.ConfigManager.get_internal_sections(), ['datamodel.C'])
+		self.assertEqual(list(self.Outbox.get_pending()), ['datamodel.C'])
+
+	def test_forced(self):
+		self.other.close()
+		outcomes = BDTI.delete_subscriptions(self.datamodels, force=True)
+		self.assertEqual(outcomes['datamodel.C']["outcome"], DELETE_FORCED)
+		self.assertIsInstance(outcomes['datamodel.C']["error"], OrionNotReachable)
+		self.assertEqual(self.ConfigManager.get_internal_sections(), [])
+		self.assertEqual(self.Outbox.get_pending(), {})
+
+	def test_subscription_not_found(self):
+		subscription_id = self.ConfigManager.get_subscription_id('datamodel.B')
+		del self.orion.subscriptions['city'][subscription_id]
+		outcomes = BDTI.delete_subscriptions(self.datamodels)
+		self.assertEqual(self.get_outcomes(outcomes), {'datamodel.A': DELETE_DELETED, 'datamodel.B': DELETE_FAILED,
+													   'datamodel.C': DELETE_DELETED})
+		self.assertEqual(self.ConfigManager.get_internal_sections(), ['datamodel.B'])
+
+	def test_circuit_open(self):
+		rm_subscriptions = SubscriptionManager.rm_subscriptions
+
+		def fail_b(datamodel, *args, **kwargs):
+			if datamodel == 'datamodel.B':
+				raise OrionCircuitOpen(self.orion_url, 30)
+			return rm_subscriptions(datamodel, *args, **kwargs)
+
+		with mock.patch.object(SubscriptionManager, 'rm_subscriptions', side_effect=fail_b):
+			outcomes = BDTI.delete_subscriptions(self.datamodels)
+		self.assertEqual(self.get_outcomes(outcomes), {'datamodel.A': DELETE_DELETED, 'datamodel.B': DELETE_PENDING,
+													   'datamodel.C': DELETE_DELETED})
+		self.assertEqual(list(self.Outbox.get_pending()), ['datamodel.B'])
+
+	def test_without_subscription_id(self):
+		# a recreate that failed after removing the subscription
+		self.ConfigManager.set_internal_value('datamodel.A', DATA_MODEL_SUBSCRIPTION_ID, '')
+		outcomes = BDTI.delete_subscriptions(['datamodel.A'])
+		self.assertEqual(self.get_outcomes(outcomes), {'datamodel.A': DELETE_DELETED})
+		self.assertEqual(self.orion.reset_counts(), {'GET': 1})
+
+	def test_delete_fails_with_any_orion(self):
+		self.other.close()
+		self.assertFalse(self.bdti.delete(['all'], deploy=True, force=False))
+		self.bdti.deployment_handler.deploy_cygnus.assert_called_once_with()
+		self.assertEqual(self.ConfigManager.get_internal_sections(), ['datamodel.C'])
+		# Cygnus is deployed again by resume, along with the removal still pending
+		self.assertTrue(self.Outbox.is_deploy_pending())
+
+
+if __name__ == '__main__':
+	unittest.main()
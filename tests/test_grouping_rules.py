@@ -0,0 +1,69 @@
+import json
+import unittest
+
+from support import OrionTestCase, get_section
+
+
+def get_record(datamodel, subscription_id, orion_url, **values):
+	"""
+	:return: the internal configuration section of an integrated datamodel, without grouping rule id unless given,
+		as previous versions wrote it
+	:rtype: str
+	"""
+	return get_section(datamodel, subscription_id=subscription_id, orion_url=orion_url,
+					   integration_date='2020-01-01 00:00:00', **values)
+
+
+class GroupingRuleIdsTest(OrionTestCase):
+	"""
+	Ids of the grouping rules of the integrated datamodels, which must not change while they are integrated
+	"""
+
+	def get_rule_ids(self):
+		with open(self.work_path + '/grouping_rules.conf') as file:
+			rules = json.load(file)["grouping_rules"]
+		return {rule["destination"]: rule["id"] for rule in rules}
+
+	def test_next_free_ids(self):
+		self.write_config()
+		self.write_internal(get_record('datamodel.A', 'a', self.orion_url, grouping_rule_id=3) +
+							get_record('datamodel.B', 'b', self.orion_url, grouping_rule_id=1))
+		self.assertEqual(self.ConfigManager.get_grouping_rule_ids(['datamodel.B', 'datamodel.C', 'datamodel.D']),
+						 {'datamodel.B': 1, 'datamodel.C': 4, 'datamodel.D': 5})
+
+	def test_legacy_ids_kept_on_upgrade(self):
+		datamodels = ['datamodel.A', 'datamodel.B', 'datamodel.C']
+		self.write_config(*[get_section(datamodel) for datamodel in datamodels + ['datamodel.D']])
+		self.write_internal(''.join(get_record(datamodel, datamodel[-1], self.orion_url) for datamodel in datamodels))
+		bdti = self.get_bdti()
+		bdti.create_subscriptions(['datamodel.D'])
+		bdti.create_grouping_rules(self.work_path + '/grouping_rules.conf')
+
+		self.write_internal(open(self.internal_path).read())
+		self.assertEqual(self.ConfigManager.get_grouping_rule_ids(datamodels + ['datamodel.D']),
+						 {'datamodel.A': 1, 'datamodel.B': 2, 'datamodel.C': 3, 'datamodel.D': 4})
+		self.assertEqual(self.get_rule_ids(), {'a': 1, 'b': 2, 'c': 3, 'd': 4})
+
+	def test_ids_kept_on_removal(self):
+		datamodels = ['datamodel.A', 'datamodel.B', 'datamodel.C']
+		self.write_config(*[get_section(datamodel) for datamodel in datamodels])
+		self.write_internal(''.join(get_record(datamodel, datamodel[-1], self.orion_url, grouping_rule_id=index)
+									for index, datamodel in enumerate(datamodels, 1)))
+		self.ConfigManager.remove_internal_datamodel('datamodel.A')
+		self.get_bdti().create_grouping_rules(self.work_path + '/grouping_rules.conf')
+		self.assertEqual(self.get_rule_ids(), {'b': 2, 'c': 3})
+		# the id of a removed datamodel is not reused while a later one is integrated
+		self.assertEqual(self.ConfigManager.get_grouping_rule_ids(['datamodel.A']), {'datamodel.A': 4})
+
+	def test_rules_sorted_by_id(self):
+		from cb_bdti.config.cygnus.manager import CygnusConfManager
+		models = [dict(name=name, types='WeatherObserved', fiware_service='city', fiware_servicepath='/' + name,
+					   file_path=name, file_name=name, grouping_rule_id=rule_id) for name, rule_id in [('b', '2'), ('a', '1')]]
+		copies = [dict(model) for model in models]
+		rules = CygnusConfManager.build_grouping_rules(models, 'json-row')
+		self.assertEqual([rule["id"] for rule in rules], [1, 2])
+		self.assertEqual(models, copies)
+
+
+if __name__ == '__main__':
+	unittest.main()
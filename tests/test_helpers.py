@@ -0,0 +1,50 @@
+import os
+import sys
+import unittest
+
+SOURCE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+if SOURCE_PATH not in sys.path:
+	sys.path.insert(0, SOURCE_PATH)
+
+from cb_bdti.utils.helpers import Helpers
+from cb_bdti.utils.loggers.formatters import _datamodel, _step, log_context
+
+
+class RunInParallelTest(unittest.TestCase):
+	"""
+	Calls made by a pool of threads, e.g. the Orion requests of bulk operations
+	"""
+
+	def test_results_in_order(self):
+		def square(item):
+			if item == 3:
+				raise ValueError(item)
+			return item * item
+
+		results = Helpers.run_in_parallel(square, range(5), 3)
+		self.assertEqual([(item, result) for item, result, _ in results], [(0, 0), (1, 1), (2, 4), (3, None), (4, 16)])
+		self.assertIsInstance(results[3][2], ValueError)
+		self.assertEqual([error for _, _, error in results if not isinstance(error, ValueError)], [None] * 4)
+
+	def test_no_items(self):
+		self.assertEqual(Helpers.run_in_parallel(lambda item: item, []), [])
+
+	def test_log_context_propagated(self):
+		def get_context(datamodel):
+			with log_context(datamodel=datamodel):
+				return _datamodel.get(), _step.get()
+
+		with log_context(step='bulk'):
+			results = Helpers.run_in_parallel(get_context, ['datamodel.A', 'datamodel.B', 'datamodel.C'], 3)
+			nested = Helpers.run_in_parallel(lambda item: Helpers.run_in_parallel(lambda el: _step.get(), [item]),
+											 ['datamodel.A'])
+		self.assertEqual([result for _, result, _ in results],
+						 [('datamodel.A', 'bulk'), ('datamodel.B', 'bulk'), ('datamodel.C', 'bulk')])
+		self.assertEqual(nested[0][1][0][1], 'bulk')
+		# the context of the caller is not changed by the calls
+		self.assertIsNone(_step.get())
+		self.assertIsNone(_datamodel.get())
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,71 @@
+import threading
+import unittest
+from unittest import mock
+
+from support import OrionTestCase, get_section
+from stubs import OrionStub
+
+from cb_bdti.utils.helpers import Helpers
+from cb_bdti.utils.loggers.formatters import _datamodel
+
+
+class IntegrateTest(OrionTestCase):
+	"""
+	Integration and modification of the datamodels of several Orions, each one in its own thread
+	"""
+
+	def setUp(self):
+		super(IntegrateTest, self).setUp()
+		self.other = OrionStub()
+		self.addCleanup(self.other.close)
+		self.sections = [get_section('datamodel.A'), get_section('datamodel.B'),
+						 get_section('datamodel.C', orion='other'),
+						 '\n[orion.other]\norion.host = %s\n' % self.other.url]
+		self.write_config(*self.sections)
+		self.bdti = self.get_bdti()
+		self.bdti.deployment_handler = mock.Mock()
+		self.prompts = []
+
+	def confirm_action(self, question):
+		# the answer is given by the datamodel that the question is about
+		self.prompts.append((_datamodel.get(), question, threading.current_thread() is threading.main_thread(),
+							 self.orion.reset_counts().get('POST', 0) + self.other.reset_counts().get('POST', 0)))
+		return _datamodel.get() == 'datamodel.A'
+
+	def test_prompts_before_orions_run(self):
+		self.assertTrue(self.bdti.integrate(['datamodel.A', 'datamodel.C']))
+		subscription_ids = {datamodel: self.ConfigManager.get_subscription_id(datamodel)
+							for datamodel in ['datamodel.A', 'datamodel.C']}
+		self.orion.reset_counts(), self.other.reset_counts()
+		with mock.patch.object(Helpers, 'confirm_action', self.confirm_action):
+			self.assertTrue(self.bdti.integrate(['all']))
+		self.assertEqual([prompt[0] for prompt in self.prompts], ['datamodel.A', 'datamodel.C'])
+		# asked by the main thread before any subscription is made
+		self.assertEqual({prompt[2:] for prompt in self.prompts}, {(True, 0)})
+		self.assertNotEqual(self.ConfigManager.get_subscription_id('datamodel.A'), subscription_ids['datamodel.A'])
+		self.assertEqual(self.ConfigManager.get_subscription_id('datamodel.C'), subscription_ids['datamodel.C'])
+		self.assertTrue(self.ConfigManager.get_subscription_id('datamodel.B'))
+
+	def test_modify_prompts_before_orions_run(self):
+		self.assertTrue(self.bdti.integrate(['datamodel.B']))
+		self.orion.reset_counts(), self.other.reset_counts()
+		with mock.patch.object(Helpers, 'confirm_action', self.confirm_action):
+			self.assertTrue(self.bdti.modify(['all']))
+		self.assertEqual([prompt[0] for prompt in self.prompts], ['datamodel.A', 'datamodel.C'])
+		self.assertEqual({prompt[2:] for prompt in self.prompts}, {(True, 0)})
+		self.assertEqual(sorted(self.ConfigManager.get_internal_sections()), ['datamodel.A', 'datamodel.B'])
+
+	def test_handler_closed_when_an_orion_fails(self):
+		self.other.error_rate = 1.0
+		self.assertFalse(self.bdti.integrate(['all']))
+		self.bdti.deployment_handler.deploy_cygnus.assert_called_once_with()
+		self.bdti.deployment_handler.close_handler.assert_called_once_with()
+		self.assertEqual(sorted(self.ConfigManager.get_internal_sections()), ['datamodel.A', 'datamodel.B'])
+
+		self.bdti.deployment_handler.reset_mock()
+		self.assertFalse(self.bdti.modify(['datamodel.A', 'datamodel.C']))
+		self.bdti.deployment_handler.close_handler.assert_called_once_with()
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,127 @@
+import threading
+import time
+import unittest
+from datetime import timedelta
+
+from support import OrionTestCase, get_section
+
+from cb_bdti.config.constants import BREAKER_CLOSED, BREAKER_HALF_OPEN, BREAKER_OPEN, ORION_RATE_LIMIT, ORION_TIMEOUT
+from cb_bdti.core.handler.limiter import CircuitBreaker, OrionLimiter, TokenBucket
+from cb_bdti.errors.core.handler import OrionCircuitOpen
+
+
+class TokenBucketTest(unittest.TestCase):
+	"""
+	Rate of the Orion requests
+	"""
+
+	def test_unlimited(self):
+		bucket = TokenBucket(0)
+		self.assertEqual([bucket.acquire() for _ in range(10)], [0] * 10)
+
+	def test_waits_for_a_token(self):
+		bucket = TokenBucket(20)
+		self.assertEqual(bucket.acquire(), 0)
+		self.assertAlmostEqual(bucket.acquire(), 0.05, delta=0.01)
+
+	def test_burst(self):
+		bucket = TokenBucket(10, burst=3)
+		self.assertEqual([bucket.acquire() for _ in range(3)], [0] * 3)
+		self.assertGreater(bucket.acquire(), 0.09)
+
+	def test_concurrent_operations_spaced_out(self):
+		bucket, waits = TokenBucket(50), []
+		threads = [threading.Thread(target=lambda: waits.append(bucket.acquire())) for _ in range(5)]
+		start = time.monotonic()
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+		self.assertGreaterEqual(time.monotonic() - start, 0.075)
+		self.assertAlmostEqual(max(waits), 0.08, delta=0.01)
+
+
+class CircuitBreakerTest(unittest.TestCase):
+	"""
+	States of the breaker of an Orion
+	"""
+
+	def setUp(self):
+		self.breaker = CircuitBreaker('http://orion', failures=2, reset=0.05)
+
+	def open_breaker(self):
+		self.breaker.record_failure()
+		self.breaker.record_failure()
+
+	def test_opens_after_consecutive_failures(self):
+		self.breaker.record_failure()
+		self.breaker.record_success()
+		self.breaker.record_failure()
+		self.assertEqual(self.breaker.state, BREAKER_CLOSED)
+		self.breaker.check()
+		self.breaker.record_failure()
+		self.assertEqual(self.breaker.state, BREAKER_OPEN)
+		self.assertRaises(OrionCircuitOpen, self.breaker.check)
+
+	def test_never_opens_without_failures_limit(self):
+		breaker = CircuitBreaker('http://orion', failures=0, reset=0.05)
+		for _ in range(10):
+			breaker.record_failure()
+		self.assertEqual(breaker.state, BREAKER_CLOSED)
+
+	def test_half_open_tries_one_request(self):
+		self.open_breaker()
+		time.sleep(0.06)
+		self.assertEqual(self.breaker.state, BREAKER_HALF_OPEN)
+		# requests that wait for a slot do not take the try
+		self.breaker.check(try_again=False)
+		self.breaker.check()
+		self.assertRaises(OrionCircuitOpen, self.breaker.check)
+		self.breaker.record_success()
+		self.assertEqual(self.breaker.state, BREAKER_CLOSED)
+		self.breaker.check()
+
+	def test_failed_try_opens_again(self):
+		self.open_breaker()
+		time.sleep(0.06)
+		self.breaker.check()
+		self.breaker.record_failure()
+		self.assertEqual(self.breaker.state, BREAKER_OPEN)
+		self.assertRaises(OrionCircuitOpen, self.breaker.check)
+
+
+class OrionLimitsTest(OrionTestCase):
+	"""
+	Limits of the Orion requests read from the configuration file
+	"""
+
+	def test_configured_limits(self):
+		self.write_config(**{ORION_RATE_LIMIT: 5})
+		OrionLimiter.configure({ORION_TIMEOUT: 1}, 'http://other:1026/ngsi-ld/v1/subscriptions')
+		limiter = OrionLimiter.get(self.orion_url + '/ngsi-ld/v1/subscriptions')
+		self.assertEqual(limiter.bucket.rate, 0)
+
+		from cb_bdti.core.main import BDTI
+		BDTI.load_orion_limits(self.config_path)
+		limiter = OrionLimiter.get(self.orion_url + '/ngsi-ld/v1/subscriptions')
+		self.assertEqual(limiter.bucket.rate, 5)
+		self.assertIs(OrionLimiter.get(self.orion_url), limiter)
+		self.assertEqual(OrionLimiter.get('http://other:1026').timeout, 1)
+
+	def test_renew_with_configured_limits(self):
+		self.write_config(get_section('datamodel.A', expires='2020-01-01T00:00:00Z'), **{ORION_RATE_LIMIT: 5})
+		self.get_bdti().create_subscriptions(['datamodel.A'])
+		self.reset_state()
+
+		from cb_bdti.core.main import BDTI
+		BDTI.renew(self.config_path, timedelta(days=30), timedelta(hours=24))
+		self.assertEqual(OrionLimiter.get(self.orion_url).bucket.rate, 5)
+		self.write_internal(open(self.internal_path).read())
+		expires = self.ConfigManager.get_internal_value('datamodel.A', 'expires')
+		self.assertGreater(expires, '2020-01-01T00:00:00Z')
+		self.assertEqual([subscription["expires"] for subscriptions in self.orion.subscriptions.values()
+						  for subscription in subscriptions.values()], [expires])
+
+
+if __name__ == '__main__':
+	unittest.main()
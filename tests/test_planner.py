@@ -0,0 +1,100 @@
+import os
+import unittest
+from unittest import mock
+
+from support import OrionTestCase, get_section
+
+
+class IntegrationPlannerTest(OrionTestCase):
+	"""
+	Plans of the changes that make the integration match the configuration file, and their execution
+	"""
+
+	def setUp(self):
+		super(IntegrationPlannerTest, self).setUp()
+		self.write_config()
+		self.bdti = self.get_bdti()
+		self.bdti.deployment_handler = mock.Mock()
+
+	def get_plan(self):
+		from cb_bdti.core.planner import IntegrationPlanner
+		return IntegrationPlanner.get_plan(self.bdti.cygnus_url, agent_file=os.path.join(self.work_path, 'agent.conf'),
+										   grouping_rules_file=os.path.join(self.work_path, 'grouping_rules.conf'))
+
+	def get_actions(self, plan):
+		return {step["datamodel"]: step["action"] for step in plan["steps"]}
+
+	def integrate(self, *sections):
+		self.write_config(*sections)
+		plan = self.get_plan()
+		self.assertFalse(self.bdti.execute_plan(plan))
+		self.assertFalse([step for step in plan["steps"] if step.get("error")])
+		self.orion.reset_counts()
+		return plan
+
+	def get_subscriptions(self):
+		return [subscription for subscriptions in self.orion.subscriptions.values()
+				for subscription in subscriptions.values()]
+
+	def test_actions(self):
+		self.integrate(get_section('datamodel.B'), get_section('datamodel.C'), get_section('datamodel.D'),
+					   get_section('datamodel.E'), get_section('datamodel.F'))
+		self.write_config(get_section('datamodel.A'), get_section('datamodel.B'),
+						  get_section('datamodel.C', expires='2030-01-01T00:00:00Z'),
+						  get_section('datamodel.D', fiware_servicepath='/other'),
+						  get_section('datamodel.F', file_name='other'))
+		plan = self.get_plan()
+		self.assertEqual(self.get_actions(plan), {'datamodel.A': 'create', 'datamodel.B': 'unchanged',
+												  'datamodel.C': 'patch', 'datamodel.D': 'recreate',
+												  'datamodel.E': 'delete', 'datamodel.F': 'update'})
+		# planning makes no request
+		self.assertEqual(self.orion.reset_counts(), {})
+		self.assertEqual(plan["orion_requests"], 5)
+		self.assertTrue(plan["redeploy"])
+
+		self.assertFalse(self.bdti.execute_plan(plan))
+		self.assertEqual(self.get_actions(self.get_plan()), {datamodel: 'unchanged' for datamodel in
+															 ['datamodel.A', 'datamodel.B', 'datamodel.C',
+															  'datamodel.D', 'datamodel.F']})
+		self.assertEqual(sorted(self.ConfigManager.get_internal_sections()),
+						 ['datamodel.A', 'datamodel.B', 'datamodel.C', 'datamodel.D', 'datamodel.F'])
+		self.assertEqual(len(self.get_subscriptions()), 4 + 1)
+
+	def test_invalid_section(self):
+		self.write_config(get_section('datamodel.A', expires='tomorrow'))
+		step = self.get_plan()["steps"][0]
+		self.assertEqual(step["action"], 'invalid')
+		self.assertIn('error', step)
+
+	def test_renewed_expiry_kept(self):
+		self.integrate(get_section('datamodel.A', expires='2030-01-01T00:00:00Z'))
+		# moved forward by renew command
+		self.ConfigManager.set_internal_value('datamodel.A', 'expires', '2031-01-01T00:00:00Z')
+		self.assertEqual(self.get_actions(self.get_plan()), {'datamodel.A': 'unchanged'})
+
+		self.write_config(get_section('datamodel.A', expires='2032-01-01T00:00:00Z'))
+		step = self.get_plan()["steps"][0]
+		self.assertEqual(step["action"], 'patch')
+		self.assertEqual(list(step["patch"].values()), ['2032-01-01T00:00:00Z'])
+
+	def test_create_keeps_record(self):
+		self.integrate(get_section('datamodel.A', expires='2030-01-01T00:00:00Z'))
+		# a recreate that failed after the removal of the subscription, of a datamodel renewed before
+		for key, value in [('subscription_id', ''), ('expires', '2031-01-01T00:00:00Z'),
+						   ('integration_date', '2020-01-01 00:00:00')]:
+			self.ConfigManager.set_internal_value('datamodel.A', key, value)
+		self.orion.subscriptions.clear()
+		plan = self.get_plan()
+		self.assertEqual(self.get_actions(plan), {'datamodel.A': 'create'})
+
+		self.assertFalse(self.bdti.execute_plan(plan))
+		record = self.ConfigManager.get_internal_datamodel('datamodel.A')
+		self.assertEqual(record["expires"], '2031-01-01T00:00:00Z')
+		self.assertEqual(record["integration_date"], '2020-01-01 00:00:00')
+		self.assertEqual([subscription["expires"] for subscription in self.get_subscriptions()],
+						 ['2031-01-01T00:00:00Z'])
+		self.assertEqual(self.get_actions(self.get_plan()), {'datamodel.A': 'unchanged'})
+
+
+if __name__ == '__main__':
+	unittest.main()
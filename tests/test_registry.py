@@ -0,0 +1,119 @@
+import json
+import os
+import unittest
+from unittest import mock
+
+from support import ConfigTestCase
+
+import cb_bdti.config.registry as registry
+from cb_bdti.config.registry import TypeRegistry
+from cb_bdti.errors.core.handler import NotValidCatalog, NotValidTypes
+from cb_bdti.utils.validators import Validators
+
+CATALOG = {"Parking": ["OffStreetParking", "ParkingSpot"],
+		   "Weather": ["WeatherObserved", "WeatherForecast"],
+		   "Alert": ["Alert"],
+		   "Park": ["Garden"],
+		   "Transportation": ["TrafficFlowObserved", "ParkingSpot"]}
+
+
+class TypeRegistryTest(ConfigTestCase):
+	"""
+	Types of the FIWARE Data Models by domain, read from a catalog
+	"""
+
+	def setUp(self):
+		super(TypeRegistryTest, self).setUp()
+		self.cache_path = registry.DATAMODELS_CACHE
+		self.catalog_path = self.write_catalog(CATALOG)
+
+	def write_catalog(self, catalog, name='catalog.json'):
+		path = os.path.join(self.work_path, name)
+		with open(path, 'w') as file:
+			json.dump(catalog, file)
+		TypeRegistry.configure(path)
+		return path
+
+	def test_domain_contained_in_the_name(self):
+		self.assertEqual(TypeRegistry.get_domain('datamodel.MadridParking'), 'Parking')
+		self.assertEqual(TypeRegistry.get_domain('datamodel.TransportationMadrid'), 'Transportation')
+		self.assertIsNone(TypeRegistry.get_domain('datamodel.Madrid'))
+
+	def test_first_domain_of_the_catalog(self):
+		# as the types were checked before the registry, whatever the position and length of the domains
+		self.assertEqual(TypeRegistry.get_domain('datamodel.WeatherAlert'), 'Weather')
+		self.assertEqual(TypeRegistry.get_domain('datamodel.AlertWeather'), 'Weather')
+		self.assertEqual(TypeRegistry.get_domain('datamodel.ParkWeatherParking'), 'Parking')
+		self.assertEqual(TypeRegistry.get_domain('datamodel.AlertPark'), 'Alert')
+
+	def test_indexes(self):
+		self.assertEqual(TypeRegistry.get_types('Weather'), frozenset(["WeatherObserved", "WeatherForecast"]))
+		self.assertEqual(TypeRegistry.get_types('Unknown'), frozenset())
+		self.assertEqual(TypeRegistry.get_domains('ParkingSpot'), ('Parking', 'Transportation'))
+		self.assertEqual(TypeRegistry.get_domains('Unknown'), ())
+
+	def test_validate_types(self):
+		Validators.validate_types('OffStreetParking ParkingSpot', 'datamodel.MadridParking')
+		Validators.validate_types('Anything', 'datamodel.Madrid')
+		self.assertRaises(NotValidTypes, Validators.validate_types, 'WeatherObserved', 'datamodel.MadridParking')
+
+	def test_official_list(self):
+		self.write_catalog({"updatedDate": "2026-01-01", "officialList": [
+			{"repoName": "dataModel.Parking", "dataModels": ["ParkingSpot"]},
+			{"repoName": "Weather", "dataModels": ["WeatherObserved"]}]}, 'official.json')
+		self.assertEqual(TypeRegistry.get_domain('datamodel.MadridParking'), 'Parking')
+		self.assertEqual(TypeRegistry.get_types('Weather'), frozenset(["WeatherObserved"]))
+
+	def test_not_valid_catalog(self):
+		self.write_catalog({"Parking": "ParkingSpot"}, 'wrong.json')
+		self.assertRaises(NotValidCatalog, TypeRegistry.get_domain, 'datamodel.Parking')
+		TypeRegistry.configure(os.path.join(self.work_path, 'missing.json'))
+		self.assertRaises(NotValidCatalog, TypeRegistry.get_domain, 'datamodel.Parking')
+
+	def test_cache_reused(self):
+		TypeRegistry.get_domain('datamodel.Parking')
+		self.assertTrue(os.path.isfile(self.cache_path))
+		TypeRegistry._TypeRegistry__indexes = None
+		with mock.patch.object(TypeRegistry, 'read_catalog') as read_catalog:
+			# the order of the catalog is kept by the cache
+			self.assertEqual(TypeRegistry.get_domain('datamodel.ParkWeatherParking'), 'Parking')
+			self.assertEqual(TypeRegistry.get_domains('ParkingSpot'), ('Parking', 'Transportation'))
+		read_catalog.assert_not_called()
+
+	def test_cache_invalidated(self):
+		TypeRegistry.get_domain('datamodel.Parking')
+		# the same catalog path, changed
+		self.write_catalog({"Parking": ["ParkingSpot"], "Weather": ["WeatherObserved"]})
+		TypeRegistry._TypeRegistry__indexes = None
+		self.assertEqual(TypeRegistry.get_types('Parking'), frozenset(["ParkingSpot"]))
+		# another catalog
+		self.write_catalog({"Streetlighting": ["Streetlight"]}, 'other.json')
+		self.assertEqual(TypeRegistry.get_domain('datamodel.Parking'), None)
+		with open(self.cache_path) as file:
+			self.assertEqual(json.load(file)["key"][1], os.path.join(self.work_path, 'other.json'))
+
+	def test_broken_cache(self):
+		with open(self.cache_path, 'w') as file:
+			file.write('{"key": ')
+		with self.assertLogs(level='DEBUG') as logs:
+			self.assertEqual(TypeRegistry.get_domain('datamodel.Parking'), 'Parking')
+		self.assertTrue(any('not read' in line for line in logs.output))
+		with open(self.cache_path) as file:
+			self.assertIn("indexes", json.load(file))
+
+	def test_cache_not_writable(self):
+		cache_path = os.path.join(self.work_path, 'file', 'cache.json')
+		open(os.path.join(self.work_path, 'file'), 'w').close()
+		with mock.patch.object(registry, 'DATAMODELS_CACHE', cache_path), self.assertLogs(level='DEBUG') as logs:
+			self.assertEqual(TypeRegistry.get_domain('datamodel.Parking'), 'Parking')
+		self.assertTrue(any('not cached' in line for line in logs.output))
+
+	def test_cache_folder_created(self):
+		cache_path = os.path.join(self.work_path, 'cache', 'cb_bdti', 'cache.json')
+		with mock.patch.object(registry, 'DATAMODELS_CACHE', cache_path):
+			TypeRegistry.get_domain('datamodel.Parking')
+		self.assertTrue(os.path.isfile(cache_path))
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+from unittest import mock
+
+from support import OrionTestCase, get_section
+
+import cb_bdti.core.main as main
+from cb_bdti.config.constants import *
+
+
+class ResumeTest(OrionTestCase):
+	"""
+	Replay of the Orion mutations recorded in the outbox by an interrupted run
+	"""
+
+	def setUp(self):
+		super(ResumeTest, self).setUp()
+		self.write_config(get_section('datamodel.A'), get_section('datamodel.B'))
+		self.bdti = self.get_bdti()
+		self.bdti.deployment_handler = mock.Mock()
+		self.sleep = mock.patch.object(main.time, 'sleep').start()
+		self.addCleanup(mock.patch.stopall)
+
+	def restart(self):
+		"""
+		Reads again the outbox and the internal configuration, as the run after an interrupted one does, and
+		forgets the requests made so far
+
+		:return: a BDTI of the configuration file
+		:rtype: BDTI
+		"""
+		self.Outbox._Outbox__outbox = None
+		self.ConfigManager._ConfigManager__internal_instance = None
+		bdti = self.get_bdti()
+		bdti.deployment_handler = mock.Mock()
+		self.orion.reset_counts()
+		return bdti
+
+	def get_subscriptions(self):
+		return sorted(self.orion.subscriptions.get('city', {}))
+
+	def test_creates_not_done(self):
+		# the run was interrupted once datamodel.A was subscribed and recorded
+		self.assertTrue(self.bdti.integrate(['datamodel.A']))
+		subscription_id = self.ConfigManager.get_subscription_id('datamodel.A')
+		self.Outbox.record({'datamodel.A': {OUTBOX_OPERATION: OUTBOX_CREATE},
+							'datamodel.B': {OUTBOX_OPERATION: OUTBOX_CREATE}}, deploy=True)
+		bdti = self.restart()
+		self.assertTrue(bdti.resume())
+		self.assertEqual(self.orion.reset_counts(), {'POST': 1})
+		self.assertEqual(self.ConfigManager.get_subscription_id('datamodel.A'), subscription_id)
+		self.assertEqual(self.get_subscriptions(), sorted([subscription_id,
+															 self.ConfigManager.get_subscription_id('datamodel.B')]))
+		self.assertEqual(self.Outbox.get_pending(), {})
+		self.assertFalse(self.Outbox.is_deploy_pending())
+		bdti.deployment_handler.deploy_cygnus.assert_called_once_with()
+
+	def test_recreate(self):
+		self.assertTrue(self.bdti.integrate(['datamodel.A']))
+		subscription_id = self.ConfigManager.get_subscription_id('datamodel.A')
+		self.Outbox.record({'datamodel.A': {OUTBOX_OPERATION: OUTBOX_RECREATE,
+											DATA_MODEL_SUBSCRIPTION_ID: subscription_id}}, deploy=True)
+		self.assertTrue(self.restart().resume())
+		new_id = self.ConfigManager.get_subscription_id('datamodel.A')
+		self.assertNotEqual(new_id, subscription_id)
+		self.assertEqual(self.get_subscriptions(), [new_id])
+
+	def test_recreate_already_done(self):
+		self.assertTrue(self.bdti.integrate(['datamodel.A']))
+		subscription_id = self.ConfigManager.get_subscription_id('datamodel.A')
+		self.Outbox.record({'datamodel.A': {OUTBOX_OPERATION: OUTBOX_RECREATE,
+											DATA_MODEL_SUBSCRIPTION_ID: 'urn:ngsi-ld:Subscription:old'}})
+		self.assertTrue(self.restart().resume())
+		self.assertEqual(self.orion.reset_counts(), {})
+		self.assertEqual(self.ConfigManager.get_subscription_id('datamodel.A'), subscription_id)
+		self.assertEqual(self.Outbox.get_pending(), {})
+
+	def test_delete(self):
+		self.assertTrue(self.bdti.integrate(['datamodel.A', 'datamodel.B']))
+		self.Outbox.record({'datamodel.A': {OUTBOX_OPERATION: OUTBOX_DELETE,
+											DATA_MODEL_SUBSCRIPTION_ID:
+												self.ConfigManager.get_subscription_id('datamodel.A')}}, deploy=True)
+		self.assertTrue(self.restart().resume())
+		self.assertEqual(self.ConfigManager.get_internal_sections(), ['datamodel.B'])
+		self.assertEqual(self.get_subscriptions(), [self.ConfigManager.get_subscription_id('datamodel.B')])
+
+	def test_failures_retried_with_backoff(self):
+		self.Outbox.record({'datamodel.A': {OUTBOX_OPERATION: OUTBOX_CREATE}}, deploy=True)
+		bdti = self.restart()
+		self.orion.error_rate = 1.0
+		try:
+			self.assertFalse(bdti.resume(retries=3, backoff=2))
+		finally:
+			self.orion.error_rate = 0.0
+		self.assertEqual([call[0][0] for call in self.sleep.call_args_list], [2, 4, 8])
+		pending = self.Outbox.get_pending()
+		self.assertEqual(list(pending), ['datamodel.A'])
+		self.assertEqual(pending['datamodel.A'][OUTBOX_ATTEMPTS], '4')
+		self.assertTrue(pending['datamodel.A'][OUTBOX_LAST_ERROR])
+		# resumed again once Orion answers
+		self.assertTrue(self.restart().resume())
+		self.assertEqual(self.Outbox.get_pending(), {})
+		self.assertTrue(self.ConfigManager.get_subscription_id('datamodel.A'))
+
+	def test_dry_run_and_discard(self):
+		self.Outbox.record({'datamodel.A': {OUTBOX_OPERATION: OUTBOX_CREATE}}, deploy=True)
+		bdti = self.restart()
+		self.assertTrue(bdti.resume(dry_run=True))
+		self.assertEqual(list(self.Outbox.get_pending()), ['datamodel.A'])
+		self.assertTrue(bdti.resume(discard=True))
+		self.assertEqual(self.Outbox.get_pending(), {})
+		self.assertFalse(self.Outbox.is_deploy_pending())
+		self.assertEqual(self.orion.reset_counts(), {})
+		bdti.deployment_handler.deploy_cygnus.assert_not_called()
+
+	def test_only_deployment_pending(self):
+		self.Outbox.record({}, deploy=True)
+		bdti = self.restart()
+		self.assertTrue(bdti.resume())
+		bdti.deployment_handler.deploy_cygnus.assert_called_once_with()
+		self.assertFalse(self.Outbox.is_deploy_pending())
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,106 @@
+import http.client
+import json
+import logging
+import os
+import socket
+import stat
+import threading
+import unittest
+from unittest import mock
+
+from support import OrionTestCase, get_section
+from stubs import OrionStub
+
+from cb_bdti.core.server import BDTIServer
+from cb_bdti.errors.core.handler import SocketInUse
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+
+	def __init__(self, socket_path):
+		super(UnixHTTPConnection, self).__init__('localhost')
+		self.socket_path = socket_path
+
+	def connect(self):
+		self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		self.sock.connect(self.socket_path)
+
+
+class ServerTest(OrionTestCase):
+	"""
+	Local API of serve command
+	"""
+
+	def setUp(self):
+		super(ServerTest, self).setUp()
+		self.other = OrionStub()
+		self.addCleanup(self.other.close)
+		self.write_config(get_section('datamodel.A'), get_section('datamodel.B', orion='other'),
+						  '\n[orion.other]\norion.host = %s\n' % self.other.url)
+		self.bdti = self.get_bdti()
+		self.bdti.deployment_handler = mock.Mock()
+		self.socket_path = os.path.join(self.work_path, 'api.sock')
+
+	def start_server(self):
+		server = BDTIServer(self.bdti, self.socket_path)
+		thread = threading.Thread(target=server.serve, daemon=True)
+		thread.start()
+		self.addCleanup(thread.join)
+		self.addCleanup(server.shutdown)
+		return server
+
+	def request(self, method, path, content=None):
+		connection = UnixHTTPConnection(self.socket_path)
+		try:
+			connection.request(method, path, json.dumps(content) if content is not None else None)
+			response = connection.getresponse()
+			return response.status, json.loads(response.read())
+		finally:
+			connection.close()
+
+	def test_socket_only_for_its_user(self):
+		self.start_server()
+		self.assertTrue(stat.S_ISSOCK(os.lstat(self.socket_path).st_mode))
+		self.assertEqual(stat.S_IMODE(os.lstat(self.socket_path).st_mode), 0o600)
+
+	def test_stale_socket_removed(self):
+		with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+			sock.bind(self.socket_path)
+		self.start_server()
+		self.assertEqual(self.request('GET', '/')[0], 200)
+
+	def test_path_in_use(self):
+		self.start_server()
+		self.assertRaises(SocketInUse, BDTIServer, self.bdti, self.socket_path)
+		other_path = os.path.join(self.work_path, 'file')
+		open(other_path, 'w').close()
+		self.assertRaises(SocketInUse, BDTIServer, self.bdti, other_path)
+		self.assertTrue(os.path.isfile(other_path))
+
+	def test_query_params(self):
+		self.start_server()
+		self.assertEqual(self.request('GET', '/health?stalled=1')[0], 400)
+		self.assertEqual(self.request('GET', '/health?stalled_after=soon')[0], 400)
+		self.assertEqual(self.request('GET', '/health?stalled_after=-1')[0], 400)
+		self.assertEqual(self.request('GET', '/datamodels?all=1')[0], 400)
+		self.assertEqual(self.request('GET', '/health?stalled_after=2'), (200, []))
+		# an error of the query is not taken for an error of the request
+		with mock.patch.object(self.bdti, 'get_subscriptions_health', side_effect=TypeError('unexpected')):
+			self.assertEqual(self.request('GET', '/health')[0], 502)
+
+	def test_operation_logs_of_every_thread(self):
+		self.start_server()
+		logging.getLogger().setLevel(logging.INFO)
+		self.addCleanup(logging.getLogger().setLevel, logging.WARNING)
+		status, result = self.request('POST', '/integrate', {"datamodels": ["all"]})
+		self.assertEqual(status, 200)
+		messages = [record["message"] for record in result["logs"]]
+		for datamodel in ['datamodel.A', 'datamodel.B']:
+			self.assertIn('Subscription for %s Data Model created successfully' % datamodel, messages)
+		# the records of the queries served meanwhile are not collected
+		self.assertEqual(self.request('GET', '/datamodels')[0], 200)
+		self.assertEqual(sorted(self.request('GET', '/datamodels')[1]), ['datamodel.A', 'datamodel.B'])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,110 @@
+import re
+import unittest
+from unittest import mock
+
+from support import CYGNUS_URL, OrionTestCase, get_section
+
+from cb_bdti.config.constants import MAX_SHARDS, SHARD_ID_CHARACTERS
+from cb_bdti.core.handler.manager import SubscriptionManager
+from cb_bdti.errors.core.handler import NotValidShards
+from cb_bdti.utils.helpers import Helpers
+
+# last characters of entity ids that are not in SHARD_ID_CHARACTERS
+OTHER_CHARACTERS = "-_:.~/ éñ$"
+
+
+class ShardIdPatternsTest(unittest.TestCase):
+	"""
+	Entity id regexes of the subscriptions of a sharded datamodel
+	"""
+
+	def get_shards(self, patterns, entity_id):
+		return [index for index, pattern in enumerate(patterns) if re.match(pattern, entity_id)]
+
+	def test_disjoint_and_cover_every_id(self):
+		for shards in range(1, MAX_SHARDS + 1):
+			patterns = Helpers.get_shard_id_patterns(shards)
+			self.assertEqual(len(patterns), shards)
+			for character in SHARD_ID_CHARACTERS + OTHER_CHARACTERS:
+				entity_id = 'urn:ngsi-ld:WeatherObserved:' + character
+				self.assertEqual(len(self.get_shards(patterns, entity_id)), 1, (shards, entity_id))
+
+	def test_only_the_last_character_counts(self):
+		patterns = Helpers.get_shard_id_patterns(4)
+		for entity_id in ['urn:ngsi-ld:Parking:a1', 'a1', 'urn:ngsi-ld:Parking:zzz-1', '1']:
+			self.assertEqual(self.get_shards(patterns, entity_id), [1])
+
+	def test_characters_spread_evenly(self):
+		for shards in range(1, MAX_SHARDS + 1):
+			patterns = Helpers.get_shard_id_patterns(shards)
+			# decimal and hexadecimal suffixes too
+			for characters in [SHARD_ID_CHARACTERS, '0123456789', '0123456789abcdef']:
+				counts = [sum(1 for el in characters if re.match(pattern, el)) for pattern in patterns]
+				self.assertLessEqual(max(counts) - min(counts), 1, (shards, characters))
+
+	def test_other_characters_in_last_shard(self):
+		patterns = Helpers.get_shard_id_patterns(3)
+		for character in OTHER_CHARACTERS:
+			self.assertEqual(self.get_shards(patterns, 'id' + character), [2])
+
+
+class GetShardsTest(unittest.TestCase):
+	"""
+	Shards of a datamodel read from the values of its section
+	"""
+
+	def test_single_shard(self):
+		self.assertEqual(SubscriptionManager.get_shards('datamodel.A', {}, CYGNUS_URL), [(None, CYGNUS_URL)])
+		self.assertEqual(SubscriptionManager.get_shards('datamodel.A', {'shards': '1', 'id_pattern': 'a.*'},
+														CYGNUS_URL), [(None, CYGNUS_URL)])
+
+	def test_shards_with_endpoints(self):
+		endpoints = ['http://10.0.0.1:5050/notify', 'http://10.0.0.2:5050/notify']
+		shards = SubscriptionManager.get_shards('datamodel.A', {'shards': '2', 'shard_endpoints': ' '.join(endpoints)},
+												CYGNUS_URL)
+		self.assertEqual(shards, list(zip(Helpers.get_shard_id_patterns(2), endpoints)))
+		shards = SubscriptionManager.get_shards('datamodel.A', {'shards': '3'}, CYGNUS_URL)
+		self.assertEqual([endpoint for _, endpoint in shards], [CYGNUS_URL] * 3)
+
+	def test_not_valid_shards(self):
+		for values in [{'shards': '0'}, {'shards': str(MAX_SHARDS + 1)}, {'shards': 'two'},
+					   {'shards': '2', 'id_pattern': 'a.*'},
+					   {'shards': '2', 'shard_endpoints': CYGNUS_URL},
+					   {'shards': '2', 'shard_endpoints': CYGNUS_URL + ' not-a-url'}]:
+			with self.assertRaises(NotValidShards, msg=values):
+				SubscriptionManager.get_shards('datamodel.A', values, CYGNUS_URL)
+
+
+class ShardedSubscriptionsTest(OrionTestCase):
+	"""
+	Subscriptions of the shards of a datamodel in Orion
+	"""
+
+	def setUp(self):
+		super(ShardedSubscriptionsTest, self).setUp()
+		self.write_config(get_section('datamodel.Weather', shards='3'))
+		self.bdti = self.get_bdti()
+		self.bdti.deployment_handler = mock.Mock()
+
+	def test_subscription_by_shard(self):
+		self.assertTrue(self.bdti.integrate(['datamodel.Weather']))
+		subscription_ids = self.ConfigManager.get_subscription_ids('datamodel.Weather')
+		self.assertEqual(len(subscription_ids), 3)
+		subscriptions = self.orion.subscriptions['city']
+		self.assertEqual([subscriptions[subscription_id]["subject"]["entities"][0]["idPattern"]
+						  for subscription_id in subscription_ids], Helpers.get_shard_id_patterns(3))
+
+	def test_no_shard_left_when_one_fails(self):
+		with mock.patch.object(SubscriptionManager, 'do_subscription', side_effect=[
+				'urn:ngsi-ld:Subscription:1', 'urn:ngsi-ld:Subscription:2', RuntimeError('failed')]), \
+				mock.patch.object(SubscriptionManager, 'rm_subscription') as rm_subscription:
+			with self.assertRaises(RuntimeError):
+				SubscriptionManager.do_subscriptions('datamodel.Weather', self.orion_url, [
+					(pattern, CYGNUS_URL) for pattern in Helpers.get_shard_id_patterns(3)], id_pattern='',
+					fiware_service='city')
+		self.assertEqual([call[0][2] for call in rm_subscription.call_args_list],
+						 ['urn:ngsi-ld:Subscription:1', 'urn:ngsi-ld:Subscription:2'])
+
+
+if __name__ == '__main__':
+	unittest.main()
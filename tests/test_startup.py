@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+import unittest
+
+SOURCE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+# modules imported on demand by the commands that use them
+LAZY_MODULES = ['requests', 'urllib3', 'yaml', 'telnetlib', 'paramiko']
+
+# generous bound of the import of the command line module, far above its usual time, so only a heavy module
+# imported at startup makes the test fail
+MAX_IMPORT_SECONDS = 2
+
+
+def run_python(code):
+	"""
+	Runs some code in a fresh interpreter with the sources of the solution in its path
+
+	:param str code: the code
+	:return: the output of the code
+	:rtype: str
+	"""
+	env = dict(os.environ, PYTHONPATH=os.pathsep.join([SOURCE_PATH, os.environ.get('PYTHONPATH', '')]))
+	return subprocess.run([sys.executable, '-c', code], env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+						  universal_newlines=True, check=True).stdout
+
+
+class StartupTest(unittest.TestCase):
+	"""
+	Startup of the cb-bdti command line, paid by every command as each one runs in a fresh interpreter
+	"""
+
+	def assert_lazy_modules_not_loaded(self, module):
+		loaded = run_python('import %s, sys; print(" ".join(m for m in %r if m in sys.modules))'
+							% (module, LAZY_MODULES)).split()
+		self.assertEqual(loaded, [], '%s import loads %s' % (module, ', '.join(loaded)))
+
+	def test_commands_import_no_lazy_modules(self):
+		self.assert_lazy_modules_not_loaded('cb_bdti.commands')
+
+	def test_main_import_no_lazy_modules(self):
+		self.assert_lazy_modules_not_loaded('cb_bdti.core.main')
+
+	def test_commands_import_time(self):
+		seconds = float(run_python('import time; start = time.perf_counter(); import cb_bdti.commands; '
+								   'print(time.perf_counter() - start)'))
+		self.assertLess(seconds, MAX_IMPORT_SECONDS)
+
+	def test_help(self):
+		output = run_python('from cb_bdti.commands import cli; cli(["--help"], standalone_mode=False)')
+		self.assertIn('Usage', output)
+
+
+if __name__ == '__main__':
+	unittest.main()